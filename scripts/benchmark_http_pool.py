@@ -0,0 +1,127 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Benchmark AI client connection reuse against a local OpenAI-compatible stub.
+
+Sends waves of concurrent structured-output requests (like a grading fan-out)
+to tests/openai_stub_server.py and compares transport configurations:
+
+- no-reuse:  a new client per request (what the OpenRouter client used to do)
+- defaults:  SDK transport defaults (keep-alive connections expire after 5 seconds)
+- shared:    the shared configuration from cqc_cpcc.utilities.AI.http_client
+
+The stub charges --handshake-delay for every new connection to stand in for
+TCP/TLS setup. For each configuration the script prints throughput,
+p50/p95 latency and how many connections were opened.
+
+Usage:
+    PYTHONPATH=src python3 scripts/benchmark_http_pool.py --concurrency 150 --waves 4 --wave-gap 6
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path in (REPO_ROOT, REPO_ROOT / "src"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient  # noqa: E402
+
+from cqc_cpcc.utilities.AI.http_client import create_async_http_client, get_http_timeout  # noqa: E402
+from tests.openai_stub_server import OpenAIStubServer  # noqa: E402
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "Feedback",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"summary": {"type": "string"}, "score": {"type": "integer"}},
+            "required": ["summary", "score"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _client_factory(mode: str, base_url: str):
+    """Return (get_client, close) for a benchmark mode."""
+    if mode == "no-reuse":
+        def new_client() -> AsyncOpenAI:
+            return AsyncOpenAI(api_key="stub", base_url=base_url, max_retries=0)
+        return new_client, None
+
+    http_client = (DefaultAsyncHttpxClient(timeout=get_http_timeout()) if mode == "defaults"
+                   else create_async_http_client())
+    client = AsyncOpenAI(api_key="stub", base_url=base_url, max_retries=0, http_client=http_client)
+    return (lambda: client), client.close
+
+
+async def _run_mode(mode: str, args: argparse.Namespace) -> dict:
+    async with OpenAIStubServer(latency=args.latency, handshake_delay=args.handshake_delay) as stub:
+        get_client, close = _client_factory(mode, stub.base_url)
+        latencies: list[float] = []
+
+        async def one_request(i: int) -> None:
+            client = get_client()
+            started = time.perf_counter()
+            await client.chat.completions.create(
+                model="gpt-5-mini",
+                messages=[{"role": "user", "content": f"Grade submission {i}"}],
+                response_format=RESPONSE_FORMAT,
+            )
+            latencies.append(time.perf_counter() - started)
+            if close is None:
+                await client.close()
+
+        started = time.perf_counter()
+        for wave in range(args.waves):
+            await asyncio.gather(*(one_request(wave * args.concurrency + i) for i in range(args.concurrency)))
+            if wave < args.waves - 1 and args.wave_gap:
+                await asyncio.sleep(args.wave_gap)
+        elapsed = time.perf_counter() - started - args.wave_gap * (args.waves - 1)
+        if close is not None:
+            await close()
+
+        latencies.sort()
+        return {
+            "mode": mode,
+            "requests": len(latencies),
+            "req_per_s": len(latencies) / elapsed,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+            "connections": stub.stats["connections"],
+        }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=150, help="Requests per wave")
+    parser.add_argument("--waves", type=int, default=4, help="Number of waves")
+    parser.add_argument("--wave-gap", type=float, default=6.0, help="Idle seconds between waves")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response latency (seconds)")
+    parser.add_argument("--handshake-delay", type=float, default=0.03,
+                        help="Stub delay per new connection (seconds)")
+    parser.add_argument("--modes", default="no-reuse,defaults,shared", help="Comma-separated modes")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # Per-request client logs would drown the table
+
+    print(f"{'mode':<10} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'connections':>12}")
+    for mode in args.modes.split(","):
+        result = await _run_mode(mode.strip(), args)
+        print(
+            f"{result['mode']:<10} {result['requests']:>8} {result['req_per_s']:>8.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['connections']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
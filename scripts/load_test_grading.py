@@ -0,0 +1,251 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Load-test rubric grading against a local OpenAI-compatible stub.
+
+TEST_MODE returns canned objects and never touches the HTTP stack, so it
+cannot measure throughput. This driver starts tests/openai_stub_server.py
+in-process, points the real AI client at it (OPENAI_BASE_URL) and pushes
+synthetic BrightSpace-style ZIPs through the same steps as
+process_rubric_grading_batch on the Grade Assignment page:
+
+1. extract_student_submissions_from_zip for every ZIP
+2. per student: build_submission_text_with_token_limit, then
+   grade_with_rubric with a streamed-criterion callback
+3. all students run concurrently (asyncio.gather with return_exceptions);
+   the shared LLM concurrency limiter decides how many reach the stub
+
+The stub answers with a valid RubricAssessmentResult for the chosen rubric,
+with configurable latency distribution and 429/5xx injection, so retries,
+streaming and backend scoring are exercised too.
+
+Reports students per minute, p50/p95/p99 per-student latency, failures,
+stub request/token counts and peak memory (process max RSS, plus the Python
+heap peak with --trace-memory).
+
+Usage:
+    PYTHONPATH=src python3 scripts/load_test_grading.py --students 200 --zips 2 \\
+        --latency lognormal:1.5,0.4 --rate-limit-rate 0.02 --server-error-rate 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path in (REPO_ROOT, REPO_ROOT / "src"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from tests.openai_stub_server import OpenAIStubServer  # noqa: E402
+
+JAVA_TEMPLATE = """public class {class_name} {{
+    // Synthetic submission {index} for load testing
+    public static void main(String[] args) {{
+        int total = 0;
+        for (int i = 0; i < {loop}; i++) {{
+            total += i * {factor};
+        }}
+        System.out.println("Total: " + total);
+    }}
+}}
+"""
+
+
+def build_synthetic_zip(zip_path: Path, first_student: int, students: int, files_per_student: int,
+                        padding_lines: int) -> None:
+    """Write a BrightSpace-style ZIP ("<id> - <Student Name> - <timestamp>/<file>")."""
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for number in range(first_student, first_student + students):
+            folder = f"{100000 + number} - Student {number:05d} - Jan 1, 2026 1200 PM"
+            for file_index in range(files_per_student):
+                class_name = f"Part{file_index + 1}"
+                source = JAVA_TEMPLATE.format(class_name=class_name, index=number, loop=number % 97 + 3,
+                                              factor=file_index + 1)
+                source += "".join(f"// filler line {line} for student {number}\n" for line in range(padding_lines))
+                zip_file.writestr(f"{folder}/{class_name}.java", source)
+
+
+def make_rubric_content_factory(rubric, seed: int | None):
+    """Stub content factory returning a valid RubricAssessmentResult for rubric."""
+    rng = random.Random(seed)
+
+    def factory(request: dict) -> dict:
+        criteria_results = []
+        for criterion in rubric.criteria:
+            if not criterion.enabled:
+                continue
+            level = rng.choice(criterion.levels) if criterion.levels else None
+            points = (round(rng.uniform(level.score_min, level.score_max)) if level
+                      else rng.randint(0, criterion.max_points))
+            criteria_results.append({
+                "criterion_id": criterion.criterion_id,
+                "criterion_name": criterion.name,
+                "points_possible": criterion.max_points,
+                "points_earned": min(points, criterion.max_points),
+                "selected_level_label": level.label if level else None,
+                "feedback": f"Synthetic feedback for {criterion.name}.",
+                "evidence": None,
+            })
+        return {
+            "rubric_id": rubric.rubric_id,
+            "rubric_version": rubric.rubric_version,
+            "total_points_possible": rubric.total_points_possible,
+            "total_points_earned": sum(result["points_earned"] for result in criteria_results),
+            "criteria_results": criteria_results,
+            "overall_band_label": None,
+            "overall_feedback": "Synthetic overall feedback.",
+            "detected_errors": None,
+        }
+
+    return factory
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run_load_test(args: argparse.Namespace) -> dict:
+    async with OpenAIStubServer(
+            latency=args.latency,
+            handshake_delay=args.handshake_delay,
+            rate_limit_rate=args.rate_limit_rate,
+            server_error_rate=args.server_error_rate,
+            retry_after=args.retry_after,
+            seed=args.seed,
+    ) as stub:
+        # The client singleton reads these when it is first created
+        os.environ["OPENAI_API_KEY"] = "stub"
+        os.environ["OPENAI_BASE_URL"] = stub.base_url
+
+        from cqc_cpcc.rubric_config import get_rubric_by_id
+        from cqc_cpcc.rubric_grading import grade_with_rubric
+        from cqc_cpcc.utilities.zip_grading_utils import (
+            build_submission_text_with_token_limit,
+            extract_student_submissions_from_zip,
+        )
+
+        rubric = get_rubric_by_id(args.rubric_id)
+        stub.content_factory = make_rubric_content_factory(rubric, args.seed)
+
+        with tempfile.TemporaryDirectory(prefix="cqc_load_test_") as work_dir:
+            zip_paths = []
+            per_zip = -(-args.students // args.zips)
+            for zip_index in range(args.zips):
+                first = zip_index * per_zip
+                count = min(per_zip, args.students - first)
+                if count <= 0:
+                    break
+                zip_path = Path(work_dir) / f"submissions_{zip_index + 1}.zip"
+                build_synthetic_zip(zip_path, first, count, args.files_per_student, args.padding_lines)
+                zip_paths.append(zip_path)
+
+            latencies: list[float] = []
+            streamed_criteria = 0
+
+            def on_criterion_result(criterion_result) -> None:
+                nonlocal streamed_criteria
+                streamed_criteria += 1
+
+            async def grade_student(student_id: str, submission) -> str:
+                started = time.perf_counter()
+                submission_text = build_submission_text_with_token_limit(files=submission.files)
+                await grade_with_rubric(
+                    rubric=rubric,
+                    assignment_instructions="Write a Java program that totals a sequence of numbers.",
+                    student_submission=submission_text,
+                    model_name=args.model,
+                    temperature=0.2,
+                    on_criterion_result=on_criterion_result,
+                )
+                latencies.append(time.perf_counter() - started)
+                return student_id
+
+            started = time.perf_counter()
+            student_submissions = {}
+            for zip_path in zip_paths:
+                student_submissions.update(extract_student_submissions_from_zip(str(zip_path), ["java"]))
+            extracted = time.perf_counter()
+
+            results = await asyncio.gather(
+                *(grade_student(student_id, submission) for student_id, submission in student_submissions.items()),
+                return_exceptions=True,
+            )
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        failures = [result for result in results if isinstance(result, BaseException)]
+        return {
+            "students": len(student_submissions),
+            "graded": len(latencies),
+            "failed": len(failures),
+            "first_failure": repr(failures[0]) if failures else None,
+            "elapsed_s": elapsed,
+            "extract_s": extracted - started,
+            "students_per_min": len(latencies) / elapsed * 60 if elapsed else 0.0,
+            "p50_s": percentile(latencies, 0.50),
+            "p95_s": percentile(latencies, 0.95),
+            "p99_s": percentile(latencies, 0.99),
+            "streamed_criteria": streamed_criteria,
+            "stub": dict(stub.stats),
+        }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=100, help="Total synthetic students")
+    parser.add_argument("--zips", type=int, default=1, help="Number of ZIP files to spread students across")
+    parser.add_argument("--files-per-student", type=int, default=3, help="Java files per student")
+    parser.add_argument("--padding-lines", type=int, default=40, help="Filler lines per file (submission size)")
+    parser.add_argument("--rubric-id", default="default_100pt_rubric", help="Rubric from rubric_config")
+    parser.add_argument("--model", default="gpt-5-mini", help="Model name sent to the stub")
+    parser.add_argument("--latency", default="lognormal:1.0,0.4",
+                        help="Stub latency: seconds or fixed:/uniform:/normal:/lognormal: spec")
+    parser.add_argument("--handshake-delay", type=float, default=0.03, help="Stub delay per new connection")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="Fraction of requests answered 5xx")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency, faults and scores")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also report the Python heap peak (tracemalloc; slows the run)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # Per-request grading logs would drown the report
+
+    if args.trace_memory:
+        tracemalloc.start()
+    report = await run_load_test(args)
+    heap_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        max_rss_kb //= 1024  # macOS reports bytes
+
+    stub = report["stub"]
+    print(f"students          {report['graded']}/{report['students']} graded, {report['failed']} failed")
+    print(f"elapsed           {report['elapsed_s']:.1f} s (ZIP extraction {report['extract_s']:.2f} s)")
+    print(f"throughput        {report['students_per_min']:.1f} students/min")
+    print(f"latency p50/p95/p99  {report['p50_s']:.2f} / {report['p95_s']:.2f} / {report['p99_s']:.2f} s")
+    print(f"streamed criteria {report['streamed_criteria']}")
+    print(f"stub requests     {stub['requests']} on {stub['connections']} connections "
+          f"({stub['rate_limited']} x 429, {stub['server_errors']} x 5xx)")
+    print(f"stub tokens       {stub['prompt_tokens']} prompt / {stub['completion_tokens']} completion")
+    print(f"peak memory       {max_rss_kb / 1024:.1f} MiB RSS"
+          + (f", {heap_peak / 1024 / 1024:.1f} MiB Python heap" if heap_peak is not None else ""))
+    if report["first_failure"]:
+        print(f"first failure     {report['first_failure']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
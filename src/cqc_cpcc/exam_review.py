@@ -340,6 +340,9 @@ class CodeGrader:
     temperature: float = DEFAULT_TEMPERATURE
     use_openrouter: bool = False
     openrouter_auto_route: bool = True
+    use_model_router: bool = None
+    course_id: str = None
+    assignment_id: str = None
 
     def __init__(self, max_points: int, exam_instructions: str, exam_solution: str,
                  deduction_per_major_error: int = 20,
@@ -351,7 +354,10 @@ class CodeGrader:
                  model_name: str = DEFAULT_GRADING_MODEL,
                  temperature: float = DEFAULT_TEMPERATURE,
                  use_openrouter: bool = False,
-                 openrouter_auto_route: bool = True):
+                 openrouter_auto_route: bool = True,
+                 use_model_router: bool = None,
+                 course_id: str = None,
+                 assignment_id: str = None):
         self.max_points = max_points
         self.deduction_per_major_error = deduction_per_major_error
         self.deduction_per_minor_error = deduction_per_minor_error
@@ -362,6 +368,9 @@ class CodeGrader:
         self.temperature = temperature
         self.use_openrouter = use_openrouter
         self.openrouter_auto_route = openrouter_auto_route
+        self.use_model_router = use_model_router
+        self.course_id = course_id
+        self.assignment_id = assignment_id
 
         if major_error_type_list is None:
             major_error_type_list = MajorErrorType.list()
@@ -450,6 +459,9 @@ class CodeGrader:
                 callback=callback,
                 use_openrouter=self.use_openrouter,
                 openrouter_auto_route=self.openrouter_auto_route,
+                route=self.use_model_router,
+                course_id=self.course_id,
+                assignment_id=self.assignment_id,
             )
         else:
             # Legacy LangChain path
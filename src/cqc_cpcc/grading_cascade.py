@@ -0,0 +1,386 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Confidence-based model cascade for rubric grading.
+
+Most submissions are simple enough for a nano model, but every student used to
+be graded with the single model picked on the grading page. In cascade mode
+grade_with_rubric (rubric_grading.py) first grades with a cheap, fast model
+and re-grades with the selected (stronger) model only when a trigger fires:
+
+- schema_validation: the cheap model's output failed schema validation (after
+  its own retries) or could not be finalized
+- cheap_model_error: the cheap model call failed with a transport error or an
+  open circuit (after its own retries and failover)
+- band_boundary: the deterministic total is within the boundary margin of an
+  overall band edge, a manually scored criterion sits on a level edge, or one
+  more/fewer minor error would change the program_performance level
+- low_confidence: the cheap model's self-reported grading_confidence is below
+  the threshold (or missing)
+- scorer_disagreement: the cheap model's own points, levels or total disagree
+  with what the deterministic backend scorers compute from its output
+
+Escalations, estimated cost (from the llm_metrics price table) and latency are
+collected in CascadeStats for the UI. Savings compare the cascade's estimated
+cost with grading every submission with the strong model only.
+
+Configuration (environment variables):
+- CQC_AI_GRADING_CASCADE: Enable cascade mode by default (default: False)
+- CQC_AI_CASCADE_CHEAP_MODEL: First-pass model (default: gpt-5-nano)
+- CQC_AI_CASCADE_CONFIDENCE_THRESHOLD: Minimum self-reported confidence (default: 0.75)
+- CQC_AI_CASCADE_BOUNDARY_MARGIN: Band-edge margin as a fraction of points (default: 0.02)
+- CQC_AI_CASCADE_DISAGREEMENT_TOLERANCE: Allowed LLM/backend point difference as
+  a fraction of points (default: 0.1)
+
+Usage:
+    from cqc_cpcc.grading_cascade import get_cascade_stats
+    from cqc_cpcc.rubric_grading import grade_with_rubric
+
+    result = await grade_with_rubric(rubric, instructions, submission, model_name="gpt-5", cascade=True)
+    print(get_cascade_stats().snapshot()["escalation_rate"])
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Annotated, Any, Optional
+
+from pydantic import Field
+
+from cqc_cpcc.rubric_grading import compute_effective_error_counts, select_rubric_program_performance_level
+from cqc_cpcc.rubric_models import Rubric, RubricAssessmentResult
+from cqc_cpcc.utilities.AI.llm_metrics import LatencyHistogram, get_metrics_registry
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_CASCADE_BOUNDARY_MARGIN,
+    CQC_AI_CASCADE_CHEAP_MODEL,
+    CQC_AI_CASCADE_CONFIDENCE_THRESHOLD,
+    CQC_AI_CASCADE_DISAGREEMENT_TOLERANCE,
+)
+from cqc_cpcc.utilities.logger import logger
+from cqc_cpcc.utilities.token_estimator import get_token_estimator
+
+CASCADE_TRIGGERS = ("schema_validation", "cheap_model_error", "band_boundary", "low_confidence",
+                    "scorer_disagreement")
+
+# Criteria whose points the backend computes (LLM points are only a cross-check)
+BACKEND_SCORED_MODES = ("level_band", "error_count")
+
+
+class CascadeRubricAssessmentResult(RubricAssessmentResult):
+    """RubricAssessmentResult plus the cheap model's self-reported confidence."""
+    grading_confidence: Annotated[
+        Optional[float],
+        Field(
+            default=None,
+            description="Your confidence from 0.0 to 1.0 that an expert grader would select the same "
+                        "levels and error counts for every criterion. Use lower values for ambiguous, "
+                        "borderline or partially readable submissions."
+        )
+    ]
+
+
+@dataclass(frozen=True)
+class CascadeConfig:
+    """Cascade thresholds (defaults from the environment)."""
+    cheap_model: str = CQC_AI_CASCADE_CHEAP_MODEL
+    confidence_threshold: float = CQC_AI_CASCADE_CONFIDENCE_THRESHOLD
+    boundary_margin: float = CQC_AI_CASCADE_BOUNDARY_MARGIN
+    disagreement_tolerance: float = CQC_AI_CASCADE_DISAGREEMENT_TOLERANCE
+
+
+@dataclass
+class CascadeDecision:
+    """How one submission went through the cascade.
+
+    Attributes:
+        cheap_model: First-pass model
+        strong_model: Escalation model
+        triggers: Trigger names that fired (empty = cheap result kept)
+        reasons: Human-readable detail for each trigger
+        confidence: Cheap model's self-reported confidence
+        cheap_seconds: First-pass latency
+        strong_seconds: Escalation latency (0 if not escalated)
+        cost_usd: Estimated cost of the cascade for this submission
+        strong_only_cost_usd: Estimated cost of grading with the strong model only
+            (None if the strong model is not in the price table)
+    """
+    cheap_model: str
+    strong_model: str
+    triggers: list[str] = field(default_factory=list)
+    reasons: list[str] = field(default_factory=list)
+    confidence: Optional[float] = None
+    cheap_seconds: float = 0.0
+    strong_seconds: float = 0.0
+    cost_usd: float = 0.0
+    strong_only_cost_usd: Optional[float] = None
+
+    @property
+    def escalated(self) -> bool:
+        return bool(self.triggers)
+
+    @property
+    def final_model(self) -> str:
+        return self.strong_model if self.escalated else self.cheap_model
+
+    @property
+    def total_seconds(self) -> float:
+        return self.cheap_seconds + self.strong_seconds
+
+
+def estimate_grading_cost(model: str, prompt: str, completion: str) -> Optional[float]:
+    """Estimated USD cost of one grading call (None if the model is unpriced)."""
+    registry = get_metrics_registry()
+    if not registry.has_price(model):
+        return None
+    estimator = get_token_estimator()
+    return registry.estimate_cost(model, estimator.estimate(prompt), estimator.estimate(completion), 0)
+
+
+def _level_edges(levels) -> list[float]:
+    """Scores where one level ends and the next begins (midpoint of any gap, e.g. 89.5)."""
+    ordered = sorted(levels, key=lambda level: level.score_min)
+    return [(lower.score_max + upper.score_min) / 2 for lower, upper in zip(ordered, ordered[1:])]
+
+
+def find_boundary_reasons(rubric: Rubric, result: RubricAssessmentResult, margin: float) -> list[str]:
+    """Reasons a finalized result sits on a band boundary.
+
+    Args:
+        rubric: The rubric used for grading
+        result: Result after backend scoring
+        margin: Margin as a fraction of the points involved
+
+    Returns:
+        Reasons (empty if no criterion or band is near a boundary)
+    """
+    reasons = []
+
+    # A single criterion's level fixes the total, so only sums of criteria can sit near a band edge
+    if rubric.overall_bands and len([c for c in rubric.criteria if c.enabled]) > 1:
+        tolerance = margin * rubric.total_points_possible
+        for edge in _level_edges(rubric.overall_bands):
+            if abs(result.total_points_earned - edge) <= tolerance:
+                reasons.append(f"total {result.total_points_earned:g} is within {tolerance:g} of band edge {edge:g}")
+
+    criteria = {c.criterion_id: c for c in rubric.criteria if c.enabled}
+    for criterion_result in result.criteria_results:
+        criterion = criteria.get(criterion_result.criterion_id)
+        if criterion is None or not criterion.levels:
+            continue
+
+        if criterion.criterion_id == "program_performance" and result.original_major_errors is not None:
+            major, minor = result.original_major_errors, result.original_minor_errors or 0
+            for neighbour_minor in (minor - 1, minor + 1):
+                if neighbour_minor < 0:
+                    continue
+                try:
+                    label, _ = select_rubric_program_performance_level(
+                        rubric, criterion, *compute_effective_error_counts(rubric, major, neighbour_minor)
+                    )
+                except ValueError:
+                    continue
+                if label != criterion_result.selected_level_label:
+                    reasons.append(
+                        f"{criterion.criterion_id} changes to '{label}' with {neighbour_minor} minor errors "
+                        f"(graded with {minor})"
+                    )
+                    break
+
+        elif criterion.scoring_mode == "manual" and criterion_result.points_earned is not None:
+            tolerance = margin * criterion.max_points
+            for edge in _level_edges(criterion.levels):
+                if abs(criterion_result.points_earned - edge) <= tolerance:
+                    reasons.append(
+                        f"{criterion.criterion_id} {criterion_result.points_earned:g} is on level edge {edge:g}"
+                    )
+                    break
+
+    return reasons
+
+
+def find_disagreement_reasons(
+        rubric: Rubric,
+        raw: RubricAssessmentResult,
+        final: RubricAssessmentResult,
+        tolerance: float,
+) -> list[str]:
+    """Reasons the model's own scores disagree with the deterministic scorers.
+
+    Args:
+        rubric: The rubric used for grading
+        raw: Model output before backend scoring (a copy; finalizing mutates criteria)
+        final: Result after backend scoring
+        tolerance: Allowed difference as a fraction of the points involved
+
+    Returns:
+        Reasons (empty if the model agrees with the backend)
+    """
+    reasons = []
+    criteria = {c.criterion_id: c for c in rubric.criteria if c.enabled}
+    raw_by_id = {cr.criterion_id: cr for cr in raw.criteria_results}
+
+    for final_result in final.criteria_results:
+        criterion = criteria.get(final_result.criterion_id)
+        raw_result = raw_by_id.get(final_result.criterion_id)
+        if criterion is None or raw_result is None:
+            continue
+        backend_scored = criterion.scoring_mode in BACKEND_SCORED_MODES or criterion.criterion_id == "program_performance"
+        if not backend_scored:
+            continue
+
+        if (
+                criterion.criterion_id == "program_performance"
+                and raw_result.selected_level_label
+                and raw_result.selected_level_label != final_result.selected_level_label
+        ):
+            reasons.append(
+                f"{criterion.criterion_id}: model chose '{raw_result.selected_level_label}', "
+                f"error counts give '{final_result.selected_level_label}'"
+            )
+        elif (
+                raw_result.points_earned  # None or 0 means the model left scoring to the backend
+                and final_result.points_earned is not None
+                and abs(raw_result.points_earned - final_result.points_earned) > tolerance * criterion.max_points
+        ):
+            reasons.append(
+                f"{criterion.criterion_id}: model gave {raw_result.points_earned:g}, "
+                f"backend computed {final_result.points_earned:g}"
+            )
+
+    # The prompt asks for total_points_earned=0 so the backend recalculates; only a nonzero total is a claim
+    if (
+            raw.total_points_earned
+            and abs(raw.total_points_earned - final.total_points_earned) > tolerance * rubric.total_points_possible
+    ):
+        reasons.append(
+            f"total: model gave {raw.total_points_earned:g}, backend computed {final.total_points_earned:g}"
+        )
+    return reasons
+
+
+def evaluate_cascade_triggers(
+        rubric: Rubric,
+        raw: RubricAssessmentResult,
+        final: RubricAssessmentResult,
+        confidence: Optional[float],
+        config: CascadeConfig,
+) -> tuple[list[str], list[str]]:
+    """Check a cheap-model result against every escalation trigger.
+
+    Args:
+        rubric: The rubric used for grading
+        raw: Cheap model output before backend scoring
+        final: The same output after backend scoring
+        confidence: Self-reported confidence (None counts as low)
+        config: Cascade thresholds
+
+    Returns:
+        (trigger names, reasons)
+    """
+    triggers, reasons = [], []
+
+    if confidence is None or confidence < config.confidence_threshold:
+        triggers.append("low_confidence")
+        reasons.append(f"confidence {confidence if confidence is not None else 'missing'} "
+                       f"< {config.confidence_threshold:g}")
+
+    boundary = find_boundary_reasons(rubric, final, config.boundary_margin)
+    if boundary:
+        triggers.append("band_boundary")
+        reasons.extend(boundary)
+
+    disagreement = find_disagreement_reasons(rubric, raw, final, config.disagreement_tolerance)
+    if disagreement:
+        triggers.append("scorer_disagreement")
+        reasons.extend(disagreement)
+
+    return triggers, reasons
+
+
+class CascadeStats:
+    """Thread-safe escalation, cost and latency counters for cascade grading."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.graded = 0
+        self.escalated = 0
+        self.trigger_counts = {name: 0 for name in CASCADE_TRIGGERS}
+        self.cost_usd = 0.0
+        self.strong_only_cost_usd = 0.0
+        self._unpriced = 0
+        self._latency = {"cascade": LatencyHistogram(), "cheap_only": LatencyHistogram(),
+                         "escalated": LatencyHistogram()}
+
+    def record(self, decision: CascadeDecision) -> None:
+        """Add one submission's cascade decision."""
+        with self._lock:
+            self.graded += 1
+            self.cost_usd += decision.cost_usd
+            if decision.strong_only_cost_usd is None:
+                self._unpriced += 1
+            else:
+                self.strong_only_cost_usd += decision.strong_only_cost_usd
+            self._latency["cascade"].observe(decision.total_seconds)
+            if decision.escalated:
+                self.escalated += 1
+                for trigger in decision.triggers:
+                    self.trigger_counts[trigger] = self.trigger_counts.get(trigger, 0) + 1
+                self._latency["escalated"].observe(decision.total_seconds)
+            else:
+                self._latency["cheap_only"].observe(decision.total_seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        """JSON-serializable summary.
+
+        Returns:
+            Dict with graded, escalated, escalation_rate, trigger_counts,
+            cost_usd, strong_only_cost_usd, savings_usd, savings_rate (None when
+            the strong model is unpriced) and latency {kind: {count, mean, p50, p95}}
+        """
+        with self._lock:
+            priced = self._unpriced == 0 and self.graded > 0
+            savings = self.strong_only_cost_usd - self.cost_usd if priced else None
+            return {
+                "graded": self.graded,
+                "escalated": self.escalated,
+                "escalation_rate": round(self.escalated / self.graded, 4) if self.graded else None,
+                "trigger_counts": dict(self.trigger_counts),
+                "cost_usd": round(self.cost_usd, 6),
+                "strong_only_cost_usd": round(self.strong_only_cost_usd, 6) if priced else None,
+                "savings_usd": round(savings, 6) if savings is not None else None,
+                "savings_rate": (round(savings / self.strong_only_cost_usd, 4)
+                                 if savings is not None and self.strong_only_cost_usd else None),
+                "latency": {
+                    kind: {
+                        "count": histogram.count,
+                        "mean": round(histogram.total / histogram.count, 3) if histogram.count else None,
+                        "p50": histogram.quantile(0.5),
+                        "p95": histogram.quantile(0.95),
+                    }
+                    for kind, histogram in self._latency.items()
+                },
+            }
+
+
+_cascade_stats = CascadeStats()
+_cascade_stats_lock = threading.Lock()
+
+
+def get_cascade_stats() -> CascadeStats:
+    """Process-wide cascade statistics (for the settings page)."""
+    return _cascade_stats
+
+
+def reset_cascade_stats() -> None:
+    """Start new process-wide cascade statistics (mainly for tests)."""
+    global _cascade_stats
+    with _cascade_stats_lock:
+        _cascade_stats = CascadeStats()
+
+
+def log_cascade_decision(decision: CascadeDecision) -> None:
+    if decision.escalated:
+        logger.info(
+            f"Cascade escalated from '{decision.cheap_model}' to '{decision.strong_model}' "
+            f"({', '.join(decision.triggers)}): {'; '.join(decision.reasons)}"
+        )
+    else:
+        logger.info(f"Cascade kept '{decision.cheap_model}' result (confidence={decision.confidence})")
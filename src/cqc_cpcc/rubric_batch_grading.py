@@ -0,0 +1,409 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Offline bulk rubric grading through a Batch-style JSONL pipeline.
+
+Interactive grading (grade_with_rubric) sends one request per student and
+waits for each answer. For end-of-term exams latency does not matter, but
+throughput and cost do, so this module grades a whole class through a batch
+endpoint (such as the OpenAI Batch API) in four stages:
+
+1. Serialize: build every student's rubric prompt and write one JSONL line per
+   student with the RubricAssessmentResult response_format
+2. Submit: upload the JSONL file and create the batch
+3. Poll: check batch status with exponential backoff until it finishes
+4. Stream: read result lines as they are downloaded, validate each against
+   RubricAssessmentResult and run it through finalize_rubric_result()
+   (rubric identity correction + apply_backend_scoring)
+
+The endpoint is pluggable through the BatchEndpoint protocol. OpenAIBatchEndpoint
+works with any OpenAI-compatible server (pass an AsyncOpenAI client with a
+custom base_url to use a local stand-in).
+
+Usage:
+    >>> from cqc_cpcc.rubric_batch_grading import grade_with_rubric_batch
+    >>> outcome = await grade_with_rubric_batch(
+    ...     rubric=rubric,
+    ...     assignment_instructions="Write a Hello World program...",
+    ...     student_submissions={"student_1": "...", "student_2": "..."},
+    ... )
+    >>> outcome.results["student_1"].total_points_earned
+    >>> outcome.failures  # {"student_2": "reason"}
+"""
+
+import asyncio
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional, Protocol
+
+from pydantic import ValidationError
+
+from cqc_cpcc.error_definitions_models import ErrorDefinition
+from cqc_cpcc.rubric_grading import (
+    DEFAULT_GRADING_MODEL,
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_TEMPERATURE,
+    build_rubric_grading_prompt,
+    finalize_rubric_result,
+)
+from cqc_cpcc.rubric_models import Rubric, RubricAssessmentResult
+from cqc_cpcc.utilities.AI.openai_client import (
+    _normalize_fallback_json,
+    get_client,
+    get_token_param_for_model,
+    sanitize_openai_params,
+)
+from cqc_cpcc.utilities.AI.schema_registry import get_compiled_schema
+from cqc_cpcc.utilities.logger import logger
+
+BATCH_CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Batch statuses (OpenAI Batch API vocabulary)
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+DEFAULT_POLL_INITIAL_DELAY = 5.0
+DEFAULT_POLL_MAX_DELAY = 300.0
+DEFAULT_POLL_BACKOFF_MULTIPLIER = 2.0
+DEFAULT_POLL_TIMEOUT = 24 * 60 * 60
+
+
+class BatchEndpoint(Protocol):
+    """A batch endpoint that accepts a JSONL file of chat completion requests."""
+
+    async def submit(self, jsonl_content: str) -> str:
+        """Upload the JSONL content, create a batch and return its ID."""
+        ...
+
+    async def get_status(self, batch_id: str) -> dict:
+        """Return batch status info. Must contain a "status" key."""
+        ...
+
+    def iter_results(self, batch_id: str) -> AsyncIterator[dict]:
+        """Yield parsed result lines (output and error files) for a finished batch."""
+        ...
+
+
+class OpenAIBatchEndpoint:
+    """BatchEndpoint backed by the OpenAI Batch API (or a compatible server).
+
+    Args:
+        client: AsyncOpenAI client. Defaults to the shared client from get_client().
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    async def _get_client(self):
+        if self._client is None:
+            self._client = await get_client()
+        return self._client
+
+    async def submit(self, jsonl_content: str) -> str:
+        client = await self._get_client()
+        upload = io.BytesIO(jsonl_content.encode("utf-8"))
+        upload.name = "rubric_batch.jsonl"
+
+        input_file = await client.files.create(file=upload, purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_CHAT_COMPLETIONS_URL,
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+        logger.info(f"Submitted batch {batch.id} (input_file={input_file.id})")
+        return batch.id
+
+    async def get_status(self, batch_id: str) -> dict:
+        client = await self._get_client()
+        batch = await client.batches.retrieve(batch_id)
+        request_counts = getattr(batch, "request_counts", None)
+        return {
+            "status": batch.status,
+            "output_file_id": getattr(batch, "output_file_id", None),
+            "error_file_id": getattr(batch, "error_file_id", None),
+            "completed": getattr(request_counts, "completed", None),
+            "failed": getattr(request_counts, "failed", None),
+            "total": getattr(request_counts, "total", None),
+        }
+
+    async def iter_results(self, batch_id: str) -> AsyncIterator[dict]:
+        client = await self._get_client()
+        status = await self.get_status(batch_id)
+
+        for file_id in (status.get("output_file_id"), status.get("error_file_id")):
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+@dataclass
+class BatchGradingOutcome:
+    """Results of a batch grading run.
+
+    Attributes:
+        batch_id: ID of the submitted batch
+        results: Student ID -> scored RubricAssessmentResult
+        failures: Student ID -> failure reason
+    """
+    batch_id: str
+    results: dict[str, RubricAssessmentResult] = field(default_factory=dict)
+    failures: dict[str, str] = field(default_factory=dict)
+
+
+def build_rubric_batch_jsonl(
+        rubric: Rubric,
+        assignment_instructions: str,
+        student_submissions: dict[str, str],
+        reference_solution: Optional[str] = None,
+        error_definitions: Optional[list[ErrorDefinition]] = None,
+        model_name: str = DEFAULT_GRADING_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+) -> str:
+    """Stage 1: serialize every student's grading request into Batch JSONL.
+
+    Each line is a chat completion request keyed by custom_id = student ID,
+    using the same prompt and strict RubricAssessmentResult schema as
+    grade_with_rubric().
+
+    Args:
+        rubric: The grading rubric
+        assignment_instructions: Assignment requirements
+        student_submissions: Student ID -> submission text
+        reference_solution: Optional reference solution
+        error_definitions: Optional error definitions
+        model_name: OpenAI model name
+        temperature: Sampling temperature
+        max_tokens: Output token limit per request
+
+    Returns:
+        JSONL content (one request per line)
+    """
+    compiled_schema = get_compiled_schema(RubricAssessmentResult)
+    token_param = get_token_param_for_model(model_name)
+
+    lines = []
+    for student_id, submission in student_submissions.items():
+        prompt = build_rubric_grading_prompt(
+            rubric=rubric,
+            assignment_instructions=assignment_instructions,
+            student_submission=submission,
+            reference_solution=reference_solution,
+            error_definitions=error_definitions,
+        )
+        body = sanitize_openai_params(model_name, {
+            "model": model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "response_format": compiled_schema.response_format,
+            "temperature": temperature,
+            token_param: max_tokens,
+        })
+        lines.append(json.dumps({
+            "custom_id": student_id,
+            "method": "POST",
+            "url": BATCH_CHAT_COMPLETIONS_URL,
+            "body": body,
+        }))
+
+    logger.info(f"Serialized {len(lines)} rubric grading requests for batch (model={model_name})")
+    return "\n".join(lines) + "\n"
+
+
+async def poll_batch_until_done(
+        endpoint: BatchEndpoint,
+        batch_id: str,
+        initial_delay: float = DEFAULT_POLL_INITIAL_DELAY,
+        max_delay: float = DEFAULT_POLL_MAX_DELAY,
+        backoff_multiplier: float = DEFAULT_POLL_BACKOFF_MULTIPLIER,
+        timeout: float = DEFAULT_POLL_TIMEOUT,
+) -> dict:
+    """Stage 3: poll a batch with exponential backoff until it reaches a terminal status.
+
+    Args:
+        endpoint: Batch endpoint
+        batch_id: Batch ID returned by submit()
+        initial_delay: First delay between polls in seconds
+        max_delay: Upper bound for the delay between polls
+        backoff_multiplier: Delay growth factor per poll
+        timeout: Give up after this many seconds
+
+    Returns:
+        Final status dict from the endpoint
+
+    Raises:
+        TimeoutError: If the batch is not finished within timeout
+    """
+    delay = initial_delay
+    deadline = time.monotonic() + timeout
+
+    while True:
+        status = await endpoint.get_status(batch_id)
+        state = status.get("status")
+        logger.info(
+            f"Batch {batch_id} status={state} "
+            f"(completed={status.get('completed')}, failed={status.get('failed')}, total={status.get('total')})"
+        )
+        if state in BATCH_TERMINAL_STATUSES:
+            return status
+
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"Batch {batch_id} did not finish within {timeout} seconds (last status={state})")
+
+        await asyncio.sleep(delay)
+        delay = min(delay * backoff_multiplier, max_delay)
+
+
+def parse_batch_result_line(rubric: Rubric, line: dict) -> tuple[str, RubricAssessmentResult | None, str | None]:
+    """Convert one batch result line into a scored result.
+
+    Args:
+        rubric: The rubric used for grading
+        line: Parsed JSONL result line
+
+    Returns:
+        (student_id, result, None) on success or (student_id, None, reason) on failure
+    """
+    student_id = line.get("custom_id", "")
+
+    if line.get("error"):
+        return student_id, None, f"Batch request error: {line['error']}"
+
+    response = line.get("response") or {}
+    status_code = response.get("status_code")
+    if status_code != 200:
+        return student_id, None, f"Batch request returned status {status_code}"
+
+    try:
+        message = response["body"]["choices"][0]["message"]
+    except (KeyError, IndexError, TypeError):
+        return student_id, None, "Batch response missing choices"
+
+    if message.get("refusal"):
+        return student_id, None, f"Model refused: {message['refusal']}"
+
+    content = message.get("content")
+    if not content:
+        return student_id, None, "Batch response content was empty"
+
+    compiled_schema = get_compiled_schema(RubricAssessmentResult)
+    try:
+        result = compiled_schema.type_adapter.validate_json(content)
+    except ValidationError:
+        # Same tolerance as the interactive fallback path
+        try:
+            result = compiled_schema.type_adapter.validate_python(
+                _normalize_fallback_json(json.loads(content), RubricAssessmentResult)
+            )
+        except (ValidationError, json.JSONDecodeError) as e:
+            return student_id, None, f"Schema validation failed: {e}"
+
+    try:
+        return student_id, finalize_rubric_result(rubric, result), None
+    except ValueError as e:
+        return student_id, None, str(e)
+
+
+async def stream_batch_results(
+        endpoint: BatchEndpoint,
+        batch_id: str,
+        rubric: Rubric,
+) -> AsyncIterator[tuple[str, RubricAssessmentResult | None, str | None]]:
+    """Stage 4: stream scored results for a finished batch.
+
+    Args:
+        endpoint: Batch endpoint
+        batch_id: Finished batch ID
+        rubric: The rubric used for grading
+
+    Yields:
+        (student_id, result, failure_reason) per result line
+    """
+    async for line in endpoint.iter_results(batch_id):
+        yield parse_batch_result_line(rubric, line)
+
+
+async def grade_with_rubric_batch(
+        rubric: Rubric,
+        assignment_instructions: str,
+        student_submissions: dict[str, str],
+        reference_solution: Optional[str] = None,
+        error_definitions: Optional[list[ErrorDefinition]] = None,
+        model_name: str = DEFAULT_GRADING_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        endpoint: Optional[BatchEndpoint] = None,
+        poll_initial_delay: float = DEFAULT_POLL_INITIAL_DELAY,
+        poll_max_delay: float = DEFAULT_POLL_MAX_DELAY,
+        poll_timeout: float = DEFAULT_POLL_TIMEOUT,
+) -> BatchGradingOutcome:
+    """Grade many submissions through a batch endpoint (serialize, submit, poll, stream).
+
+    Args:
+        rubric: The grading rubric
+        assignment_instructions: Assignment requirements
+        student_submissions: Student ID -> submission text
+        reference_solution: Optional reference solution
+        error_definitions: Optional error definitions
+        model_name: OpenAI model name (batch endpoints do not support OpenRouter IDs)
+        temperature: Sampling temperature
+        endpoint: Batch endpoint (default: OpenAIBatchEndpoint with the shared client)
+        poll_initial_delay: First delay between status polls in seconds
+        poll_max_delay: Maximum delay between status polls in seconds
+        poll_timeout: Maximum total wait in seconds
+
+    Returns:
+        BatchGradingOutcome with per-student results and failures
+
+    Raises:
+        ValueError: If there are no submissions or the batch did not complete
+        TimeoutError: If polling times out
+    """
+    if not student_submissions:
+        raise ValueError("No student submissions to grade")
+
+    if endpoint is None:
+        endpoint = OpenAIBatchEndpoint()
+
+    jsonl_content = build_rubric_batch_jsonl(
+        rubric=rubric,
+        assignment_instructions=assignment_instructions,
+        student_submissions=student_submissions,
+        reference_solution=reference_solution,
+        error_definitions=error_definitions,
+        model_name=model_name,
+        temperature=temperature,
+    )
+
+    batch_id = await endpoint.submit(jsonl_content)
+    status = await poll_batch_until_done(
+        endpoint,
+        batch_id,
+        initial_delay=poll_initial_delay,
+        max_delay=poll_max_delay,
+        timeout=poll_timeout,
+    )
+
+    if status.get("status") != "completed":
+        raise ValueError(f"Batch {batch_id} ended with status '{status.get('status')}'")
+
+    outcome = BatchGradingOutcome(batch_id=batch_id)
+    async for student_id, result, failure in stream_batch_results(endpoint, batch_id, rubric):
+        if result is not None:
+            outcome.results[student_id] = result
+        else:
+            logger.warning(f"Batch grading failed for {student_id}: {failure}")
+            outcome.failures[student_id] = failure
+
+    # Students with no result line at all
+    for student_id in student_submissions:
+        if student_id not in outcome.results and student_id not in outcome.failures:
+            outcome.failures[student_id] = "No result returned by batch"
+
+    logger.info(
+        f"Batch {batch_id} graded {len(outcome.results)}/{len(student_submissions)} submission(s), "
+        f"{len(outcome.failures)} failure(s)"
+    )
+    return outcome
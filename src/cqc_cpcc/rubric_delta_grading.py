@@ -0,0 +1,576 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Delta regrading for resubmissions based on per-file content hashes.
+
+When a student resubmits after feedback, usually one or two files change but
+the whole project used to be regraded. Delta mode reuses the previous grade:
+
+1. Record: every graded result is stored as a GradedSubmission together with
+   a SHA-256 per submission file and a hash of the grading context (rubric,
+   instructions, reference solution and error definitions, i.e. the shared
+   prompt prefix). Records live in a SQLite store next to the response cache,
+   keyed by assignment and student ID.
+2. Diff: on resubmission the new per-file hashes are compared to the stored
+   ones. Nothing changed -> the previous result is reused without an LLM call.
+   No previous record, a different grading context, or too much changed
+   (CQC_DELTA_MAX_CHANGED_FRACTION of the submission characters) -> normal
+   full grading with grade_with_rubric.
+3. Delta request: only the changed and added files are sent in full. The
+   unchanged files are replaced by a compact digest (name, language, line
+   count and an outline of their definitions), followed by the previous
+   criterion results and detected errors. The model re-evaluates only the
+   criteria the changes affect and returns a DeltaRubricAssessment.
+4. Merge: re-evaluated criteria replace the previous ones, the updated error
+   list replaces the previous one, and the merged result goes through
+   finalize_rubric_result() (apply_backend_scoring), exactly like a full grade.
+   A delta response that fails validation falls back to full grading.
+
+Configuration (environment variables):
+- CQC_DELTA_REGRADING: Enable delta regrading on the grading page by default (default: False)
+- CQC_DELTA_MAX_CHANGED_FRACTION: Above this fraction of changed characters,
+  regrade in full (default: 0.5)
+- CQC_GRADING_HISTORY_MAX_MB: Maximum size of the stored results (default: 256)
+- CQC_GRADING_HISTORY_TTL_DAYS: How long stored results are kept (default: 180)
+
+Usage:
+    >>> from cqc_cpcc.rubric_delta_grading import get_grading_history, grade_with_rubric_delta
+    >>> history = get_grading_history()
+    >>> previous = history.get("CSC151/Exam1", "student_1")
+    >>> outcome = await grade_with_rubric_delta(
+    ...     rubric=rubric,
+    ...     assignment_instructions="Write a Hello World program...",
+    ...     student_submission=submission_text,
+    ...     previous=previous,
+    ... )
+    >>> outcome.mode  # "delta", "unchanged" or "full"
+    >>> history.put(outcome.to_record("CSC151/Exam1", "student_1"))
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Annotated, Any, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from cqc_cpcc.error_definitions_models import ErrorDefinition
+from cqc_cpcc.rubric_grading import (
+    DEFAULT_GRADING_MODEL,
+    DEFAULT_TEMPERATURE,
+    _request_with_failover,
+    build_rubric_grading_prompt_prefix,
+    finalize_rubric_result,
+    grade_with_rubric,
+)
+from cqc_cpcc.rubric_models import CriterionResult, DetectedError, Rubric, RubricAssessmentResult
+from cqc_cpcc.utilities.AI.chunked_preprocessing import split_submission_files
+from cqc_cpcc.utilities.AI.openai_exceptions import OpenAISchemaValidationError
+from cqc_cpcc.utilities.AI.response_cache import ResponseCache
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_FAILOVER_MODEL,
+    CQC_AI_RESPONSE_CACHE_DIR,
+    CQC_DELTA_MAX_CHANGED_FRACTION,
+    CQC_GRADING_HISTORY_MAX_MB,
+    CQC_GRADING_HISTORY_TTL_DAYS,
+)
+from cqc_cpcc.utilities.logger import logger
+
+# Bump when the stored record format or file hash normalization changes
+GRADING_HISTORY_VERSION = 1
+
+GRADING_HISTORY_FILENAME = "grading_history.sqlite3"
+
+# Outline entries listed per unchanged file in the digest
+MAX_OUTLINE_ENTRIES = 12
+
+# Lines that declare a class, function or method (kept in the unchanged-file outline)
+_DEFINITION_PATTERN = re.compile(
+    r"^\s*(?:(?:public|private|protected|static|final|abstract|async|export|override|virtual)\s+)*"
+    r"(?:def|class|interface|enum|record|struct|function|fun|func|fn)\b"
+    r"|^\s*(?:(?:public|private|protected|static|final|abstract|synchronized)\s+)+[\w<>\[\],.? ]+\s+\w+\s*\("
+    r"|^[\w<>:*&]+(?:\s+[\w<>:*&]+)+\s*\([^;]*$"
+)
+
+
+class GradedSubmission(BaseModel):
+    """A stored grading result with the per-file hashes it was graded from.
+
+    Attributes:
+        assignment_key: Identifies the assignment (e.g. "CSC151/Exam1")
+        student_id: Student identifier
+        context_hash: SHA-256 of the grading context (see build_grading_context_hash)
+        file_hashes: File name -> SHA-256 of the file content
+        result: Scored RubricAssessmentResult
+        mode: How the result was produced ("full", "delta" or "unchanged")
+        graded_at: Unix timestamp
+    """
+    assignment_key: str
+    student_id: str
+    context_hash: str
+    file_hashes: dict[str, str]
+    result: RubricAssessmentResult
+    mode: str = "full"
+    graded_at: float = Field(default_factory=time.time)
+
+
+class DeltaRubricAssessment(BaseModel):
+    """Model output for a delta regrade of a resubmission."""
+    reevaluated_criteria: Annotated[
+        list[CriterionResult],
+        Field(default_factory=list,
+              description="Results only for the criteria the changed files affect (empty if none)")
+    ]
+    detected_errors: Annotated[
+        Optional[list[DetectedError]],
+        Field(default=None, description="Complete updated error list for the whole submission")
+    ]
+    error_counts_by_severity: Annotated[
+        Optional[dict[str, int]],
+        Field(default=None, description="Updated error counts for the whole submission by severity")
+    ]
+    error_counts_by_id: Annotated[
+        Optional[dict[str, int]],
+        Field(default=None, description="Updated error counts for the whole submission by error_id")
+    ]
+    overall_feedback: Annotated[str, Field(description="Updated overall summary feedback")]
+
+
+@dataclass
+class FileDelta:
+    """Per-file differences between a stored grade and a resubmission.
+
+    Attributes:
+        changed: Files present in both whose content hash differs
+        added: Files only in the resubmission
+        removed: Files only in the previous submission
+        unchanged: Files with the same content hash
+        changed_fraction: Share of the resubmission's characters in changed and added files
+    """
+    changed: list[str] = field(default_factory=list)
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    changed_fraction: float = 0.0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.changed or self.added or self.removed)
+
+
+@dataclass
+class DeltaGradingOutcome:
+    """Result of grade_with_rubric_delta.
+
+    Attributes:
+        result: Scored RubricAssessmentResult
+        mode: "delta" (changed files only), "unchanged" (previous result reused)
+            or "full" (graded from scratch)
+        file_hashes: File name -> SHA-256 for the graded submission
+        context_hash: Grading context hash for the graded submission
+        delta: File differences from the previous grade (None without one)
+        reevaluated_criteria: Criterion IDs the delta request re-evaluated
+        reason: Why full grading was used (empty for delta/unchanged)
+    """
+    result: RubricAssessmentResult
+    mode: str
+    file_hashes: dict[str, str]
+    context_hash: str
+    delta: Optional[FileDelta] = None
+    reevaluated_criteria: list[str] = field(default_factory=list)
+    reason: str = ""
+
+    def to_record(self, assignment_key: str, student_id: str) -> GradedSubmission:
+        """Build the GradedSubmission to store for the next resubmission."""
+        return GradedSubmission(
+            assignment_key=assignment_key,
+            student_id=student_id,
+            context_hash=self.context_hash,
+            file_hashes=self.file_hashes,
+            result=self.result,
+            mode=self.mode,
+        )
+
+
+def _normalize_file_content(content: str) -> str:
+    lines = content.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def file_content_hashes(student_submission: str) -> dict[str, str]:
+    """SHA-256 per file of a submission (line endings and trailing whitespace ignored).
+
+    Args:
+        student_submission: Text built by build_submission_text_with_token_limit
+            (raw code is treated as a single file)
+
+    Returns:
+        File name -> SHA-256 hex digest
+    """
+    return {
+        filename: hashlib.sha256(_normalize_file_content(content).encode("utf-8")).hexdigest()
+        for filename, _, content in split_submission_files(student_submission)
+    }
+
+
+def build_grading_context_hash(
+        rubric: Rubric,
+        assignment_instructions: str,
+        reference_solution: Optional[str] = None,
+        error_definitions: Optional[list[ErrorDefinition]] = None,
+) -> str:
+    """SHA-256 of everything besides the submission that a grade depends on.
+
+    This is the shared rubric prompt prefix, so any change to the rubric,
+    instructions, reference solution or error definitions invalidates stored
+    results for delta regrading.
+    """
+    prefix = build_rubric_grading_prompt_prefix(
+        rubric=rubric,
+        assignment_instructions=assignment_instructions,
+        reference_solution=reference_solution,
+        error_definitions=error_definitions,
+    )
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+
+def compute_file_delta(
+        previous_hashes: dict[str, str],
+        files: list[tuple[str, str, str]],
+) -> FileDelta:
+    """Compare a resubmission's files with the hashes of the previous grade.
+
+    Args:
+        previous_hashes: File name -> SHA-256 from the stored GradedSubmission
+        files: (filename, language, content) from split_submission_files()
+
+    Returns:
+        FileDelta
+    """
+    delta = FileDelta()
+    changed_chars = total_chars = 0
+    for filename, _, content in files:
+        digest = hashlib.sha256(_normalize_file_content(content).encode("utf-8")).hexdigest()
+        total_chars += len(content)
+        if filename not in previous_hashes:
+            delta.added.append(filename)
+        elif previous_hashes[filename] != digest:
+            delta.changed.append(filename)
+        else:
+            delta.unchanged.append(filename)
+            continue
+        changed_chars += len(content)
+
+    current = {filename for filename, _, _ in files}
+    delta.removed = [filename for filename in previous_hashes if filename not in current]
+    delta.changed_fraction = changed_chars / total_chars if total_chars else 0.0
+    return delta
+
+
+def summarize_unchanged_file(filename: str, language: str, content: str) -> str:
+    """One-line digest of a file that did not change since the previous grade."""
+    lines = content.split("\n")
+    outline = [line.strip().rstrip("{").strip() for line in lines if _DEFINITION_PATTERN.match(line)]
+    summary = f"- `{filename}` ({language or 'text'}, {len(lines)} lines)"
+    if outline:
+        more = f", ... (+{len(outline) - MAX_OUTLINE_ENTRIES} more)" if len(outline) > MAX_OUTLINE_ENTRIES else ""
+        summary += ": " + ", ".join(f"`{entry}`" for entry in outline[:MAX_OUTLINE_ENTRIES]) + more
+    return summary
+
+
+def build_delta_regrade_prompt(
+        rubric: Rubric,
+        assignment_instructions: str,
+        previous_result: RubricAssessmentResult,
+        files: list[tuple[str, str, str]],
+        delta: FileDelta,
+        reference_solution: Optional[str] = None,
+        error_definitions: Optional[list[ErrorDefinition]] = None,
+) -> str:
+    """Build the prompt that re-evaluates only the criteria a resubmission affects.
+
+    The assignment-wide prefix is the same as for full grading, so delta and
+    full requests share the provider's prompt cache.
+
+    Args:
+        rubric: The rubric to use for grading
+        assignment_instructions: Assignment requirements and instructions
+        previous_result: Scored result of the previous submission
+        files: (filename, language, content) of the resubmission
+        delta: File differences from compute_file_delta()
+        reference_solution: Optional reference solution for comparison
+        error_definitions: Optional list of ErrorDefinition objects to check against
+
+    Returns:
+        Formatted prompt string
+    """
+    prefix = build_rubric_grading_prompt_prefix(
+        rubric=rubric,
+        assignment_instructions=assignment_instructions,
+        reference_solution=reference_solution,
+        error_definitions=error_definitions,
+    )
+
+    prompt_parts = [
+        prefix,
+        "## Resubmission (Delta Regrade)",
+        "This student already received the assessment below and has resubmitted. Only the files under "
+        "\"Changed Files\" differ from the graded submission; unchanged files are summarized.",
+        "- Re-evaluate ONLY the criteria the changed, added or removed files affect. "
+        "Keep every other criterion exactly as previously assessed and leave it out of the response.",
+        "- Return DeltaRubricAssessment instead of RubricAssessmentResult: `reevaluated_criteria` holds "
+        "complete criteria_results entries (same rules as above) for the re-evaluated criteria only.",
+        "- `detected_errors` and the error counts must cover the WHOLE submission: keep previous errors in "
+        "unchanged files, drop errors the changes fixed, and add new ones.",
+        "- Update overall_feedback to reflect the resubmission.",
+        "",
+        "### Previous Criterion Results",
+    ]
+    for criterion in previous_result.criteria_results:
+        level = f" [{criterion.selected_level_label}]" if criterion.selected_level_label else ""
+        prompt_parts.append(
+            f"- `{criterion.criterion_id}`: {criterion.points_earned}/{criterion.points_possible}{level} "
+            f"— {criterion.feedback}"
+        )
+    prompt_parts.append("")
+
+    prompt_parts.append("### Previously Detected Errors")
+    if previous_result.detected_errors:
+        for error in previous_result.detected_errors:
+            occurrences = f" x{error.occurrences}" if error.occurrences else ""
+            prompt_parts.append(f"- **{error.code}** ({error.severity}{occurrences}): {error.description}")
+    else:
+        prompt_parts.append("- None")
+    prompt_parts.append("")
+
+    sent = set(delta.changed) | set(delta.added)
+    if delta.unchanged:
+        prompt_parts.append("### Unchanged Files (digest)")
+        for filename, language, content in files:
+            if filename not in sent:
+                prompt_parts.append(summarize_unchanged_file(filename, language, content))
+        prompt_parts.append("")
+
+    if delta.removed:
+        prompt_parts.append("### Removed Files")
+        prompt_parts.extend(f"- `{filename}`" for filename in delta.removed)
+        prompt_parts.append("")
+
+    prompt_parts.append("## Changed Files")
+    for filename, language, content in files:
+        if filename not in sent:
+            continue
+        status = "new file" if filename in delta.added else "changed"
+        prompt_parts.append(f"### Submission File Name: {filename} ({status})")
+        prompt_parts.append(f"### Submission Content: ```{language}\n{content}\n```")
+    return "\n".join(prompt_parts)
+
+
+def merge_delta_assessment(
+        rubric: Rubric,
+        previous_result: RubricAssessmentResult,
+        delta_assessment: DeltaRubricAssessment,
+) -> tuple[RubricAssessmentResult, list[str]]:
+    """Merge a delta response into the previous result and rescore it.
+
+    Args:
+        rubric: The rubric used for grading
+        previous_result: Scored result of the previous submission
+        delta_assessment: Validated delta response
+
+    Returns:
+        (result after finalize_rubric_result, re-evaluated criterion IDs)
+    """
+    enabled_ids = {c.criterion_id for c in rubric.criteria if c.enabled}
+    updates: dict[str, CriterionResult] = {}
+    for criterion in delta_assessment.reevaluated_criteria:
+        if criterion.criterion_id not in enabled_ids:
+            logger.warning(f"Ignoring re-evaluated criterion '{criterion.criterion_id}' (not in rubric)")
+            continue
+        updates[criterion.criterion_id] = criterion
+
+    criteria_results = [
+        updates.get(criterion.criterion_id, criterion).model_copy(deep=True)
+        for criterion in previous_result.criteria_results
+    ]
+    previous_ids = {criterion.criterion_id for criterion in previous_result.criteria_results}
+    criteria_results.extend(c for criterion_id, c in updates.items() if criterion_id not in previous_ids)
+
+    # Backend scoring recalculates the total unless every criterion is manual (points already known)
+    known_points = [c.points_earned for c in criteria_results]
+    merged = RubricAssessmentResult(
+        rubric_id=previous_result.rubric_id,
+        rubric_version=previous_result.rubric_version,
+        total_points_possible=previous_result.total_points_possible,
+        total_points_earned=0 if None in known_points else sum(known_points),
+        criteria_results=criteria_results,
+        overall_feedback=delta_assessment.overall_feedback,
+        detected_errors=delta_assessment.detected_errors,
+        error_counts_by_severity=delta_assessment.error_counts_by_severity,
+        error_counts_by_id=delta_assessment.error_counts_by_id,
+    )
+    return finalize_rubric_result(rubric, merged), list(updates)
+
+
+async def grade_with_rubric_delta(
+        rubric: Rubric,
+        assignment_instructions: str,
+        student_submission: str,
+        previous: Optional[GradedSubmission] = None,
+        reference_solution: Optional[str] = None,
+        error_definitions: Optional[list[ErrorDefinition]] = None,
+        model_name: str = DEFAULT_GRADING_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        failover_model: Optional[str] = None,
+        max_changed_fraction: float = CQC_DELTA_MAX_CHANGED_FRACTION,
+        **grade_kwargs: Any,
+) -> DeltaGradingOutcome:
+    """Grade a resubmission, sending only the files changed since the previous grade.
+
+    Args:
+        rubric: The grading rubric
+        assignment_instructions: Assignment requirements
+        student_submission: Submission text (see build_submission_text_with_token_limit)
+        previous: Stored grade of the student's previous submission, if any
+        reference_solution: Optional reference solution
+        error_definitions: Optional error definitions
+        model_name: OpenAI or OpenRouter model ID
+        temperature: Sampling temperature
+        failover_model: Alternate model while model_name's circuit is open
+            (None follows CQC_AI_FAILOVER_MODEL)
+        max_changed_fraction: Regrade in full when more than this fraction of
+            the submission's characters changed
+        **grade_kwargs: Extra grade_with_rubric arguments for full grading
+            (on_criterion_result, cascade, ...)
+
+    Returns:
+        DeltaGradingOutcome with the scored result and how it was produced
+
+    Raises:
+        ValueError: If full grading fails
+    """
+    if failover_model is None:
+        failover_model = CQC_AI_FAILOVER_MODEL or None
+
+    files = split_submission_files(student_submission)
+    file_hashes = file_content_hashes(student_submission)
+    context_hash = build_grading_context_hash(rubric, assignment_instructions, reference_solution, error_definitions)
+
+    delta = None
+    reason = "no previous grade"
+    if previous is not None:
+        delta = compute_file_delta(previous.file_hashes, files)
+        if previous.context_hash != context_hash:
+            reason = "rubric, instructions or error definitions changed"
+        elif not delta.has_changes:
+            logger.info(f"Delta regrade: no files changed, reusing previous result for {previous.student_id}")
+            return DeltaGradingOutcome(
+                result=previous.result.model_copy(deep=True), mode="unchanged",
+                file_hashes=file_hashes, context_hash=context_hash, delta=delta,
+            )
+        elif delta.changed_fraction > max_changed_fraction:
+            reason = f"{delta.changed_fraction:.0%} of the submission changed"
+        else:
+            prompt = build_delta_regrade_prompt(
+                rubric, assignment_instructions, previous.result, files, delta,
+                reference_solution, error_definitions,
+            )
+            try:
+                delta_assessment = await _request_with_failover(
+                    prompt, model_name, temperature, None, failover_model,
+                    schema_model=DeltaRubricAssessment,
+                )
+                result, reevaluated = merge_delta_assessment(rubric, previous.result, delta_assessment)
+                logger.info(
+                    f"Delta regrade for {previous.student_id}: {len(delta.changed) + len(delta.added)} "
+                    f"changed file(s), re-evaluated {reevaluated or 'no criteria'}; "
+                    f"{result.total_points_earned}/{result.total_points_possible} points"
+                )
+                return DeltaGradingOutcome(
+                    result=result, mode="delta", file_hashes=file_hashes, context_hash=context_hash,
+                    delta=delta, reevaluated_criteria=reevaluated,
+                )
+            except (OpenAISchemaValidationError, ValidationError, ValueError) as e:
+                reason = f"delta response failed validation: {str(e)[:200]}"
+
+    logger.info(f"Full grading instead of delta regrade: {reason}")
+    result = await grade_with_rubric(
+        rubric=rubric,
+        assignment_instructions=assignment_instructions,
+        student_submission=student_submission,
+        reference_solution=reference_solution,
+        error_definitions=error_definitions,
+        model_name=model_name,
+        temperature=temperature,
+        failover_model=failover_model,
+        **grade_kwargs,
+    )
+    return DeltaGradingOutcome(
+        result=result, mode="full", file_hashes=file_hashes, context_hash=context_hash,
+        delta=delta, reason=reason,
+    )
+
+
+class GradingHistory:
+    """Stored GradedSubmission records keyed by assignment and student ID.
+
+    Records are kept in a size-bounded ResponseCache database of their own.
+    """
+
+    def __init__(self, cache: ResponseCache):
+        self.cache = cache
+
+    @staticmethod
+    def build_key(assignment_key: str, student_id: str) -> str:
+        material = {"v": GRADING_HISTORY_VERSION, "kind": "graded_submission",
+                    "assignment": assignment_key, "student": student_id}
+        canonical = json.dumps(material, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, assignment_key: str, student_id: str) -> Optional[GradedSubmission]:
+        """Latest stored grade for a student, or None."""
+        payload = self.cache.get(self.build_key(assignment_key, student_id))
+        if payload is None:
+            return None
+        try:
+            return GradedSubmission.model_validate_json(payload)
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable stored grade for {student_id}: {e}")
+            return None
+
+    def put(self, record: GradedSubmission) -> None:
+        """Store a grade, replacing the student's previous one."""
+        self.cache.set(
+            self.build_key(record.assignment_key, record.student_id), record.model_dump_json(),
+            model=record.mode, schema_name="GradedSubmission",
+        )
+
+
+_grading_history: GradingHistory | None = None
+_grading_history_lock = threading.Lock()
+
+
+def get_grading_history() -> GradingHistory:
+    """Get or create the process-wide GradingHistory (stored next to the response cache)."""
+    global _grading_history
+    if _grading_history is None:
+        with _grading_history_lock:
+            if _grading_history is None:
+                cache_dir = (Path(CQC_AI_RESPONSE_CACHE_DIR) if CQC_AI_RESPONSE_CACHE_DIR
+                             else Path.home() / ".cache" / "cqc_cpcc")
+                _grading_history = GradingHistory(ResponseCache(
+                    db_path=cache_dir / GRADING_HISTORY_FILENAME,
+                    max_bytes=int(CQC_GRADING_HISTORY_MAX_MB * 1024 * 1024),
+                    ttl_seconds=CQC_GRADING_HISTORY_TTL_DAYS * 24 * 60 * 60,
+                ))
+    return _grading_history
+
+
+def set_grading_history(history: GradingHistory | None) -> None:
+    """Replace the grading history (None recreates it from env on next use; for tests)."""
+    global _grading_history
+    with _grading_history_lock:
+        _grading_history = history
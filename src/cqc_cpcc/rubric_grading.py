@@ -28,20 +28,38 @@ Usage:
     >>> print(result.overall_feedback)
 """
 
-from typing import Optional
+import inspect
+import time
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar
 
 from cqc_cpcc.course_identifier import course_ids_match
 from cqc_cpcc.error_definitions_models import ErrorDefinition
-from cqc_cpcc.rubric_models import Rubric, RubricAssessmentResult, DetectedError
+from cqc_cpcc.rubric_models import Criterion, Rubric, RubricAssessmentResult, DetectedError, CriterionResult
+from cqc_cpcc.utilities.AI.circuit_breaker import is_circuit_open
+from cqc_cpcc.utilities.AI.model_router import RouteDecision, RoutedCall, get_model_router
 from cqc_cpcc.utilities.AI.openai_client import get_structured_completion
+from cqc_cpcc.utilities.AI.openai_exceptions import (
+    CircuitOpenError,
+    OpenAISchemaValidationError,
+    OpenAITransportError,
+)
+from cqc_cpcc.utilities.env_constants import CQC_AI_FAILOVER_MODEL, CQC_AI_GRADING_CASCADE, CQC_AI_MODEL_ROUTER
+from cqc_cpcc.utilities.token_estimator import get_token_estimator
 from cqc_cpcc.utilities.logger import logger
 from langchain_core.callbacks import BaseCallbackHandler
+from pydantic import BaseModel, ValidationError
+
+if TYPE_CHECKING:
+    from cqc_cpcc.grading_cascade import CascadeConfig, CascadeDecision
 
 # Default model configuration
 DEFAULT_GRADING_MODEL = "gpt-5-mini"
 DEFAULT_TEMPERATURE = 0.2
 DEFAULT_MAX_TOKENS = 16384
 
+T = TypeVar("T", bound=BaseModel)
+
 
 def normalize_detected_errors_for_scoring(
         detected_errors: Optional[list[DetectedError]],
@@ -108,24 +126,27 @@ def normalize_detected_errors_for_scoring(
     return normalized_errors, counts_by_severity, counts_by_id
 
 
-def build_rubric_grading_prompt(
+def build_rubric_grading_prompt_prefix(
         rubric: Rubric,
         assignment_instructions: str,
-        student_submission: str,
         reference_solution: Optional[str] = None,
         error_definitions: Optional[list[ErrorDefinition]] = None,
 ) -> str:
-    """Build a deterministic prompt for rubric-based grading.
+    """Build the assignment-wide part of the rubric grading prompt.
+    
+    Everything that is the same for every student in a batch (instructions,
+    reference solution, rubric, error definitions, grading and output rules)
+    lives here. The result is byte-identical for identical inputs, so
+    providers can reuse their prompt cache across students.
     
     Args:
         rubric: The rubric to use for grading
         assignment_instructions: Assignment requirements and instructions
-        student_submission: Student's code or work to grade
         reference_solution: Optional reference solution for comparison
         error_definitions: Optional list of ErrorDefinition objects to check against
         
     Returns:
-        Formatted prompt string for OpenAI
+        Prompt prefix (without the student submission)
     """
     prompt_parts = []
 
@@ -237,17 +258,11 @@ def build_rubric_grading_prompt(
 
             prompt_parts.append("")
 
-    # Student submission
-    prompt_parts.append("## Student Submission to Grade")
-    # Note Need to wrap code in backticks. It is expected that the student submission is preprocessed to be safely included in a markdown code block with File Name included ahead of it.
-    # If the submission is very long, it should be truncated with an indication that it was truncated.
-    prompt_parts.append(student_submission)
-    prompt_parts.append("")
-
     # Grading instructions - GPT-5.2 methodology
     prompt_parts.append("## Grading Instructions")
     prompt_parts.append(
         "Grade exactly and only as specified. Do not add features or interpretation beyond what is requested.")
+    prompt_parts.append("The student submission to grade is provided at the end of this prompt.")
     prompt_parts.append("")
 
     if enabled_errors:
@@ -325,9 +340,248 @@ def build_rubric_grading_prompt(
     prompt_parts.append('  {"code": "MISSING_DOCS", "name": "Insufficient Documentation", "severity": "major",')
     prompt_parts.append('   "description": "What was found in the code.", "occurrences": 1, "notes": null}')
 
+    prompt_parts.append("")
+
     return "\n".join(prompt_parts)
 
 
+def build_rubric_grading_prompt(
+        rubric: Rubric,
+        assignment_instructions: str,
+        student_submission: str,
+        reference_solution: Optional[str] = None,
+        error_definitions: Optional[list[ErrorDefinition]] = None,
+) -> str:
+    """Build a deterministic prompt for rubric-based grading.
+    
+    The prompt is laid out prefix-first: the assignment-wide content from
+    build_rubric_grading_prompt_prefix() comes first and the student submission
+    comes last, so every student in a batch shares the same cacheable prefix.
+    
+    Args:
+        rubric: The rubric to use for grading
+        assignment_instructions: Assignment requirements and instructions
+        student_submission: Student's code or work to grade
+        reference_solution: Optional reference solution for comparison
+        error_definitions: Optional list of ErrorDefinition objects to check against
+        
+    Returns:
+        Formatted prompt string for OpenAI
+    """
+    prefix = build_rubric_grading_prompt_prefix(
+        rubric=rubric,
+        assignment_instructions=assignment_instructions,
+        reference_solution=reference_solution,
+        error_definitions=error_definitions,
+    )
+
+    # Student submission (last, so it never breaks the shared prefix)
+    # Note Need to wrap code in backticks. It is expected that the student submission is preprocessed to be safely included in a markdown code block with File Name included ahead of it.
+    # If the submission is very long, it should be truncated with an indication that it was truncated.
+    return "\n".join([
+        prefix,
+        "## Student Submission to Grade",
+        student_submission,
+    ])
+
+
+def preview_criterion_score(rubric: Rubric, criterion_result: CriterionResult) -> CriterionResult:
+    """Apply level-band scoring to a single streamed criterion for early display.
+    
+    Error-count and program-performance criteria depend on the whole result and
+    are left as returned by the model until apply_backend_scoring() runs.
+    
+    Args:
+        rubric: The rubric used for grading
+        criterion_result: A single criterion result parsed from the stream
+        
+    Returns:
+        The criterion result with backend level-band points when applicable
+    """
+    from cqc_cpcc.scoring import score_level_band_criterion
+
+    rubric_criterion = next(
+        (c for c in rubric.criteria if c.criterion_id == criterion_result.criterion_id), None
+    )
+    if (rubric_criterion is None or rubric_criterion.scoring_mode != "level_band"
+            or not criterion_result.selected_level_label):
+        return criterion_result
+
+    try:
+        scoring_result = score_level_band_criterion(
+            criterion_result.selected_level_label,
+            rubric_criterion,
+            points_strategy=rubric_criterion.points_strategy,
+        )
+    except ValueError as e:
+        logger.debug(f"Preview scoring skipped for '{criterion_result.criterion_id}': {e}")
+        return criterion_result
+
+    return criterion_result.model_copy(update={"points_earned": scoring_result["points_awarded"]})
+
+
+def _build_criterion_stream_handler(
+        rubric: Rubric,
+        on_criterion_result: Callable[[CriterionResult], Any],
+) -> Callable[[dict], Any]:
+    """Wrap a CriterionResult callback as a raw stream item handler."""
+    published_ids: set[str] = set()
+
+    async def handle_item(item: dict) -> None:
+        try:
+            criterion_result = CriterionResult.model_validate(item)
+        except ValidationError as e:
+            logger.debug(f"Ignoring malformed streamed criterion: {e}")
+            return
+
+        # Retries may stream the same criterion again
+        if criterion_result.criterion_id in published_ids:
+            return
+        published_ids.add(criterion_result.criterion_id)
+
+        outcome = on_criterion_result(preview_criterion_score(rubric, criterion_result))
+        if inspect.isawaitable(outcome):
+            await outcome
+
+    return handle_item
+
+
+def get_model_provider(model_name: str) -> str:
+    """Return the provider that serves a model ID.
+    
+    OpenRouter model IDs are "openrouter/auto" or "provider/model-name";
+    everything else is an OpenAI model.
+    """
+    return "openrouter" if model_name.startswith("openrouter/") or "/" in model_name else "openai"
+
+
+async def _request_rubric_assessment(
+        prompt: str,
+        model_name: str,
+        temperature: float,
+        stream_handler: Optional[Callable[[dict], Any]] = None,
+        schema_model: type[T] = RubricAssessmentResult,
+) -> T:
+    """Send a rubric grading prompt to the provider that serves model_name."""
+    if get_model_provider(model_name) == "openrouter":
+        # Route to OpenRouter client for structured output
+        from cqc_cpcc.utilities.AI.openrouter_client import get_openrouter_completion
+
+        logger.info(
+            f"Detected OpenRouter model ID '{model_name}', routing to OpenRouter client"
+        )
+
+        use_auto_route = model_name == "openrouter/auto"
+        explicit_model = None if use_auto_route else model_name
+
+        return await get_openrouter_completion(
+            prompt=prompt,
+            schema_model=schema_model,
+            use_auto_route=use_auto_route,
+            model_name=explicit_model,
+            max_tokens=DEFAULT_MAX_TOKENS,
+        )
+
+    # Call OpenAI with structured output validation
+    # Uses 3 retries (4 total attempts) with smart fallback for robustness
+    return await get_structured_completion(
+        prompt=prompt,
+        model_name=model_name,
+        schema_model=schema_model,
+        temperature=temperature,
+        max_tokens=DEFAULT_MAX_TOKENS,
+        max_retries=3,  # 3 retries = 4 total attempts (initial + 3 fallback)
+        on_stream_item=stream_handler,
+    )
+
+
+async def _request_with_failover(
+        prompt: str,
+        model_name: str,
+        temperature: float,
+        stream_handler: Optional[Callable[[dict], Any]],
+        failover_model: Optional[str],
+        schema_model: type[T] = RubricAssessmentResult,
+) -> T:
+    """Request an assessment, failing over while model_name's circuit is open."""
+    # Route straight to the alternate while the primary circuit is open
+    active_model = model_name
+    if failover_model and is_circuit_open(get_model_provider(model_name), model_name):
+        logger.warning(f"Circuit open for '{model_name}', failing over to '{failover_model}'")
+        active_model = failover_model
+
+    try:
+        return await _request_rubric_assessment(prompt, active_model, temperature, stream_handler, schema_model)
+    except CircuitOpenError as e:
+        if not failover_model or active_model == failover_model:
+            raise
+        logger.warning(f"{e}; failing over from '{active_model}' to '{failover_model}'")
+        return await _request_rubric_assessment(prompt, failover_model, temperature, stream_handler, schema_model)
+
+
+async def _grade_with_cascade(
+        rubric: Rubric,
+        prompt: str,
+        strong_model: str,
+        temperature: float,
+        stream_handler: Optional[Callable[[dict], Any]],
+        failover_model: Optional[str],
+        config: "CascadeConfig",
+) -> tuple[RubricAssessmentResult, "CascadeDecision"]:
+    """Grade with the cheap model and re-grade with strong_model only if a trigger fires.
+    
+    Returns:
+        (finalized result, cascade decision)
+    """
+    from cqc_cpcc.grading_cascade import (
+        CascadeDecision,
+        CascadeRubricAssessmentResult,
+        estimate_grading_cost,
+        evaluate_cascade_triggers,
+    )
+
+    decision = CascadeDecision(cheap_model=config.cheap_model, strong_model=strong_model)
+    result = None
+    cheap_output = ""
+    start = time.monotonic()
+    try:
+        cheap = await _request_with_failover(
+            prompt, config.cheap_model, temperature, stream_handler, failover_model,
+            schema_model=CascadeRubricAssessmentResult,
+        )
+        cheap_output = cheap.model_dump_json()
+        if cheap.grading_confidence is not None:
+            decision.confidence = min(1.0, max(0.0, cheap.grading_confidence))
+        raw = RubricAssessmentResult.model_validate(cheap.model_dump(exclude={"grading_confidence"}))
+        # finalize_rubric_result rescores criteria in place, so keep the model's own values
+        result = finalize_rubric_result(rubric, raw.model_copy(deep=True))
+        decision.triggers, decision.reasons = evaluate_cascade_triggers(
+            rubric, raw, result, decision.confidence, config
+        )
+    except (OpenAISchemaValidationError, ValidationError, ValueError) as e:
+        decision.triggers, decision.reasons = ["schema_validation"], [str(e)[:300]]
+    except OpenAITransportError as e:
+        # Includes CircuitOpenError: the strong model may still be reachable
+        logger.warning(f"Cascade model '{config.cheap_model}' failed, escalating to '{strong_model}': {e}")
+        decision.triggers, decision.reasons = ["cheap_model_error"], [str(e)[:300]]
+    decision.cheap_seconds = time.monotonic() - start
+    decision.cost_usd = estimate_grading_cost(config.cheap_model, prompt, cheap_output) or 0.0
+
+    if decision.escalated:
+        start = time.monotonic()
+        strong = await _request_with_failover(prompt, strong_model, temperature, None, failover_model)
+        decision.strong_seconds = time.monotonic() - start
+        strong_cost = estimate_grading_cost(strong_model, prompt, strong.model_dump_json())
+        decision.cost_usd += strong_cost or 0.0
+        decision.strong_only_cost_usd = strong_cost
+        result = finalize_rubric_result(rubric, strong)
+    else:
+        # What the strong model would have cost for an output of the same size
+        decision.strong_only_cost_usd = estimate_grading_cost(strong_model, prompt, cheap_output)
+
+    return result, decision
+
+
 async def grade_with_rubric(
         rubric: Rubric,
         assignment_instructions: str,
@@ -337,6 +591,15 @@ async def grade_with_rubric(
         model_name: str = DEFAULT_GRADING_MODEL,
         temperature: float = DEFAULT_TEMPERATURE,
         callback: Optional[BaseCallbackHandler] = None,
+        on_criterion_result: Optional[Callable[[CriterionResult], Any]] = None,
+        failover_model: Optional[str] = None,
+        cascade: Optional[bool] = None,
+        cascade_model: Optional[str] = None,
+        on_cascade_decision: Optional[Callable[["CascadeDecision"], Any]] = None,
+        route: Optional[bool] = None,
+        course_id: Optional[str] = None,
+        assignment_id: Optional[str] = None,
+        on_route_decision: Optional[Callable[[RouteDecision], Any]] = None,
 ) -> RubricAssessmentResult:
     """Grade a student submission using a rubric.
     
@@ -359,6 +622,29 @@ async def grade_with_rubric(
         model_name: OpenAI model to use (default: gpt-5-mini)
         temperature: Sampling temperature (default: 0.2)
         callback: Optional LangChain callback for compatibility
+        on_criterion_result: Optional callback (sync or async) receiving each
+            CriterionResult as soon as it is streamed, with level-band points
+            already applied. Final scores come from the returned result.
+            Only used for OpenAI models (OpenRouter responses are not streamed).
+        failover_model: Alternate model (OpenAI or OpenRouter ID) used when the
+            circuit breaker for model_name's provider or model is open.
+            None (default) follows CQC_AI_FAILOVER_MODEL.
+        cascade: Grade with cascade_model first and escalate to model_name only
+            when a trigger fires (see grading_cascade.py). None (default)
+            follows CQC_AI_GRADING_CASCADE.
+        cascade_model: First-pass model for cascade mode (default:
+            CQC_AI_CASCADE_CHEAP_MODEL)
+        on_cascade_decision: Optional callback (sync or async) receiving the
+            CascadeDecision for this submission in cascade mode
+        route: Let the model router (see model_router.py) replace model_name
+            with the model its history favors for this course, assignment and
+            submission size. None (default) follows CQC_AI_MODEL_ROUTER.
+            Outcomes are recorded for single-model grading; in cascade mode the
+            routed model is the escalation model.
+        course_id: Course identifier used to segment router history
+        assignment_id: Assignment identifier used to segment router history
+        on_route_decision: Optional callback (sync or async) receiving the
+            RouteDecision when routing
         
     Returns:
         RubricAssessmentResult with complete grading breakdown
@@ -395,38 +681,52 @@ async def grade_with_rubric(
     )
 
     try:
-        # Check if using OpenRouter model IDs (openrouter/auto or provider/model-name)
-        is_openrouter_model = model_name.startswith("openrouter/") or "/" in model_name
-
-        if is_openrouter_model:
-            # Route to OpenRouter client for structured output
-            from cqc_cpcc.utilities.AI.openrouter_client import get_openrouter_completion
-
-            logger.info(
-                f"Detected OpenRouter model ID '{model_name}', routing to OpenRouter client"
+        stream_handler = (
+            _build_criterion_stream_handler(rubric, on_criterion_result)
+            if on_criterion_result else None
+        )
+        route_decision = None
+        if route is None:
+            route = CQC_AI_MODEL_ROUTER
+        if route:
+            route_decision = get_model_router().choose(
+                model_name, course_id, assignment_id, get_token_estimator().estimate(student_submission)
             )
+            model_name = route_decision.model
+            if on_route_decision:
+                outcome = on_route_decision(route_decision)
+                if inspect.isawaitable(outcome):
+                    await outcome
+        if failover_model is None:
+            failover_model = CQC_AI_FAILOVER_MODEL or None
+        if cascade is None:
+            cascade = CQC_AI_GRADING_CASCADE
+
+        if cascade:
+            from cqc_cpcc.grading_cascade import CascadeConfig, get_cascade_stats, log_cascade_decision
+
+            config = CascadeConfig(cheap_model=cascade_model) if cascade_model else CascadeConfig()
+            if config.cheap_model != model_name:
+                result, decision = await _grade_with_cascade(
+                    rubric, prompt, model_name, temperature, stream_handler, failover_model, config
+                )
+                log_cascade_decision(decision)
+                get_cascade_stats().record(decision)
+                if on_cascade_decision:
+                    outcome = on_cascade_decision(decision)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+                logger.info(
+                    f"Grading complete: {result.total_points_earned}/{result.total_points_possible} points "
+                    f"({len(result.criteria_results)} criteria assessed, model '{decision.final_model}')"
+                )
+                return result
 
-            use_auto_route = model_name == "openrouter/auto"
-            explicit_model = None if use_auto_route else model_name
-
-            result = await get_openrouter_completion(
-                prompt=prompt,
-                schema_model=RubricAssessmentResult,
-                use_auto_route=use_auto_route,
-                model_name=explicit_model,
-                max_tokens=DEFAULT_MAX_TOKENS,
-            )
-        else:
-            # Call OpenAI with structured output validation
-            # Uses 3 retries (4 total attempts) with smart fallback for robustness
-            result = await get_structured_completion(
-                prompt=prompt,
-                model_name=model_name,
-                schema_model=RubricAssessmentResult,
-                temperature=temperature,
-                max_tokens=DEFAULT_MAX_TOKENS,
-                max_retries=3,  # 3 retries = 4 total attempts (initial + 3 fallback)
-            )
+        tracker = get_model_router().track(route_decision, prompt) if route_decision else nullcontext(RoutedCall())
+        with tracker as routed_call:
+            result = await _request_with_failover(prompt, model_name, temperature, stream_handler, failover_model)
+            if route_decision:
+                routed_call.completion = result.model_dump_json()
 
         # Log raw OpenAI response for debugging
         logger.info(
@@ -440,71 +740,7 @@ async def grade_with_rubric(
                 f"{cr.points_earned}/{cr.points_possible} (level: {cr.selected_level_label or 'N/A'})"
             )
 
-        # CRITICAL: Correct rubric_id and rubric_version if LLM returned incorrect/default values
-        # This commonly happens in fallback JSON mode where the model might return generic values
-        if result.rubric_id != rubric.rubric_id:
-            logger.warning(
-                f"Correcting rubric_id from '{result.rubric_id}' to '{rubric.rubric_id}' "
-                f"(LLM returned incorrect/generic rubric ID)"
-            )
-            # Create a new result with corrected rubric_id
-            result = RubricAssessmentResult(
-                rubric_id=rubric.rubric_id,  # Use input rubric's ID
-                rubric_version=rubric.rubric_version,  # Use input rubric's version
-                total_points_possible=result.total_points_possible,
-                total_points_earned=result.total_points_earned,
-                criteria_results=result.criteria_results,
-                overall_band_label=result.overall_band_label,
-                overall_feedback=result.overall_feedback,
-                detected_errors=result.detected_errors,
-                error_counts_by_severity=result.error_counts_by_severity,
-                error_counts_by_id=result.error_counts_by_id,
-                original_major_errors=result.original_major_errors,
-                original_minor_errors=result.original_minor_errors,
-                effective_major_errors=result.effective_major_errors,
-                effective_minor_errors=result.effective_minor_errors,
-            )
-        elif result.rubric_version != rubric.rubric_version:
-            # If only version mismatch, correct it too
-            logger.warning(
-                f"Correcting rubric_version from '{result.rubric_version}' to '{rubric.rubric_version}'"
-            )
-            result = RubricAssessmentResult(
-                rubric_id=rubric.rubric_id,
-                rubric_version=rubric.rubric_version,  # Use input rubric's version
-                total_points_possible=result.total_points_possible,
-                total_points_earned=result.total_points_earned,
-                criteria_results=result.criteria_results,
-                overall_band_label=result.overall_band_label,
-                overall_feedback=result.overall_feedback,
-                detected_errors=result.detected_errors,
-                error_counts_by_severity=result.error_counts_by_severity,
-                error_counts_by_id=result.error_counts_by_id,
-                original_major_errors=result.original_major_errors,
-                original_minor_errors=result.original_minor_errors,
-                effective_major_errors=result.effective_major_errors,
-                effective_minor_errors=result.effective_minor_errors,
-            )
-
-        # Post-process: Apply backend scoring for non-manual criteria
-        result = apply_backend_scoring(rubric, result)
-
-        # Final validation checks
-        if result.rubric_id != rubric.rubric_id:
-            logger.error(
-                f"ASSERTION FAILED: Result rubric_id '{result.rubric_id}' still does not match "
-                f"input rubric_id '{rubric.rubric_id}' after correction"
-            )
-            raise ValueError(
-                f"Rubric ID mismatch after correction: expected '{rubric.rubric_id}', "
-                f"got '{result.rubric_id}'"
-            )
-
-        if result.total_points_possible != rubric.total_points_possible:
-            logger.warning(
-                f"Result total_points_possible ({result.total_points_possible}) "
-                f"does not match rubric ({rubric.total_points_possible})"
-            )
+        result = finalize_rubric_result(rubric, result)
 
         logger.info(
             f"Grading complete: {result.total_points_earned}/{result.total_points_possible} points "
@@ -521,54 +757,173 @@ async def grade_with_rubric(
         raise ValueError(f"Failed to grade with rubric: {e}")
 
 
-def apply_backend_scoring(rubric: Rubric, result: RubricAssessmentResult) -> RubricAssessmentResult:
-    """Apply backend deterministic scoring for non-manual criteria.
+def finalize_rubric_result(rubric: Rubric, result: RubricAssessmentResult) -> RubricAssessmentResult:
+    """Correct rubric identity fields and apply backend scoring to a raw LLM result.
     
-    This function is the main entry point for backend scoring computation. It:
-    1. Handles error_count criteria: applies error normalization and computes scores
-    2. Handles level_band criteria: computes points from selected performance levels
-    3. Handles program_performance criterion (dispatches to rubric-specific level selector)
-    4. Recalculates total_points_earned
-    5. Recalculates overall_band_label using deterministic logic
-    6. Stores original and effective error counts for transparency
+    Shared by interactive grading (grade_with_rubric) and batch grading so both
+    paths produce identical results from the same model output.
     
     Args:
         rubric: The rubric used for grading
-        result: The initial result from OpenAI (may have placeholder scores)
+        result: Validated RubricAssessmentResult as returned by the model
         
     Returns:
-        Updated RubricAssessmentResult with backend-computed scores
+        RubricAssessmentResult with corrected rubric_id/version and backend scores
+        
+    Raises:
+        ValueError: If the rubric_id still does not match after correction
     """
-    from cqc_cpcc.error_scoring import normalize_errors, select_program_performance_level, \
-        select_csc134_program_performance_level, get_error_count_for_severity, aggregate_error_counts
-    from cqc_cpcc.scoring import score_level_band_criterion, aggregate_rubric_result
+    # CRITICAL: Correct rubric_id and rubric_version if LLM returned incorrect/default values
+    # This commonly happens in fallback JSON mode where the model might return generic values
+    if result.rubric_id != rubric.rubric_id:
+        logger.warning(
+            f"Correcting rubric_id from '{result.rubric_id}' to '{rubric.rubric_id}' "
+            f"(LLM returned incorrect/generic rubric ID)"
+        )
+        # Create a new result with corrected rubric_id
+        result = RubricAssessmentResult(
+            rubric_id=rubric.rubric_id,  # Use input rubric's ID
+            rubric_version=rubric.rubric_version,  # Use input rubric's version
+            total_points_possible=result.total_points_possible,
+            total_points_earned=result.total_points_earned,
+            criteria_results=result.criteria_results,
+            overall_band_label=result.overall_band_label,
+            overall_feedback=result.overall_feedback,
+            detected_errors=result.detected_errors,
+            error_counts_by_severity=result.error_counts_by_severity,
+            error_counts_by_id=result.error_counts_by_id,
+            original_major_errors=result.original_major_errors,
+            original_minor_errors=result.original_minor_errors,
+            effective_major_errors=result.effective_major_errors,
+            effective_minor_errors=result.effective_minor_errors,
+        )
+    elif result.rubric_version != rubric.rubric_version:
+        # If only version mismatch, correct it too
+        logger.warning(
+            f"Correcting rubric_version from '{result.rubric_version}' to '{rubric.rubric_version}'"
+        )
+        result = RubricAssessmentResult(
+            rubric_id=rubric.rubric_id,
+            rubric_version=rubric.rubric_version,  # Use input rubric's version
+            total_points_possible=result.total_points_possible,
+            total_points_earned=result.total_points_earned,
+            criteria_results=result.criteria_results,
+            overall_band_label=result.overall_band_label,
+            overall_feedback=result.overall_feedback,
+            detected_errors=result.detected_errors,
+            error_counts_by_severity=result.error_counts_by_severity,
+            error_counts_by_id=result.error_counts_by_id,
+            original_major_errors=result.original_major_errors,
+            original_minor_errors=result.original_minor_errors,
+            effective_major_errors=result.effective_major_errors,
+            effective_minor_errors=result.effective_minor_errors,
+        )
 
-    logger.info(f"=== Backend Scoring Start ===")
-    logger.info(
-        f"Input result: total_points_earned={result.total_points_earned}, total_points_possible={result.total_points_possible}")
-    logger.info(f"Input result has {len(result.criteria_results)} criterion results")
-    logger.info(f"Input result error_counts_by_severity: {result.error_counts_by_severity}")
+    # Post-process: Apply backend scoring for non-manual criteria
+    result = apply_backend_scoring(rubric, result)
 
-    # Identify criteria that need backend scoring
-    level_band_criteria = [c for c in rubric.criteria if c.enabled and c.scoring_mode == "level_band"]
-    error_count_criteria = [c for c in rubric.criteria if c.enabled and c.scoring_mode == "error_count"]
+    # Final validation checks
+    if result.rubric_id != rubric.rubric_id:
+        logger.error(
+            f"ASSERTION FAILED: Result rubric_id '{result.rubric_id}' still does not match "
+            f"input rubric_id '{rubric.rubric_id}' after correction"
+        )
+        raise ValueError(
+            f"Rubric ID mismatch after correction: expected '{rubric.rubric_id}', "
+            f"got '{result.rubric_id}'"
+        )
 
-    # Check if this is CSC151 v2.0 rubric (has program_performance criterion)
-    has_program_performance = any(
-        c.criterion_id == "program_performance" for c in rubric.criteria if c.enabled
+    if result.total_points_possible != rubric.total_points_possible:
+        logger.warning(
+            f"Result total_points_possible ({result.total_points_possible}) "
+            f"does not match rubric ({rubric.total_points_possible})"
+        )
+
+    return result
+
+
+def is_csc134_rubric(rubric: Rubric) -> bool:
+    """Whether a rubric uses the CSC134 program_performance thresholds."""
+    return any(course_ids_match(course_id, "CSC_134") for course_id in rubric.course_ids)
+
+
+def compute_effective_error_counts(rubric: Rubric, major: int, minor: int) -> tuple[int, int]:
+    """Apply the rubric's Minor→Major conversion (if any error_count criterion defines one).
+    
+    Args:
+        rubric: The rubric used for grading
+        major: Original major error count
+        minor: Original minor error count
+        
+    Returns:
+        (effective_major, effective_minor)
+    """
+    from cqc_cpcc.error_scoring import normalize_errors
+
+    has_conversion = any(
+        c.error_rules and c.error_rules.error_conversion
+        for c in rubric.criteria
+        if c.enabled and c.scoring_mode == "error_count"
     )
+    if has_conversion:
+        return normalize_errors(major, minor)
+    # No conversion defined — effective counts equal original counts
+    return major, minor
 
-    logger.info(
-        f"Criteria analysis: level_band={len(level_band_criteria)}, error_count={len(error_count_criteria)}, has_program_performance={has_program_performance}")
 
-    # If no backend scoring needed, return as-is
-    if not level_band_criteria and not error_count_criteria and not has_program_performance:
-        logger.info("No backend scoring needed (all criteria are manual mode)")
-        return result
+def select_rubric_program_performance_level(
+        rubric: Rubric,
+        criterion: Criterion,
+        effective_major: int,
+        effective_minor: int,
+) -> tuple[str, float]:
+    """Select the program_performance level with the rubric-specific level selector.
+    
+    Args:
+        rubric: The rubric used for grading (CSC134 rubrics use their own thresholds)
+        criterion: The program_performance criterion
+        effective_major: Effective major errors (after compute_effective_error_counts)
+        effective_minor: Effective minor errors
+        
+    Returns:
+        (level_label, score)
+    """
+    from cqc_cpcc.error_scoring import select_csc134_program_performance_level, select_program_performance_level
+
+    selector = select_csc134_program_performance_level if is_csc134_rubric(rubric) \
+        else select_program_performance_level
+    return selector(
+        effective_major,
+        effective_minor,
+        criterion=criterion,
+        assignment_submitted=True  # Assume submitted if we have a result
+    )
 
-    logger.info(
-        f"Applying backend scoring: {len(level_band_criteria)} level_band, "
-        f"{len(error_count_criteria)} error_count criteria"
+
+def resolve_scoring_error_counts(
+        rubric: Rubric,
+        result: RubricAssessmentResult,
+) -> tuple[Optional[list[DetectedError]], Optional[dict[str, int]], Optional[dict[str, int]], int, int]:
+    """Resolve the original error counts backend scoring uses for one result.
+    
+    Normalizes detected errors and picks the count source (occurrence totals for
+    program_performance, unique error types otherwise). Counts stay 0 when no
+    enabled criterion uses them; compute_effective_error_counts() applies the
+    rubric's Minor→Major conversion afterwards.
+    
+    Args:
+        rubric: The rubric used for grading
+        result: The result being scored
+        
+    Returns:
+        (normalized detected_errors, normalized error_counts_by_severity,
+        normalized error_counts_by_id, original_major, original_minor)
+    """
+    from cqc_cpcc.error_scoring import get_error_count_for_severity, aggregate_error_counts
+
+    error_count_criteria = [c for c in rubric.criteria if c.enabled and c.scoring_mode == "error_count"]
+    has_program_performance = any(
+        c.criterion_id == "program_performance" for c in rubric.criteria if c.enabled
     )
 
     normalized_detected_errors = result.detected_errors
@@ -585,8 +940,6 @@ def apply_backend_scoring(rubric: Rubric, result: RubricAssessmentResult) -> Rub
     # Extract error counts if needed
     original_major = 0
     original_minor = 0
-    effective_major = 0
-    effective_minor = 0
 
     if error_count_criteria or has_program_performance:
         # Scoring source differs by criterion type:
@@ -633,26 +986,78 @@ def apply_backend_scoring(rubric: Rubric, result: RubricAssessmentResult) -> Rub
             f"Original error counts: {original_major} major, {original_minor} minor"
         )
 
+    return (
+        normalized_detected_errors,
+        normalized_counts_by_severity,
+        normalized_counts_by_id,
+        original_major,
+        original_minor,
+    )
+
+
+def apply_backend_scoring(rubric: Rubric, result: RubricAssessmentResult) -> RubricAssessmentResult:
+    """Apply backend deterministic scoring for non-manual criteria.
+    
+    This function is the main entry point for backend scoring computation. It:
+    1. Handles error_count criteria: applies error normalization and computes scores
+    2. Handles level_band criteria: computes points from selected performance levels
+    3. Handles program_performance criterion (dispatches to rubric-specific level selector)
+    4. Recalculates total_points_earned
+    5. Recalculates overall_band_label using deterministic logic
+    6. Stores original and effective error counts for transparency
+    
+    Args:
+        rubric: The rubric used for grading
+        result: The initial result from OpenAI (may have placeholder scores)
+        
+    Returns:
+        Updated RubricAssessmentResult with backend-computed scores
+    """
+    from cqc_cpcc.scoring import score_level_band_criterion, aggregate_rubric_result
+
+    logger.info(f"=== Backend Scoring Start ===")
+    logger.info(
+        f"Input result: total_points_earned={result.total_points_earned}, total_points_possible={result.total_points_possible}")
+    logger.info(f"Input result has {len(result.criteria_results)} criterion results")
+    logger.info(f"Input result error_counts_by_severity: {result.error_counts_by_severity}")
+
+    # Identify criteria that need backend scoring
+    level_band_criteria = [c for c in rubric.criteria if c.enabled and c.scoring_mode == "level_band"]
+    error_count_criteria = [c for c in rubric.criteria if c.enabled and c.scoring_mode == "error_count"]
+
+    # Check if this is CSC151 v2.0 rubric (has program_performance criterion)
+    has_program_performance = any(
+        c.criterion_id == "program_performance" for c in rubric.criteria if c.enabled
+    )
+
+    logger.info(
+        f"Criteria analysis: level_band={len(level_band_criteria)}, error_count={len(error_count_criteria)}, has_program_performance={has_program_performance}")
+
+    # If no backend scoring needed, return as-is
+    if not level_band_criteria and not error_count_criteria and not has_program_performance:
+        logger.info("No backend scoring needed (all criteria are manual mode)")
+        return result
+
+    logger.info(
+        f"Applying backend scoring: {len(level_band_criteria)} level_band, "
+        f"{len(error_count_criteria)} error_count criteria"
+    )
+
+    (
+        normalized_detected_errors,
+        normalized_counts_by_severity,
+        normalized_counts_by_id,
+        original_major,
+        original_minor,
+    ) = resolve_scoring_error_counts(rubric, result)
+
+    effective_major = 0
+    effective_minor = 0
+    if error_count_criteria or has_program_performance:
         # Apply error normalization only when any criterion has error_conversion defined.
         # CSC134 and other rubrics without error_conversion use original counts as-is.
-        has_conversion = any(
-            c.error_rules and c.error_rules.error_conversion
-            for c in rubric.criteria
-            if c.enabled and c.scoring_mode == "error_count"
-        )
-        if has_conversion:
-            effective_major, effective_minor = normalize_errors(original_major, original_minor)
-            logger.info(
-                f"Effective error counts after normalization: {effective_major} major, {effective_minor} minor"
-            )
-        else:
-            # No conversion defined — effective counts equal original counts
-            effective_major = original_major
-            effective_minor = original_minor
-            logger.info(
-                f"No error_conversion defined; effective counts equal original: "
-                f"{effective_major} major, {effective_minor} minor"
-            )
+        effective_major, effective_minor = compute_effective_error_counts(rubric, original_major, original_minor)
+        logger.info(f"Effective error counts: {effective_major} major, {effective_minor} minor")
 
     # Update criterion results with computed scores
     updated_criteria_results = []
@@ -683,33 +1088,14 @@ def apply_backend_scoring(rubric: Rubric, result: RubricAssessmentResult) -> Rub
         # Handle different scoring modes
         if rubric_criterion.criterion_id == "program_performance":
             # Dispatch to rubric-specific level selector
-            if any(course_ids_match(course_id, "CSC_134") for course_id in rubric.course_ids):
-                # CSC134 C++ rubric: apply the rubric's configured normalization,
-                # then evaluate its rubric-specific performance thresholds.
-                logger.info(
-                    f"Using CSC134 program_performance scoring with effective_major={effective_major}, "
-                    f"effective_minor={effective_minor}"
-                )
-                level_label, score = select_csc134_program_performance_level(
-                    effective_major,
-                    effective_minor,
-                    criterion=rubric_criterion,
-                    assignment_submitted=True  # Assume submitted if we have a result
-                )
-                logger.info(f"CSC134 program_performance computed: level_label='{level_label}', score={score}")
-                log_prefix = "CSC134"
-            else:
-                # CSC151/default: apply 4-minor→1-major conversion, use effective counts
-                logger.info(
-                    f"Using program_performance scoring with effective_major={effective_major}, effective_minor={effective_minor}")
-                level_label, score = select_program_performance_level(
-                    effective_major,
-                    effective_minor,
-                    criterion=rubric_criterion,
-                    assignment_submitted=True  # Assume submitted if we have a result
-                )
-                logger.info(f"program_performance computed: level_label='{level_label}', score={score}")
-                log_prefix = "program_performance"
+            logger.info(
+                f"Using program_performance scoring with effective_major={effective_major}, "
+                f"effective_minor={effective_minor}"
+            )
+            level_label, score = select_rubric_program_performance_level(
+                rubric, rubric_criterion, effective_major, effective_minor
+            )
+            log_prefix = "CSC134" if is_csc134_rubric(rubric) else "program_performance"
 
             # Update the criterion result
             criterion_result.points_earned = score
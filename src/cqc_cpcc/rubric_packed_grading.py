@@ -0,0 +1,406 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Micro-batched rubric grading: several small submissions per request.
+
+Intro-course labs are often 30-80 lines. For those, the fixed cost of a
+grade_with_rubric call (round trip, rubric prompt, schema) dwarfs the
+submission itself. Packing mode groups small submissions into one request:
+
+1. Plan: submissions under the per-submission token limit are packed
+   first-fit-decreasing into packs that stay under the pack token budget and
+   the maximum pack size. Larger submissions are graded alone.
+2. Grade: each pack is one request. The shared rubric prefix comes first
+   (same cacheable prefix as solo grading), followed by every submission
+   under its student ID. The model returns PackedRubricAssessmentResults,
+   a list of results keyed by student ID.
+3. Split: each student's entry is validated on its own (an invalid entry
+   does not fail the rest of the pack), checked (present once, every enabled
+   criterion assessed) and run through finalize_rubric_result(), exactly like
+   a solo result.
+4. Fall back: students whose packed result is missing or fails validation,
+   or whose whole pack failed, are re-graded alone with grade_with_rubric.
+
+Configuration (environment variables):
+- CQC_AI_SUBMISSION_PACKING: Enable packing on the grading page by default (default: False)
+- CQC_AI_PACK_TOKEN_BUDGET: Submission tokens per packed request (default: 8000)
+- CQC_AI_PACK_MAX_SUBMISSIONS: Maximum submissions per packed request (default: 6)
+- CQC_AI_PACK_MAX_SUBMISSION_TOKENS: Larger submissions are never packed (default: 1500)
+
+Usage:
+    >>> from cqc_cpcc.rubric_packed_grading import grade_with_rubric_packed
+    >>> outcome = await grade_with_rubric_packed(
+    ...     rubric=rubric,
+    ...     assignment_instructions="Write a Hello World program...",
+    ...     student_submissions={"student_1": "...", "student_2": "..."},
+    ... )
+    >>> outcome.results["student_1"].total_points_earned
+    >>> outcome.fallback_reasons  # {"student_2": "missing from packed response"}
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Annotated, Any, Optional
+
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError, model_validator
+
+from cqc_cpcc.error_definitions_models import ErrorDefinition
+from cqc_cpcc.rubric_grading import (
+    DEFAULT_GRADING_MODEL,
+    DEFAULT_TEMPERATURE,
+    _request_with_failover,
+    build_rubric_grading_prompt_prefix,
+    finalize_rubric_result,
+    grade_with_rubric,
+)
+from cqc_cpcc.rubric_models import Rubric, RubricAssessmentResult
+from cqc_cpcc.utilities.AI.openai_exceptions import OpenAISchemaValidationError
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_FAILOVER_MODEL,
+    CQC_AI_PACK_MAX_SUBMISSION_TOKENS,
+    CQC_AI_PACK_MAX_SUBMISSIONS,
+    CQC_AI_PACK_TOKEN_BUDGET,
+)
+from cqc_cpcc.utilities.logger import logger
+from cqc_cpcc.utilities.token_estimator import get_token_estimator
+
+
+class PackedStudentResult(BaseModel):
+    """One student's assessment inside a packed response."""
+    student_id: Annotated[str, Field(description="Student ID exactly as given in the submission heading")]
+    assessment: Annotated[RubricAssessmentResult, Field(description="Rubric assessment for this student only")]
+
+
+class PackedRubricAssessmentResults(BaseModel):
+    """Assessments for every submission in a packed request.
+
+    Entries that fail validation are set aside in invalid_entries (student ID ->
+    error) instead of failing the whole response, so only those students need
+    to be re-graded alone.
+    """
+    results: Annotated[
+        list[PackedStudentResult],
+        Field(description="Exactly one entry per student submission, in the order given")
+    ]
+    _invalid_entries: dict[str, str] = PrivateAttr(default_factory=dict)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _set_aside_invalid_entries(cls, data: Any, handler):
+        invalid = {}
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            valid = []
+            for entry in data["results"]:
+                try:
+                    PackedStudentResult.model_validate(entry)
+                    valid.append(entry)
+                except ValidationError as e:
+                    student_id = entry.get("student_id") if isinstance(entry, dict) else None
+                    invalid[str(student_id)] = f"failed validation: {e.errors()[0].get('msg', e)}"
+            data = {**data, "results": valid}
+
+        packed = handler(data)
+        packed._invalid_entries = invalid
+        return packed
+
+    @property
+    def invalid_entries(self) -> dict[str, str]:
+        return dict(self._invalid_entries)
+
+
+@dataclass
+class PackedGradingOutcome:
+    """Results of a packed grading run.
+
+    Attributes:
+        results: Student ID -> scored RubricAssessmentResult
+        failures: Student ID -> failure reason (solo grading also failed)
+        packed: Student IDs graded inside a packed request
+        solo: Student IDs graded alone (too large, or fallback)
+        fallback_reasons: Student ID -> why a packed student was re-graded alone
+        requests: Number of grading requests made (packs + solo)
+    """
+    results: dict[str, RubricAssessmentResult] = field(default_factory=dict)
+    failures: dict[str, str] = field(default_factory=dict)
+    packed: list[str] = field(default_factory=list)
+    solo: list[str] = field(default_factory=list)
+    fallback_reasons: dict[str, str] = field(default_factory=dict)
+    requests: int = 0
+
+
+def plan_submission_packs(
+        student_submissions: dict[str, str],
+        token_budget: int = CQC_AI_PACK_TOKEN_BUDGET,
+        max_submissions: int = CQC_AI_PACK_MAX_SUBMISSIONS,
+        max_submission_tokens: int = CQC_AI_PACK_MAX_SUBMISSION_TOKENS,
+) -> tuple[list[list[str]], list[str]]:
+    """Group small submissions into packs (first-fit decreasing by token estimate).
+
+    Args:
+        student_submissions: Student ID -> submission text
+        token_budget: Maximum submission tokens per pack
+        max_submissions: Maximum submissions per pack
+        max_submission_tokens: Submissions above this are graded alone
+
+    Returns:
+        (packs of student IDs with at least two students each, student IDs to grade alone)
+    """
+    estimator = get_token_estimator()
+    tokens = {student_id: estimator.estimate(text) for student_id, text in student_submissions.items()}
+    limit = min(max_submission_tokens, token_budget)
+
+    solo = [student_id for student_id, count in tokens.items() if count > limit]
+    candidates = sorted((s for s in tokens if tokens[s] <= limit), key=lambda s: tokens[s], reverse=True)
+
+    packs: list[list[str]] = []
+    pack_tokens: list[int] = []
+    for student_id in candidates:
+        for index, pack in enumerate(packs):
+            if len(pack) < max_submissions and pack_tokens[index] + tokens[student_id] <= token_budget:
+                pack.append(student_id)
+                pack_tokens[index] += tokens[student_id]
+                break
+        else:
+            packs.append([student_id])
+            pack_tokens.append(tokens[student_id])
+
+    # A pack of one is just a solo request with a bigger schema
+    solo.extend(pack[0] for pack in packs if len(pack) == 1)
+    order = {student_id: index for index, student_id in enumerate(student_submissions)}
+    packs = [sorted(pack, key=order.get) for pack in packs if len(pack) > 1]
+    return packs, sorted(solo, key=order.get)
+
+
+def build_packed_rubric_grading_prompt(
+        rubric: Rubric,
+        assignment_instructions: str,
+        student_submissions: dict[str, str],
+        reference_solution: Optional[str] = None,
+        error_definitions: Optional[list[ErrorDefinition]] = None,
+) -> str:
+    """Build one prompt that grades several submissions independently.
+
+    The assignment-wide prefix is the same as for solo grading, so packed and
+    solo requests share the provider's prompt cache.
+
+    Args:
+        rubric: The rubric to use for grading
+        assignment_instructions: Assignment requirements and instructions
+        student_submissions: Student ID -> submission text (one pack)
+        reference_solution: Optional reference solution for comparison
+        error_definitions: Optional list of ErrorDefinition objects to check against
+
+    Returns:
+        Formatted prompt string
+    """
+    prefix = build_rubric_grading_prompt_prefix(
+        rubric=rubric,
+        assignment_instructions=assignment_instructions,
+        reference_solution=reference_solution,
+        error_definitions=error_definitions,
+    )
+
+    prompt_parts = [
+        prefix,
+        "## Multiple Submissions",
+        f"This request contains {len(student_submissions)} independent student submissions.",
+        "- Grade each submission on its own, exactly as if it were the only one. "
+        "Never compare submissions or let one affect another's grade.",
+        "- Return PackedRubricAssessmentResults: one `results` entry per submission, in the order given.",
+        "- Set `student_id` to the exact ID in the submission heading and put the complete "
+        "RubricAssessmentResult for that student in `assessment`.",
+        "",
+    ]
+    for student_id, submission in student_submissions.items():
+        prompt_parts.append(f"## Student Submission to Grade — student_id: `{student_id}`")
+        prompt_parts.append(submission)
+        prompt_parts.append("")
+
+    return "\n".join(prompt_parts)
+
+
+def split_packed_results(
+        rubric: Rubric,
+        student_ids: list[str],
+        packed: PackedRubricAssessmentResults,
+) -> tuple[dict[str, RubricAssessmentResult], dict[str, str]]:
+    """Split a validated packed response into finalized per-student results.
+
+    Args:
+        rubric: The rubric used for grading
+        student_ids: Student IDs in the pack
+        packed: Validated packed response
+
+    Returns:
+        (student ID -> finalized result, student ID -> reason it must be re-graded alone)
+    """
+    expected_criteria = {c.criterion_id for c in rubric.criteria if c.enabled}
+    invalid = packed.invalid_entries
+    entries: dict[str, list[RubricAssessmentResult]] = {student_id: [] for student_id in student_ids}
+    for entry in packed.results:
+        if entry.student_id in entries:
+            entries[entry.student_id].append(entry.assessment)
+        else:
+            logger.warning(f"Packed response contains unknown student_id '{entry.student_id}'")
+
+    results, fallbacks = {}, {}
+    for student_id, assessments in entries.items():
+        if student_id in invalid:
+            fallbacks[student_id] = invalid[student_id]
+            continue
+        if not assessments:
+            fallbacks[student_id] = "missing from packed response"
+            continue
+        if len(assessments) > 1:
+            fallbacks[student_id] = f"returned {len(assessments)} times in packed response"
+            continue
+
+        missing = expected_criteria - {cr.criterion_id for cr in assessments[0].criteria_results}
+        if missing:
+            fallbacks[student_id] = f"criteria not assessed: {', '.join(sorted(missing))}"
+            continue
+
+        try:
+            results[student_id] = finalize_rubric_result(rubric, assessments[0])
+        except (ValueError, ValidationError) as e:
+            fallbacks[student_id] = str(e)
+
+    return results, fallbacks
+
+
+async def grade_submission_pack(
+        rubric: Rubric,
+        assignment_instructions: str,
+        student_submissions: dict[str, str],
+        reference_solution: Optional[str] = None,
+        error_definitions: Optional[list[ErrorDefinition]] = None,
+        model_name: str = DEFAULT_GRADING_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        failover_model: Optional[str] = None,
+) -> tuple[dict[str, RubricAssessmentResult], dict[str, str]]:
+    """Grade one pack in a single request.
+
+    A response that fails schema validation as a whole sends every student in
+    the pack to solo grading; transport errors propagate.
+
+    Returns:
+        (student ID -> finalized result, student ID -> fallback reason)
+    """
+    prompt = build_packed_rubric_grading_prompt(
+        rubric=rubric,
+        assignment_instructions=assignment_instructions,
+        student_submissions=student_submissions,
+        reference_solution=reference_solution,
+        error_definitions=error_definitions,
+    )
+    try:
+        packed = await _request_with_failover(
+            prompt, model_name, temperature, None, failover_model,
+            schema_model=PackedRubricAssessmentResults,
+        )
+    except (OpenAISchemaValidationError, ValidationError) as e:
+        reason = f"packed response failed validation: {str(e)[:200]}"
+        return {}, {student_id: reason for student_id in student_submissions}
+
+    return split_packed_results(rubric, list(student_submissions), packed)
+
+
+async def grade_with_rubric_packed(
+        rubric: Rubric,
+        assignment_instructions: str,
+        student_submissions: dict[str, str],
+        reference_solution: Optional[str] = None,
+        error_definitions: Optional[list[ErrorDefinition]] = None,
+        model_name: str = DEFAULT_GRADING_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        failover_model: Optional[str] = None,
+        token_budget: int = CQC_AI_PACK_TOKEN_BUDGET,
+        max_submissions: int = CQC_AI_PACK_MAX_SUBMISSIONS,
+        max_submission_tokens: int = CQC_AI_PACK_MAX_SUBMISSION_TOKENS,
+        solo_fallback: bool = True,
+) -> PackedGradingOutcome:
+    """Grade many submissions, packing small ones several to a request.
+
+    Args:
+        rubric: The grading rubric
+        assignment_instructions: Assignment requirements
+        student_submissions: Student ID -> submission text
+        reference_solution: Optional reference solution
+        error_definitions: Optional error definitions
+        model_name: OpenAI or OpenRouter model ID
+        temperature: Sampling temperature
+        failover_model: Alternate model while model_name's circuit is open
+            (None follows CQC_AI_FAILOVER_MODEL)
+        token_budget: Maximum submission tokens per pack
+        max_submissions: Maximum submissions per pack
+        max_submission_tokens: Submissions above this are graded alone
+        solo_fallback: Grade unpacked and fallback students alone with
+            grade_with_rubric. With False they are only listed in outcome.solo
+            (for callers that run solo grading themselves, like the grading page).
+
+    Returns:
+        PackedGradingOutcome with per-student results, failures and packing details
+
+    Raises:
+        ValueError: If there are no submissions
+    """
+    if not student_submissions:
+        raise ValueError("No student submissions to grade")
+    if failover_model is None:
+        failover_model = CQC_AI_FAILOVER_MODEL or None
+
+    packs, solo = plan_submission_packs(student_submissions, token_budget, max_submissions, max_submission_tokens)
+    outcome = PackedGradingOutcome(solo=list(solo), requests=len(packs))
+
+    pack_outcomes = await asyncio.gather(
+        *(
+            grade_submission_pack(
+                rubric, assignment_instructions, {s: student_submissions[s] for s in pack},
+                reference_solution, error_definitions, model_name, temperature, failover_model,
+            )
+            for pack in packs
+        ),
+        return_exceptions=True,
+    )
+    for pack, pack_outcome in zip(packs, pack_outcomes):
+        if isinstance(pack_outcome, BaseException):
+            logger.warning(f"Packed request for {len(pack)} submission(s) failed: {pack_outcome}")
+            pack_outcome = ({}, {s: f"packed request failed: {pack_outcome}" for s in pack})
+        results, fallbacks = pack_outcome
+        outcome.results.update(results)
+        outcome.packed.extend(results)
+        outcome.fallback_reasons.update(fallbacks)
+        for student_id, reason in fallbacks.items():
+            logger.warning(f"Re-grading {student_id} alone: {reason}")
+
+    outcome.solo.extend(outcome.fallback_reasons)
+
+    if solo_fallback and outcome.solo:
+        solo_results = await asyncio.gather(
+            *(
+                grade_with_rubric(
+                    rubric=rubric,
+                    assignment_instructions=assignment_instructions,
+                    student_submission=student_submissions[student_id],
+                    reference_solution=reference_solution,
+                    error_definitions=error_definitions,
+                    model_name=model_name,
+                    temperature=temperature,
+                    failover_model=failover_model,
+                )
+                for student_id in outcome.solo
+            ),
+            return_exceptions=True,
+        )
+        outcome.requests += len(outcome.solo)
+        for student_id, result in zip(outcome.solo, solo_results):
+            if isinstance(result, BaseException):
+                outcome.failures[student_id] = str(result)
+            else:
+                outcome.results[student_id] = result
+
+    logger.info(
+        f"Packed grading: {len(outcome.packed)} submission(s) in {len(packs)} packed request(s), "
+        f"{len(outcome.solo)} graded alone ({len(outcome.fallback_reasons)} fallback(s)), "
+        f"{len(outcome.failures)} failure(s)"
+    )
+    return outcome
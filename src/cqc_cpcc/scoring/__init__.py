@@ -16,6 +16,11 @@ from cqc_cpcc.scoring.rubric_scoring_engine import (
     compute_percentage,
     select_overall_band,
 )
+from cqc_cpcc.scoring.batch_rescoring import (
+    ClassRescoreResult,
+    load_class_scoring_arrays,
+    rescore_class_results,
+)
 
 __all__ = [
     "score_level_band_criterion",
@@ -23,4 +28,7 @@ __all__ = [
     "aggregate_rubric_result",
     "compute_percentage",
     "select_overall_band",
+    "ClassRescoreResult",
+    "load_class_scoring_arrays",
+    "rescore_class_results",
 ]
@@ -0,0 +1,345 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Vectorized class-wide rescoring.
+
+apply_backend_scoring() scores one student at a time, calling
+score_level_band_criterion, score_error_count_criterion and
+aggregate_rubric_result per criterion. When an instructor edits rubric
+overrides after a run, every student in the class needs rescoring. This module
+loads all results of a run into NumPy arrays and applies the same rules
+to all students together:
+
+- One row per criterion result across the whole class (ragged results,
+  unknown and duplicate criteria are kept), with the student index, the rubric
+  criterion it maps to, the selected level and the current points
+- Per-student original error counts; Minor→Major normalization runs on the
+  count vectors
+- Level-band points: labels are mapped to level indexes and points are looked
+  up in per-criterion level tables (min / mid / max strategy)
+- Error-count points: deductions, max_deduction, floor_score and clipping
+  applied to whole columns
+- program_performance: the rubric's level selector runs once per distinct
+  (effective major, effective minor) pair and is broadcast back
+- Totals via np.bincount, percentages and overall bands via np.select
+
+The output is identical to calling apply_backend_scoring() on each result.
+Per-result error normalization (collapsing duplicate detected errors) is
+dictionary work and reuses resolve_scoring_error_counts().
+
+Usage:
+    >>> from cqc_cpcc.scoring import rescore_class_results
+    >>> rescored = rescore_class_results(effective_rubric, [result for _, result in all_results])
+    >>> rescored.results[0].total_points_earned, rescored.percentages[0]
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+import numpy as np
+
+from cqc_cpcc.rubric_models import Criterion, Rubric, RubricAssessmentResult
+from cqc_cpcc.utilities.logger import logger
+
+PROGRAM_PERFORMANCE_ID = "program_performance"
+
+
+@dataclass
+class ClassScoringArrays:
+    """All results of a run loaded into arrays (one row per criterion result).
+
+    Attributes:
+        student_index: Result index of each row
+        criterion_index: Index into criteria of each row (-1 = not in the rubric)
+        level_labels: Selected level label of each row (None if not selected)
+        points_earned: Current points of each row (NaN if None)
+        points_is_float: Whether each row's current points are a float
+        original_major: Original major error count per student
+        original_minor: Original minor error count per student
+        criteria: Rubric criteria in column order (first occurrence of each ID)
+        resolved_errors: Per student (detected_errors, error_counts_by_severity,
+            error_counts_by_id) after duplicate error normalization
+    """
+    student_index: np.ndarray
+    criterion_index: np.ndarray
+    level_labels: np.ndarray
+    points_earned: np.ndarray
+    points_is_float: np.ndarray
+    original_major: np.ndarray
+    original_minor: np.ndarray
+    criteria: list[Criterion]
+    resolved_errors: list[tuple] = field(default_factory=list)
+
+
+@dataclass
+class ClassRescoreResult:
+    """Rescored results of a run.
+
+    Attributes:
+        results: Rescored RubricAssessmentResult per input result
+        total_points_earned: Total points per student
+        percentages: Percentage per student (NaN where points possible is 0)
+        overall_band_labels: Overall band label per student (as stored in results)
+    """
+    results: list[RubricAssessmentResult]
+    total_points_earned: np.ndarray
+    percentages: np.ndarray
+    overall_band_labels: list[Optional[str]]
+
+
+def load_class_scoring_arrays(rubric: Rubric, results: Sequence[RubricAssessmentResult]) -> ClassScoringArrays:
+    """Load a run's results into arrays for vectorized scoring.
+
+    Args:
+        rubric: The rubric to score with
+        results: Results of every student in the run
+
+    Returns:
+        ClassScoringArrays
+    """
+    from cqc_cpcc.rubric_grading import resolve_scoring_error_counts
+
+    criteria: list[Criterion] = []
+    column_by_id: dict[str, int] = {}
+    for criterion in rubric.criteria:
+        if criterion.criterion_id not in column_by_id:
+            column_by_id[criterion.criterion_id] = len(criteria)
+            criteria.append(criterion)
+
+    rows = [
+        (student, column_by_id.get(cr.criterion_id, -1), cr.selected_level_label, cr.points_earned)
+        for student, result in enumerate(results)
+        for cr in result.criteria_results
+    ]
+    resolved = [resolve_scoring_error_counts(rubric, result) for result in results]
+
+    return ClassScoringArrays(
+        student_index=np.array([row[0] for row in rows], dtype=np.int64),
+        criterion_index=np.array([row[1] for row in rows], dtype=np.int64),
+        level_labels=np.array([row[2] for row in rows], dtype=object),
+        points_earned=np.array([np.nan if row[3] is None else row[3] for row in rows], dtype=np.float64),
+        points_is_float=np.array([isinstance(row[3], float) for row in rows], dtype=bool),
+        original_major=np.array([r[3] for r in resolved], dtype=np.int64),
+        original_minor=np.array([r[4] for r in resolved], dtype=np.int64),
+        criteria=criteria,
+        resolved_errors=[r[:3] for r in resolved],
+    )
+
+
+def normalize_error_arrays(major: np.ndarray, minor: np.ndarray, conversion_ratio: int = 4) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized normalize_errors(): every conversion_ratio minor errors become one major error."""
+    if (major < 0).any() or (minor < 0).any():
+        raise ValueError(f"Error counts cannot be negative: major={major.min()}, minor={minor.min()}")
+    if conversion_ratio <= 0:
+        raise ValueError(f"Conversion ratio must be positive: {conversion_ratio}")
+    return major + minor // conversion_ratio, minor % conversion_ratio
+
+
+def _level_band_points(criterion: Criterion, labels: np.ndarray, fallback: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Points for level_band rows of one criterion (score_level_band_criterion, vectorized).
+
+    Returns:
+        (points, is_float) per row; rows without a known level keep fallback
+    """
+    if not criterion.levels or criterion.points_strategy not in ("min", "mid", "max"):
+        logger.error(f"Cannot score level_band criterion '{criterion.criterion_id}': no levels or invalid strategy")
+        return fallback, np.zeros(len(labels), dtype=bool)
+
+    first_level_by_label: dict[str, int] = {}
+    for i, level in enumerate(criterion.levels):
+        first_level_by_label.setdefault(level.label, i)
+    known_labels = np.array(sorted(first_level_by_label), dtype=object)
+    level_rows = np.array([first_level_by_label[label] for label in known_labels], dtype=np.int64)
+
+    score_min = np.array([level.score_min for level in criterion.levels], dtype=np.float64)
+    score_max = np.array([level.score_max for level in criterion.levels], dtype=np.float64)
+    level_points = {
+        "min": score_min,
+        "max": score_max,
+        "mid": (score_min + score_max) // 2,
+    }[criterion.points_strategy]
+
+    # Map labels to level indexes with a sorted lookup ("" never matches a level label)
+    keys = np.array(["" if label is None else label for label in labels], dtype=object)
+    position = np.clip(np.searchsorted(known_labels, keys), 0, len(known_labels) - 1)
+    found = (known_labels[position] == keys) & (keys != "")
+    points = np.where(found, level_points[level_rows[position]], fallback)
+    return points, found
+
+
+def _error_count_points(criterion: Criterion, effective_major: np.ndarray, effective_minor: np.ndarray) -> np.ndarray:
+    """Points per student for one error_count criterion (score_error_count_criterion, vectorized)."""
+    rules = criterion.error_rules
+    if not rules:
+        raise ValueError(f"Criterion '{criterion.criterion_id}' has no error_rules defined")
+
+    major, minor = effective_major, effective_minor
+    if (major < 0).any() or (minor < 0).any():
+        raise ValueError(f"Error counts cannot be negative: major={major.min()}, minor={minor.min()}")
+    if rules.error_conversion:
+        major, minor = normalize_error_arrays(major, minor, rules.error_conversion.minor_to_major_ratio)
+
+    deduction = major * rules.major_weight + minor * rules.minor_weight
+    if rules.max_deduction is not None:
+        deduction = np.minimum(deduction, rules.max_deduction)
+    points = criterion.max_points - deduction
+    if rules.floor_score is not None:
+        points = np.maximum(rules.floor_score, points)
+    return np.rint(np.clip(points, 0, criterion.max_points)).astype(np.int64)
+
+
+def _program_performance_points(
+        rubric: Rubric,
+        criterion: Criterion,
+        effective_major: np.ndarray,
+        effective_minor: np.ndarray,
+) -> tuple[list, list[str]]:
+    """(score, level label) per student, selecting each distinct error-count pair once."""
+    from cqc_cpcc.rubric_grading import select_rubric_program_performance_level
+
+    pairs, inverse = np.unique(np.stack([effective_major, effective_minor], axis=1), axis=0, return_inverse=True)
+    selected = [
+        select_rubric_program_performance_level(rubric, criterion, int(major), int(minor))
+        for major, minor in pairs
+    ]
+    inverse = inverse.reshape(-1)
+    return [selected[i][1] for i in inverse], [selected[i][0] for i in inverse]
+
+
+def _round_percentages(percentages: np.ndarray) -> np.ndarray:
+    """round(x, 2) per element; values next to a rounding tie use Python's correctly rounded round()."""
+    rounded = np.round(percentages, 2)
+    scaled = percentages * 100.0
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(percentages[i]), 2)
+    return rounded
+
+
+def _select_overall_bands(rubric: Rubric, totals: np.ndarray) -> list[Optional[str]]:
+    """Vectorized select_overall_band(): first band whose range contains the total."""
+    if not rubric.overall_bands:
+        return [None] * len(totals)
+    conditions = [(band.score_min <= totals) & (totals <= band.score_max) for band in rubric.overall_bands]
+    labels = np.select(conditions, np.array([band.label for band in rubric.overall_bands], dtype=object),
+                       default=None)
+    unmatched = int((~np.any(conditions, axis=0)).sum())
+    if unmatched:
+        logger.warning(f"No overall band found for {unmatched} student total(s)")
+    return labels.tolist()
+
+
+def rescore_class_results(rubric: Rubric, results: Sequence[RubricAssessmentResult]) -> ClassRescoreResult:
+    """Rescore every result of a run with the rubric, identical to apply_backend_scoring() per result.
+
+    Input results are not modified.
+
+    Args:
+        rubric: The (effective) rubric to score with
+        results: Results of every student in the run
+
+    Returns:
+        ClassRescoreResult
+
+    Raises:
+        ValueError: Where apply_backend_scoring() would raise (e.g. an error_count
+            criterion without error_rules, or a student with 0 points possible)
+    """
+    results = list(results)
+    enabled = [c for c in rubric.criteria if c.enabled]
+    uses_error_counts = any(c.scoring_mode == "error_count" for c in enabled)
+    has_program_performance = any(c.criterion_id == PROGRAM_PERFORMANCE_ID for c in enabled)
+    points_possible = np.array([sum(cr.points_possible for cr in r.criteria_results) for r in results],
+                               dtype=np.float64)
+
+    if not any(c.scoring_mode == "level_band" for c in enabled) and not uses_error_counts \
+            and not has_program_performance:
+        # apply_backend_scoring() leaves all-manual results untouched
+        totals = np.array([r.total_points_earned for r in results], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percentages = _round_percentages(np.where(points_possible > 0, totals / points_possible * 100.0, np.nan))
+        return ClassRescoreResult(results, totals, percentages, [r.overall_band_label for r in results])
+
+    arrays = load_class_scoring_arrays(rubric, results)
+    n_students = len(results)
+
+    effective_major, effective_minor = arrays.original_major, arrays.original_minor
+    if uses_error_counts or has_program_performance:
+        has_conversion = any(c.error_rules and c.error_rules.error_conversion
+                             for c in enabled if c.scoring_mode == "error_count")
+        if has_conversion:
+            effective_major, effective_minor = normalize_error_arrays(effective_major, effective_minor)
+    else:
+        effective_major = np.zeros(n_students, dtype=np.int64)
+        effective_minor = np.zeros(n_students, dtype=np.int64)
+
+    # Rows keep their points (None -> 0) unless a rubric rule scores them
+    points = np.where(np.isnan(arrays.points_earned), 0.0, arrays.points_earned)
+    is_float = arrays.points_is_float.copy()
+    row_points: list = [None] * len(points)
+    labels = arrays.level_labels.copy()
+
+    for column, criterion in enumerate(arrays.criteria):
+        rows = np.flatnonzero(arrays.criterion_index == column)
+        if not len(rows):
+            continue
+        students = arrays.student_index[rows]
+
+        if criterion.criterion_id == PROGRAM_PERFORMANCE_ID:
+            scores, level_labels = _program_performance_points(rubric, criterion, effective_major, effective_minor)
+            for row, student in zip(rows, students):
+                row_points[row] = scores[student]
+                labels[row] = level_labels[student]
+        elif criterion.scoring_mode == "level_band":
+            scored, found = _level_band_points(criterion, labels[rows], points[rows])
+            points[rows] = scored
+            is_float[rows] |= found
+        elif criterion.scoring_mode == "error_count":
+            points[rows] = _error_count_points(criterion, effective_major, effective_minor)[students]
+            is_float[rows] = False
+
+    # Python values exactly as the per-student path stores them
+    for row, value in enumerate(points.tolist()):
+        if row_points[row] is None:
+            row_points[row] = value if is_float[row] else int(value)
+
+    totals = np.bincount(arrays.student_index, weights=np.array(row_points, dtype=np.float64), minlength=n_students)
+    if (points_possible <= 0).any():
+        raise ValueError(f"points_possible must be positive, got {points_possible.min():g}")
+    if (totals < 0).any():
+        raise ValueError(f"points_earned cannot be negative, got {totals.min():g}")
+    float_totals = np.bincount(arrays.student_index, weights=[isinstance(p, float) for p in row_points],
+                               minlength=n_students) > 0
+    percentages = _round_percentages(totals / points_possible * 100.0)
+    bands = _select_overall_bands(rubric, totals)
+
+    rescored = []
+    row = 0
+    for student, result in enumerate(results):
+        criteria_results = []
+        for cr in result.criteria_results:
+            update = {"points_earned": row_points[row]}
+            if labels[row] != cr.selected_level_label:
+                update["selected_level_label"] = labels[row]
+            criteria_results.append(cr.model_copy(update=update))
+            row += 1
+
+        detected_errors, counts_by_severity, counts_by_id = arrays.resolved_errors[student]
+        error_based = uses_error_counts or has_program_performance
+        total = float(totals[student]) if float_totals[student] else int(totals[student])
+        rescored.append(result.model_copy(update={
+            "criteria_results": criteria_results,
+            "total_points_earned": total,
+            "overall_band_label": bands[student] or next(
+                (cr.selected_level_label for cr in criteria_results if cr.selected_level_label), None
+            ),
+            "original_major_errors": int(arrays.original_major[student]) if error_based else None,
+            "original_minor_errors": int(arrays.original_minor[student]) if error_based else None,
+            "effective_major_errors": int(effective_major[student]) if error_based else None,
+            "effective_minor_errors": int(effective_minor[student]) if error_based else None,
+            "detected_errors": detected_errors,
+            "error_counts_by_severity": counts_by_severity,
+            "error_counts_by_id": counts_by_id,
+        }))
+
+    logger.info(f"Rescored {n_students} result(s) with rubric '{rubric.rubric_id}' ({len(row_points)} criterion results)")
+    return ClassRescoreResult(rescored, totals, percentages, [r.overall_band_label for r in rescored])
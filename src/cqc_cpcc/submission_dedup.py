@@ -0,0 +1,342 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Exact and near-duplicate detection for student submissions.
+
+Copied or barely modified submissions used to be graded independently at full
+cost. This stage runs between ZIP extraction and the grading fan-out:
+
+- Exact duplicates: submissions whose normalized content has the same SHA-256
+  are graded once. Only whitespace, line endings, submission file headers and
+  code fences are normalized. Comments are kept because rubrics grade
+  documentation and spelling in comments. The first student in upload order
+  is the representative, and the others reuse a copy of that student's result.
+- Near-duplicates: every distinct submission's code tokens (comments removed)
+  get a MinHash signature over k-token shingles. LSH banding proposes candidate pairs, and
+  pairs whose exact shingle Jaccard similarity reaches the threshold are
+  grouped (union-find). Near-duplicates are still graded separately. They are
+  only flagged in the grading summary so they can be reviewed together.
+
+Configuration (environment variables):
+- CQC_SUBMISSION_DEDUP: Enable the dedup stage by default (default: True)
+- CQC_DEDUP_NEAR_THRESHOLD: Jaccard similarity for near-duplicates (default: 0.8)
+- CQC_DEDUP_NUM_PERM: MinHash signature length (default: 64)
+- CQC_DEDUP_BANDS: LSH bands; must divide CQC_DEDUP_NUM_PERM (default: 16)
+- CQC_DEDUP_SHINGLE_SIZE: Tokens per shingle (default: 5)
+
+Usage:
+    >>> from cqc_cpcc.submission_dedup import find_duplicate_submissions, fan_out_duplicate_results
+    >>> report = find_duplicate_submissions({"alice": text_a, "bob": text_b, "carol": text_c})
+    >>> to_grade = report.representatives  # ["alice", "carol"] if bob copied alice
+    >>> results = fan_out_duplicate_results(graded_results, report)
+    >>> report.llm_calls_saved
+    1
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Optional, TypeVar
+
+from cqc_cpcc.utilities.env_constants import (
+    CQC_DEDUP_BANDS,
+    CQC_DEDUP_NEAR_THRESHOLD,
+    CQC_DEDUP_NUM_PERM,
+    CQC_DEDUP_SHINGLE_SIZE,
+)
+from cqc_cpcc.utilities.logger import logger
+
+R = TypeVar("R")
+
+# Mersenne prime for the universal hash family used by MinHash
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Headers and code fences added by build_submission_text_with_token_limit (file names differ between students)
+_SUBMISSION_HEADER_RE = re.compile(r"^\s*###\s*Submission File Name:.*$|###\s*Submission Content:|```\w*", re.MULTILINE)
+_WHITESPACE_RE = re.compile(r"[ \t\f\v]+")
+# String literals (group 1, kept) or comments: "/* */" blocks, "//" (not "://" in URLs)
+# and "#" (not C/C++ preprocessor directives)
+_STRING_OR_COMMENT_RE = re.compile(
+    r"(\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*')"
+    r"|/\*.*?\*/"
+    r"|(?<![:\w])//[^\n]*"
+    r"|(?:^|(?<=\s))#(?!\s*(?:include|define|if|ifdef|ifndef|endif|else|elif|pragma|undef)\b)[^\n]*",
+    re.DOTALL | re.MULTILINE,
+)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+@dataclass
+class NearDuplicateGroup:
+    """Submissions that are similar but not identical after normalization.
+
+    Attributes:
+        student_ids: Group members in upload order (exact duplicates included)
+        similarity: Highest pairwise Jaccard similarity that linked the group
+    """
+    student_ids: list[str]
+    similarity: float
+
+
+@dataclass
+class DedupReport:
+    """Duplicate groups found among a batch of submissions.
+
+    Attributes:
+        representatives: Student IDs to grade (one per distinct normalized content)
+        exact_duplicates: Representative ID -> IDs that reuse its result
+        near_duplicate_groups: Groups flagged for review together
+        fingerprints: Student ID -> SHA-256 of the normalized content
+    """
+    representatives: list[str] = field(default_factory=list)
+    exact_duplicates: dict[str, list[str]] = field(default_factory=dict)
+    near_duplicate_groups: list[NearDuplicateGroup] = field(default_factory=list)
+    fingerprints: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def llm_calls_saved(self) -> int:
+        """Grading calls avoided by reusing exact duplicates' results."""
+        return sum(len(duplicates) for duplicates in self.exact_duplicates.values())
+
+    def representative_of(self, student_id: str) -> str:
+        """The student whose result student_id reuses (itself if not a duplicate)."""
+        for representative, duplicates in self.exact_duplicates.items():
+            if student_id in duplicates:
+                return representative
+        return student_id
+
+    def review_notes(self) -> dict[str, str]:
+        """Student ID -> duplicate note for the grading summary export."""
+        notes: dict[str, list[str]] = {}
+        for representative, duplicates in self.exact_duplicates.items():
+            for student_id in duplicates:
+                notes.setdefault(student_id, []).append(f"Exact duplicate of {representative} (result reused)")
+            notes.setdefault(representative, []).append(f"Result reused by exact duplicate(s): {', '.join(duplicates)}")
+        for index, group in enumerate(self.near_duplicate_groups, start=1):
+            for student_id in group.student_ids:
+                others = ", ".join(s for s in group.student_ids if s != student_id)
+                notes.setdefault(student_id, []).append(
+                    f"Near-duplicate group {index} ({group.similarity:.0%} similar): {others}"
+                )
+        return {student_id: "; ".join(parts) for student_id, parts in notes.items()}
+
+
+def normalize_submission_text(text: str) -> str:
+    """Normalize submission text for exact duplicate detection.
+
+    Removes submission file headers and code fences, normalizes line endings,
+    collapses runs of spaces and tabs and drops blank lines. Comments and all
+    other content are kept, since exact duplicates reuse each other's grade.
+
+    Args:
+        text: Submission text (as built for grading)
+
+    Returns:
+        Normalized text
+    """
+    text = _SUBMISSION_HEADER_RE.sub("\n", text.replace("\r\n", "\n").replace("\r", "\n"))
+    lines = (_WHITESPACE_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def normalize_code_tokens(text: str) -> str:
+    """Code tokens for near-duplicate detection.
+
+    Removes submission file headers, code fences and C-style and "#" comments
+    (string literals are kept intact). The result is a space-joined token stream.
+
+    Args:
+        text: Submission text (as built for grading)
+
+    Returns:
+        Normalized token stream
+    """
+    text = _SUBMISSION_HEADER_RE.sub("\n", text)
+    text = _STRING_OR_COMMENT_RE.sub(lambda match: match.group(1) or " ", text)
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def content_fingerprint(text: str) -> str:
+    """SHA-256 of the normalized submission content."""
+    return hashlib.sha256(normalize_submission_text(text).encode("utf-8")).hexdigest()
+
+
+def shingle_hashes(normalized: str, shingle_size: int = CQC_DEDUP_SHINGLE_SIZE) -> set[int]:
+    """32-bit hashes of every run of shingle_size consecutive tokens."""
+    tokens = normalized.split(" ") if normalized else []
+    if len(tokens) < shingle_size:
+        grams = [" ".join(tokens)] if tokens else []
+    else:
+        grams = [" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "little")
+        for gram in grams
+    }
+
+
+class MinHasher:
+    """MinHash signatures with a fixed, seeded universal hash family."""
+
+    def __init__(self, num_perm: int = CQC_DEDUP_NUM_PERM, seed: int = 1):
+        self.num_perm = num_perm
+        self._params = []
+        for i in range(num_perm):
+            digest = hashlib.blake2b(f"{seed}:{i}".encode(), digest_size=16).digest()
+            a = int.from_bytes(digest[:8], "little") % (_MERSENNE_PRIME - 1) + 1
+            b = int.from_bytes(digest[8:], "little") % _MERSENNE_PRIME
+            self._params.append((a, b))
+
+    def signature(self, hashes: set[int]) -> tuple[int, ...]:
+        """MinHash signature of a set of shingle hashes (all max values for an empty set)."""
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._params
+        )
+
+
+def jaccard_similarity(first: set[int], second: set[int]) -> float:
+    """Exact Jaccard similarity of two shingle hash sets."""
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+def find_lsh_candidate_pairs(signatures: dict[str, tuple[int, ...]], bands: int) -> set[tuple[str, str]]:
+    """Pairs of keys whose signatures agree on at least one band.
+
+    Args:
+        signatures: Key -> MinHash signature (all the same length)
+        bands: Number of LSH bands (must divide the signature length)
+
+    Returns:
+        Candidate pairs, each ordered by first appearance in signatures
+    """
+    if not signatures:
+        return set()
+    num_perm = len(next(iter(signatures.values())))
+    if num_perm % bands:
+        raise ValueError(f"LSH bands ({bands}) must divide the signature length ({num_perm})")
+    rows = num_perm // bands
+    order = {key: index for index, key in enumerate(signatures)}
+
+    pairs = set()
+    for band in range(bands):
+        buckets: dict[tuple[int, ...], list[str]] = {}
+        for key, signature in signatures.items():
+            buckets.setdefault(signature[band * rows:(band + 1) * rows], []).append(key)
+        for members in buckets.values():
+            for i, first in enumerate(members):
+                for second in members[i + 1:]:
+                    pairs.add((first, second) if order[first] < order[second] else (second, first))
+    return pairs
+
+
+def find_duplicate_submissions(
+        student_submissions: dict[str, str],
+        near_threshold: float = CQC_DEDUP_NEAR_THRESHOLD,
+        num_perm: int = CQC_DEDUP_NUM_PERM,
+        bands: int = CQC_DEDUP_BANDS,
+        shingle_size: int = CQC_DEDUP_SHINGLE_SIZE,
+        min_shingles: int = 10,
+) -> DedupReport:
+    """Find exact and near-duplicate submissions.
+
+    Args:
+        student_submissions: Student ID -> submission text
+        near_threshold: Jaccard similarity at or above which submissions are near-duplicates
+        num_perm: MinHash signature length
+        bands: LSH bands (must divide num_perm)
+        shingle_size: Tokens per shingle
+        min_shingles: Submissions with fewer shingles (e.g. empty or starter code only)
+            are never flagged as near-duplicates
+
+    Returns:
+        DedupReport with representatives, exact duplicates and near-duplicate groups
+    """
+    report = DedupReport()
+    by_fingerprint: dict[str, str] = {}
+
+    for student_id, text in student_submissions.items():
+        fingerprint = content_fingerprint(text)
+        report.fingerprints[student_id] = fingerprint
+        representative = by_fingerprint.get(fingerprint)
+        if representative is None:
+            by_fingerprint[fingerprint] = student_id
+            report.representatives.append(student_id)
+        else:
+            report.exact_duplicates.setdefault(representative, []).append(student_id)
+
+    shingles = {
+        student_id: shingle_hashes(normalize_code_tokens(student_submissions[student_id]), shingle_size)
+        for student_id in report.representatives
+    }
+    shingles = {student_id: hashes for student_id, hashes in shingles.items() if len(hashes) >= min_shingles}
+
+    hasher = MinHasher(num_perm)
+    signatures = {student_id: hasher.signature(hashes) for student_id, hashes in shingles.items()}
+
+    # Union-find over representatives linked by verified candidate pairs
+    parent = {student_id: student_id for student_id in signatures}
+    best_similarity: dict[str, float] = {}
+
+    def find(student_id: str) -> str:
+        while parent[student_id] != student_id:
+            parent[student_id] = parent[parent[student_id]]
+            student_id = parent[student_id]
+        return student_id
+
+    for first, second in find_lsh_candidate_pairs(signatures, bands):
+        similarity = jaccard_similarity(shingles[first], shingles[second])
+        if similarity < near_threshold:
+            continue
+        root_first, root_second = find(first), find(second)
+        if root_first != root_second:
+            parent[root_second] = root_first
+        root = find(first)
+        best_similarity[root] = max(
+            similarity, best_similarity.get(root_first, 0.0), best_similarity.get(root_second, 0.0)
+        )
+
+    clusters: dict[str, list[str]] = {}
+    for student_id in signatures:
+        clusters.setdefault(find(student_id), []).append(student_id)
+
+    order = {student_id: index for index, student_id in enumerate(student_submissions)}
+    for root, members in clusters.items():
+        if len(members) < 2:
+            continue
+        # Exact duplicates of a member belong to the group too
+        student_ids = members + [d for m in members for d in report.exact_duplicates.get(m, [])]
+        report.near_duplicate_groups.append(
+            NearDuplicateGroup(sorted(student_ids, key=order.get), round(best_similarity.get(root, 0.0), 4))
+        )
+    report.near_duplicate_groups.sort(key=lambda group: order[group.student_ids[0]])
+
+    logger.info(
+        f"Submission dedup: {len(student_submissions)} submission(s), {len(report.representatives)} distinct, "
+        f"{report.llm_calls_saved} exact duplicate(s), {len(report.near_duplicate_groups)} near-duplicate group(s)"
+    )
+    return report
+
+
+def fan_out_duplicate_results(results: dict[str, R], report: DedupReport) -> dict[str, R]:
+    """Give every exact duplicate a copy of its representative's result.
+
+    Args:
+        results: Student ID -> result for graded representatives
+        report: Report from find_duplicate_submissions()
+
+    Returns:
+        Results for representatives and their duplicates (representatives that
+        failed to grade leave their duplicates without a result)
+    """
+    expanded = dict(results)
+    for representative, duplicates in report.exact_duplicates.items():
+        result: Optional[R] = results.get(representative)
+        if result is None:
+            continue
+        for student_id in duplicates:
+            expanded[student_id] = result.model_copy(deep=True) if hasattr(result, "model_copy") else result
+    return expanded
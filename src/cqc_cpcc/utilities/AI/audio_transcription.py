@@ -0,0 +1,245 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Segmented audio transcription helpers and the transcription cache.
+
+transcribe_audio used to upload the whole recording in one request, which
+fails outright above Whisper's 25 MB upload limit and transcribes a long
+recording serially. transcribe_audio (openai_client.py) now runs this
+pipeline:
+
+1. Cache: the audio is hashed (SHA-256). A finished transcription is stored
+   under that hash, so re-grading the same oral presentation returns the
+   stored transcript without calling the API.
+2. Split: recordings longer than the segment length, or larger than the
+   upload limit, are cut by ffmpeg into overlapping segments (mono 16 kHz
+   MP3, about 5 MB per 10 minutes). ffprobe/ffmpeg run in the shared media
+   worker pool (see utilities/media_pipeline.py).
+3. Transcribe: the segments are transcribed concurrently; each request takes
+   a slot from the shared "openai" concurrency limiter.
+4. Stitch: segment timestamps are shifted by the segment offset. Each segment
+   owns the time window from the middle of its leading overlap to the middle
+   of its trailing overlap, so a Whisper segment heard twice is kept once.
+   Segments without timestamps fall back to removing the repeated words at
+   the text boundary.
+
+Configuration (environment variables):
+- CQC_AI_TRANSCRIPTION_SEGMENT_SECONDS: Segment length in seconds (default: 600)
+- CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS: Overlap between segments (default: 5)
+- CQC_AI_TRANSCRIPTION_MAX_UPLOAD_MB: Largest file uploaded unsplit (default: 24)
+- CQC_AI_TRANSCRIPTION_CACHE: Cache transcriptions by audio hash (default: True)
+- CQC_AI_TRANSCRIPTION_CACHE_MAX_MB: Transcription cache size limit (default: 256)
+
+Usage:
+    from cqc_cpcc.utilities.AI.audio_transcription import plan_segments
+
+    plan = plan_segments(duration=2700.0)  # [(0.0, 600.0), (595.0, 600.0), ...]
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from cqc_cpcc.utilities.AI.response_cache import ResponseCache
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_RESPONSE_CACHE_DIR,
+    CQC_AI_TRANSCRIPTION_CACHE_MAX_MB,
+    CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS,
+    CQC_AI_TRANSCRIPTION_SEGMENT_SECONDS,
+)
+from cqc_cpcc.utilities.media_pipeline import WHISPER_AUDIO_ARGS, run_media_command
+
+WHISPER_MODEL = "whisper-1"
+
+# Bump when the cached transcription payload changes
+TRANSCRIPTION_CACHE_VERSION = 1
+
+TRANSCRIPTION_CACHE_FILENAME = "ai_transcription_cache.sqlite3"
+
+_WORD_PATTERN = re.compile(r"[^\w']+")
+MAX_OVERLAP_WORDS = 60
+MIN_OVERLAP_WORDS = 2  # A single shared word is too likely to be a coincidence
+
+
+@dataclass(frozen=True)
+class AudioSegment:
+    """One segment cut from a longer recording."""
+    index: int
+    start: float
+    duration: float
+    path: str
+
+
+def build_transcription_cache_key(audio_sha256: str, model: str = WHISPER_MODEL) -> str:
+    """Cache key for a transcription of the given audio content."""
+    material = {"v": TRANSCRIPTION_CACHE_VERSION, "kind": "transcription", "model": model, "audio": audio_sha256}
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def plan_segments(
+        duration: float,
+        segment_seconds: float = CQC_AI_TRANSCRIPTION_SEGMENT_SECONDS,
+        overlap_seconds: float = CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS,
+) -> list[tuple[float, float]]:
+    """Plan overlapping segments covering a recording.
+
+    Args:
+        duration: Recording length in seconds
+        segment_seconds: Segment length
+        overlap_seconds: Seconds shared by consecutive segments
+
+    Returns:
+        List of (start, length) in seconds
+    """
+    overlap_seconds = min(max(0.0, overlap_seconds), segment_seconds / 2)
+    step = segment_seconds - overlap_seconds
+    plan = []
+    start = 0.0
+    while True:
+        length = min(segment_seconds, duration - start)
+        plan.append((start, length))
+        if start + length >= duration:
+            return plan
+        start += step
+
+
+async def split_audio(file_path: str, plan: list[tuple[float, float]], output_dir: str) -> list[AudioSegment]:
+    """Cut planned segments out of a recording with ffmpeg (concurrently, in the media worker pool).
+
+    Args:
+        file_path: Source audio (or video) file
+        plan: (start, length) pairs from plan_segments()
+        output_dir: Directory for the segment files
+
+    Returns:
+        Segments in order
+
+    Raises:
+        RuntimeError: If ffmpeg fails for any segment (MediaProcessingError is a RuntimeError)
+    """
+    async def cut(index: int, start: float, length: float) -> AudioSegment:
+        path = os.path.join(output_dir, f"segment_{index:04d}.mp3")
+        await run_media_command(
+            ["ffmpeg", "-v", "error", "-y", "-ss", f"{start:.3f}", "-t", f"{length:.3f}", "-i", file_path,
+             *WHISPER_AUDIO_ARGS, path],
+            label=f"{os.path.basename(file_path)} segment {index}",
+        )
+        if not os.path.exists(path):
+            raise RuntimeError(f"ffmpeg wrote no audio for segment {index} at {start:.0f}s")
+        return AudioSegment(index=index, start=start, duration=length, path=path)
+
+    return list(await asyncio.gather(*(cut(i, start, length) for i, (start, length) in enumerate(plan))))
+
+
+def normalize_transcription_segments(segments: Any) -> list[dict]:
+    """Convert Whisper verbose_json segments (objects or dicts) to start/end/text dicts."""
+    if not isinstance(segments, list):
+        return []
+    normalized = []
+    for segment in segments:
+        values = segment if isinstance(segment, dict) else vars(segment) if hasattr(segment, "__dict__") else {}
+        try:
+            normalized.append({
+                "start": float(values["start"]),
+                "end": float(values["end"]),
+                "text": str(values.get("text", "")).strip(),
+            })
+        except (KeyError, TypeError, ValueError):
+            continue
+    return normalized
+
+
+def _normalize_word(token: str) -> str:
+    return _WORD_PATTERN.sub("", token.lower())
+
+
+def merge_overlapping_text(previous: str, following: str, max_words: int = MAX_OVERLAP_WORDS) -> str:
+    """Join two transcripts, dropping words the second repeats from the end of the first.
+
+    Args:
+        previous: Transcript so far
+        following: Transcript of the next (overlapping) segment
+        max_words: Longest overlap to look for
+
+    Returns:
+        Combined transcript
+    """
+    previous, following = previous.strip(), following.strip()
+    if not previous or not following:
+        return previous or following
+
+    tail = [_normalize_word(token) for token in previous.split()[-max_words:]]
+    following_tokens = following.split()
+    head = [_normalize_word(token) for token in following_tokens[:max_words]]
+    for size in range(min(len(tail), len(head)), MIN_OVERLAP_WORDS - 1, -1):
+        if tail[-size:] == head[:size]:
+            return f"{previous} {' '.join(following_tokens[size:])}".strip()
+    return f"{previous} {following}"
+
+
+def stitch_transcriptions(
+        parts: list[tuple[float, dict]],
+        overlap_seconds: float = CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS,
+) -> tuple[str, list[dict]]:
+    """Stitch segment transcriptions into one transcript with absolute timestamps.
+
+    Args:
+        parts: (segment start offset, {"text", "segments"}) in order
+        overlap_seconds: Overlap used when the recording was split
+
+    Returns:
+        (text, segments with start/end relative to the whole recording)
+    """
+    text = ""
+    segments: list[dict] = []
+    for index, (offset, result) in enumerate(parts):
+        window_start = offset + overlap_seconds / 2 if index else float("-inf")
+        window_end = parts[index + 1][0] + overlap_seconds / 2 if index + 1 < len(parts) else float("inf")
+        timed = result.get("segments") or []
+        if not timed:
+            text = merge_overlapping_text(text, result.get("text", ""))
+            continue
+        for segment in timed:
+            start, end = offset + segment["start"], offset + segment["end"]
+            if window_start <= (start + end) / 2 < window_end:
+                segments.append({"start": round(start, 3), "end": round(end, 3), "text": segment["text"]})
+                if segment["text"]:
+                    text = f"{text} {segment['text']}".strip()
+    return text, segments
+
+
+_transcription_cache: ResponseCache | None = None
+_transcription_cache_lock = threading.Lock()
+
+
+def get_transcription_cache() -> ResponseCache:
+    """Get or create the transcription cache (no expiry; size-bounded LRU).
+
+    Returns:
+        ResponseCache stored next to the AI response cache
+    """
+    global _transcription_cache
+    if _transcription_cache is None:
+        with _transcription_cache_lock:
+            if _transcription_cache is None:
+                cache_dir = (Path(CQC_AI_RESPONSE_CACHE_DIR) if CQC_AI_RESPONSE_CACHE_DIR
+                             else Path.home() / ".cache" / "cqc_cpcc")
+                _transcription_cache = ResponseCache(
+                    db_path=cache_dir / TRANSCRIPTION_CACHE_FILENAME,
+                    max_bytes=int(CQC_AI_TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024),
+                    ttl_seconds=0,
+                )
+    return _transcription_cache
+
+
+def set_transcription_cache(cache: ResponseCache | None) -> None:
+    """Replace the transcription cache (None recreates it from env on next use; for tests)."""
+    global _transcription_cache
+    with _transcription_cache_lock:
+        _transcription_cache = cache
@@ -0,0 +1,443 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Map-reduce preprocessing digest for oversized submissions.
+
+generate_preprocessing_digest used to send the whole submission to the model
+in one prompt. The submissions that need preprocessing are the largest ones,
+so that single request was both the slowest and the most likely to fail or
+be truncated. Chunked mode splits the work:
+
+1. Split: the submission text is split per file (on the
+   "### Submission File Name:" headers written by
+   build_submission_text_with_token_limit). A file larger than the chunk
+   budget is split further at function/class/method boundaries, falling back
+   to line boundaries for a single oversized definition.
+2. Map: every chunk is digested concurrently into a FileDigest (the shared
+   concurrency limiter throttles how many reach the provider at once).
+3. Reduce: the parts of each file are merged into one FileDigest, and one
+   small request over the merged per-file digests produces the overall
+   assessment and completeness check of the PreprocessingDigest.
+
+Chunk digests are cached by a SHA-256 over the chunk content and its grading
+context (model, assignment instructions, grading criteria) in the persistent
+response cache. A resubmission that changes one file re-digests only that
+file's chunks, and a failed run keeps the chunks that already succeeded.
+
+Configuration (environment variables):
+- CQC_AI_CHUNKED_PREPROCESSING: Use chunked mode for preprocessing (default: True)
+- CQC_AI_PREPROCESSING_CHUNK_TOKENS: Token budget per chunk (default: 12000)
+- CQC_AI_CHUNK_DIGEST_CACHE: Cache chunk digests by content hash (default: True)
+
+Usage:
+    from cqc_cpcc.utilities.AI.chunked_preprocessing import generate_chunked_preprocessing_digest
+
+    digest = await generate_chunked_preprocessing_digest(submission_text, instructions, rubric_config)
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from cqc_cpcc.utilities.AI.llm_metrics import get_metrics_registry
+from cqc_cpcc.utilities.AI.openai_client import (
+    DEFAULT_MODEL,
+    CompletenessCheck,
+    FileDigest,
+    PreprocessingDigest,
+    get_structured_completion,
+)
+from cqc_cpcc.utilities.AI.response_cache import get_response_cache
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_CHUNK_DIGEST_CACHE,
+    CQC_AI_PREPROCESSING_CHUNK_TOKENS,
+)
+from cqc_cpcc.utilities.logger import logger
+from cqc_cpcc.utilities.token_estimator import get_token_estimator
+
+# Bump when the chunk prompt or cache key derivation changes
+CHUNK_DIGEST_VERSION = 1
+
+DEFAULT_SUBMISSION_FILENAME = "submission"
+
+_FILE_HEADER_PATTERN = re.compile(r"^### Submission File Name: (.+?)\s*$", re.MULTILINE)
+_CONTENT_PREFIX = "### Submission Content: "
+_FENCE_PATTERN = re.compile(r"^\s*```([\w+#.-]*)[ \t]*\n(.*?)\n?```\s*$", re.DOTALL)
+
+# Lines that start a top-level or class-level definition (indented at most one level)
+_BOUNDARY_PATTERN = re.compile(
+    r"^(?:\t| {0,4})(?:@\w"
+    r"|(?:(?:public|private|protected|internal|static|final|abstract|sealed|override|virtual"
+    r"|async|export|default|synchronized|inline|pub)\s+)*"
+    r"(?:def|class|interface|enum|record|struct|function|fun|func|fn|impl|trait|module)\b"
+    r"|(?:(?:public|private|protected|static|final|abstract|synchronized)\s+)+[\w<>\[\],.? ]+\s+\w+\s*\()"
+)
+
+
+class DigestSummary(BaseModel):
+    """Submission-level part of a PreprocessingDigest (reduce step output)."""
+    overall_assessment: str = Field(description="Overall submission assessment")
+    completeness_check: CompletenessCheck = Field(description="Completeness assessment")
+
+
+@dataclass(frozen=True)
+class SubmissionChunk:
+    """One piece of a submission file to digest independently."""
+    filename: str
+    language: str
+    text: str
+    start_line: int
+    part: int
+    total_parts: int
+
+    @property
+    def end_line(self) -> int:
+        return self.start_line + self.text.count("\n")
+
+
+def split_submission_files(student_code: str) -> list[tuple[str, str, str]]:
+    """Split combined submission text into its files.
+
+    Args:
+        student_code: Text built by build_submission_text_with_token_limit
+                      (or any raw code, treated as a single file)
+
+    Returns:
+        List of (filename, language, content) with code fences removed
+    """
+    headers = list(_FILE_HEADER_PATTERN.finditer(student_code))
+    if not headers:
+        return [(DEFAULT_SUBMISSION_FILENAME, "", student_code)]
+
+    files = []
+    for index, header in enumerate(headers):
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(student_code)
+        body = student_code[header.end():end].lstrip("\n")
+        if body.startswith(_CONTENT_PREFIX):
+            body = body[len(_CONTENT_PREFIX):]
+        language = ""
+        fenced = _FENCE_PATTERN.match(body)
+        if fenced:
+            language, body = fenced.group(1), fenced.group(2)
+        files.append((header.group(1), language, body.rstrip("\n")))
+    return files
+
+
+def _split_lines_by_budget(lines: list[str], max_tokens: int) -> list[list[str]]:
+    """Pack lines into groups of at most max_tokens (a single long line stays whole)."""
+    estimator = get_token_estimator()
+    groups: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for line in lines:
+        line_tokens = estimator.estimate(line) + 1
+        if current and current_tokens + line_tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def split_file_into_chunks(
+        filename: str,
+        content: str,
+        language: str = "",
+        max_tokens: int = CQC_AI_PREPROCESSING_CHUNK_TOKENS,
+) -> list[SubmissionChunk]:
+    """Split one file at definition boundaries into chunks of at most max_tokens.
+
+    Args:
+        filename: File name
+        content: File content (without code fences)
+        language: Code fence language tag
+        max_tokens: Token budget per chunk
+
+    Returns:
+        Chunks in file order (a file within budget is a single chunk)
+    """
+    estimator = get_token_estimator()
+    if estimator.estimate(content) <= max_tokens:
+        return [SubmissionChunk(filename, language, content, 1, 1, 1)]
+
+    lines = content.split("\n")
+    boundaries = [0]
+    for index, line in enumerate(lines):
+        # Keep decorators/annotations with the definition that follows them
+        if index and _BOUNDARY_PATTERN.match(line) and not _BOUNDARY_PATTERN.match(lines[index - 1]):
+            boundaries.append(index)
+    boundaries.append(len(lines))
+
+    segments = [lines[start:end] for start, end in zip(boundaries, boundaries[1:]) if end > start]
+    pieces: list[tuple[int, list[str]]] = []  # (start line index, lines)
+    current: list[str] = []
+    current_start = 0
+    current_tokens = 0
+    line_index = 0
+    for segment in segments:
+        segment_tokens = estimator.estimate("\n".join(segment))
+        if current and current_tokens + segment_tokens > max_tokens:
+            pieces.append((current_start, current))
+            current, current_tokens = [], 0
+        if not current:
+            current_start = line_index
+        if segment_tokens > max_tokens:
+            # A single definition over budget: split it by lines
+            offset = line_index
+            for group in _split_lines_by_budget(segment, max_tokens):
+                pieces.append((offset, group))
+                offset += len(group)
+            current, current_tokens = [], 0
+        else:
+            current.extend(segment)
+            current_tokens += segment_tokens
+        line_index += len(segment)
+    if current:
+        pieces.append((current_start, current))
+
+    return [
+        SubmissionChunk(filename, language, "\n".join(piece), start + 1, part, len(pieces))
+        for part, (start, piece) in enumerate(pieces, start=1)
+    ]
+
+
+def split_submission_into_chunks(
+        student_code: str,
+        max_tokens: int = CQC_AI_PREPROCESSING_CHUNK_TOKENS,
+) -> list[SubmissionChunk]:
+    """Split a submission by file, then by definition boundaries.
+
+    Args:
+        student_code: Combined submission text
+        max_tokens: Token budget per chunk
+
+    Returns:
+        Chunks in submission order
+    """
+    chunks: list[SubmissionChunk] = []
+    for filename, language, content in split_submission_files(student_code):
+        chunks.extend(split_file_into_chunks(filename, content, language, max_tokens))
+    return chunks
+
+
+def build_chunk_cache_key(chunk: SubmissionChunk, model_name: str, context: str) -> str:
+    """Content hash identifying a chunk digest.
+
+    Args:
+        chunk: Submission chunk
+        model_name: Model producing the digest
+        context: Assignment instructions and grading criteria
+
+    Returns:
+        SHA-256 hex digest
+    """
+    material = {
+        "v": CHUNK_DIGEST_VERSION,
+        "kind": "preprocessing_chunk",
+        "model": model_name,
+        "context": hashlib.sha256(context.encode("utf-8")).hexdigest(),
+        "filename": chunk.filename,
+        "part": [chunk.part, chunk.total_parts, chunk.start_line],
+        "text": hashlib.sha256(chunk.text.encode("utf-8")).hexdigest(),
+    }
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _build_chunk_prompt(chunk: SubmissionChunk, assignment_instructions: str, rubric_config: str) -> str:
+    part_note = (
+        f" (part {chunk.part} of {chunk.total_parts}, lines {chunk.start_line}-{chunk.end_line})"
+        if chunk.total_parts > 1 else ""
+    )
+    return f"""Create a grading digest for one file of a student code submission. Preserve all information needed for accurate grading.
+
+ASSIGNMENT INSTRUCTIONS:
+{assignment_instructions}
+
+{f"GRADING CRITERIA:\n{rubric_config}\n" if rubric_config else ""}
+
+STUDENT FILE: {chunk.filename}{part_note}
+```{chunk.language}
+{chunk.text}
+```
+
+---
+
+CREATE FILE DIGEST:
+1. File purpose and structure (of this part, if it is only part of the file)
+2. Key functions/classes/methods with signatures
+3. Logic patterns (loops, conditionals, algorithms)
+4. Input/output behavior
+5. Issues or concerns with {chunk.filename}:line references (line numbers start at {chunk.start_line})
+
+OUTPUT REQUIREMENTS:
+- Set "filename" to "{chunk.filename}"
+- Preserve detail sufficient for grading without raw code
+- Extract exactly what is present in this code; do not invent components
+- If something cannot be determined from this part alone, say so rather than speculate
+- Set arrays to empty [] if no items detected
+"""
+
+
+def _build_summary_prompt(files_json: str, assignment_instructions: str, rubric_config: str) -> str:
+    return f"""Summarize a student submission from its per-file grading digests.
+
+ASSIGNMENT INSTRUCTIONS:
+{assignment_instructions}
+
+{f"GRADING CRITERIA:\n{rubric_config}\n" if rubric_config else ""}
+
+PER-FILE DIGESTS:
+{files_json}
+
+---
+
+TASK:
+- overall_assessment: overall assessment of the submission against the assignment instructions
+- completeness_check: required components present and missing, based only on the digests
+
+Do not invent components that are not in the digests.
+"""
+
+
+def _join_distinct(values: list[str]) -> str:
+    seen: list[str] = []
+    for value in values:
+        value = (value or "").strip()
+        if value and value not in seen:
+            seen.append(value)
+    return "\n".join(seen)
+
+
+def merge_file_digests(filename: str, parts: list[FileDigest]) -> FileDigest:
+    """Merge the digests of a file's chunks (in file order) into one FileDigest."""
+    if len(parts) == 1:
+        return parts[0].model_copy(update={"filename": filename})
+
+    components, component_keys = [], set()
+    for component in (c for part in parts for c in part.key_components):
+        key = (component.name, component.type, component.signature)
+        if key not in component_keys:
+            component_keys.add(key)
+            components.append(component)
+    issues, issue_keys = [], set()
+    for issue in (i for part in parts for i in part.detected_issues):
+        key = (issue.issue, issue.location)
+        if key not in issue_keys:
+            issue_keys.add(key)
+            issues.append(issue)
+
+    return FileDigest(
+        filename=filename,
+        purpose=_join_distinct([part.purpose for part in parts]),
+        structure=_join_distinct([part.structure for part in parts]),
+        key_components=components,
+        notable_logic=_join_distinct([part.notable_logic for part in parts]),
+        io_behavior=_join_distinct([part.io_behavior for part in parts]),
+        detected_issues=issues,
+    )
+
+
+async def _digest_chunk(
+        chunk: SubmissionChunk,
+        assignment_instructions: str,
+        rubric_config: str,
+        model_name: str,
+        use_cache: bool,
+) -> tuple[FileDigest, bool]:
+    """Digest one chunk, using the content-hash cache when enabled.
+
+    Returns:
+        (FileDigest, True if it came from the cache)
+    """
+    cache_key = build_chunk_cache_key(chunk, model_name, f"{assignment_instructions}\n{rubric_config}")
+    if use_cache:
+        cached = await asyncio.to_thread(get_response_cache().get, cache_key)
+        if cached is not None:
+            try:
+                digest = FileDigest.model_validate_json(cached)
+                get_metrics_registry().increment("cache_hits", "preprocessing_chunk", model_name)
+                return digest, True
+            except ValueError as e:
+                logger.warning(f"Ignoring unreadable cached chunk digest for {chunk.filename}: {e}")
+
+    with get_metrics_registry().track_request("preprocessing_chunk", model_name):
+        digest = await get_structured_completion(
+            prompt=_build_chunk_prompt(chunk, assignment_instructions, rubric_config),
+            model_name=model_name,
+            schema_model=FileDigest,
+            use_cache=False,
+        )
+    digest = digest.model_copy(update={"filename": chunk.filename})
+    if use_cache:
+        await asyncio.to_thread(
+            get_response_cache().set, cache_key, digest.model_dump_json(),
+            model=model_name, schema_name="FileDigest",
+        )
+    return digest, False
+
+
+async def generate_chunked_preprocessing_digest(
+        student_code: str,
+        assignment_instructions: str,
+        rubric_config: str = "",
+        model_name: str = DEFAULT_MODEL,
+        max_chunk_tokens: int = CQC_AI_PREPROCESSING_CHUNK_TOKENS,
+        use_cache: Optional[bool] = None,
+) -> PreprocessingDigest:
+    """Generate a PreprocessingDigest by digesting submission chunks concurrently.
+
+    Args:
+        student_code: Full student submission (all files)
+        assignment_instructions: Assignment requirements
+        rubric_config: Rubric or error criteria (optional)
+        model_name: Model to use (default: gpt-5-mini)
+        max_chunk_tokens: Token budget per chunk
+        use_cache: Cache chunk digests by content hash. None (default)
+            follows CQC_AI_CHUNK_DIGEST_CACHE.
+
+    Returns:
+        PreprocessingDigest with one FileDigest per file
+
+    Raises:
+        OpenAISchemaValidationError: If a chunk or summary digest fails validation
+        OpenAITransportError: If an API call fails after retries
+    """
+    if use_cache is None:
+        use_cache = CQC_AI_CHUNK_DIGEST_CACHE
+
+    chunks = split_submission_into_chunks(student_code, max_chunk_tokens)
+    results = await asyncio.gather(*(
+        _digest_chunk(chunk, assignment_instructions, rubric_config, model_name, use_cache)
+        for chunk in chunks
+    ))
+    cache_hits = sum(1 for _, cached in results if cached)
+
+    parts_by_file: dict[str, list[FileDigest]] = {}
+    for chunk, (digest, _) in zip(chunks, results):
+        parts_by_file.setdefault(chunk.filename, []).append(digest)
+    files = [merge_file_digests(filename, parts) for filename, parts in parts_by_file.items()]
+
+    files_json = json.dumps([file.model_dump() for file in files], indent=1)
+    with get_metrics_registry().track_request("preprocessing_summary", model_name):
+        summary = await get_structured_completion(
+            prompt=_build_summary_prompt(files_json, assignment_instructions, rubric_config),
+            model_name=model_name,
+            schema_model=DigestSummary,
+        )
+
+    logger.info(
+        f"Chunked preprocessing digest: {len(files)} file(s), {len(chunks)} chunk(s), "
+        f"{len(chunks) - cache_hits} digested, {cache_hits} from cache"
+    )
+    return PreprocessingDigest(
+        files=files,
+        overall_assessment=summary.overall_assessment,
+        completeness_check=summary.completeness_check,
+    )
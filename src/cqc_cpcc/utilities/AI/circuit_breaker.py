@@ -0,0 +1,273 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Circuit breakers for LLM providers and models.
+
+When a provider has a bad period, every student otherwise burns all of its
+retry attempts before failing. A circuit breaker remembers recent failures
+across all callers and rejects new calls immediately while the provider is
+down, so grading can fail over to an alternate provider or model right away.
+
+States:
+- closed: Calls flow normally. Consecutive failures are counted.
+- open: After CQC_AI_CIRCUIT_FAILURE_THRESHOLD consecutive failures, calls are
+  rejected with CircuitOpenError for CQC_AI_CIRCUIT_RESET_SECONDS.
+- half_open: After the reset timeout, one probe call is let through. Success
+  closes the circuit; failure opens it again.
+
+Each call is guarded by two breakers: one for the provider (e.g., "openai")
+and one for the model (e.g., "openai:gpt-5-mini"). Only transport failures
+(timeouts, connection errors, 5xx) count. Rate limits are handled by the
+concurrency limiter and client errors (4xx) mean the provider is up.
+
+Configuration (environment variables):
+- CQC_AI_CIRCUIT_BREAKER: Enable circuit breakers (default: True)
+- CQC_AI_CIRCUIT_FAILURE_THRESHOLD: Consecutive failures that open a circuit (default: 5)
+- CQC_AI_CIRCUIT_RESET_SECONDS: Seconds a circuit stays open before a probe (default: 60)
+
+Usage:
+    from cqc_cpcc.utilities.AI.circuit_breaker import circuit_guard
+
+    async with circuit_guard("openai", "gpt-5-mini"):
+        response = await client.chat.completions.create(...)
+"""
+
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from cqc_cpcc.utilities.AI.openai_exceptions import CircuitOpenError
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_CIRCUIT_BREAKER,
+    CQC_AI_CIRCUIT_FAILURE_THRESHOLD,
+    CQC_AI_CIRCUIT_RESET_SECONDS,
+)
+from cqc_cpcc.utilities.logger import logger
+from openai import APIConnectionError, APIError, APITimeoutError, RateLimitError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by consecutive failures."""
+
+    def __init__(
+            self,
+            name: str,
+            failure_threshold: int = CQC_AI_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout: float = CQC_AI_CIRCUIT_RESET_SECONDS,
+            clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """Current state, moving open -> half_open once the reset timeout has passed."""
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+            logger.info(f"Circuit '{self.name}' half-open, allowing a probe request")
+
+    def seconds_until_probe(self) -> float:
+        """Seconds until an open circuit allows a probe (0 when not open)."""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed, claiming the probe slot when half-open."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Record a call that reached the provider successfully."""
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit '{self.name}' closed after successful probe")
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a transport failure, opening the circuit when the threshold is reached."""
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._times_opened += 1
+                    logger.warning(
+                        f"Circuit '{self.name}' opened after {self._consecutive_failures} consecutive failures"
+                    )
+                self._state = OPEN
+                self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot without changing state (e.g., rate limited)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict[str, Any]:
+        """Current state for monitoring."""
+        with self._lock:
+            self._maybe_half_open()
+            retry_in = 0.0
+            if self._state == OPEN:
+                retry_in = max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "times_opened": self._times_opened,
+                "seconds_until_probe": round(retry_in, 1),
+            }
+
+
+def is_breaker_failure(error: BaseException) -> bool:
+    """Check whether an exception indicates the provider itself is failing.
+
+    Args:
+        error: Exception raised by an API call
+
+    Returns:
+        True for timeouts, connection errors and 5xx responses
+    """
+    if isinstance(error, RateLimitError):
+        return False
+    if isinstance(error, (APITimeoutError, APIConnectionError)):
+        return True
+    if isinstance(error, APIError):
+        status_code = getattr(error, "status_code", None)
+        return isinstance(status_code, int) and status_code >= 500
+    return False
+
+
+# Process-wide breakers keyed by "provider" and "provider:model"
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get the process-wide breaker for a circuit name.
+
+    Args:
+        name: Circuit name ("openai" or "openai:gpt-5-mini")
+
+    Returns:
+        Shared CircuitBreaker instance
+    """
+    breaker = _breakers.get(name)
+    if breaker is not None:
+        return breaker
+
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            _breakers[name] = breaker
+    return breaker
+
+
+def _circuit_names(provider: str, model: str | None) -> list[str]:
+    return [provider, f"{provider}:{model}"] if model else [provider]
+
+
+def is_circuit_open(provider: str, model: str | None = None) -> bool:
+    """Check whether calls to a provider/model would currently be rejected.
+
+    Half-open circuits are reported as available so a probe can go through.
+
+    Args:
+        provider: Provider name (e.g., "openai", "openrouter")
+        model: Optional model ID
+
+    Returns:
+        True if the provider or model circuit is open
+    """
+    if not CQC_AI_CIRCUIT_BREAKER:
+        return False
+    return any(
+        name in _breakers and _breakers[name].state == OPEN
+        for name in _circuit_names(provider, model)
+    )
+
+
+@asynccontextmanager
+async def circuit_guard(provider: str, model: str | None = None) -> AsyncIterator[None]:
+    """Guard one API call with the provider and model circuit breakers.
+
+    Args:
+        provider: Provider name (e.g., "openai", "openrouter")
+        model: Optional model ID
+
+    Raises:
+        CircuitOpenError: If either circuit is open
+    """
+    if not CQC_AI_CIRCUIT_BREAKER:
+        yield
+        return
+
+    breakers = [get_circuit_breaker(name) for name in _circuit_names(provider, model)]
+    admitted: list[CircuitBreaker] = []
+    for breaker in breakers:
+        if not breaker.allow_request():
+            for claimed in admitted:
+                claimed.release_probe()
+            raise CircuitOpenError(breaker.name, retry_after=math.ceil(breaker.seconds_until_probe()) or None)
+        admitted.append(breaker)
+
+    try:
+        yield
+    except BaseException as e:
+        for breaker in breakers:
+            if is_breaker_failure(e):
+                breaker.record_failure()
+            elif isinstance(e, RateLimitError) or not isinstance(e, Exception):
+                breaker.release_probe()
+            else:
+                breaker.record_success()
+        raise
+    else:
+        for breaker in breakers:
+            breaker.record_success()
+
+
+def get_circuit_snapshot() -> dict[str, dict[str, Any]]:
+    """Return the state of every circuit breaker created so far.
+
+    Returns:
+        Dict mapping circuit name to its snapshot
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def reset_circuit_breakers() -> None:
+    """Drop all breakers (for tests)."""
+    with _breakers_lock:
+        _breakers.clear()
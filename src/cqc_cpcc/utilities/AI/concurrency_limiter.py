@@ -0,0 +1,381 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Adaptive AIMD concurrency limiter shared by all LLM calls.
+
+Grading a large ZIP fans out one coroutine per student with asyncio.gather.
+Without a limiter every request hits the provider at once, triggers 429s, and
+the retries pile up on top of the original burst. This module puts a
+process-wide, per-provider limiter in front of the OpenAI and OpenRouter
+clients.
+
+Algorithm (additive-increase / multiplicative-decrease):
+- Success within the latency target: window grows by ~1 per full window of
+  successful requests (increase_step / window per success)
+- Success slower than the latency target: window shrinks gently (x0.9)
+- 429 or 5xx/timeout: window is multiplied by decrease_factor (at most once
+  per cooldown so a burst of failures does not collapse it to the minimum)
+- Retry-After: new requests are held until the server-requested time passes
+
+The limiter works across event loops (Streamlit may run each batch in a fresh
+loop) because waiters are woken with loop.call_soon_threadsafe().
+
+Configuration (environment variables):
+- CQC_AI_CONCURRENCY_LIMITER: Enable the limiter (default: True)
+- CQC_AI_CONCURRENCY_INITIAL: Initial window (default: 8)
+- CQC_AI_CONCURRENCY_MIN: Minimum window (default: 1)
+- CQC_AI_CONCURRENCY_MAX: Maximum window (default: 32)
+- CQC_AI_LATENCY_TARGET_SECONDS: Latency above which the window shrinks (default: 90)
+
+Usage:
+    from cqc_cpcc.utilities.AI.concurrency_limiter import get_concurrency_limiter
+
+    limiter = get_concurrency_limiter("openai")
+    async with limiter.slot():
+        response = await client.chat.completions.create(**api_kwargs)
+
+    # UI
+    snapshot = get_limiter_snapshot()  # {"openai": {"window": 8, "in_flight": 3, ...}}
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from openai import APIConnectionError, APIError, APITimeoutError, RateLimitError
+
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_CONCURRENCY_INITIAL,
+    CQC_AI_CONCURRENCY_LIMITER,
+    CQC_AI_CONCURRENCY_MAX,
+    CQC_AI_CONCURRENCY_MIN,
+    CQC_AI_LATENCY_TARGET_SECONDS,
+)
+from cqc_cpcc.utilities.logger import logger
+
+# Longest Retry-After pause honored (protects against bogus headers)
+MAX_RETRY_AFTER_SECONDS = 120.0
+
+# Minimum time between two multiplicative decreases
+DECREASE_COOLDOWN_SECONDS = 1.0
+
+# How often queued waiters re-check for capacity (covers Retry-After expiry)
+WAITER_POLL_SECONDS = 0.25
+
+SLOW_RESPONSE_DECREASE_FACTOR = 0.9
+
+
+def retry_after_from_exception(error: BaseException) -> float | None:
+    """Extract a Retry-After delay (seconds) from an API exception.
+
+    Args:
+        error: Exception raised by the OpenAI SDK (or a wrapper)
+
+    Returns:
+        Delay in seconds, or None if the server did not provide one
+    """
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers is not None:
+            try:
+                retry_after = headers.get("retry-after")
+            except Exception:
+                retry_after = None
+
+    try:
+        return float(retry_after) if retry_after is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limiter with a FIFO wait queue.
+
+    Attributes:
+        name: Provider name (for logs and UI)
+        min_limit: Lower bound for the window
+        max_limit: Upper bound for the window
+        increase_step: Additive increase per full window of successes
+        decrease_factor: Multiplicative decrease on 429/5xx
+        latency_target: Latency in seconds above which the window shrinks
+    """
+
+    def __init__(
+            self,
+            name: str,
+            initial_limit: int = 8,
+            min_limit: int = 1,
+            max_limit: int = 32,
+            increase_step: float = 1.0,
+            decrease_factor: float = 0.5,
+            latency_target: float = 90.0,
+    ):
+        if min_limit < 1:
+            raise ValueError(f"min_limit must be at least 1, got {min_limit}")
+        if max_limit < min_limit:
+            raise ValueError(f"max_limit ({max_limit}) must be >= min_limit ({min_limit})")
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"decrease_factor must be between 0 and 1, got {decrease_factor}")
+
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+
+        self._window = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+        # Counters for the UI
+        self._successes = 0
+        self._rate_limited = 0
+        self._server_errors = 0
+
+    @property
+    def window(self) -> int:
+        """Current number of concurrent requests allowed."""
+        return int(self._window)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return current limiter state for display.
+
+        Returns:
+            Dict with window, in_flight, queue_depth, paused_seconds and counters
+        """
+        with self._lock:
+            return {
+                "window": self.window,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "paused_seconds": round(max(0.0, self._blocked_until - time.monotonic()), 1),
+                "successes": self._successes,
+                "rate_limited": self._rate_limited,
+                "server_errors": self._server_errors,
+            }
+
+    async def acquire(self, wait_for_pause: bool = True) -> None:
+        """Wait for a slot.
+
+        Args:
+            wait_for_pause: Honor an active Retry-After pause first. Retries
+                            that already backed off for Retry-After pass False.
+        """
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            pause = self._blocked_until - time.monotonic()
+        if wait_for_pause and pause > 0:
+            logger.debug(f"[{self.name}] Holding request {pause:.1f}s for Retry-After")
+            await asyncio.sleep(pause)
+
+        with self._lock:
+            if self._in_flight < self.window and not self._waiters:
+                self._in_flight += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=WAITER_POLL_SECONDS)
+                if done:
+                    return
+                with self._lock:
+                    self._dispatch_locked()
+        except asyncio.CancelledError:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+                    future.cancel()
+                elif future.done():
+                    # Slot was granted just before cancellation - give it back
+                    self._in_flight -= 1
+                    self._dispatch_locked()
+                else:
+                    # Grant is scheduled but not delivered - _grant() releases it
+                    future.cancel()
+            raise
+
+    def release(self) -> None:
+        """Release a slot and wake queued requests."""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._dispatch_locked()
+
+    def _dispatch_locked(self) -> None:
+        """Hand free slots to queued waiters (caller holds the lock)."""
+        if self._blocked_until > time.monotonic():
+            return
+        while self._waiters and self._in_flight < self.window:
+            loop, future = self._waiters.popleft()
+            self._in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._grant, future)
+            except RuntimeError:
+                # Waiter's loop is closed - slot was never used
+                self._in_flight -= 1
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.done():
+            # Waiter was cancelled after the slot was reserved
+            self.release()
+        else:
+            future.set_result(True)
+
+    def on_success(self, latency: float) -> None:
+        """Record a successful request.
+
+        Args:
+            latency: Request latency in seconds
+        """
+        with self._lock:
+            self._successes += 1
+            if latency > self.latency_target:
+                self._window = max(self.min_limit, self._window * SLOW_RESPONSE_DECREASE_FACTOR)
+            else:
+                self._window = min(self.max_limit, self._window + self.increase_step / self._window)
+            self._dispatch_locked()
+
+    def on_rate_limited(self, retry_after: float | None = None) -> None:
+        """Record a 429 response and honor Retry-After.
+
+        Args:
+            retry_after: Server-requested delay in seconds
+        """
+        with self._lock:
+            self._rate_limited += 1
+            self._decrease_locked()
+            if retry_after:
+                pause = min(float(retry_after), MAX_RETRY_AFTER_SECONDS)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        logger.info(f"[{self.name}] Rate limited: window={self.window}, retry_after={retry_after}")
+
+    def on_server_error(self) -> None:
+        """Record a 5xx response, timeout or connection failure."""
+        with self._lock:
+            self._server_errors += 1
+            self._decrease_locked()
+        logger.info(f"[{self.name}] Server error: window={self.window}")
+
+    def _decrease_locked(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN_SECONDS:
+            return
+        self._last_decrease = now
+        self._window = max(self.min_limit, self._window * self.decrease_factor)
+
+    @asynccontextmanager
+    async def slot(self, wait_for_pause: bool = True) -> AsyncIterator[None]:
+        """Hold a slot for one API call and feed the outcome back to AIMD.
+
+        Args:
+            wait_for_pause: Honor an active Retry-After pause before acquiring
+
+        Example:
+            async with limiter.slot():
+                response = await client.chat.completions.create(...)
+        """
+        await self.acquire(wait_for_pause=wait_for_pause)
+        start = time.monotonic()
+        try:
+            yield
+        except RateLimitError as e:
+            self.on_rate_limited(retry_after_from_exception(e))
+            raise
+        except (APITimeoutError, APIConnectionError):
+            self.on_server_error()
+            raise
+        except APIError as e:
+            status_code = getattr(e, "status_code", None)
+            if isinstance(status_code, int) and status_code == 429:
+                self.on_rate_limited(retry_after_from_exception(e))
+            elif isinstance(status_code, int) and status_code >= 500:
+                self.on_server_error()
+            raise
+        else:
+            self.on_success(time.monotonic() - start)
+        finally:
+            self.release()
+
+
+class _NoOpLimiter:
+    """Stand-in used when CQC_AI_CONCURRENCY_LIMITER is disabled."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"window": None, "in_flight": None, "queue_depth": 0, "paused_seconds": 0.0}
+
+    @asynccontextmanager
+    async def slot(self, wait_for_pause: bool = True) -> AsyncIterator[None]:
+        yield
+
+
+# Process-wide limiters keyed by provider
+_limiters: dict[str, AdaptiveConcurrencyLimiter | _NoOpLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(provider: str) -> AdaptiveConcurrencyLimiter | _NoOpLimiter:
+    """Get the process-wide limiter for a provider.
+
+    Args:
+        provider: Provider name (e.g., "openai", "openrouter")
+
+    Returns:
+        Shared limiter instance for the provider
+    """
+    limiter = _limiters.get(provider)
+    if limiter is not None:
+        return limiter
+
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            if CQC_AI_CONCURRENCY_LIMITER:
+                limiter = AdaptiveConcurrencyLimiter(
+                    name=provider,
+                    initial_limit=CQC_AI_CONCURRENCY_INITIAL,
+                    min_limit=CQC_AI_CONCURRENCY_MIN,
+                    max_limit=CQC_AI_CONCURRENCY_MAX,
+                    latency_target=CQC_AI_LATENCY_TARGET_SECONDS,
+                )
+            else:
+                limiter = _NoOpLimiter(provider)
+            _limiters[provider] = limiter
+    return limiter
+
+
+def get_limiter_snapshot() -> dict[str, dict[str, Any]]:
+    """Return the state of every limiter created so far.
+
+    Returns:
+        Dict keyed by provider name with window, in_flight and queue_depth
+    """
+    return {name: limiter.snapshot() for name, limiter in list(_limiters.items())}
+
+
+def reset_concurrency_limiters() -> None:
+    """Drop all limiters (mainly for tests)."""
+    with _limiters_lock:
+        _limiters.clear()
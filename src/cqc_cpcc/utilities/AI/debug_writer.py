@@ -0,0 +1,292 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Background writer for AI debug capture.
+
+With debug mode on, every request, response and note used to be written as a
+pretty-printed JSON file from the event loop thread that drives the grading
+calls. This module moves that work to a background thread:
+
+- Callers enqueue records (a non-blocking put; records are dropped and counted
+  if the queue is full, so debugging never stalls grading).
+- The writer thread drains the queue in batches, serializes each batch to
+  JSONL and appends it to the current segment as one gzip member.
+- Segments rotate once they reach CQC_AI_DEBUG_SEGMENT_MAX_MB.
+- Every record gets a line in index.jsonl with the segment, byte offset and
+  length of its gzip member, so a correlation ID is looked up by
+  decompressing only the members that contain it.
+
+Layout of the save directory:
+    index.jsonl
+    debug_20240101_120000_1234_0001.jsonl.gz
+    debug_20240101_121500_1234_0002.jsonl.gz
+
+Configuration (environment variables):
+- CQC_AI_DEBUG_SEGMENT_MAX_MB: Segment size that triggers rotation (default: 64)
+- CQC_AI_DEBUG_FLUSH_SECONDS: Maximum time a record waits before being written (default: 1)
+- CQC_AI_DEBUG_QUEUE_SIZE: Records buffered before new ones are dropped (default: 10000)
+
+Usage:
+    from cqc_cpcc.utilities.AI.debug_writer import get_debug_writer, read_debug_records
+
+    writer = get_debug_writer("/tmp/ai_debug")
+    writer.submit("a1b2c3d4", "request", {"model": "gpt-5-mini"})
+    writer.flush()
+    records = read_debug_records("/tmp/ai_debug", "a1b2c3d4")
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_DEBUG_FLUSH_SECONDS,
+    CQC_AI_DEBUG_QUEUE_SIZE,
+    CQC_AI_DEBUG_SEGMENT_MAX_MB,
+)
+
+debug_logger = logging.getLogger("openai.debug")
+
+INDEX_FILENAME = "index.jsonl"
+SEGMENT_GLOB = "debug_*.jsonl.gz"
+MAX_BATCH_RECORDS = 500
+
+_STOP = object()
+
+
+class DebugSegmentWriter:
+    """Batches debug records from a queue into rolling gzip JSONL segments."""
+
+    def __init__(
+            self,
+            save_dir: str | Path,
+            max_segment_bytes: int = int(CQC_AI_DEBUG_SEGMENT_MAX_MB * 1024 * 1024),
+            flush_interval: float = CQC_AI_DEBUG_FLUSH_SECONDS,
+            queue_size: int = CQC_AI_DEBUG_QUEUE_SIZE,
+    ):
+        self.save_dir = Path(save_dir)
+        self.save_dir.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max(1, max_segment_bytes)
+        self.flush_interval = max(0.01, flush_interval)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._segment_seq = 0
+        self._segment_path: Path | None = None
+        self._stats = {"written": 0, "dropped": 0, "batches": 0, "segments": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="ai-debug-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, correlation_id: str, data_type: str, data: dict) -> bool:
+        """Queue a record for writing without blocking.
+
+        Args:
+            correlation_id: Correlation ID for this request
+            data_type: Type of data ('request', 'response', 'notes', ...)
+            data: JSON-serializable data (non-serializable values are stringified)
+
+        Returns:
+            True if queued, False if the writer is closed or the queue is full
+        """
+        if self._closed:
+            return False
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "correlation_id": correlation_id,
+            "data_type": data_type,
+            "data": data,
+        }
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["dropped"] += 1
+            return False
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write pending records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Writer counters for monitoring."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["segment"] = self._segment_path.name if self._segment_path else None
+        return stats
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < MAX_BATCH_RECORDS:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(item is _STOP for item in batch)
+            records = [item for item in batch if item is not _STOP]
+            try:
+                if records:
+                    self._write_batch(records)
+            except Exception as e:
+                # Don't let file writing errors break the main flow
+                with self._stats_lock:
+                    self._stats["errors"] += 1
+                debug_logger.warning(f"Failed to write {len(records)} debug records: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _current_segment(self) -> Path:
+        if self._segment_path is None or (
+                self._segment_path.exists() and self._segment_path.stat().st_size >= self.max_segment_bytes):
+            self._segment_seq += 1
+            timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+            self._segment_path = self.save_dir / f"debug_{timestamp}_{os.getpid()}_{self._segment_seq:04d}.jsonl.gz"
+            with self._stats_lock:
+                self._stats["segments"] += 1
+        return self._segment_path
+
+    def _write_batch(self, records: list[dict]) -> None:
+        payload = "".join(json.dumps(record, default=str) + "\n" for record in records)
+        member = gzip.compress(payload.encode("utf-8"), compresslevel=5)
+
+        segment = self._current_segment()
+        with open(segment, "ab") as f:
+            offset = f.tell()
+            f.write(member)
+
+        index_lines = "".join(
+            json.dumps({
+                "correlation_id": record["correlation_id"],
+                "data_type": record["data_type"],
+                "timestamp": record["timestamp"],
+                "segment": segment.name,
+                "offset": offset,
+                "length": len(member),
+            }) + "\n"
+            for record in records
+        )
+        with open(self.save_dir / INDEX_FILENAME, "a", encoding="utf-8") as f:
+            f.write(index_lines)
+
+        with self._stats_lock:
+            self._stats["written"] += len(records)
+            self._stats["batches"] += 1
+
+
+def read_debug_records(save_dir: str | Path, correlation_id: str) -> list[dict]:
+    """Read all records for a correlation ID using the segment index.
+
+    Args:
+        save_dir: Debug save directory
+        correlation_id: Correlation ID to look up
+
+    Returns:
+        Records in write order, each with timestamp/correlation_id/data_type/data
+    """
+    save_dir = Path(save_dir)
+    index_path = save_dir / INDEX_FILENAME
+    if not index_path.exists():
+        return []
+
+    members: list[tuple[str, int, int]] = []
+    with open(index_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if correlation_id not in line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("correlation_id") != correlation_id:
+                continue
+            member = (entry["segment"], entry["offset"], entry["length"])
+            if member not in members:
+                members.append(member)
+
+    records: list[dict] = []
+    for segment, offset, length in members:
+        try:
+            with open(save_dir / segment, "rb") as f:
+                f.seek(offset)
+                payload = gzip.decompress(f.read(length)).decode("utf-8")
+        except (OSError, EOFError) as e:
+            debug_logger.warning(f"Could not read debug segment {segment}@{offset}: {e}")
+            continue
+        for line in payload.splitlines():
+            record = json.loads(line)
+            if record.get("correlation_id") == correlation_id:
+                records.append(record)
+    return records
+
+
+_writers: dict[Path, DebugSegmentWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_debug_writer(save_dir: str | Path) -> DebugSegmentWriter:
+    """Get or create the process-wide writer for a save directory.
+
+    Args:
+        save_dir: Debug save directory
+
+    Returns:
+        Shared DebugSegmentWriter instance
+    """
+    key = Path(save_dir).resolve()
+    writer = _writers.get(key)
+    if writer is not None:
+        return writer
+
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = DebugSegmentWriter(key)
+            _writers[key] = writer
+    return writer
+
+
+def flush_debug_writer(save_dir: str | Path) -> None:
+    """Flush the writer for a save directory, if one has been started."""
+    writer = _writers.get(Path(save_dir).resolve())
+    if writer is not None:
+        writer.flush()
+
+
+def close_debug_writers() -> None:
+    """Flush and stop all writers (called at exit; also used by tests)."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_debug_writers)
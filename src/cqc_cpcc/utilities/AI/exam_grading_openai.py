@@ -15,15 +15,19 @@ Key changes from LangChain version:
 - Better error handling with custom exceptions
 """
 
+from contextlib import nullcontext
 from typing import TYPE_CHECKING, TypeVar
 
 from cqc_cpcc.utilities.AI.exam_grading_prompts import build_exam_grading_prompt
+from cqc_cpcc.utilities.AI.model_router import RoutedCall, get_model_router
 from cqc_cpcc.utilities.AI.openai_client import get_structured_completion
 from cqc_cpcc.utilities.AI.openai_exceptions import (
     OpenAISchemaValidationError,
     OpenAITransportError,
 )
+from cqc_cpcc.utilities.env_constants import CQC_AI_MODEL_ROUTER
 from cqc_cpcc.utilities.logger import logger
+from cqc_cpcc.utilities.token_estimator import get_token_estimator
 from langchain_core.callbacks import BaseCallbackHandler
 from pydantic import BaseModel
 
@@ -51,6 +55,9 @@ async def grade_exam_submission(
         use_preprocessing: bool | None = None,
         use_openrouter: bool = False,
         openrouter_auto_route: bool = True,
+        route: bool | None = None,
+        course_id: str | None = None,
+        assignment_id: str | None = None,
 ) -> "ErrorDefinitions":
     """Grade an exam submission using OpenAI structured outputs or OpenRouter.
     
@@ -73,6 +80,12 @@ async def grade_exam_submission(
         use_preprocessing: Force preprocessing on/off. If None, auto-detect based on size.
         use_openrouter: If True, use OpenRouter instead of OpenAI
         openrouter_auto_route: If True and use_openrouter=True, use OpenRouter auto-routing
+        route: Let the model router (see model_router.py) pick the model from grading
+            history for this course, assignment and submission size; the chosen
+            model's ID decides between OpenAI and OpenRouter. None (default)
+            follows CQC_AI_MODEL_ROUTER.
+        course_id: Course identifier used to segment router history
+        assignment_id: Assignment identifier used to segment router history
         
     Returns:
         ErrorDefinitions object with validated major and minor errors
@@ -100,6 +113,20 @@ async def grade_exam_submission(
         generate_preprocessing_digest,
     )
 
+    route_decision = None
+    if route is None:
+        route = CQC_AI_MODEL_ROUTER
+    if route:
+        default_model = "openrouter/auto" if use_openrouter and openrouter_auto_route else model_name
+        route_decision = get_model_router().choose(
+            default_model, course_id, assignment_id, get_token_estimator().estimate(student_submission)
+        )
+        if route_decision.model != default_model:
+            # OpenRouter model IDs are "provider/model"
+            model_name = route_decision.model
+            use_openrouter = "/" in model_name
+            openrouter_auto_route = False
+
     # Auto-detect if preprocessing should be used (unless explicitly specified)
     if use_preprocessing is None:
         use_preprocessing = should_use_preprocessing(student_submission)
@@ -155,26 +182,30 @@ async def grade_exam_submission(
     )
 
     try:
-        # Call OpenRouter or OpenAI based on configuration
-        if use_openrouter:
-            from cqc_cpcc.utilities.AI.openrouter_client import get_openrouter_completion
+        tracker = get_model_router().track(route_decision, prompt) if route_decision else nullcontext(RoutedCall())
+        with tracker as routed_call:
+            # Call OpenRouter or OpenAI based on configuration
+            if use_openrouter:
+                from cqc_cpcc.utilities.AI.openrouter_client import get_openrouter_completion
 
-            result = await get_openrouter_completion(
-                prompt=prompt,
-                schema_model=ErrorDefinitions,
-                use_auto_route=openrouter_auto_route,
-                model_name=model_name if not openrouter_auto_route else None,
-                max_tokens=DEFAULT_MAX_TOKENS,
-            )
-        else:
-            # Call OpenAI with structured output validation (with own 2-attempt retry)
-            result = await get_structured_completion(
-                prompt=prompt,
-                model_name=model_name,
-                schema_model=ErrorDefinitions,
-                temperature=temperature,
-                max_tokens=DEFAULT_MAX_TOKENS,
-            )
+                result = await get_openrouter_completion(
+                    prompt=prompt,
+                    schema_model=ErrorDefinitions,
+                    use_auto_route=openrouter_auto_route,
+                    model_name=model_name if not openrouter_auto_route else None,
+                    max_tokens=DEFAULT_MAX_TOKENS,
+                )
+            else:
+                # Call OpenAI with structured output validation (with own 2-attempt retry)
+                result = await get_structured_completion(
+                    prompt=prompt,
+                    model_name=model_name,
+                    schema_model=ErrorDefinitions,
+                    temperature=temperature,
+                    max_tokens=DEFAULT_MAX_TOKENS,
+                )
+            if route_decision:
+                routed_call.completion = result.model_dump_json()
 
         logger.info(
             f"Grading complete: {len(result.all_major_errors or [])} major errors, "
@@ -0,0 +1,361 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Request hedging for tail-latency control on LLM calls.
+
+Most grading calls finish within a predictable time, but a few get stuck for
+minutes and hold up the whole batch. When a call has been running longer than
+the observed p95 latency for its model, the hedger sends a duplicate request
+(optionally to a fallback model). Whichever valid result arrives first wins and
+the other request is cancelled.
+
+How it works:
+- Clients wrap the actual API request in track_in_flight(). Only that
+  in-flight time counts: time spent waiting for a concurrency slot or rate
+  budget, and retry backoff, neither triggers a hedge nor is sampled, so a
+  class-wide fan-out that is merely queued does not inflate p95 or add hedges
+  to the same queue. Calls run with reports_in_flight=False are timed as a
+  whole.
+- Successful in-flight latencies are tracked per model in a rolling window.
+- Hedging only starts once a model has enough samples to estimate its p95.
+- The hedge delay is max(p95, CQC_AI_HEDGE_MIN_DELAY_SECONDS), measured from
+  the start of the current in-flight attempt.
+- A hedge is only sent while hedges stay under CQC_AI_HEDGE_MAX_RATE of all
+  requests and under CQC_AI_HEDGE_MAX_IN_FLIGHT concurrent hedges, so a slow
+  provider cannot double the load.
+- If one request fails, the other is awaited; the primary's error is raised
+  only when both fail.
+
+Configuration (environment variables):
+- CQC_AI_HEDGING: Enable hedging for structured completions (default: False)
+- CQC_AI_HEDGE_MAX_RATE: Max fraction of requests that may be hedged (default: 0.1)
+- CQC_AI_HEDGE_MAX_IN_FLIGHT: Max concurrent hedge requests (default: 4)
+- CQC_AI_HEDGE_MIN_DELAY_SECONDS: Never hedge earlier than this (default: 5)
+- CQC_AI_HEDGE_FALLBACK_MODELS: JSON mapping model ID to the model used for
+  its hedge, e.g. '{"gpt-5": "gpt-5-mini"}' (default: hedge with same model)
+
+Usage:
+    from cqc_cpcc.utilities.AI.hedging import get_request_hedger
+
+    result = await get_request_hedger().run(
+        "gpt-5-mini",
+        lambda model, is_hedge: call_llm(model),
+        reports_in_flight=True,
+    )
+
+    # Inside call_llm, after the concurrency slot and rate budget are acquired:
+    with track_in_flight():
+        response = await client.chat.completions.create(...)
+"""
+
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_HEDGE_FALLBACK_MODELS,
+    CQC_AI_HEDGE_MAX_IN_FLIGHT,
+    CQC_AI_HEDGE_MAX_RATE,
+    CQC_AI_HEDGE_MIN_DELAY_SECONDS,
+    CQC_AI_HEDGING,
+)
+from cqc_cpcc.utilities.logger import logger
+
+T = TypeVar('T')
+
+HEDGE_MIN_SAMPLES = 20  # Latency samples needed before a model's p95 is trusted
+LATENCY_WINDOW = 200  # Rolling window of latency samples per model
+
+
+def parse_hedge_fallback_models(raw: str | dict | None) -> dict[str, str]:
+    """Parse the CQC_AI_HEDGE_FALLBACK_MODELS setting.
+
+    Args:
+        raw: JSON string or already-parsed dict mapping model ID to fallback model ID
+
+    Returns:
+        Dict of model ID to fallback model ID (invalid entries are skipped)
+    """
+    if not raw:
+        return {}
+
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid CQC_AI_HEDGE_FALLBACK_MODELS JSON, ignoring: {e}")
+            return {}
+
+    if not isinstance(raw, dict):
+        logger.error("CQC_AI_HEDGE_FALLBACK_MODELS must be a JSON object, ignoring")
+        return {}
+
+    return {model: fallback for model, fallback in raw.items() if isinstance(fallback, str) and fallback}
+
+
+class LatencyTracker:
+    """Rolling per-model latency samples with percentile lookup."""
+
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, seconds: float) -> None:
+        """Record the latency of one successful call."""
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def sample_count(self, model: str) -> int:
+        """Number of samples currently held for a model."""
+        with self._lock:
+            return len(self._samples.get(model, ()))
+
+    def percentile(self, model: str, q: float = 0.95) -> float | None:
+        """Nearest-rank percentile of recent latencies.
+
+        Args:
+            model: Model ID
+            q: Percentile as a fraction (0.95 = p95)
+
+        Returns:
+            Latency in seconds, or None if fewer than min_samples are available
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        rank = max(1, math.ceil(q * len(samples)))
+        return samples[rank - 1]
+
+
+class InFlightCall:
+    """In-flight progress of one hedged call, reported through track_in_flight().
+
+    Attributes:
+        started_at: Start of the current API attempt (None while queued or backing off)
+        api_seconds: Duration of the last successful API attempt
+    """
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.api_seconds: Optional[float] = None
+        self.changed = asyncio.Event()
+
+
+_in_flight_call: ContextVar[Optional[InFlightCall]] = ContextVar("cqc_ai_in_flight_call", default=None)
+
+
+@contextmanager
+def track_in_flight() -> Iterator[None]:
+    """Mark the enclosed API request as in flight for the hedger (no-op outside a hedged call)."""
+    progress = _in_flight_call.get()
+    if progress is None:
+        yield
+        return
+
+    start = time.monotonic()
+    progress.started_at = start
+    progress.changed.set()
+    try:
+        yield
+        progress.api_seconds = time.monotonic() - start
+    finally:
+        progress.started_at = None
+        progress.changed.set()
+
+
+class RequestHedger:
+    """Runs calls with a latency-triggered duplicate request."""
+
+    def __init__(
+            self,
+            max_rate: float = CQC_AI_HEDGE_MAX_RATE,
+            max_in_flight: int = CQC_AI_HEDGE_MAX_IN_FLIGHT,
+            min_delay: float = CQC_AI_HEDGE_MIN_DELAY_SECONDS,
+            fallback_models: dict[str, str] | None = None,
+            latency_tracker: LatencyTracker | None = None,
+    ):
+        self.max_rate = max_rate
+        self.max_in_flight = max_in_flight
+        self.min_delay = min_delay
+        self.fallback_models = fallback_models or {}
+        self.latency = latency_tracker or LatencyTracker()
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hedges_started = 0
+        self._hedges_in_flight = 0
+        self._hedge_wins = 0
+
+    def hedge_delay(self, model: str) -> float | None:
+        """Seconds to wait before hedging a call to `model` (None = do not hedge)."""
+        p95 = self.latency.percentile(model, 0.95)
+        if p95 is None:
+            return None
+        return max(p95, self.min_delay)
+
+    def _try_start_hedge(self) -> bool:
+        with self._lock:
+            if self._hedges_in_flight >= self.max_in_flight:
+                return False
+            if self._hedges_started + 1 > self.max_rate * self._requests:
+                return False
+            self._hedges_started += 1
+            self._hedges_in_flight += 1
+            return True
+
+    def _finish_hedge(self, won: bool) -> None:
+        with self._lock:
+            self._hedges_in_flight -= 1
+            if won:
+                self._hedge_wins += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Hedging counters for monitoring."""
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "hedges_started": self._hedges_started,
+                "hedges_in_flight": self._hedges_in_flight,
+                "hedge_wins": self._hedge_wins,
+            }
+
+    @staticmethod
+    def _start(call: Callable[[str, bool], Awaitable[T]], model: str, is_hedge: bool,
+               progress: Optional[InFlightCall]) -> "asyncio.Future[T]":
+        # The task copies the context, so track_in_flight() inside it reports to progress
+        token = _in_flight_call.set(progress)
+        try:
+            return asyncio.ensure_future(call(model, is_hedge))
+        finally:
+            _in_flight_call.reset(token)
+
+    def _observe(self, model: str, progress: Optional[InFlightCall], start: float) -> None:
+        seconds = time.monotonic() - start if progress is None else progress.api_seconds
+        if seconds is not None:
+            self.latency.observe(model, seconds)
+
+    @staticmethod
+    async def _wait_for_hedge_point(task: asyncio.Future, progress: Optional[InFlightCall], delay: float,
+                                    start: float) -> None:
+        """Return once task is done or its current in-flight attempt has run for delay seconds."""
+        while not task.done():
+            began = start if progress is None else progress.started_at
+            if began is None:
+                # Queued or backing off: wait for the next attempt to start
+                progress.changed.clear()
+                waiter = asyncio.ensure_future(progress.changed.wait())
+                try:
+                    await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    waiter.cancel()
+                continue
+            remaining = began + delay - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.wait({task}, timeout=remaining)
+
+    async def run(self, model: str, call: Callable[[str, bool], Awaitable[T]], reports_in_flight: bool = False) -> T:
+        """Run a call, hedging it if it outlives the model's p95 latency.
+
+        Args:
+            model: Model ID of the primary request
+            call: Factory taking (model, is_hedge) and returning the awaitable call
+            reports_in_flight: The call wraps its API request in track_in_flight(),
+                so only in-flight time is measured (otherwise the whole call is)
+
+        Returns:
+            The first successful result
+
+        Raises:
+            Exception: The primary request's error if every request failed
+        """
+        with self._lock:
+            self._requests += 1
+
+        start = time.monotonic()
+        primary_progress = InFlightCall() if reports_in_flight else None
+        primary = self._start(call, model, False, primary_progress)
+        delay = self.hedge_delay(model)
+
+        try:
+            if delay is not None:
+                await self._wait_for_hedge_point(primary, primary_progress, delay, start)
+            if delay is None or primary.done() or not self._try_start_hedge():
+                result = await primary
+                self._observe(model, primary_progress, start)
+                return result
+        except BaseException:
+            if not primary.done():
+                primary.cancel()
+            raise
+
+        hedge_model = self.fallback_models.get(model, model)
+        logger.info(f"Hedging {model} request after {delay:.1f}s in flight (hedge model={hedge_model})")
+        hedge_start = time.monotonic()
+        hedge_progress = InFlightCall() if reports_in_flight else None
+        hedge = self._start(call, hedge_model, True, hedge_progress)
+        pending = {primary, hedge}
+        hedge_won = False
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (primary, hedge):
+                    if task in done and not task.cancelled() and task.exception() is None:
+                        hedge_won = task is hedge
+                        if hedge_won:
+                            self._observe(hedge_model, hedge_progress, hedge_start)
+                        else:
+                            self._observe(model, primary_progress, start)
+                        return task.result()
+            # Prefer the primary's error; a cancelled task has no exception to report
+            errors = [task.exception() for task in (primary, hedge) if not task.cancelled()]
+            if errors:
+                raise errors[0]
+            raise asyncio.CancelledError()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            self._finish_hedge(hedge_won)
+
+
+def is_hedging_enabled() -> bool:
+    """Check whether request hedging is enabled via CQC_AI_HEDGING."""
+    return CQC_AI_HEDGING
+
+
+_request_hedger: RequestHedger | None = None
+_request_hedger_lock = threading.Lock()
+
+
+def get_request_hedger() -> RequestHedger:
+    """Get or create the process-wide RequestHedger configured from env.
+
+    Returns:
+        Shared RequestHedger instance
+    """
+    global _request_hedger
+    if _request_hedger is None:
+        with _request_hedger_lock:
+            if _request_hedger is None:
+                _request_hedger = RequestHedger(
+                    fallback_models=parse_hedge_fallback_models(CQC_AI_HEDGE_FALLBACK_MODELS)
+                )
+    return _request_hedger
+
+
+def reset_request_hedger() -> None:
+    """Drop the shared hedger so the next call rebuilds it (for tests)."""
+    global _request_hedger
+    with _request_hedger_lock:
+        _request_hedger = None
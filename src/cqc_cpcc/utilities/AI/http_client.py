@@ -0,0 +1,127 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Shared HTTP transport configuration for the AI clients.
+
+AsyncOpenAI builds its own httpx client with default settings: keep-alive
+connections expire after 5 seconds and HTTP/1.1 needs one connection per
+in-flight request. Under a 150-way grading fan-out, the gaps between waves
+are long enough for idle connections to expire, so each wave pays for new TCP
+and TLS handshakes. The OpenRouter client was worse: it built a new client
+(and a new connection pool) for every call.
+
+Both clients now get their httpx.AsyncClient from create_async_http_client(),
+which applies one tunable configuration:
+- Pool limits (max connections, max idle keep-alive connections)
+- Keep-alive expiry for idle connections
+- Optional HTTP/2 (multiplexes requests over few connections; needs the "h2"
+  package, falls back to HTTP/1.1 with a warning when it is missing)
+- Per-phase timeouts (connect, read, write, pool acquisition)
+
+Configuration (environment variables):
+- CQC_AI_HTTP_MAX_CONNECTIONS: Maximum open connections per client (default: 1000)
+- CQC_AI_HTTP_MAX_KEEPALIVE_CONNECTIONS: Idle connections kept open (default: 200)
+- CQC_AI_HTTP_KEEPALIVE_EXPIRY_SECONDS: Seconds an idle connection is kept (default: 60)
+- CQC_AI_HTTP2: Use HTTP/2 when available (default: False)
+- CQC_AI_HTTP_CONNECT_TIMEOUT_SECONDS: TCP/TLS connect timeout (default: 10)
+- CQC_AI_HTTP_READ_TIMEOUT_SECONDS: Time to wait for response data (default: 600)
+- CQC_AI_HTTP_WRITE_TIMEOUT_SECONDS: Time to send the request body (default: 60)
+- CQC_AI_HTTP_POOL_TIMEOUT_SECONDS: Time to wait for a free connection (default: 60)
+
+Usage:
+    from cqc_cpcc.utilities.AI.http_client import create_async_http_client, get_http_timeout
+
+    client = AsyncOpenAI(api_key=key, http_client=create_async_http_client(), timeout=get_http_timeout())
+"""
+
+import importlib.util
+from typing import Any
+
+import httpx
+
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_HTTP2,
+    CQC_AI_HTTP_CONNECT_TIMEOUT_SECONDS,
+    CQC_AI_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    CQC_AI_HTTP_MAX_CONNECTIONS,
+    CQC_AI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    CQC_AI_HTTP_POOL_TIMEOUT_SECONDS,
+    CQC_AI_HTTP_READ_TIMEOUT_SECONDS,
+    CQC_AI_HTTP_WRITE_TIMEOUT_SECONDS,
+)
+from cqc_cpcc.utilities.logger import logger
+from openai import DEFAULT_CONNECTION_LIMITS, DEFAULT_TIMEOUT, DefaultAsyncHttpxClient
+
+# Limits/Timeout classes of the httpx package the installed openai SDK is built on
+_Limits = type(DEFAULT_CONNECTION_LIMITS)
+_Timeout = type(DEFAULT_TIMEOUT)
+
+_http2_warning_logged = False
+
+
+def get_http_limits() -> httpx.Limits:
+    """Connection pool limits from env configuration."""
+    return _Limits(
+        max_connections=CQC_AI_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=CQC_AI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=CQC_AI_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def get_http_timeout() -> httpx.Timeout:
+    """Per-phase timeouts from env configuration."""
+    return _Timeout(
+        connect=CQC_AI_HTTP_CONNECT_TIMEOUT_SECONDS,
+        read=CQC_AI_HTTP_READ_TIMEOUT_SECONDS,
+        write=CQC_AI_HTTP_WRITE_TIMEOUT_SECONDS,
+        pool=CQC_AI_HTTP_POOL_TIMEOUT_SECONDS,
+    )
+
+
+def is_http2_available() -> bool:
+    """Check whether the optional "h2" package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _use_http2(requested: bool) -> bool:
+    global _http2_warning_logged
+    if not requested:
+        return False
+    if is_http2_available():
+        return True
+    if not _http2_warning_logged:
+        logger.warning("CQC_AI_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+        _http2_warning_logged = True
+    return False
+
+
+def create_async_http_client(**overrides: Any) -> httpx.AsyncClient:
+    """Create an httpx.AsyncClient with the shared pool/keep-alive/timeout settings.
+
+    Args:
+        **overrides: httpx.AsyncClient keyword arguments that replace the
+                     configured values (e.g. limits=..., http2=..., transport=...)
+
+    Returns:
+        Configured client (SDK defaults such as follow_redirects are kept)
+    """
+    kwargs: dict[str, Any] = {
+        "limits": get_http_limits(),
+        "timeout": get_http_timeout(),
+        "http2": CQC_AI_HTTP2,
+    }
+    kwargs.update(overrides)
+    kwargs["http2"] = _use_http2(bool(kwargs["http2"]))
+    return DefaultAsyncHttpxClient(**kwargs)
+
+
+def describe_http_config() -> dict[str, Any]:
+    """Effective HTTP configuration (for logs and the settings page)."""
+    limits = get_http_limits()
+    timeout = get_http_timeout()
+    return {
+        "max_connections": limits.max_connections,
+        "max_keepalive_connections": limits.max_keepalive_connections,
+        "keepalive_expiry": limits.keepalive_expiry,
+        "http2": CQC_AI_HTTP2 and is_http2_available(),
+        "timeouts": {"connect": timeout.connect, "read": timeout.read, "write": timeout.write, "pool": timeout.pool},
+    }
@@ -0,0 +1,159 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Tolerant JSON repair for salvaging malformed LLM output.
+
+A structured completion that is cut off by the token limit, or that contains a
+small syntax defect, used to be thrown away and re-requested with a full
+fallback round trip. Most of these outputs are one closing bracket or one
+stray comma away from valid JSON. This module repairs them:
+
+- Markdown code fences and prose around the JSON value are removed.
+- Trailing commas before } or ] are dropped.
+- Truncated output is completed: an open string is closed, a trailing comma
+  is dropped and the open arrays/objects are closed in order. If that still
+  does not parse (dangling key, partial number or literal), the last
+  incomplete element is removed and the closure is tried again.
+
+The repaired value is not trusted on its own: callers pass it through
+_normalize_fallback_json and Pydantic validation before using it. Completing
+truncated output invents the end of the value (a half-written array element
+can become a valid but wrong item), so structured completions call
+repair_json(..., complete_truncated=False) and retry truncated output instead.
+
+Usage:
+    from cqc_cpcc.utilities.AI.json_repair import repair_json
+
+    data = repair_json('{"criteria_results": [{"criterion_id": "a"}, {"crit')
+    # {"criteria_results": [{"criterion_id": "a"}]}
+"""
+
+import json
+import re
+from typing import Any, Optional
+
+MAX_BACKTRACK_STEPS = 50
+
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*\n?(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _extract_json_text(text: str) -> str:
+    """Strip code fences and leading prose before the first { or [."""
+    fenced = _FENCE_PATTERN.search(text)
+    if fenced and fenced.group(1).strip():
+        text = fenced.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return text[min(starts):].strip() if starts else text.strip()
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Remove commas that directly precede a closing bracket (outside strings)."""
+    out: list[str] = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char in "}]":
+            # Drop whitespace and a comma emitted just before this closer
+            position = len(out)
+            while position and out[position - 1].isspace():
+                position -= 1
+            if position and out[position - 1] == ",":
+                del out[position - 1]
+        elif char == '"':
+            in_string = True
+        out.append(char)
+    return "".join(out)
+
+
+def _scan(text: str) -> tuple[list[str], bool, bool, list[int]]:
+    """Scan text and report open containers, string state and cut points.
+
+    Returns:
+        (open bracket stack, inside a string, dangling escape,
+        positions of structural commas and opening brackets)
+    """
+    stack: list[str] = []
+    cut_points: list[int] = []
+    in_string = escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            cut_points.append(index)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+        elif char == ",":
+            cut_points.append(index)
+    return stack, in_string, escaped, cut_points
+
+
+def _close(text: str) -> str:
+    """Close an open string and all open containers of a truncated JSON prefix."""
+    stack, in_string, escaped, _ = _scan(text)
+    if in_string:
+        text = (text[:-1] if escaped else text) + '"'
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    return text + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def repair_json(text: Optional[str], complete_truncated: bool = True) -> Optional[Any]:
+    """Parse JSON, repairing truncation and common syntax defects.
+
+    Args:
+        text: Raw model output
+        complete_truncated: Close open strings/containers and drop incomplete
+            elements; when False only fences, surrounding prose and trailing
+            commas are repaired
+
+    Returns:
+        Parsed JSON value, or None if nothing usable could be recovered
+    """
+    if not text or not text.strip():
+        return None
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    candidate = _strip_trailing_commas(_extract_json_text(text))
+    if not candidate or candidate[0] not in "{[":
+        return None
+
+    if not complete_truncated:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            return None
+
+    for _ in range(MAX_BACKTRACK_STEPS):
+        try:
+            return json.loads(_strip_trailing_commas(_close(candidate)))
+        except json.JSONDecodeError:
+            pass
+
+        # Drop the last incomplete element (including a container it opened) and try again
+        _, _, _, cut_points = _scan(candidate)
+        if not cut_points or not candidate[:cut_points[-1]].strip():
+            return None
+        candidate = candidate[:cut_points[-1]]
+    return None
@@ -0,0 +1,398 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Always-on, in-process metrics for LLM calls.
+
+openai_debug only captures individual requests and only when debug mode is
+on. This registry keeps cheap aggregate counters for every call so we can see
+how long grading calls take, how many tokens they use, how often the retry and
+fallback paths fire, and roughly what a batch costs.
+
+Recorded per (operation, model):
+- Latency histogram of API requests (seconds), split by outcome
+- Prompt, completion and cached prompt token counters
+- Retry, fallback (plain-JSON smart retry) and cache hit counters
+- JSON repair attempts and salvages (malformed output recovered without a retry)
+- Estimated cost in USD from a per-model price table (or the provider-reported
+  cost when OpenRouter includes one in usage)
+
+Operations: "structured_completion", "openrouter_completion",
+"preprocessing_digest" (end-to-end digest generation) and "transcription".
+
+Export:
+- snapshot(): JSON-serializable dict
+- to_prometheus(): Prometheus text exposition format
+- CQC_AI_METRICS_EXPORT_PATH: when set, the Prometheus text is written to this
+  file (at most every CQC_AI_METRICS_EXPORT_INTERVAL_SECONDS) for node
+  exporter textfile collection
+
+Configuration (environment variables):
+- CQC_AI_METRICS_EXPORT_PATH: Prometheus textfile path (default: unset)
+- CQC_AI_METRICS_EXPORT_INTERVAL_SECONDS: Minimum seconds between writes (default: 15)
+- CQC_AI_MODEL_PRICING: JSON overrides of USD prices per 1M tokens, e.g.
+  '{"gpt-5-mini": {"input": 0.25, "cached_input": 0.025, "output": 2.0}}'
+
+Usage:
+    from cqc_cpcc.utilities.AI.llm_metrics import get_metrics_registry
+
+    metrics = get_metrics_registry()
+    with metrics.track_request("structured_completion", "gpt-5-mini"):
+        response = await client.chat.completions.create(...)
+    metrics.record_usage("structured_completion", "gpt-5-mini", response.usage)
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_METRICS_EXPORT_INTERVAL_SECONDS,
+    CQC_AI_METRICS_EXPORT_PATH,
+    CQC_AI_MODEL_PRICING,
+)
+from cqc_cpcc.utilities.logger import logger
+
+# Latency histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 90.0, 120.0, 180.0, 300.0)
+
+COUNTER_NAMES = (
+    "requests",
+    "errors",
+    "retries",
+    "fallbacks",
+    "cache_hits",
+    "repair_attempts",
+    "repair_salvaged",
+    "prompt_tokens",
+    "completion_tokens",
+    "cached_tokens",
+    "audio_seconds",
+)
+
+# USD per 1M tokens; transcription models are priced per audio minute
+DEFAULT_MODEL_PRICING: dict[str, dict[str, float]] = {
+    "gpt-5-nano": {"input": 0.05, "cached_input": 0.005, "output": 0.40},
+    "gpt-5-mini": {"input": 0.25, "cached_input": 0.025, "output": 2.00},
+    "gpt-5": {"input": 1.25, "cached_input": 0.125, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "whisper-1": {"per_minute": 0.006},
+}
+
+
+def parse_model_pricing(raw: str | dict | None) -> dict[str, dict[str, float]]:
+    """Merge CQC_AI_MODEL_PRICING overrides into the default price table.
+
+    Args:
+        raw: JSON string or dict mapping model ID (or prefix) to price fields
+
+    Returns:
+        Price table with overrides applied (invalid entries are skipped)
+    """
+    pricing = {model: dict(prices) for model, prices in DEFAULT_MODEL_PRICING.items()}
+    if not raw:
+        return pricing
+
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid CQC_AI_MODEL_PRICING JSON, ignoring: {e}")
+            return pricing
+
+    if not isinstance(raw, dict):
+        logger.error("CQC_AI_MODEL_PRICING must be a JSON object, ignoring")
+        return pricing
+
+    for model, prices in raw.items():
+        if isinstance(prices, dict):
+            pricing[model] = {k: float(v) for k, v in prices.items() if isinstance(v, (int, float))}
+    return pricing
+
+
+def _as_int(value: Any) -> int:
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+def _as_float(value: Any) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+@dataclass
+class LatencyHistogram:
+    """Cumulative-bucket latency histogram."""
+    bucket_counts: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Bucket upper bound containing the q-quantile (None when empty)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS + (float("inf"),), self.bucket_counts):
+            running += bucket_count
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Thread-safe registry of LLM call metrics."""
+
+    def __init__(
+            self,
+            pricing: Optional[dict[str, dict[str, float]]] = None,
+            export_path: Optional[str] = None,
+            export_interval: float = 15.0,
+    ):
+        self.pricing = pricing if pricing is not None else dict(DEFAULT_MODEL_PRICING)
+        self.export_path = Path(export_path) if export_path else None
+        self.export_interval = export_interval
+        self._lock = threading.Lock()
+        self._latency: dict[tuple[str, str, str], LatencyHistogram] = {}
+        self._counters: dict[tuple[str, str], dict[str, float]] = {}
+        self._cost: dict[tuple[str, str], float] = {}
+        self._last_export = 0.0
+
+    def _counter_row(self, operation: str, model: str) -> dict[str, float]:
+        return self._counters.setdefault((operation, model), {name: 0 for name in COUNTER_NAMES})
+
+    def increment(self, name: str, operation: str, model: str, amount: float = 1) -> None:
+        """Increment a named counter (see COUNTER_NAMES)."""
+        with self._lock:
+            self._counter_row(operation, model)[name] += amount
+        self._maybe_export()
+
+    def observe_latency(self, operation: str, model: str, seconds: float, outcome: str = "success") -> None:
+        """Record one request latency and count it as a request (and error, if failed)."""
+        with self._lock:
+            self._latency.setdefault((operation, model, outcome), LatencyHistogram()).observe(seconds)
+            row = self._counter_row(operation, model)
+            row["requests"] += 1
+            if outcome != "success":
+                row["errors"] += 1
+        self._maybe_export()
+
+    @contextmanager
+    def track_request(self, operation: str, model: str) -> Iterator[None]:
+        """Time the wrapped request and record it with its outcome."""
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self.observe_latency(operation, model, time.monotonic() - start, outcome="error")
+            raise
+        self.observe_latency(operation, model, time.monotonic() - start)
+
+    def _price_for(self, model: str) -> Optional[dict[str, float]]:
+        if model in self.pricing:
+            return self.pricing[model]
+        # Longest matching prefix, so dated snapshots use their family's price
+        matches = [key for key in self.pricing if model.startswith(key)]
+        return self.pricing[max(matches, key=len)] if matches else None
+
+    def has_price(self, model: str) -> bool:
+        """Whether the price table covers a model."""
+        return self._price_for(model) is not None
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int) -> float:
+        """Estimated USD cost of one request from the price table (0 if unpriced)."""
+        prices = self._price_for(model)
+        if not prices:
+            return 0.0
+        uncached = max(0, prompt_tokens - cached_tokens)
+        cached_price = prices.get("cached_input", prices.get("input", 0.0))
+        return (
+                uncached * prices.get("input", 0.0)
+                + cached_tokens * cached_price
+                + completion_tokens * prices.get("output", 0.0)
+        ) / 1_000_000
+
+    def record_usage(self, operation: str, model: str, usage: Any) -> None:
+        """Add token counters and estimated cost from a chat completion usage object.
+
+        Args:
+            operation: Operation label
+            model: Model ID the request was sent to
+            usage: response.usage (None/mocks are tolerated)
+        """
+        if usage is None:
+            return
+        prompt_tokens = _as_int(getattr(usage, "prompt_tokens", None))
+        completion_tokens = _as_int(getattr(usage, "completion_tokens", None))
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+        cached_tokens = _as_int(cached)
+
+        # OpenRouter reports the actual charge when usage accounting is on
+        reported_cost = _as_float(getattr(usage, "cost", None))
+        cost = reported_cost if reported_cost is not None else self.estimate_cost(
+            model, prompt_tokens, completion_tokens, cached_tokens
+        )
+
+        with self._lock:
+            row = self._counter_row(operation, model)
+            row["prompt_tokens"] += prompt_tokens
+            row["completion_tokens"] += completion_tokens
+            row["cached_tokens"] += cached_tokens
+            self._cost[(operation, model)] = self._cost.get((operation, model), 0.0) + cost
+        self._maybe_export()
+
+    def record_audio(self, operation: str, model: str, duration_seconds: Any) -> None:
+        """Add transcribed audio duration and its estimated cost."""
+        seconds = _as_float(duration_seconds)
+        if seconds is None:
+            return
+        prices = self._price_for(model) or {}
+        cost = seconds / 60 * prices.get("per_minute", 0.0)
+        with self._lock:
+            self._counter_row(operation, model)["audio_seconds"] += seconds
+            self._cost[(operation, model)] = self._cost.get((operation, model), 0.0) + cost
+        self._maybe_export()
+
+    def snapshot(self) -> dict[str, Any]:
+        """JSON-serializable view of all metrics.
+
+        Returns:
+            {"models": [{"operation", "model", counters..., "cost_usd",
+            "latency": {outcome: {"count", "sum", "p50", "p95", "buckets"}}}],
+            "totals": {...}}
+        """
+        with self._lock:
+            rows = []
+            for (operation, model), counters in sorted(self._counters.items()):
+                latency = {}
+                for (op, mdl, outcome), histogram in self._latency.items():
+                    if op == operation and mdl == model:
+                        latency[outcome] = {
+                            "count": histogram.count,
+                            "sum": round(histogram.total, 3),
+                            "p50": histogram.quantile(0.5),
+                            "p95": histogram.quantile(0.95),
+                            "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"],
+                                                histogram.bucket_counts)),
+                        }
+                rows.append({
+                    "operation": operation,
+                    "model": model,
+                    **counters,
+                    "cost_usd": round(self._cost.get((operation, model), 0.0), 6),
+                    "latency": latency,
+                })
+
+        totals = {name: sum(row[name] for row in rows) for name in COUNTER_NAMES}
+        totals["cost_usd"] = round(sum(row["cost_usd"] for row in rows), 6)
+        totals["repair_salvage_rate"] = (
+            round(totals["repair_salvaged"] / totals["repair_attempts"], 4) if totals["repair_attempts"] else None
+        )
+        return {"models": rows, "totals": totals}
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            latency = sorted(self._latency.items())
+            cost = dict(self._cost)
+
+        def labels(operation: str, model: str, **extra: str) -> str:
+            pairs = {"operation": operation, "model": model, **extra}
+            return ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs.items())
+
+        for name in COUNTER_NAMES:
+            metric = f"cqc_llm_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (operation, model), row in counters:
+                lines.append(f"{metric}{{{labels(operation, model)}}} {row[name]:g}")
+
+        lines.append("# TYPE cqc_llm_cost_usd_total counter")
+        for (operation, model), _ in counters:
+            lines.append(f"cqc_llm_cost_usd_total{{{labels(operation, model)}}} {cost.get((operation, model), 0.0):.6f}")
+
+        lines.append("# TYPE cqc_llm_request_duration_seconds histogram")
+        for (operation, model, outcome), histogram in latency:
+            running = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + (float("inf"),), histogram.bucket_counts):
+                running += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(
+                    f"cqc_llm_request_duration_seconds_bucket{{{labels(operation, model, outcome=outcome, le=le)}}} "
+                    f"{running}"
+                )
+            base = labels(operation, model, outcome=outcome)
+            lines.append(f"cqc_llm_request_duration_seconds_sum{{{base}}} {histogram.total:.3f}")
+            lines.append(f"cqc_llm_request_duration_seconds_count{{{base}}} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str | Path, fmt: str = "prometheus") -> None:
+        """Write metrics to a file atomically.
+
+        Args:
+            path: Destination file
+            fmt: "prometheus" (text exposition) or "json"
+        """
+        path = Path(path)
+        content = self.to_prometheus() if fmt == "prometheus" else json.dumps(self.snapshot(), indent=2)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _maybe_export(self) -> None:
+        if self.export_path is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_export < self.export_interval:
+                return
+            self._last_export = now
+        try:
+            self.export(self.export_path)
+        except OSError as e:
+            logger.warning(f"Could not export LLM metrics to {self.export_path}: {e}")
+
+    def reset(self) -> None:
+        """Clear all metrics."""
+        with self._lock:
+            self._latency.clear()
+            self._counters.clear()
+            self._cost.clear()
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_metrics_registry: MetricsRegistry | None = None
+_metrics_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get or create the process-wide MetricsRegistry configured from env.
+
+    Returns:
+        Shared MetricsRegistry instance
+    """
+    global _metrics_registry
+    if _metrics_registry is None:
+        with _metrics_registry_lock:
+            if _metrics_registry is None:
+                _metrics_registry = MetricsRegistry(
+                    pricing=parse_model_pricing(CQC_AI_MODEL_PRICING),
+                    export_path=CQC_AI_METRICS_EXPORT_PATH,
+                    export_interval=CQC_AI_METRICS_EXPORT_INTERVAL_SECONDS,
+                )
+    return _metrics_registry
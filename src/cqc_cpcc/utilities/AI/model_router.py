@@ -0,0 +1,496 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Telemetry-driven model router for grading calls.
+
+define_openrouter_model used to offer two choices: "openrouter/auto" (opaque)
+or one fixed model for the whole batch. The router picks the model for each
+submission from our own grading history instead:
+
+- History: every routed call stores its latency, estimated cost and whether
+  the output failed schema validation. Instructor scores recorded for routed
+  results store how closely the model agreed with the instructor
+  (1 - |AI score - instructor score| / points possible). Rows are segmented by
+  course, assignment and submission size bucket and kept in a SQLite database
+  next to the response cache.
+- Statistics: for each candidate the most specific segment with enough
+  samples is used (course + assignment + size, then course + size, then
+  size, then everything), so a new assignment borrows its course's history.
+- Objective:
+  - "cheapest": lowest mean cost among models whose agreement with
+    instructor scores meets CQC_AI_ROUTER_MIN_AGREEMENT
+  - "fastest": lowest p95 latency among models whose mean cost is within
+    CQC_AI_ROUTER_BUDGET_USD (and whose known agreement meets the bound)
+  Both exclude models above CQC_AI_ROUTER_MAX_SCHEMA_FAILURE_RATE. The
+  model selected in the UI (the default model) is always eligible and is used
+  when no candidate qualifies.
+- Provider: only candidates in the selected model's namespace are considered
+  ("openai/..." candidates for an "openai/..." OpenRouter model, bare IDs for
+  a direct OpenAI model), so routing never switches the provider.
+- Exploration: opt-in. With probability CQC_AI_ROUTER_EXPLORE_RATE a candidate
+  without enough samples for the segment is tried, so new models collect
+  history. Explored calls grade real students without an agreement bound.
+
+Configuration (environment variables):
+- CQC_AI_MODEL_ROUTER: Route grading calls by default (default: False)
+- CQC_AI_ROUTER_CANDIDATES: Comma-separated candidate model IDs
+  (default: openai/gpt-5-nano,openai/gpt-5-mini,openai/gpt-5)
+- CQC_AI_ROUTER_OBJECTIVE: "cheapest" or "fastest" (default: cheapest)
+- CQC_AI_ROUTER_MIN_AGREEMENT: Accuracy bound on instructor agreement (default: 0.9)
+- CQC_AI_ROUTER_MAX_SCHEMA_FAILURE_RATE: Maximum schema failure rate (default: 0.1)
+- CQC_AI_ROUTER_BUDGET_USD: Mean cost budget per call for "fastest" (default: 0.02)
+- CQC_AI_ROUTER_MIN_SAMPLES: Calls needed before a segment's statistics are used (default: 5)
+- CQC_AI_ROUTER_EXPLORE_RATE: Share of calls that explore under-sampled models (default: 0, off)
+- CQC_AI_ROUTER_WINDOW_DAYS: Only history this recent is used (default: 90)
+
+Usage:
+    >>> from cqc_cpcc.utilities.AI.model_router import get_model_router
+    >>> router = get_model_router()
+    >>> decision = router.choose("openai/gpt-5", course_id="CSC151", assignment_id="Exam1",
+    ...                          submission_tokens=2400)
+    >>> with router.track(decision, prompt) as call:
+    ...     result = await get_openrouter_completion(prompt, schema, model_name=decision.model)
+    ...     call.completion = result.model_dump_json()
+    >>> router.record_instructor_score(decision, ai_score=85, instructor_score=88, points_possible=100)
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+from pydantic import ValidationError
+
+from cqc_cpcc.utilities.AI.llm_metrics import get_metrics_registry
+from cqc_cpcc.utilities.AI.openai_exceptions import OpenAISchemaValidationError
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_RESPONSE_CACHE_DIR,
+    CQC_AI_ROUTER_BUDGET_USD,
+    CQC_AI_ROUTER_CANDIDATES,
+    CQC_AI_ROUTER_EXPLORE_RATE,
+    CQC_AI_ROUTER_MAX_SCHEMA_FAILURE_RATE,
+    CQC_AI_ROUTER_MIN_AGREEMENT,
+    CQC_AI_ROUTER_MIN_SAMPLES,
+    CQC_AI_ROUTER_OBJECTIVE,
+    CQC_AI_ROUTER_WINDOW_DAYS,
+)
+from cqc_cpcc.utilities.logger import logger
+from cqc_cpcc.utilities.token_estimator import get_token_estimator
+
+ROUTER_HISTORY_FILENAME = "ai_model_router.sqlite3"
+
+OBJECTIVES = ("cheapest", "fastest")
+
+# Submission size buckets by estimated tokens (upper bound, label); larger is "xlarge"
+SIZE_BUCKETS = ((1500, "small"), (8000, "medium"), (32000, "large"))
+
+# Instructor scores needed before a model's agreement counts as verified
+MIN_AGREEMENT_SAMPLES = 3
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS outcomes (
+    model TEXT NOT NULL,
+    course_id TEXT,
+    assignment_id TEXT,
+    size_bucket TEXT NOT NULL,
+    latency_seconds REAL NOT NULL,
+    cost_usd REAL,
+    schema_failure INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agreements (
+    model TEXT NOT NULL,
+    course_id TEXT,
+    assignment_id TEXT,
+    size_bucket TEXT NOT NULL,
+    agreement REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outcomes_created_at ON outcomes (created_at);
+CREATE INDEX IF NOT EXISTS idx_agreements_created_at ON agreements (created_at);
+"""
+
+
+def model_namespace(model: str) -> str:
+    """Provider namespace of a model ID ("openai" for "openai/gpt-5", "" for a direct OpenAI "gpt-5")."""
+    return model.split("/", 1)[0] if "/" in model else ""
+
+
+def size_bucket(submission_tokens: int) -> str:
+    """Size bucket label for a submission's estimated token count."""
+    for upper_bound, label in SIZE_BUCKETS:
+        if submission_tokens < upper_bound:
+            return label
+    return "xlarge"
+
+
+@dataclass(frozen=True)
+class RoutingSegment:
+    """Slice of the history a routing decision is made for (None = any)."""
+    course_id: Optional[str] = None
+    assignment_id: Optional[str] = None
+    size_bucket: Optional[str] = None
+
+    def broader(self) -> list["RoutingSegment"]:
+        """This segment followed by progressively broader ones, ending with the whole history."""
+        segments = [
+            self,
+            RoutingSegment(self.course_id, None, self.size_bucket),
+            RoutingSegment(None, None, self.size_bucket),
+            RoutingSegment(),
+        ]
+        return list(dict.fromkeys(segments))
+
+    @property
+    def label(self) -> str:
+        parts = [self.course_id, self.assignment_id, self.size_bucket]
+        return "/".join(part for part in parts if part) or "all"
+
+
+@dataclass
+class ModelStats:
+    """A model's history within one segment.
+
+    Attributes:
+        model: Model ID
+        samples: Routed calls in the segment
+        schema_failure_rate: Share of calls whose output failed schema validation
+        mean_cost_usd: Mean estimated cost per call (None if unpriced)
+        p95_latency_seconds: 95th percentile latency
+        agreement: Mean agreement with instructor scores (None without any)
+        agreement_samples: Instructor scores behind agreement
+        segment: Segment label the outcome statistics came from
+    """
+    model: str
+    samples: int = 0
+    schema_failure_rate: float = 0.0
+    mean_cost_usd: Optional[float] = None
+    p95_latency_seconds: Optional[float] = None
+    agreement: Optional[float] = None
+    agreement_samples: int = 0
+    segment: str = "all"
+
+
+@dataclass
+class RoutingObjective:
+    """What the router optimizes and the bounds it must respect."""
+    kind: str = CQC_AI_ROUTER_OBJECTIVE
+    min_agreement: float = CQC_AI_ROUTER_MIN_AGREEMENT
+    max_schema_failure_rate: float = CQC_AI_ROUTER_MAX_SCHEMA_FAILURE_RATE
+    budget_usd: float = CQC_AI_ROUTER_BUDGET_USD
+    min_samples: int = CQC_AI_ROUTER_MIN_SAMPLES
+
+    def __post_init__(self):
+        if self.kind not in OBJECTIVES:
+            raise ValueError(f"Unknown routing objective '{self.kind}' (expected one of {', '.join(OBJECTIVES)})")
+
+
+@dataclass
+class RouteDecision:
+    """The model chosen for one call and why.
+
+    Attributes:
+        model: Model to call
+        default_model: Model selected in the UI (fallback)
+        segment: Segment the decision was made for
+        reason: Human-readable explanation
+        explored: The model was picked to collect history
+        stats: Candidate model -> statistics used for the decision
+    """
+    model: str
+    default_model: str
+    segment: RoutingSegment
+    reason: str
+    explored: bool = False
+    stats: dict[str, ModelStats] = field(default_factory=dict)
+
+
+@dataclass
+class RoutedCall:
+    """Filled in by the caller inside ModelRouter.track()."""
+    completion: str = ""
+
+
+def estimate_call_cost(model: str, prompt: str, completion: str) -> Optional[float]:
+    """Estimated USD cost of one call (OpenRouter IDs are priced by their model name)."""
+    registry = get_metrics_registry()
+    for name in (model, model.split("/", 1)[-1]):
+        if registry.has_price(name):
+            estimator = get_token_estimator()
+            return registry.estimate_cost(name, estimator.estimate(prompt), estimator.estimate(completion), 0)
+    return None
+
+
+def _p95(values: list[float]) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class RouterHistory:
+    """SQLite store of routed call outcomes and instructor agreement.
+
+    Each operation opens a short-lived connection so the history can be shared
+    between threads and processes.
+    """
+
+    def __init__(self, db_path: str | Path, window_days: float = CQC_AI_ROUTER_WINDOW_DAYS):
+        self.db_path = Path(db_path)
+        self.window_days = window_days
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA_SQL)
+            self._initialized = True
+        return conn
+
+    def _insert(self, sql: str, values: tuple) -> None:
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute(sql, values)
+                    conn.commit()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            # History failures must never break grading
+            logger.warning(f"Model router history write failed: {e}")
+
+    def record_outcome(self, model: str, segment: RoutingSegment, latency_seconds: float,
+                       cost_usd: Optional[float], schema_failure: bool) -> None:
+        self._insert(
+            "INSERT INTO outcomes (model, course_id, assignment_id, size_bucket, latency_seconds, cost_usd, "
+            "schema_failure, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (model, segment.course_id, segment.assignment_id, segment.size_bucket or "", latency_seconds,
+             cost_usd, int(schema_failure), time.time()),
+        )
+
+    def record_agreement(self, model: str, segment: RoutingSegment, agreement: float) -> None:
+        self._insert(
+            "INSERT INTO agreements (model, course_id, assignment_id, size_bucket, agreement, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (model, segment.course_id, segment.assignment_id, segment.size_bucket or "", agreement, time.time()),
+        )
+
+    def _select(self, table: str, columns: str, segment: RoutingSegment) -> list[tuple]:
+        conditions = ["created_at >= ?"]
+        values: list = [time.time() - self.window_days * 24 * 60 * 60 if self.window_days > 0 else 0]
+        for column, value in (("course_id", segment.course_id), ("assignment_id", segment.assignment_id),
+                              ("size_bucket", segment.size_bucket)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    return conn.execute(
+                        f"SELECT {columns} FROM {table} WHERE {' AND '.join(conditions)}", values
+                    ).fetchall()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Model router history read failed: {e}")
+            return []
+
+    def segment_stats(self, segment: RoutingSegment) -> dict[str, ModelStats]:
+        """Per-model statistics for one segment."""
+        outcomes: dict[str, list[tuple]] = {}
+        for model, latency, cost, failure in self._select(
+                "outcomes", "model, latency_seconds, cost_usd, schema_failure", segment):
+            outcomes.setdefault(model, []).append((latency, cost, failure))
+        agreements: dict[str, list[float]] = {}
+        for model, agreement in self._select("agreements", "model, agreement", segment):
+            agreements.setdefault(model, []).append(agreement)
+
+        stats = {}
+        for model in set(outcomes) | set(agreements):
+            rows = outcomes.get(model, [])
+            costs = [cost for _, cost, _ in rows if cost is not None]
+            scores = agreements.get(model, [])
+            stats[model] = ModelStats(
+                model=model,
+                samples=len(rows),
+                schema_failure_rate=sum(failure for _, _, failure in rows) / len(rows) if rows else 0.0,
+                mean_cost_usd=sum(costs) / len(costs) if costs else None,
+                p95_latency_seconds=_p95([latency for latency, _, _ in rows]),
+                agreement=sum(scores) / len(scores) if scores else None,
+                agreement_samples=len(scores),
+                segment=segment.label,
+            )
+        return stats
+
+
+class ModelRouter:
+    """Chooses a model per call from RouterHistory according to a RoutingObjective."""
+
+    def __init__(
+            self,
+            history: RouterHistory,
+            candidates: list[str],
+            objective: Optional[RoutingObjective] = None,
+            explore_rate: float = CQC_AI_ROUTER_EXPLORE_RATE,
+            rng: Optional[random.Random] = None,
+    ):
+        self.history = history
+        self.candidates = list(dict.fromkeys(candidates))
+        self.objective = objective or RoutingObjective()
+        self.explore_rate = explore_rate
+        self._rng = rng or random.Random()
+
+    def candidate_stats(self, models: list[str], segment: RoutingSegment) -> dict[str, ModelStats]:
+        """Statistics per model from the most specific segment with enough samples."""
+        by_segment = [self.history.segment_stats(s) for s in segment.broader()]
+        stats = {}
+        for model in models:
+            outcome = next(
+                (s[model] for s in by_segment if model in s and s[model].samples >= self.objective.min_samples),
+                None,
+            )
+            agreement = next(
+                (s[model] for s in by_segment if model in s and s[model].agreement_samples >= MIN_AGREEMENT_SAMPLES),
+                None,
+            )
+            merged = outcome or ModelStats(model=model)
+            if agreement is not None:
+                merged.agreement = agreement.agreement
+                merged.agreement_samples = agreement.agreement_samples
+            else:
+                merged.agreement, merged.agreement_samples = None, 0
+            stats[model] = merged
+        return stats
+
+    def _eligible(self, stats: ModelStats) -> bool:
+        objective = self.objective
+        if stats.samples < objective.min_samples or stats.schema_failure_rate > objective.max_schema_failure_rate:
+            return False
+        agreement_ok = stats.agreement is not None and stats.agreement >= objective.min_agreement
+        if objective.kind == "cheapest":
+            return agreement_ok and stats.mean_cost_usd is not None
+        within_budget = stats.mean_cost_usd is not None and stats.mean_cost_usd <= objective.budget_usd
+        return within_budget and (stats.agreement is None or agreement_ok)
+
+    def choose(
+            self,
+            default_model: str,
+            course_id: Optional[str] = None,
+            assignment_id: Optional[str] = None,
+            submission_tokens: int = 0,
+    ) -> RouteDecision:
+        """Choose the model for one submission.
+
+        Args:
+            default_model: Model selected by the user; used when nothing qualifies
+            course_id: Course identifier (e.g. "CSC151")
+            assignment_id: Assignment identifier
+            submission_tokens: Estimated submission tokens (for the size bucket)
+
+        Returns:
+            RouteDecision
+        """
+        segment = RoutingSegment(course_id, assignment_id, size_bucket(submission_tokens))
+        namespace = model_namespace(default_model)
+        candidates = [m for m in self.candidates if model_namespace(m) == namespace]
+        models = list(dict.fromkeys(candidates + [default_model]))
+        stats = self.candidate_stats(models, segment)
+        decision = RouteDecision(model=default_model, default_model=default_model, segment=segment,
+                                 reason="", stats=stats)
+
+        unexplored = [m for m in candidates if stats[m].samples < self.objective.min_samples]
+        if unexplored and self._rng.random() < self.explore_rate:
+            decision.model = self._rng.choice(unexplored)
+            decision.explored = True
+            decision.reason = f"exploring {decision.model} ({stats[decision.model].samples} samples for {segment.label})"
+        else:
+            eligible = [stats[m] for m in models if self._eligible(stats[m])]
+            if self.objective.kind == "cheapest":
+                ranked = sorted(eligible, key=lambda s: s.mean_cost_usd)
+            else:
+                ranked = sorted(eligible, key=lambda s: s.p95_latency_seconds)
+            if ranked:
+                best = ranked[0]
+                if self.objective.kind == "cheapest":
+                    summary = f"cheapest with agreement {best.agreement:.0%} (${best.mean_cost_usd:.4f}/call)"
+                else:
+                    summary = (f"fastest within budget (p95 {best.p95_latency_seconds:.1f}s, "
+                               f"${best.mean_cost_usd:.4f}/call)")
+                decision.model = best.model
+                decision.reason = f"{summary}, {best.segment} history"
+            else:
+                decision.reason = f"no candidate meets the '{self.objective.kind}' bounds for {segment.label}; using default"
+
+        logger.info(f"Model router: {decision.model} for {segment.label} ({decision.reason})")
+        return decision
+
+    def record_outcome(self, decision: RouteDecision, latency_seconds: float, cost_usd: Optional[float],
+                       schema_failure: bool = False) -> None:
+        """Store the outcome of a routed call."""
+        self.history.record_outcome(decision.model, decision.segment, latency_seconds, cost_usd, schema_failure)
+
+    @contextmanager
+    def track(self, decision: RouteDecision, prompt: str) -> Iterator[RoutedCall]:
+        """Time a routed call and store its outcome.
+
+        Set RoutedCall.completion to the serialized output so the cost can be
+        estimated. Schema validation failures are stored and re-raised; other
+        errors (transport, circuit open) are not held against the model.
+        """
+        call = RoutedCall()
+        start = time.monotonic()
+        try:
+            yield call
+        except (OpenAISchemaValidationError, ValidationError):
+            self.record_outcome(decision, time.monotonic() - start, None, schema_failure=True)
+            raise
+        self.record_outcome(decision, time.monotonic() - start,
+                            estimate_call_cost(decision.model, prompt, call.completion))
+
+    def record_instructor_score(self, decision: RouteDecision, ai_score: float, instructor_score: float,
+                                points_possible: float) -> float:
+        """Store how closely a routed result agreed with the instructor's score.
+
+        Returns:
+            Agreement in [0, 1]
+        """
+        if points_possible <= 0:
+            raise ValueError("points_possible must be positive")
+        agreement = max(0.0, 1.0 - abs(ai_score - instructor_score) / points_possible)
+        self.history.record_agreement(decision.model, decision.segment, agreement)
+        return agreement
+
+
+_model_router: ModelRouter | None = None
+_model_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Get or create the process-wide ModelRouter configured from env (history next to the response cache)."""
+    global _model_router
+    if _model_router is None:
+        with _model_router_lock:
+            if _model_router is None:
+                cache_dir = (Path(CQC_AI_RESPONSE_CACHE_DIR) if CQC_AI_RESPONSE_CACHE_DIR
+                             else Path.home() / ".cache" / "cqc_cpcc")
+                _model_router = ModelRouter(
+                    history=RouterHistory(cache_dir / ROUTER_HISTORY_FILENAME),
+                    candidates=[m.strip() for m in CQC_AI_ROUTER_CANDIDATES.split(",") if m.strip()],
+                )
+    return _model_router
+
+
+def set_model_router(router: ModelRouter | None) -> None:
+    """Replace the model router (None recreates it from env on next use; for tests)."""
+    global _model_router
+    with _model_router_lock:
+        _model_router = router
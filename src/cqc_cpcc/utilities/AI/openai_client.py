@@ -11,7 +11,7 @@ Key Features:
 - Strict JSON Schema validation using Pydantic models
 - Single-layer smart retry logic (2 attempts max: initial + 1 fallback retry)
 - Fallback to plain JSON mode on empty/parse failures
-- Preprocessing digest generation for large inputs (no truncation)
+- Preprocessing digest generation for large inputs (no truncation; chunked map-reduce mode)
 - Clear custom exceptions for different failure modes
 - Optional validation repair attempt flag
 - Thread-safe and async-safe design
@@ -42,11 +42,30 @@ Example usage:
 """
 
 import asyncio
+import inspect
 import json
 import os
 import random
-from typing import Type, TypeVar
-
+import threading
+import weakref
+from types import SimpleNamespace
+from typing import Any, Callable, Type, TypeVar
+
+from cqc_cpcc.utilities.AI.audio_transcription import (
+    WHISPER_MODEL,
+    build_transcription_cache_key,
+    get_transcription_cache,
+    normalize_transcription_segments,
+    plan_segments,
+    split_audio,
+    stitch_transcriptions,
+)
+from cqc_cpcc.utilities.AI.circuit_breaker import circuit_guard
+from cqc_cpcc.utilities.AI.concurrency_limiter import get_concurrency_limiter
+from cqc_cpcc.utilities.AI.hedging import get_request_hedger, is_hedging_enabled, track_in_flight
+from cqc_cpcc.utilities.AI.http_client import create_async_http_client, describe_http_config, get_http_timeout
+from cqc_cpcc.utilities.AI.json_repair import repair_json
+from cqc_cpcc.utilities.AI.llm_metrics import get_metrics_registry
 from cqc_cpcc.utilities.AI.openai_debug import (
     create_correlation_id,
     record_request,
@@ -57,9 +76,30 @@ from cqc_cpcc.utilities.AI.openai_exceptions import (
     OpenAISchemaValidationError,
     OpenAITransportError,
 )
-from cqc_cpcc.utilities.AI.schema_normalizer import normalize_json_schema_for_openai
+from cqc_cpcc.utilities.AI.rate_scheduler import get_rate_scheduler
+from cqc_cpcc.utilities.AI.response_cache import build_cache_key, get_response_cache, is_cache_enabled
+from cqc_cpcc.utilities.AI.schema_registry import get_compiled_schema
+from cqc_cpcc.utilities.AI.streaming_json import IncrementalArrayItemParser
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_CHUNKED_PREPROCESSING,
+    CQC_AI_TRANSCRIPTION_CACHE,
+    CQC_AI_TRANSCRIPTION_MAX_UPLOAD_MB,
+    CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS,
+    CQC_AI_TRANSCRIPTION_SEGMENT_SECONDS,
+)
 from cqc_cpcc.utilities.env_constants import OPENAI_API_KEY as DEFAULT_OPENAI_API_KEY
 from cqc_cpcc.utilities.logger import logger
+from cqc_cpcc.utilities.media_pipeline import (
+    MediaProcessingError,
+    MediaToolNotFoundError,
+    ProgressCallback,
+    extract_audio,
+    hash_media_file,
+    is_ffmpeg_available,
+    probe_media_duration,
+    release_extracted_audio,
+)
+from cqc_cpcc.utilities.token_estimator import get_token_estimator
 from openai import (
     APIConnectionError,
     APIError,
@@ -163,10 +203,10 @@ MODEL_TOKEN_LIMITS = {
     },
 }
 
-# Global client instance for connection pooling
-_client: AsyncOpenAI | None = None
-_client_api_key: str | None = None
-_client_lock = asyncio.Lock()
+# One client per event loop: pooled connections belong to the loop that opened them
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[str, AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
 
 
 def get_token_param_for_model(model: str) -> str:
@@ -527,6 +567,31 @@ def _normalize_fallback_json(data: dict, schema_model: Type[BaseModel]) -> dict:
     return normalized
 
 
+def _salvage_structured_output(json_output: str, schema_model: Type[T]) -> T | None:
+    """Repair malformed output and validate it before spending a retry.
+
+    Only syntax defects (code fences, surrounding prose, trailing commas) are
+    repaired. Truncated output is not completed: closing it can turn a
+    half-written element into a valid but invented one, so it is retried. The
+    repaired JSON goes through the same normalization as fallback responses
+    and then full Pydantic validation.
+
+    Args:
+        json_output: Raw model output that failed validation
+        schema_model: Target Pydantic model
+
+    Returns:
+        Validated model instance, or None if the output is not salvageable
+    """
+    data = repair_json(json_output, complete_truncated=False)
+    if not isinstance(data, dict):
+        return None
+    try:
+        return schema_model.model_validate(_normalize_fallback_json(data, schema_model))
+    except ValidationError:
+        return None
+
+
 def _build_fallback_prompt(original_prompt: str, schema_model: Type[BaseModel]) -> str:
     """Build a fallback prompt for smart retry that requests plain JSON.
     
@@ -534,6 +599,8 @@ def _build_fallback_prompt(original_prompt: str, schema_model: Type[BaseModel])
     request that asks for plain JSON without schema enforcement. This increases
     the chance of getting a valid response with explicit field requirements.
     
+    The schema description is compiled once per schema model (see schema_registry.py).
+    
     Args:
         original_prompt: The original prompt text
         schema_model: Pydantic model defining expected structure
@@ -541,95 +608,26 @@ def _build_fallback_prompt(original_prompt: str, schema_model: Type[BaseModel])
     Returns:
         Modified prompt that requests plain JSON with explicit schema
     """
-    # Get schema info from Pydantic model
-    schema = schema_model.model_json_schema()
-    schema_name = schema_model.__name__
-
-    # Build detailed schema description with nested types
-    def describe_type(field_info: dict, indent: str = "") -> str:
-        """Recursively describe field types."""
-        field_type = field_info.get("type", "any")
-
-        if field_type == "array":
-            items = field_info.get("items", {})
-            if "$ref" in items:
-                # Reference to another model
-                ref_name = items["$ref"].split("/")[-1]
-                return f"array of {ref_name} objects"
-            elif items.get("type") == "object":
-                return "array of objects"
-            else:
-                return f"array of {items.get('type', 'any')}"
-        elif field_type == "object":
-            additional_props = field_info.get("additionalProperties")
-            if additional_props:
-                if isinstance(additional_props, dict):
-                    value_type = additional_props.get("type", "any")
-                    return f"object (dict with {value_type} values)"
-                return "object (dict)"
-            return "object"
-        else:
-            return field_type
-
-    # Build field requirements from top-level properties
-    properties = schema.get("properties", {})
-    required = schema.get("required", [])
-    defs = schema.get("$defs", {})
-
-    field_descriptions = []
-    field_descriptions.append(f"Schema: {schema_name}")
-    field_descriptions.append("")
-    field_descriptions.append("CRITICAL - Use these EXACT field names and types:")
-
-    for field_name, field_info in properties.items():
-        field_type_desc = describe_type(field_info)
-        description = field_info.get("description", "")
-        required_marker = " [REQUIRED]" if field_name in required else " [optional]"
-
-        # Add special notes for nested structures
-        if field_name == "criteria_results":
-            field_descriptions.append(
-                f"  • {field_name}: {field_type_desc}{required_marker}"
-            )
-            field_descriptions.append("    Each criterion result MUST have:")
-            field_descriptions.append("      - criterion_id (string) - NOT rubric_criterion_id")
-            field_descriptions.append("      - criterion_name (string) - NOT criterion_title")
-            field_descriptions.append("      - points_possible (integer)")
-            field_descriptions.append("      - points_earned (integer)")
-            field_descriptions.append("      - selected_level_label (string or null)")
-            field_descriptions.append("      - feedback (string)")
-            field_descriptions.append("      - evidence (array of strings or null)")
-        elif field_name == "detected_errors":
-            field_descriptions.append(
-                f"  • {field_name}: {field_type_desc}{required_marker} - MUST be JSON array, NOT string"
-            )
-        elif field_name in ["error_counts_by_severity", "error_counts_by_id"]:
-            field_descriptions.append(
-                f"  • {field_name}: {field_type_desc}{required_marker} - MUST be JSON object with integer values, NOT string"
-            )
-        else:
-            field_descriptions.append(
-                f"  • {field_name}: {field_type_desc}{required_marker} - {description}"
-            )
-
-    fields_text = "\n".join(field_descriptions)
-
-    fallback_prompt = f"""{original_prompt}
-
-IMPORTANT - Response Format Requirements:
-{fields_text}
-
-Return ONLY valid JSON (no markdown, no code blocks, no explanations).
-All arrays must be JSON arrays: [...], NOT strings containing JSON.
-All objects must be JSON objects: {{"key": "value"}}, NOT strings containing JSON.
-All integer fields must be integers: 42, NOT strings: "42".
-"""
-    return fallback_prompt
+    return f"{original_prompt}{get_compiled_schema(schema_model).fallback_prompt_suffix}"
 
 
 # Preprocessing configuration
 PREPROCESSING_TOKEN_THRESHOLD = 0.70  # Trigger preprocessing at 70% of context window
-CHARS_PER_TOKEN_ESTIMATE = 4  # Conservative estimate for token counting
+CHARS_PER_TOKEN_ESTIMATE = 4  # Legacy heuristic, superseded by the calibrated token estimator
+
+
+def estimate_prompt_tokens(text: str) -> int:
+    """Estimate the token count of prompt text.
+    
+    Uses the shared calibrated token estimator (see token_estimator.py).
+    
+    Args:
+        text: Prompt or submission text
+        
+    Returns:
+        Estimated token count
+    """
+    return get_token_estimator().estimate(text)
 
 
 def should_use_preprocessing(student_code: str, context_window: int = 128_000) -> bool:
@@ -642,7 +640,7 @@ def should_use_preprocessing(student_code: str, context_window: int = 128_000) -
     Returns:
         True if preprocessing should be used, False otherwise
     """
-    estimated_tokens = len(student_code) // CHARS_PER_TOKEN_ESTIMATE
+    estimated_tokens = estimate_prompt_tokens(student_code)
     threshold_tokens = int(context_window * PREPROCESSING_TOKEN_THRESHOLD)
 
     if estimated_tokens > threshold_tokens:
@@ -655,6 +653,75 @@ def should_use_preprocessing(student_code: str, context_window: int = 128_000) -
     return False
 
 
+_prompt_cache_stats: dict[str, dict[str, int]] = {}
+_prompt_cache_stats_lock = threading.Lock()
+
+
+def get_cached_prompt_tokens(usage: Any) -> int | None:
+    """Read the provider-reported cached input token count from usage data.
+    
+    OpenAI (and OpenRouter for providers that support it) report prompt cache
+    hits in usage.prompt_tokens_details.cached_tokens.
+    
+    Args:
+        usage: Usage object from a chat completion response (may be None)
+        
+    Returns:
+        Cached prompt token count, or None if the provider did not report it
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        cached = details.get("cached_tokens")
+    else:
+        cached = getattr(details, "cached_tokens", None)
+    return cached if isinstance(cached, int) else None
+
+
+def record_prompt_cache_usage(model: str, usage: Any) -> int | None:
+    """Accumulate prompt and cached-input token counts for a model.
+    
+    Args:
+        model: Model that served the request
+        usage: Usage object from a chat completion response (may be None)
+        
+    Returns:
+        Cached prompt token count for this request, or None if not reported
+    """
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    if not isinstance(prompt_tokens, int):
+        return None
+
+    cached_tokens = get_cached_prompt_tokens(usage)
+    with _prompt_cache_stats_lock:
+        stats = _prompt_cache_stats.setdefault(model, {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0})
+        stats["requests"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["cached_tokens"] += cached_tokens or 0
+    return cached_tokens
+
+
+def get_prompt_cache_stats() -> dict[str, dict[str, float]]:
+    """Get per-model prompt cache usage, including the cached-token hit rate.
+    
+    Returns:
+        Mapping of model name to requests, prompt_tokens, cached_tokens and hit_rate
+    """
+    with _prompt_cache_stats_lock:
+        return {
+            model: {
+                **stats,
+                "hit_rate": stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0,
+            }
+            for model, stats in _prompt_cache_stats.items()
+        }
+
+
+def reset_prompt_cache_stats() -> None:
+    """Clear accumulated prompt cache usage (for tests)."""
+    with _prompt_cache_stats_lock:
+        _prompt_cache_stats.clear()
+
+
 def _build_preprocessing_prompt(
         student_code: str,
         assignment_instructions: str,
@@ -755,6 +822,7 @@ async def generate_preprocessing_digest(
         assignment_instructions: str,
         rubric_config: str = "",
         model_name: str = DEFAULT_MODEL,
+        chunked: bool | None = None,
 ) -> PreprocessingDigest:
     """Generate a preprocessing digest for large student submissions.
     
@@ -762,11 +830,16 @@ async def generate_preprocessing_digest(
     that preserves all information needed for grading without including the raw code.
     This prevents context_length_exceeded errors while maintaining grading accuracy.
     
+    In chunked mode a submission that splits into more than one chunk is
+    digested map-reduce style (see chunked_preprocessing.py): per file and
+    definition boundary, concurrently, with chunk digests cached by content hash.
+    
     Args:
         student_code: Full student submission (all files)
         assignment_instructions: Assignment requirements
         rubric_config: Rubric or error criteria (optional)
         model_name: Model to use (default: gpt-5-mini)
+        chunked: Use chunked mode. None (default) follows CQC_AI_CHUNKED_PREPROCESSING.
         
     Returns:
         PreprocessingDigest with comprehensive analysis
@@ -775,6 +848,24 @@ async def generate_preprocessing_digest(
         OpenAISchemaValidationError: If digest generation fails validation
         OpenAITransportError: If API call fails after retries
     """
+    if chunked is None:
+        chunked = CQC_AI_CHUNKED_PREPROCESSING
+    if chunked:
+        # Import here to avoid circular dependency
+        from cqc_cpcc.utilities.AI.chunked_preprocessing import (
+            generate_chunked_preprocessing_digest,
+            split_submission_into_chunks,
+        )
+        chunk_count = len(split_submission_into_chunks(student_code))
+        if chunk_count > 1:
+            logger.info(f"Generating chunked preprocessing digest ({chunk_count} chunks)")
+            return await generate_chunked_preprocessing_digest(
+                student_code=student_code,
+                assignment_instructions=assignment_instructions,
+                rubric_config=rubric_config,
+                model_name=model_name,
+            )
+
     prompt = _build_preprocessing_prompt(
         student_code=student_code,
         assignment_instructions=assignment_instructions,
@@ -783,16 +874,17 @@ async def generate_preprocessing_digest(
 
     logger.info(
         f"Generating preprocessing digest for {len(student_code)} chars "
-        f"(~{len(student_code) // CHARS_PER_TOKEN_ESTIMATE} est. tokens)"
+        f"(~{estimate_prompt_tokens(student_code)} est. tokens)"
     )
 
     # Call with own 2-attempt retry logic
-    digest = await get_structured_completion(
-        prompt=prompt,
-        model_name=model_name,
-        schema_model=PreprocessingDigest,
-        max_retries=DEFAULT_MAX_RETRIES,  # 2 attempts total
-    )
+    with get_metrics_registry().track_request("preprocessing_digest", model_name):
+        digest = await get_structured_completion(
+            prompt=prompt,
+            model_name=model_name,
+            schema_model=PreprocessingDigest,
+            max_retries=DEFAULT_MAX_RETRIES,  # 2 attempts total
+        )
 
     # Save digest to debug artifacts if debug enabled
     if should_debug():
@@ -807,10 +899,13 @@ async def generate_preprocessing_digest(
 
 
 async def get_client() -> AsyncOpenAI:
-    """Get or create a singleton AsyncOpenAI client instance.
+    """Get or create the AsyncOpenAI client for the running event loop.
     
-    Uses a lock to ensure thread-safe initialization. The client is reused
-    across calls for connection pooling.
+    The client is reused for all calls on the loop for connection pooling,
+    with pool limits, keep-alive and timeouts from the shared HTTP
+    configuration (see http_client). Each loop gets its own client because
+    pooled connections cannot be reused after the loop that opened them has
+    closed (the grading page runs each batch on a fresh loop).
     
     IMPORTANT: SDK retries are disabled (max_retries=0) to ensure single-layer
     retry behavior controlled by get_structured_completion().
@@ -821,7 +916,6 @@ async def get_client() -> AsyncOpenAI:
     Raises:
         ValueError: If OPENAI_API_KEY is not set
     """
-    global _client, _client_api_key
     # Backward-compatible patching behavior:
     # if tests monkeypatch module-level OPENAI_API_KEY, respect that override.
     if OPENAI_API_KEY != DEFAULT_OPENAI_API_KEY:
@@ -835,21 +929,103 @@ async def get_client() -> AsyncOpenAI:
             "Please configure it in .env or secrets.toml"
         )
 
-    if _client is None or _client_api_key != current_api_key:
-        async with _client_lock:
-            # Double-check pattern to avoid race condition
-            if _client is not None and _client_api_key != current_api_key:
-                await _client.close()
-                _client = None
-                logger.info("OpenAI API key changed at runtime; rebuilding AsyncOpenAI client")
+    loop = asyncio.get_running_loop()
+    cached = _clients.get(loop)
+    if cached is not None and cached[0] == current_api_key:
+        return cached[1]
+
+    # Disable SDK-level retries to implement single-layer retry;
+    # shared transport settings keep connections warm across waves
+    client = AsyncOpenAI(
+        api_key=current_api_key,
+        max_retries=0,
+        http_client=create_async_http_client(),
+        timeout=get_http_timeout(),
+    )
+    _clients[loop] = (current_api_key, client)
+    logger.info(
+        f"Initialized AsyncOpenAI client with max_retries=0 (single-layer retry), "
+        f"http={describe_http_config()}"
+    )
+
+    if cached is not None:
+        logger.info("OpenAI API key changed at runtime; closing the replaced AsyncOpenAI client")
+        await cached[1].close()
+    return client
+
+
+async def _publish_stream_item(on_stream_item: Callable[[dict], Any], item: dict) -> None:
+    """Invoke a stream item callback (sync or async) without failing the request."""
+    try:
+        result = on_stream_item(item)
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.warning(f"Stream item callback failed (ignored): {e}")
+
 
-            if _client is None:
-                # Disable SDK-level retries to implement single-layer retry
-                _client = AsyncOpenAI(api_key=current_api_key, max_retries=0)
-                _client_api_key = current_api_key
-                logger.info("Initialized AsyncOpenAI client with max_retries=0 (single-layer retry)")
+async def _create_streamed_completion(
+        client: AsyncOpenAI,
+        api_kwargs: dict,
+        item_field: str,
+        on_stream_item: Callable[[dict], Any],
+) -> SimpleNamespace:
+    """Stream a chat completion, publishing finished array elements as they arrive.
+    
+    Args:
+        client: AsyncOpenAI client
+        api_kwargs: Chat completion parameters (without stream options)
+        item_field: Top-level array field whose elements are published
+        on_stream_item: Callback for each finished element
+        
+    Returns:
+        Response object shaped like a non-streamed ChatCompletion (id, model,
+        choices[0].message.content/refusal, choices[0].finish_reason, usage)
+    """
+    stream = await client.chat.completions.create(
+        **api_kwargs,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
 
-    return _client
+    parser = IncrementalArrayItemParser(item_field)
+    refusal_parts: list[str] = []
+    finish_reason = None
+    usage = None
+    response_id = None
+    response_model = None
+    created = None
+
+    async for chunk in stream:
+        response_id = response_id or getattr(chunk, "id", None)
+        response_model = response_model or getattr(chunk, "model", None)
+        created = created or getattr(chunk, "created", None)
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+
+        choice = chunk.choices[0]
+        delta = choice.delta
+        if delta is not None and delta.content:
+            for item in parser.feed(delta.content):
+                await _publish_stream_item(on_stream_item, item)
+        if delta is not None and getattr(delta, "refusal", None):
+            refusal_parts.append(delta.refusal)
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+
+    logger.debug(f"Streamed completion published {parser.items_emitted} {item_field} element(s)")
+
+    message = SimpleNamespace(content=parser.text or None, refusal="".join(refusal_parts) or None)
+    return SimpleNamespace(
+        id=response_id,
+        model=response_model,
+        created=created,
+        object="chat.completion",
+        choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+        usage=usage,
+    )
 
 
 async def get_structured_completion(
@@ -862,6 +1038,10 @@ async def get_structured_completion(
         retry_delay: float = DEFAULT_RETRY_DELAY,
         allow_repair: bool = False,
         retry_empty_response: bool = True,
+        use_cache: bool | None = None,
+        on_stream_item: Callable[[dict], Any] | None = None,
+        stream_item_field: str = "criteria_results",
+        hedge: bool | None = None,
 ) -> T:
     """Get a structured completion from OpenAI with strict schema validation.
     
@@ -891,6 +1071,24 @@ async def get_structured_completion(
     - Respects Retry-After headers for rate limits
     - Does NOT retry schema validation errors by default
     
+    Response Cache:
+    - When enabled, validated responses are stored in a persistent
+      content-addressed cache (see response_cache.py)
+    - Key covers prompt, model, schema name, normalized schema and sampling params
+    - Identical requests are served from disk without calling the API
+    
+    Streaming:
+    - When on_stream_item is given, strict-schema attempts are streamed
+    - Each finished element of the top-level `stream_item_field` array is passed
+      to on_stream_item (sync or async) as soon as it arrives
+    - The final document is still validated as a whole before returning
+    
+    Hedging:
+    - When enabled, a call that outlives the model's observed p95 latency is
+      duplicated (optionally to a fallback model, see hedging.py)
+    - The first valid result wins and the other request is cancelled
+    - Only the primary request publishes stream items
+    
     Args:
         prompt: The prompt text to send to the LLM
         model_name: OpenAI model name (default: "gpt-5-mini")
@@ -906,6 +1104,14 @@ async def get_structured_completion(
         retry_delay: Base delay in seconds between retries (exponential backoff)
         allow_repair: If True, attempts one repair retry on schema validation failure
         retry_empty_response: If True (default), retries once on empty response errors
+        use_cache: Use the persistent response cache. None (default) follows
+                   CQC_AI_RESPONSE_CACHE; False bypasses the cache for this call.
+        on_stream_item: Optional callback for each finished streamed array element.
+                        Elements may be published again if a retry occurs.
+        stream_item_field: Top-level array field whose elements are published
+                           (default: "criteria_results")
+        hedge: Hedge slow requests. None (default) follows CQC_AI_HEDGING;
+               False disables hedging for this call.
         
     Returns:
         Validated instance of schema_model with structured data from LLM
@@ -953,24 +1159,71 @@ async def get_structured_completion(
     if TEST_MODE:
         return _get_test_mode_response(schema_model)
 
+    # Tail-latency hedging: re-enter once per request with hedging disabled
+    if hedge is None:
+        hedge = is_hedging_enabled()
+    if hedge:
+        return await get_request_hedger().run(
+            model_name,
+            lambda model, is_hedge: get_structured_completion(
+                prompt=prompt,
+                model_name=model,
+                schema_model=schema_model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                max_retries=max_retries,
+                retry_delay=retry_delay,
+                allow_repair=allow_repair,
+                retry_empty_response=retry_empty_response,
+                use_cache=use_cache,
+                on_stream_item=None if is_hedge else on_stream_item,
+                stream_item_field=stream_item_field,
+                hedge=False,
+            ),
+            reports_in_flight=True,
+        )
+
+    # Build JSON schema from Pydantic model (compiled once per model)
+    # IMPORTANT: Normalized schema has additionalProperties: false on all objects
+    # This is required by OpenAI Structured Outputs strict mode
+    compiled_schema = get_compiled_schema(schema_model)
+    normalized_schema = compiled_schema.normalized_schema
+
+    # Persistent response cache lookup (content-addressed)
+    if use_cache is None:
+        use_cache = is_cache_enabled()
+    cache_key = None
+    if use_cache:
+        cache_key = build_cache_key(
+            prompt=prompt,
+            model=model_name,
+            schema_name=schema_model.__name__,
+            normalized_schema=normalized_schema,
+            sampling_params={"temperature": temperature, "max_tokens": max_tokens},
+        )
+        cached_payload = await asyncio.to_thread(get_response_cache().get, cache_key)
+        if cached_payload is not None:
+            try:
+                cached_model = compiled_schema.type_adapter.validate_json(cached_payload)
+                logger.info(
+                    f"Response cache hit (model={model_name}, schema={schema_model.__name__}, "
+                    f"key={cache_key[:12]})"
+                )
+            except ValidationError:
+                logger.warning(f"Discarding invalid cached response (key={cache_key[:12]})")
+            else:
+                get_metrics_registry().increment("cache_hits", "structured_completion", model_name)
+                if on_stream_item is not None:
+                    for item in cached_model.model_dump(mode="json").get(stream_item_field) or []:
+                        await _publish_stream_item(on_stream_item, item)
+                return cached_model
+
     # Create correlation ID for debug tracking
     correlation_id = create_correlation_id() if should_debug() else None
 
     # Get client instance
     client = await get_client()
 
-    # Build JSON schema from Pydantic model
-    # IMPORTANT: Normalize schema to add additionalProperties: false to all objects
-    # This is required by OpenAI Structured Outputs strict mode
-    raw_schema = schema_model.model_json_schema()
-    normalized_schema = normalize_json_schema_for_openai(raw_schema)
-
-    json_schema = {
-        "name": schema_model.__name__,
-        "schema": normalized_schema,
-        "strict": True,
-    }
-
     # Determine correct token parameter and value
     token_param = get_token_param_for_model(model_name)
 
@@ -997,8 +1250,12 @@ async def get_structured_completion(
                 f"(model={model_name}, schema={schema_model.__name__}, type={request_type})"
             )
 
+            if attempt > 0:
+                get_metrics_registry().increment("retries", "structured_completion", model_name)
+
             # SMART RETRY: On attempt 2+, use fallback plain JSON instead of strict schema
             if attempt > 0 and is_smart_retry:
+                get_metrics_registry().increment("fallbacks", "structured_completion", model_name)
                 # Build fallback prompt that requests plain JSON
                 fallback_prompt = _build_fallback_prompt(prompt, schema_model)
 
@@ -1015,10 +1272,7 @@ async def get_structured_completion(
                 api_kwargs = {
                     "model": model_name,
                     "messages": [{"role": "user", "content": prompt}],
-                    "response_format": {
-                        "type": "json_schema",
-                        "json_schema": json_schema,
-                    },
+                    "response_format": compiled_schema.response_format,
                     "temperature": temperature,
                 }
 
@@ -1062,7 +1316,47 @@ async def get_structured_completion(
                     request_type=request_type,
                 )
 
-            response = await client.chat.completions.create(**api_kwargs)
+            # Fail fast while the provider or model circuit is open
+            async with circuit_guard("openai", model_name):
+                # Shared AIMD limiter caps concurrent requests across all callers
+                # (retries already honored Retry-After in the backoff below)
+                async with get_concurrency_limiter("openai").slot(wait_for_pause=attempt == 0):
+                    # Wait for per-model TPM/RPM budget once the request is about to be sent
+                    reservation = await get_rate_scheduler().reserve(
+                        model_name,
+                        prompt_tokens=estimate_prompt_tokens(api_kwargs["messages"][0]["content"]),
+                        output_tokens=max_tokens,
+                    )
+                    response = None
+                    try:
+                        with get_metrics_registry().track_request("structured_completion", model_name), \
+                                track_in_flight():
+                            if on_stream_item is not None and not is_smart_retry:
+                                response = await _create_streamed_completion(
+                                    client, api_kwargs, stream_item_field, on_stream_item
+                                )
+                            else:
+                                response = await client.chat.completions.create(**api_kwargs)
+                    finally:
+                        # Failed or cancelled calls must not keep holding TPM budget
+                        if response is None:
+                            get_rate_scheduler().refund(reservation)
+                        else:
+                            get_rate_scheduler().settle(
+                                reservation, getattr(getattr(response, "usage", None), "total_tokens", None)
+                            )
+
+            cached_tokens = record_prompt_cache_usage(model_name, getattr(response, "usage", None))
+            get_metrics_registry().record_usage(
+                "structured_completion", model_name, getattr(response, "usage", None)
+            )
+            # Strict requests also bill the schema as prompt tokens; keep it out of the calibration
+            get_token_estimator().observe(
+                api_kwargs["messages"][0]["content"],
+                getattr(getattr(response, "usage", None), "prompt_tokens", None),
+                extra_tokens=(compiled_schema.schema_tokens
+                              if api_kwargs.get("response_format", {}).get("type") == "json_schema" else 0),
+            )
 
             # Check for refusal first
             if hasattr(response, 'choices') and response.choices:
@@ -1138,20 +1432,37 @@ async def get_structured_completion(
 
             # Validate against Pydantic model
             try:
-                # If using fallback plain JSON mode, apply normalization first
-                if is_smart_retry and api_kwargs.get("response_format", {}).get("type") == "json_object":
-                    logger.debug("Applying normalization to fallback JSON response")
-                    try:
+                salvaged = False
+                try:
+                    # If using fallback plain JSON mode, apply normalization first
+                    if is_smart_retry and api_kwargs.get("response_format", {}).get("type") == "json_object":
+                        logger.debug("Applying normalization to fallback JSON response")
                         parsed_json = json.loads(json_output)
                         normalized_json = _normalize_fallback_json(parsed_json, schema_model)
                         # Validate with normalized dict (not JSON string)
                         validated_model = schema_model.model_validate(normalized_json)
-                    except json.JSONDecodeError as json_err:
-                        logger.error(f"Failed to parse fallback JSON: {json_err}")
-                        raise ValidationError(f"Invalid JSON in fallback response: {json_err}", schema_model)
-                else:
-                    # Normal strict schema path - validate directly from JSON string
-                    validated_model = schema_model.model_validate_json(json_output)
+                    else:
+                        # Normal strict schema path - validate directly from JSON string
+                        validated_model = compiled_schema.type_adapter.validate_json(json_output)
+                except (ValidationError, json.JSONDecodeError) as parse_err:
+                    # Repair malformed output before spending a retry round trip (truncated output is retried)
+                    validated_model = None
+                    if finish_reason != "length":
+                        get_metrics_registry().increment("repair_attempts", "structured_completion", model_name)
+                        validated_model = _salvage_structured_output(json_output, schema_model)
+                    if validated_model is None:
+                        if isinstance(parse_err, json.JSONDecodeError):
+                            logger.error(f"Failed to parse fallback JSON: {parse_err}")
+                            # Let Pydantic report the invalid JSON as a ValidationError
+                            schema_model.model_validate_json(json_output)
+                        raise
+                    salvaged = True
+                    get_metrics_registry().increment("repair_salvaged", "structured_completion", model_name)
+                    logger.warning(
+                        f"Salvaged malformed {schema_model.__name__} output with JSON repair "
+                        f"(finish_reason={finish_reason})"
+                        f"{f' (correlation_id={correlation_id})' if correlation_id else ''}"
+                    )
 
                 # Record successful response
                 if correlation_id:
@@ -1159,7 +1470,9 @@ async def get_structured_completion(
                         correlation_id=correlation_id,
                         response=response,
                         schema_name=schema_model.__name__,
-                        decision_notes="parsed successfully" + (" (normalized)" if is_smart_retry else ""),
+                        decision_notes="parsed successfully"
+                                       + (" (normalized)" if is_smart_retry else "")
+                                       + (" (salvaged by JSON repair)" if salvaged else ""),
                         output_text=json_output,
                         output_parsed=validated_model,
                     )
@@ -1169,8 +1482,19 @@ async def get_structured_completion(
                     f"(model={model_name}, schema={schema_model.__name__}, "
                     f"tokens="
                     f"{response.usage.total_tokens if response.usage else 'unknown'}"
+                    f"{f', cached_tokens={cached_tokens}' if cached_tokens is not None else ''}"
                     f"{f', correlation_id={correlation_id}' if correlation_id else ''})"
                 )
+
+                if cache_key:
+                    await asyncio.to_thread(
+                        get_response_cache().set,
+                        cache_key,
+                        validated_model.model_dump_json(),
+                        model_name,
+                        schema_model.__name__,
+                    )
+
                 return validated_model
 
             except ValidationError as e:
@@ -1402,26 +1726,74 @@ def _get_test_mode_response(schema_model: Type[T]) -> T:
 
 
 async def close_client() -> None:
-    """Close the global AsyncOpenAI client and release resources.
+    """Close the running event loop's AsyncOpenAI client and release resources.
     
-    Should be called during application shutdown. After calling this,
-    the next call to get_structured_completion will create a new client.
+    Should be called before the loop finishes (e.g. at the end of a grading
+    batch). After calling this, the next call to get_structured_completion
+    will create a new client.
     """
-    global _client, _client_api_key
+    cached = _clients.pop(asyncio.get_running_loop(), None)
+    if cached is not None:
+        await cached[1].close()
+        logger.info("Closed AsyncOpenAI client")
 
-    async with _client_lock:
-        if _client is not None:
-            await _client.close()
-            _client = None
-            _client_api_key = None
-            logger.info("Closed AsyncOpenAI client")
+
+async def _request_transcription(client: AsyncOpenAI, file_path: str) -> dict:
+    """Send one file to Whisper (verbose_json) under the shared concurrency limiter.
+    
+    Returns:
+        Dictionary with text, duration, language and timestamped segments
+    """
+    with open(file_path, "rb") as audio_file:
+        async with get_concurrency_limiter("openai").slot():
+            with get_metrics_registry().track_request("transcription", WHISPER_MODEL):
+                transcription = await client.audio.transcriptions.create(
+                    model=WHISPER_MODEL,
+                    file=audio_file,
+                    response_format="verbose_json"  # Includes duration, language
+                )
+    return {
+        "text": transcription.text,
+        "duration": getattr(transcription, 'duration', None),
+        "language": getattr(transcription, 'language', 'unknown'),
+        "segments": normalize_transcription_segments(getattr(transcription, 'segments', None)),
+    }
+
+
+async def _transcribe_segmented(client: AsyncOpenAI, file_path: str, duration: float) -> dict:
+    """Split a long recording with ffmpeg, transcribe segments concurrently and stitch them."""
+    import tempfile
+
+    plan = plan_segments(duration)
+    logger.info(f"Transcribing {os.path.basename(file_path)} in {len(plan)} overlapping segments")
+    with tempfile.TemporaryDirectory(prefix="cqc_audio_segments_") as segment_dir:
+        segments = await split_audio(file_path, plan, segment_dir)
+        results = await asyncio.gather(*(_request_transcription(client, segment.path) for segment in segments))
+
+    text, timed_segments = stitch_transcriptions(
+        [(segment.start, result) for segment, result in zip(segments, results)],
+        CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS,
+    )
+    languages = [result["language"] for result in results if result.get("language") not in (None, "unknown")]
+    return {
+        "text": text,
+        "duration": duration,
+        "language": languages[0] if languages else "unknown",
+        "segments": timed_segments,
+        "segment_count": len(segments),
+    }
 
 
 async def transcribe_audio(file_path: str) -> dict:
     """Transcribe audio file using OpenAI Whisper API.
     
     Supports: mp3, mp4, mpeg, mpga, m4a, wav, webm
-    Max file size: 25 MB
+    
+    Recordings longer than CQC_AI_TRANSCRIPTION_SEGMENT_SECONDS, or larger than
+    CQC_AI_TRANSCRIPTION_MAX_UPLOAD_MB, are split by ffmpeg into overlapping
+    segments that are transcribed concurrently and stitched back together
+    (see audio_transcription.py). Finished transcriptions are cached by the
+    audio's SHA-256 (CQC_AI_TRANSCRIPTION_CACHE).
     
     Args:
         file_path: Path to the audio file
@@ -1431,57 +1803,73 @@ async def transcribe_audio(file_path: str) -> dict:
         - text: Transcribed text
         - duration: Audio duration in seconds (if available)
         - language: Detected language
+        - segments: Timestamped segments (start, end, text) when available
+        - segment_count: Number of uploaded segments (1 if not split)
         - file_info: File metadata (name, size, type)
         
     Raises:
         OpenAITransportError: If transcription fails
     """
-    import os
     from pathlib import Path
 
-    client = await get_client()
     file_name = os.path.basename(file_path)
     file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
     file_ext = Path(file_path).suffix.lower()
+    file_info = {
+        "name": file_name,
+        "size_mb": round(file_size, 2),
+        "type": file_ext[1:].upper() if file_ext else "unknown"
+    }
 
     logger.info(f"Transcribing audio file: {file_name} ({file_size:.2f} MB)")
 
+    cache_key = None
+    if CQC_AI_TRANSCRIPTION_CACHE:
+        cache_key = build_transcription_cache_key(await asyncio.to_thread(hash_media_file, file_path))
+        cached = await asyncio.to_thread(get_transcription_cache().get, cache_key)
+        if cached is not None:
+            try:
+                result = {**json.loads(cached), "file_info": file_info}
+                get_metrics_registry().increment("cache_hits", "transcription", WHISPER_MODEL)
+                logger.info(f"Using cached transcription for {file_name}")
+                return result
+            except (json.JSONDecodeError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable cached transcription for {file_name}: {e}")
+
     try:
-        # Check file size (OpenAI limit is 25 MB)
-        if file_size > 25:
+        client = await get_client()
+        duration = await probe_media_duration(file_path)
+        too_large = file_size > CQC_AI_TRANSCRIPTION_MAX_UPLOAD_MB
+        too_long = duration is not None and duration > (
+                CQC_AI_TRANSCRIPTION_SEGMENT_SECONDS + CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS)
+
+        if too_large and duration is None:
             raise OpenAITransportError(
-                f"Audio file {file_name} exceeds OpenAI's 25 MB limit ({file_size:.2f} MB). "
-                f"Please compress or split the file before transcription."
+                f"Audio file {file_name} exceeds the {CQC_AI_TRANSCRIPTION_MAX_UPLOAD_MB:g} MB upload limit "
+                f"({file_size:.2f} MB) and ffmpeg is {'unable to read it' if is_ffmpeg_available() else 'not installed'}"
+                f", so it cannot be split. Please compress or split the file before transcription."
             )
 
-        # Open and transcribe the audio file
-        with open(file_path, "rb") as audio_file:
-            transcription = await client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json"  # Includes duration, language
-            )
+        if too_large or too_long:
+            result = await _transcribe_segmented(client, file_path, duration)
+        else:
+            result = {**await _request_transcription(client, file_path), "segment_count": 1}
 
-        result = {
-            "text": transcription.text,
-            "duration": getattr(transcription, 'duration', None),
-            "language": getattr(transcription, 'language', 'unknown'),
-            "file_info": {
-                "name": file_name,
-                "size_mb": round(file_size, 2),
-                "type": file_ext[1:].upper() if file_ext else "unknown"
-            }
-        }
+        get_metrics_registry().record_audio("transcription", WHISPER_MODEL, result["duration"])
 
         logger.info(f"Successfully transcribed {file_name}: {len(result['text'])} characters, "
-                    f"duration: {result['duration']}s, language: {result['language']}")
-
-        return result
+                    f"duration: {result['duration']}s, language: {result['language']}, "
+                    f"segments: {result['segment_count']}")
 
     except Exception as e:
         logger.error(f"Failed to transcribe audio file {file_name}: {e}")
         raise OpenAITransportError(f"Audio transcription failed: {str(e)}")
 
+    if cache_key is not None:
+        await asyncio.to_thread(get_transcription_cache().set, cache_key, json.dumps(result), model=WHISPER_MODEL,
+                                schema_name="transcription")
+    return {**result, "file_info": file_info}
+
 
 def format_transcription_for_grading(transcription: dict) -> str:
     """Format audio transcription for inclusion in grading prompt.
@@ -1511,57 +1899,37 @@ Transcription:
     return formatted
 
 
-async def extract_audio_from_video(video_path: str) -> str | None:
+async def extract_audio_from_video(
+        video_path: str,
+        progress_callback: ProgressCallback | None = None,
+) -> str | None:
     """Extract audio track from video file using ffmpeg.
     
+    ffmpeg runs as an asyncio subprocess in the shared media worker pool, so
+    other grading calls keep running meanwhile. Audio is cached by the video's
+    SHA-256 (CQC_MEDIA_AUDIO_CACHE); see media_pipeline.py.
+    
     Args:
         video_path: Path to the video file
+        progress_callback: Called with a MediaProgress while ffmpeg runs
         
     Returns:
-        Path to extracted audio file, or None if extraction fails
+        Path to extracted audio file (release it with release_extracted_audio()),
+        or None if extraction fails
     """
-    import os
-    import subprocess
-    import tempfile
-    from pathlib import Path
-
-    video_name = Path(video_path).stem
-
-    # Create temp file for audio
-    temp_audio = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3', prefix=f"{video_name}_audio_")
-    temp_audio_path = temp_audio.name
-    temp_audio.close()
-
+    video_name = os.path.basename(video_path)
     try:
-        # Try to extract audio using ffmpeg
-        result = subprocess.run(
-            ['ffmpeg', '-i', video_path, '-vn', '-acodec', 'libmp3lame', '-y', temp_audio_path],
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
-
-        if result.returncode == 0 and os.path.exists(temp_audio_path):
-            file_size = os.path.getsize(temp_audio_path)
-            if file_size > 0:
-                logger.info(f"Successfully extracted audio from {video_name} ({file_size} bytes)")
-                return temp_audio_path
-
-        logger.warning(f"ffmpeg extraction failed for {video_name}: {result.stderr}")
-        return None
-
-    except FileNotFoundError:
+        return await extract_audio(video_path, progress_callback=progress_callback)
+    except MediaToolNotFoundError:
         logger.info("ffmpeg not found - video audio extraction not available")
-        return None
-    except subprocess.TimeoutExpired:
-        logger.error(f"ffmpeg timeout extracting audio from {video_name}")
-        return None
-    except Exception as e:
+    except MediaProcessingError as e:
+        logger.warning(f"ffmpeg extraction failed for {video_name}: {e}")
+    except OSError as e:
         logger.error(f"Error extracting audio from video {video_name}: {e}")
-        return None
+    return None
 
 
-async def process_video_file(file_path: str) -> str:
+async def process_video_file(file_path: str, progress_callback: ProgressCallback | None = None) -> str:
     """Process video file for grading by transcribing audio track.
     
     Extracts audio track from video and transcribes it using Whisper.
@@ -1569,6 +1937,7 @@ async def process_video_file(file_path: str) -> str:
     
     Args:
         file_path: Path to the video file
+        progress_callback: Called with a MediaProgress while the audio is extracted
         
     Returns:
         Formatted string with video transcription or metadata
@@ -1583,18 +1952,15 @@ async def process_video_file(file_path: str) -> str:
     logger.info(f"Processing video file: {file_name} ({file_size:.2f} MB)")
 
     # Try to extract and transcribe audio track
-    audio_path = await extract_audio_from_video(file_path)
+    audio_path = await extract_audio_from_video(file_path, progress_callback=progress_callback)
 
     if audio_path:
         try:
             # Transcribe the extracted audio
             transcription = await transcribe_audio(audio_path)
 
-            # Clean up temp audio file
-            try:
-                os.unlink(audio_path)
-            except:
-                pass
+            # Clean up temp audio file (cached audio is kept for re-grading)
+            release_extracted_audio(audio_path)
 
             # Format for grading with video context
             duration_str = f"{transcription['duration']:.1f} seconds" if transcription.get('duration') else "unknown"
@@ -1617,11 +1983,7 @@ Please evaluate the content based on the transcribed narration/explanation."""
         except Exception as e:
             logger.error(f"Failed to transcribe video audio for {file_name}: {e}")
             # Clean up temp file on error
-            try:
-                if audio_path:
-                    os.unlink(audio_path)
-            except:
-                pass
+            release_extracted_audio(audio_path)
 
     # Fallback: Return metadata with manual review instruction
     formatted = f"""[VIDEO FILE: {file_name}]
@@ -7,7 +7,7 @@ This module provides debugging capabilities for OpenAI API calls, including:
 - Request/response payload capture
 - Decision notes for empty response diagnosis
 - Optional PII redaction
-- File-based logging to JSON files
+- Background, batched capture to compressed JSONL segments indexed by correlation ID
 
 Usage:
     from cqc_cpcc.utilities.AI.openai_debug import (
@@ -32,11 +32,13 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Optional
 
+from cqc_cpcc.utilities.AI.debug_writer import flush_debug_writer, get_debug_writer, read_debug_records
 from cqc_cpcc.utilities.env_constants import (
     CQC_OPENAI_DEBUG,
     CQC_OPENAI_DEBUG_REDACT,
     CQC_OPENAI_DEBUG_SAVE_DIR,
 )
+from cqc_cpcc.utilities.token_estimator import get_token_estimator
 
 # Dedicated logger for OpenAI debug
 debug_logger = logging.getLogger("openai.debug")
@@ -107,7 +109,10 @@ def _redact_sensitive_data(data: Any) -> Any:
 
 
 def _save_to_file(correlation_id: str, data_type: str, data: dict) -> None:
-    """Save debug data to JSON file.
+    """Queue debug data for the background segment writer.
+
+    Serialization, compression and disk I/O happen on the writer thread, so
+    this returns immediately (see debug_writer for the on-disk layout).
     
     Args:
         correlation_id: Correlation ID for this request
@@ -118,20 +123,8 @@ def _save_to_file(correlation_id: str, data_type: str, data: dict) -> None:
         return
 
     try:
-        # Create save directory if it doesn't exist
-        save_dir = Path(CQC_OPENAI_DEBUG_SAVE_DIR)
-        save_dir.mkdir(parents=True, exist_ok=True)
-
-        # Generate filename with timestamp and correlation ID
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{correlation_id}_{data_type}.json"
-        filepath = save_dir / filename
-
-        # Write JSON file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, default=str)
-
-        debug_logger.debug(f"Saved {data_type} data to {filepath}")
+        if not get_debug_writer(CQC_OPENAI_DEBUG_SAVE_DIR).submit(correlation_id, data_type, data):
+            debug_logger.warning(f"Debug writer queue full, dropped {data_type} data for {correlation_id}")
 
     except Exception as e:
         # Don't let file writing errors break the main flow
@@ -168,7 +161,8 @@ def record_request(
     try:
         # Estimate input tokens from messages
         total_chars = sum(len(str(msg.get("content", ""))) for msg in messages)
-        estimated_tokens = total_chars // 4  # Rough estimate: 4 chars per token
+        estimator = get_token_estimator()
+        estimated_tokens = sum(estimator.estimate(str(msg.get("content", ""))) for msg in messages)
 
         # Build request data
         request_data = {
@@ -267,6 +261,10 @@ def record_response(
                     "completion_tokens": response.usage.completion_tokens,
                     "total_tokens": response.usage.total_tokens,
                 }
+                cached_details = getattr(response.usage, 'prompt_tokens_details', None)
+                cached_tokens = getattr(cached_details, 'cached_tokens', None)
+                if isinstance(cached_tokens, int):
+                    response_data["usage"]["cached_tokens"] = cached_tokens
 
             # Add finish_reason and other choice metadata
             if hasattr(response, 'choices') and response.choices:
@@ -387,29 +385,24 @@ def get_debug_context(correlation_id: str) -> dict:
         if not save_dir.exists():
             return {}
 
-        # Find files matching this correlation ID
-        request_files = list(save_dir.glob(f"*_{correlation_id}_request.json"))
-        response_files = list(save_dir.glob(f"*_{correlation_id}_response.json"))
-        notes_files = list(save_dir.glob(f"*_{correlation_id}_notes.json"))
-
         context = {
             "correlation_id": correlation_id,
         }
 
-        # Load request data
-        if request_files:
-            with open(request_files[0], 'r', encoding='utf-8') as f:
-                context["request"] = json.load(f)
-
-        # Load response data
-        if response_files:
-            with open(response_files[0], 'r', encoding='utf-8') as f:
-                context["response"] = json.load(f)
-
-        # Load notes data
-        if notes_files:
-            with open(notes_files[0], 'r', encoding='utf-8') as f:
-                context["notes"] = json.load(f)
+        # Segment records (pending records are flushed first so fresh calls are visible)
+        flush_debug_writer(save_dir)
+        for record in read_debug_records(save_dir, correlation_id):
+            if record["data_type"] in ("request", "response", "notes"):
+                context.setdefault(record["data_type"], record["data"])
+
+        # Legacy per-file JSON captures from older versions
+        for data_type in ("request", "response", "notes"):
+            if data_type in context:
+                continue
+            legacy_files = list(save_dir.glob(f"*_{correlation_id}_{data_type}.json"))
+            if legacy_files:
+                with open(legacy_files[0], 'r', encoding='utf-8') as f:
+                    context[data_type] = json.load(f)
 
         return context
 
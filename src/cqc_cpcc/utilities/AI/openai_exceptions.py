@@ -97,3 +97,19 @@ class OpenAISchemaValidationError(Exception):
         if self.attempt_count:
             parts.append(f"(attempts: {self.attempt_count})")
         return " ".join(parts)
+
+
+class CircuitOpenError(OpenAITransportError):
+    """Exception raised when a call is short-circuited by an open circuit breaker.
+    
+    The provider (or model) has failed repeatedly, so the request is rejected
+    immediately instead of spending retries on it.
+    
+    Attributes:
+        circuit: Name of the open circuit (e.g., "openai" or "openai:gpt-5-mini")
+        retry_after: Seconds until the circuit allows a probe request
+    """
+
+    def __init__(self, circuit: str, retry_after: int | None = None):
+        self.circuit = circuit
+        super().__init__(f"Circuit '{circuit}' is open", retry_after=retry_after)
@@ -0,0 +1,327 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Disk-persisted OpenRouter model catalog with conditional refresh.
+
+fetch_openrouter_models downloads the full model list (several hundred
+entries) on every cold start, which delays the first render of the Grade
+Assignment page. The catalog keeps the last list on disk so the page can load
+it instantly, and refreshes it in a background thread with a conditional GET
+(If-None-Match / If-Modified-Since), so an unchanged list costs a 304.
+
+Indexes are built once per refresh so the model picker can filter without
+scanning the full list:
+- by provider (the part of the model ID before "/")
+- by context length (sorted, bisected for a minimum)
+- by prompt price in USD per 1M tokens (sorted, bisected for a maximum)
+
+Configuration (environment variables):
+- CQC_OPENROUTER_CATALOG_PATH: Catalog JSON file
+  (default: ~/.cache/cqc_cpcc/openrouter_models.json)
+- CQC_OPENROUTER_CATALOG_MAX_AGE_SECONDS: Age after which a refresh is started (default: 3600)
+
+Usage:
+    from cqc_cpcc.utilities.AI.openrouter_catalog import get_openrouter_catalog
+
+    catalog = get_openrouter_catalog()
+    catalog.refresh_in_background()
+    models = catalog.filter(provider="openai", min_context=128_000, max_prompt_price=1.0)
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+from cqc_cpcc.utilities.AI.openai_exceptions import OpenAITransportError
+from cqc_cpcc.utilities.AI.openrouter_client import OPENROUTER_MODELS_URL, _get_openrouter_api_key
+from cqc_cpcc.utilities.env_constants import (
+    CQC_OPENROUTER_CATALOG_MAX_AGE_SECONDS,
+    CQC_OPENROUTER_CATALOG_PATH,
+)
+from cqc_cpcc.utilities.logger import logger
+
+
+def get_model_provider_prefix(model_id: str) -> str:
+    """Provider part of an OpenRouter model ID ("openai/gpt-5" -> "openai")."""
+    return model_id.split("/", 1)[0] if "/" in model_id else ""
+
+
+def get_prompt_price_per_million(model: dict) -> Optional[float]:
+    """Prompt price in USD per 1M tokens, or None when unknown or variable.
+
+    Args:
+        model: OpenRouter model dict (pricing values are per-token strings)
+
+    Returns:
+        Price per 1M prompt tokens
+    """
+    try:
+        price = float((model.get("pricing") or {}).get("prompt"))
+    except (TypeError, ValueError):
+        return None
+    return price * 1_000_000 if price >= 0 else None
+
+
+class OpenRouterModelCatalog:
+    """OpenRouter model list persisted to disk and indexed for filtering."""
+
+    def __init__(
+            self,
+            path: Optional[Path] = None,
+            max_age_seconds: float = CQC_OPENROUTER_CATALOG_MAX_AGE_SECONDS,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+            clock=time.time,
+    ):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._transport = transport
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+        self._models: list[dict] = []
+        self._fetched_at = 0.0
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._by_id: dict[str, dict] = {}
+        self._by_provider: dict[str, list[str]] = {}
+        self._by_context: list[tuple[int, str]] = []
+        self._by_price: list[tuple[float, str]] = []
+
+        if path is not None:
+            self._load()
+
+    @property
+    def models(self) -> list[dict]:
+        """All models in the catalog (empty until the first successful fetch)."""
+        with self._lock:
+            return list(self._models)
+
+    @property
+    def fetched_at(self) -> float:
+        """Unix time the catalog was last confirmed fresh (0 if never)."""
+        return self._fetched_at
+
+    def get(self, model_id: str) -> Optional[dict]:
+        """Look up a model by ID."""
+        return self._by_id.get(model_id)
+
+    def providers(self) -> list[str]:
+        """Sorted provider names present in the catalog."""
+        with self._lock:
+            return sorted(self._by_provider)
+
+    def is_stale(self) -> bool:
+        """Check whether the catalog is empty or older than the max age."""
+        return not self._models or self._clock() - self._fetched_at >= self.max_age_seconds
+
+    def filter(
+            self,
+            provider: Optional[str] = None,
+            min_context: Optional[int] = None,
+            max_prompt_price: Optional[float] = None,
+    ) -> list[dict]:
+        """Models matching all given criteria, in catalog order.
+
+        Args:
+            provider: Provider prefix (e.g., "openai")
+            min_context: Minimum context length in tokens
+            max_prompt_price: Maximum prompt price in USD per 1M tokens
+
+        Returns:
+            List of model dicts
+        """
+        with self._lock:
+            candidates: Optional[set[str]] = None
+            if provider:
+                candidates = set(self._by_provider.get(provider, []))
+            if min_context:
+                start = bisect.bisect_left(self._by_context, (min_context, ""))
+                matching = {model_id for _, model_id in self._by_context[start:]}
+                candidates = matching if candidates is None else candidates & matching
+            if max_prompt_price is not None:
+                end = bisect.bisect_right(self._by_price, (max_prompt_price, "\uffff"))
+                matching = {model_id for _, model_id in self._by_price[:end]}
+                candidates = matching if candidates is None else candidates & matching
+
+            if candidates is None:
+                return list(self._models)
+            return [model for model in self._models if model.get("id") in candidates]
+
+    def _set_models(self, models: list[dict]) -> None:
+        by_id = {model["id"]: model for model in models if model.get("id")}
+        by_provider: dict[str, list[str]] = {}
+        by_context: list[tuple[int, str]] = []
+        by_price: list[tuple[float, str]] = []
+        for model_id, model in by_id.items():
+            by_provider.setdefault(get_model_provider_prefix(model_id), []).append(model_id)
+            context_length = model.get("context_length")
+            if isinstance(context_length, int):
+                by_context.append((context_length, model_id))
+            price = get_prompt_price_per_million(model)
+            if price is not None:
+                by_price.append((price, model_id))
+
+        with self._lock:
+            self._models = [model for model in models if model.get("id")]
+            self._by_id = by_id
+            self._by_provider = by_provider
+            self._by_context = sorted(by_context)
+            self._by_price = sorted(by_price)
+
+    async def refresh(self) -> bool:
+        """Refresh the catalog with a conditional GET.
+
+        Returns:
+            True if the model list changed, False if the server returned 304
+
+        Raises:
+            ValueError: If OPENROUTER_API_KEY is not set
+            OpenAITransportError: If the request fails
+        """
+        api_key = _get_openrouter_api_key()
+        if not api_key:
+            raise ValueError("OPENROUTER_API_KEY not set")
+
+        headers = {"Authorization": f"Bearer {api_key}"}
+        if self._models:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+            elif self._fetched_at:
+                headers["If-Modified-Since"] = formatdate(self._fetched_at, usegmt=True)
+
+        try:
+            async with httpx.AsyncClient(transport=self._transport) as client:
+                response = await client.get(OPENROUTER_MODELS_URL, headers=headers, timeout=30.0)
+                if response.status_code == 304:
+                    self._fetched_at = self._clock()
+                    self.save()
+                    logger.debug("OpenRouter model catalog unchanged (304)")
+                    return False
+                response.raise_for_status()
+                models = response.json().get("data", [])
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to refresh OpenRouter model catalog: {e}")
+            raise OpenAITransportError(f"Failed to fetch OpenRouter models: {e}")
+
+        self._set_models(models)
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        self._fetched_at = self._clock()
+        self.save()
+        logger.info(f"Refreshed OpenRouter model catalog ({len(self._models)} models)")
+        return True
+
+    def refresh_in_background(self, force: bool = False) -> bool:
+        """Start a refresh in a daemon thread if the catalog is stale.
+
+        Args:
+            force: Refresh even if the catalog is fresh
+
+        Returns:
+            True if a refresh was started
+        """
+        if not force and not self.is_stale():
+            return False
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_quietly, name="openrouter-catalog-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+        return True
+
+    def wait_for_refresh(self, timeout: Optional[float] = None) -> None:
+        """Block until a background refresh (if any) finishes."""
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _refresh_quietly(self) -> None:
+        try:
+            asyncio.run(self.refresh())
+        except Exception as e:
+            logger.warning(f"Background OpenRouter catalog refresh failed: {e}")
+
+    def save(self) -> None:
+        """Persist the catalog to disk (atomic replace)."""
+        if self.path is None:
+            return
+        data = {
+            "fetched_at": self._fetched_at,
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+            "models": self.models,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save OpenRouter model catalog to {self.path}: {e}")
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            models = data["models"]
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable OpenRouter model catalog {self.path}: {e}")
+            return
+
+        self._set_models(models)
+        self._fetched_at = float(data.get("fetched_at") or 0.0)
+        self._etag = data.get("etag")
+        self._last_modified = data.get("last_modified")
+
+    def snapshot(self) -> dict[str, Any]:
+        """Catalog status for monitoring."""
+        return {
+            "models": len(self._models),
+            "providers": len(self._by_provider),
+            "fetched_at": self._fetched_at,
+            "stale": self.is_stale(),
+        }
+
+
+def _default_catalog_path() -> Path:
+    if CQC_OPENROUTER_CATALOG_PATH:
+        return Path(CQC_OPENROUTER_CATALOG_PATH)
+    return Path.home() / ".cache" / "cqc_cpcc" / "openrouter_models.json"
+
+
+_catalog: OpenRouterModelCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def get_openrouter_catalog() -> OpenRouterModelCatalog:
+    """Get or create the process-wide catalog, loaded from disk.
+
+    Returns:
+        Shared OpenRouterModelCatalog instance
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = OpenRouterModelCatalog(path=_default_catalog_path())
+    return _catalog
+
+
+def set_openrouter_catalog(catalog: OpenRouterModelCatalog | None) -> None:
+    """Replace the shared catalog (None reloads it from disk on next use; for tests)."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = catalog
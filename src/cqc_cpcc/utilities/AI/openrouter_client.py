@@ -38,10 +38,20 @@ Example usage:
 import asyncio
 import json
 import os
+import weakref
 from typing import Optional, Type, TypeVar
 
 import httpx
-from cqc_cpcc.utilities.AI.openai_client import _normalize_fallback_json
+from cqc_cpcc.utilities.AI.circuit_breaker import circuit_guard
+from cqc_cpcc.utilities.AI.concurrency_limiter import get_concurrency_limiter
+from cqc_cpcc.utilities.AI.hedging import get_request_hedger, is_hedging_enabled, track_in_flight
+from cqc_cpcc.utilities.AI.http_client import create_async_http_client, get_http_timeout
+from cqc_cpcc.utilities.AI.llm_metrics import get_metrics_registry
+from cqc_cpcc.utilities.AI.openai_client import (
+    _normalize_fallback_json,
+    estimate_prompt_tokens,
+    record_prompt_cache_usage,
+)
 from cqc_cpcc.utilities.AI.openai_debug import (
     create_correlation_id,
     record_request,
@@ -49,10 +59,12 @@ from cqc_cpcc.utilities.AI.openai_debug import (
     should_debug,
 )
 from cqc_cpcc.utilities.AI.openai_exceptions import (
+    CircuitOpenError,
     OpenAISchemaValidationError,
     OpenAITransportError,
 )
-from cqc_cpcc.utilities.AI.schema_normalizer import normalize_json_schema_for_openai
+from cqc_cpcc.utilities.AI.rate_scheduler import get_rate_scheduler
+from cqc_cpcc.utilities.AI.schema_registry import get_compiled_schema
 from cqc_cpcc.utilities.env_constants import (
     OPENROUTER_ALLOWED_MODELS as DEFAULT_OPENROUTER_ALLOWED_MODELS,
     OPENROUTER_API_KEY as DEFAULT_OPENROUTER_API_KEY,
@@ -89,12 +101,23 @@ def _get_openrouter_allowed_models_raw() -> str | None:
     return os.getenv("OPENROUTER_ALLOWED_MODELS") or OPENROUTER_ALLOWED_MODELS
 
 
+# One client per event loop: pooled connections belong to the loop that opened them
+_openrouter_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[str, AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+# Close tasks for replaced clients (held so they are not garbage collected before finishing)
+_closing_clients: set[asyncio.Task] = set()
+
+
 def _get_openrouter_client() -> AsyncOpenAI:
     """Get configured AsyncOpenAI client pointing to OpenRouter API.
 
     OpenRouter provides an OpenAI-compatible API endpoint at https://openrouter.ai/api/v1
     We use AsyncOpenAI with this endpoint to access OpenRouter's models.
 
+    The client is reused for all calls on the running event loop so its
+    connection pool (configured by http_client) stays warm across requests.
+
     Returns:
         Configured AsyncOpenAI client with OpenRouter base URL
 
@@ -108,16 +131,43 @@ def _get_openrouter_client() -> AsyncOpenAI:
             "Please set it in your .streamlit/secrets.toml or environment."
         )
 
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    cached = _openrouter_clients.get(loop) if loop is not None else None
+    if cached is not None and cached[0] == api_key:
+        return cached[1]
+
     # Use AsyncOpenAI with OpenRouter's base URL
     # OpenRouter provides OpenAI-compatible API at https://openrouter.ai/api/v1
-    return AsyncOpenAI(
+    client = AsyncOpenAI(
         api_key=api_key,
         base_url="https://openrouter.ai/api/v1",
         default_headers={
             "X-Title": OPENROUTER_APP_NAME,
             "HTTP-Referer": OPENROUTER_APP_URL,
         },
+        http_client=create_async_http_client(),
+        timeout=get_http_timeout(),
     )
+    if loop is not None:
+        _openrouter_clients[loop] = (api_key, client)
+        if cached is not None:
+            # API key changed: release the replaced client's connections
+            task = loop.create_task(cached[1].close())
+            _closing_clients.add(task)
+            task.add_done_callback(_closing_clients.discard)
+    return client
+
+
+async def close_openrouter_client() -> None:
+    """Close the running event loop's OpenRouter client and release its connections."""
+    cached = _openrouter_clients.pop(asyncio.get_running_loop(), None)
+    if cached is not None:
+        await cached[1].close()
+        logger.info("Closed OpenRouter client")
 
 
 async def fetch_openrouter_models() -> list[dict]:
@@ -235,6 +285,7 @@ async def get_openrouter_completion(
         model_name: Optional[str] = None,
         max_tokens: Optional[int] = None,
         max_retries: int = DEFAULT_MAX_RETRIES,
+        hedge: Optional[bool] = None,
 ) -> T:
     """Get structured completion from OpenRouter using OpenAI-compatible API.
 
@@ -250,6 +301,9 @@ async def get_openrouter_completion(
         model_name: Specific model to use (required if use_auto_route=False)
         max_tokens: Maximum tokens in response (optional)
         max_retries: Maximum number of retry attempts (default: 2)
+        hedge: Hedge slow requests after the model's observed p95 latency.
+               None (default) follows CQC_AI_HEDGING. A hedge to a configured
+               fallback model is sent with auto-routing disabled.
         
     Returns:
         Validated Pydantic model instance
@@ -275,16 +329,26 @@ async def get_openrouter_completion(
     # Use auto-routing model ID if enabled
     effective_model = "openrouter/auto" if use_auto_route else model_name
 
-    # Generate and normalize schema
-    raw_schema = schema_model.model_json_schema()
-    normalized_schema = normalize_json_schema_for_openai(raw_schema)
+    # Tail-latency hedging: re-enter once per request with hedging disabled
+    if hedge is None:
+        hedge = is_hedging_enabled()
+    if hedge:
+        return await get_request_hedger().run(
+            effective_model,
+            lambda model, is_hedge: get_openrouter_completion(
+                prompt=prompt,
+                schema_model=schema_model,
+                use_auto_route=use_auto_route and model == effective_model,
+                model_name=model_name if model == effective_model else model,
+                max_tokens=max_tokens,
+                max_retries=max_retries,
+                hedge=False,
+            ),
+            reports_in_flight=True,
+        )
 
-    # Build response format for OpenAI compatible API
-    json_schema = {
-        "name": schema_model.__name__,
-        "schema": normalized_schema,
-        "strict": True,
-    }
+    # Normalized schema and response format (compiled once per schema model)
+    compiled_schema = get_compiled_schema(schema_model)
 
     client = _get_openrouter_client()
 
@@ -300,15 +364,14 @@ async def get_openrouter_completion(
     last_error = None
 
     for attempt in range(max_retries):
+        if attempt > 0:
+            get_metrics_registry().increment("retries", "openrouter_completion", effective_model)
         try:
             # Build API call parameters for OpenAI-compatible endpoint
             api_kwargs = {
                 "model": effective_model,
                 "messages": [{"role": "user", "content": prompt}],
-                "response_format": {
-                    "type": "json_schema",
-                    "json_schema": json_schema,
-                },
+                "response_format": compiled_schema.response_format,
             }
 
             # Add optional parameters
@@ -344,7 +407,33 @@ async def get_openrouter_completion(
                 )
 
             # Call OpenRouter API using OpenAI-compatible client
-            response = await client.chat.completions.create(**api_kwargs)
+            # Fail fast while the provider or model circuit is open
+            async with circuit_guard("openrouter", effective_model):
+                async with get_concurrency_limiter("openrouter").slot():
+                    # Wait for per-model TPM/RPM budget once the request is about to be sent
+                    reservation = await get_rate_scheduler().reserve(
+                        effective_model,
+                        prompt_tokens=estimate_prompt_tokens(prompt),
+                        output_tokens=max_tokens,
+                    )
+                    response = None
+                    try:
+                        with get_metrics_registry().track_request("openrouter_completion", effective_model), \
+                                track_in_flight():
+                            response = await client.chat.completions.create(**api_kwargs)
+                    finally:
+                        # Failed or cancelled calls must not keep holding TPM budget
+                        if response is None:
+                            get_rate_scheduler().refund(reservation)
+                        else:
+                            get_rate_scheduler().settle(
+                                reservation, getattr(getattr(response, "usage", None), "total_tokens", None)
+                            )
+
+            record_prompt_cache_usage(effective_model, getattr(response, "usage", None))
+            get_metrics_registry().record_usage(
+                "openrouter_completion", effective_model, getattr(response, "usage", None)
+            )
 
             # Extract and validate response
             if not response.choices:
@@ -399,7 +488,7 @@ async def get_openrouter_completion(
 
             # Validate against Pydantic schema
             try:
-                result = schema_model.model_validate(parsed_data)
+                result = compiled_schema.type_adapter.validate_python(parsed_data)
             except ValidationError as e:
                 error_msg = f"Response doesn't match schema {schema_model.__name__}: {e}"
                 if correlation_id:
@@ -447,6 +536,10 @@ async def get_openrouter_completion(
             logger.error(f"Schema validation error (not retrying): {e}")
             raise
 
+        except CircuitOpenError:
+            # Provider/model is known to be down, retrying would only wait
+            raise
+
         except OpenAITransportError as e:
             last_error = e
             logger.warning(
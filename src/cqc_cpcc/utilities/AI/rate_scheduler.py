@@ -0,0 +1,309 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Per-model token-bucket scheduler for TPM/RPM account limits.
+
+Provider limits are expressed per model as tokens per minute (TPM) and
+requests per minute (RPM). The retry loop in get_structured_completion only
+reacts after a 429 has already been returned. This scheduler checks each
+request against per-model token buckets *before* it is sent, so large grading
+batches can run close to the account limit without tripping it.
+
+How it works:
+- Each configured model gets two buckets: one for tokens, one for requests.
+  Buckets refill continuously at limit/60 per second, up to the full limit.
+- reserve() estimates the request cost (prompt estimate + expected output),
+  waits until both buckets can cover it, then deducts it.
+- settle() corrects the token bucket once the real usage is known, refunding
+  over-estimates and charging under-estimates. refund() returns the reserved
+  tokens when the call fails or is cancelled without a response.
+- Callers reserve after taking a concurrency slot, so budget is only deducted
+  for requests that are about to be sent.
+- Models without configured limits are never delayed.
+
+Configuration (environment variables):
+- CQC_AI_MODEL_RATE_LIMITS: JSON mapping model ID to limits, e.g.
+  '{"gpt-5-mini": {"tpm": 2000000, "rpm": 5000}, "default": {"tpm": 200000, "rpm": 500}}'
+  The "default" entry applies to models without their own entry.
+- CQC_AI_EXPECTED_OUTPUT_TOKENS: Output tokens assumed when max_tokens is not
+  set (default: 2048)
+
+Usage:
+    from cqc_cpcc.utilities.AI.rate_scheduler import get_rate_scheduler
+
+    scheduler = get_rate_scheduler()
+    reservation = await scheduler.reserve("gpt-5-mini", prompt_tokens=1200, output_tokens=2048)
+    response = None
+    try:
+        response = await client.chat.completions.create(...)
+    finally:
+        if response is None:
+            scheduler.refund(reservation)
+        else:
+            scheduler.settle(reservation, actual_tokens=response.usage.total_tokens)
+"""
+
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_EXPECTED_OUTPUT_TOKENS,
+    CQC_AI_MODEL_RATE_LIMITS,
+)
+from cqc_cpcc.utilities.logger import logger
+
+DEFAULT_LIMITS_KEY = "default"
+
+
+@dataclass(frozen=True)
+class ModelRateLimits:
+    """Account limits for one model.
+
+    Attributes:
+        tpm: Tokens per minute (None = unlimited)
+        rpm: Requests per minute (None = unlimited)
+    """
+    tpm: Optional[int] = None
+    rpm: Optional[int] = None
+
+
+@dataclass
+class Reservation:
+    """Capacity deducted for one request.
+
+    Attributes:
+        model: Model ID the reservation was made against
+        tokens: Tokens deducted from the token bucket
+    """
+    model: str
+    tokens: int
+
+
+class TokenBucket:
+    """Continuously refilling token bucket (not thread-safe on its own)."""
+
+    def __init__(self, capacity: float, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.refill_per_second = self.capacity / 60.0
+        self._clock = clock
+        self._available = self.capacity
+        self._last_refill = clock()
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._available
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._available = min(self.capacity, self._available + elapsed * self.refill_per_second)
+            self._last_refill = now
+
+    def seconds_until(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)."""
+        self._refill()
+        deficit = amount - self._available
+        if deficit <= 0:
+            return 0.0
+        return deficit / self.refill_per_second
+
+    def take(self, amount: float) -> None:
+        """Deduct `amount` (may go negative when settling under-estimates)."""
+        self._refill()
+        self._available -= amount
+
+    def give(self, amount: float) -> None:
+        """Return `amount` to the bucket (capped at capacity)."""
+        self._refill()
+        self._available = min(self.capacity, self._available + amount)
+
+
+def parse_model_rate_limits(raw: str | dict | None) -> dict[str, ModelRateLimits]:
+    """Parse the CQC_AI_MODEL_RATE_LIMITS setting.
+
+    Args:
+        raw: JSON string or already-parsed dict mapping model ID to {"tpm", "rpm"}
+
+    Returns:
+        Dict of model ID to ModelRateLimits (invalid entries are skipped)
+    """
+    if not raw:
+        return {}
+
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid CQC_AI_MODEL_RATE_LIMITS JSON, ignoring: {e}")
+            return {}
+
+    if not isinstance(raw, dict):
+        logger.error("CQC_AI_MODEL_RATE_LIMITS must be a JSON object, ignoring")
+        return {}
+
+    limits = {}
+    for model, entry in raw.items():
+        if not isinstance(entry, dict):
+            logger.warning(f"Skipping rate limits for {model}: expected object, got {type(entry).__name__}")
+            continue
+        tpm = entry.get("tpm")
+        rpm = entry.get("rpm")
+        limits[model] = ModelRateLimits(
+            tpm=int(tpm) if tpm else None,
+            rpm=int(rpm) if rpm else None,
+        )
+    return limits
+
+
+class RateScheduler:
+    """Schedules requests against per-model TPM/RPM token buckets."""
+
+    def __init__(self, limits: dict[str, ModelRateLimits], clock=time.monotonic):
+        self.limits = limits
+        self._clock = clock
+        self._token_buckets: dict[str, TokenBucket] = {}
+        self._request_buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def limits_for(self, model: str) -> Optional[ModelRateLimits]:
+        """Return the configured limits for a model (or the default entry)."""
+        return self.limits.get(model) or self.limits.get(DEFAULT_LIMITS_KEY)
+
+    def _buckets_for(self, model: str) -> tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        limits = self.limits_for(model)
+        if limits is None:
+            return None, None
+
+        if model not in self._token_buckets:
+            self._token_buckets[model] = TokenBucket(limits.tpm, self._clock) if limits.tpm else None
+            self._request_buckets[model] = TokenBucket(limits.rpm, self._clock) if limits.rpm else None
+        return self._token_buckets[model], self._request_buckets[model]
+
+    def try_reserve(self, model: str, tokens: int) -> tuple[Optional[Reservation], float]:
+        """Reserve capacity without waiting.
+
+        Args:
+            model: Model ID
+            tokens: Estimated total tokens (prompt + output)
+
+        Returns:
+            (reservation, 0.0) on success, or (None, seconds_to_wait)
+        """
+        with self._lock:
+            token_bucket, request_bucket = self._buckets_for(model)
+            if token_bucket is None and request_bucket is None:
+                return Reservation(model=model, tokens=0), 0.0
+
+            # A single request larger than the whole bucket would never fit
+            cost = min(tokens, int(token_bucket.capacity)) if token_bucket else 0
+
+            wait = max(
+                token_bucket.seconds_until(cost) if token_bucket else 0.0,
+                request_bucket.seconds_until(1) if request_bucket else 0.0,
+            )
+            if wait > 0:
+                return None, wait
+
+            if token_bucket:
+                token_bucket.take(cost)
+            if request_bucket:
+                request_bucket.take(1)
+            return Reservation(model=model, tokens=cost), 0.0
+
+    async def reserve(self, model: str, prompt_tokens: int, output_tokens: int | None = None) -> Reservation:
+        """Wait until the model's buckets can cover the request, then deduct it.
+
+        Args:
+            model: Model ID
+            prompt_tokens: Estimated prompt tokens
+            output_tokens: Expected output tokens (default: CQC_AI_EXPECTED_OUTPUT_TOKENS)
+
+        Returns:
+            Reservation to pass to settle() once usage is known
+        """
+        if output_tokens is None:
+            output_tokens = CQC_AI_EXPECTED_OUTPUT_TOKENS
+        tokens = max(0, int(prompt_tokens)) + max(0, int(output_tokens))
+
+        while True:
+            reservation, wait = self.try_reserve(model, tokens)
+            if reservation is not None:
+                return reservation
+            logger.debug(f"Rate scheduler delaying {model} request ({tokens} tokens) by {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    def settle(self, reservation: Reservation, actual_tokens: Any) -> None:
+        """Correct the token bucket with the real usage.
+
+        Args:
+            reservation: Reservation returned by reserve()
+            actual_tokens: usage.total_tokens from the response. Ignored when
+                           not an integer (e.g., usage missing).
+        """
+        if not isinstance(actual_tokens, int) or isinstance(actual_tokens, bool) or reservation.tokens == 0:
+            return
+
+        with self._lock:
+            token_bucket, _ = self._buckets_for(reservation.model)
+            if token_bucket is None:
+                return
+            difference = actual_tokens - reservation.tokens
+            if difference > 0:
+                token_bucket.take(difference)
+            elif difference < 0:
+                token_bucket.give(-difference)
+
+    def refund(self, reservation: Reservation) -> None:
+        """Return a reservation's tokens when the call produced no usage.
+
+        The request slot is kept: a failed request may still have counted
+        against the provider's RPM limit.
+
+        Args:
+            reservation: Reservation returned by reserve()
+        """
+        if reservation.tokens == 0:
+            return
+
+        with self._lock:
+            token_bucket, _ = self._buckets_for(reservation.model)
+            if token_bucket is not None:
+                token_bucket.give(reservation.tokens)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return available capacity per model that has been used so far."""
+        with self._lock:
+            result = {}
+            for model, token_bucket in self._token_buckets.items():
+                request_bucket = self._request_buckets.get(model)
+                result[model] = {
+                    "tokens_available": int(token_bucket.available) if token_bucket else None,
+                    "tpm": int(token_bucket.capacity) if token_bucket else None,
+                    "requests_available": int(request_bucket.available) if request_bucket else None,
+                    "rpm": int(request_bucket.capacity) if request_bucket else None,
+                }
+            return result
+
+
+# Global scheduler instance (lazily created)
+_rate_scheduler: RateScheduler | None = None
+_rate_scheduler_lock = threading.Lock()
+
+
+def get_rate_scheduler() -> RateScheduler:
+    """Get or create the process-wide RateScheduler configured from env.
+
+    Returns:
+        Shared RateScheduler instance
+    """
+    global _rate_scheduler
+    if _rate_scheduler is None:
+        with _rate_scheduler_lock:
+            if _rate_scheduler is None:
+                _rate_scheduler = RateScheduler(parse_model_rate_limits(CQC_AI_MODEL_RATE_LIMITS))
+    return _rate_scheduler
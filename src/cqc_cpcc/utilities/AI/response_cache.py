@@ -0,0 +1,316 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Persistent content-addressed cache for structured LLM completions.
+
+Re-running a grading page with identical inputs (same ZIP, same rubric, same
+model) sends every student back through get_structured_completion(). This
+module stores validated responses on disk so identical requests return in
+milliseconds, across Streamlit reruns, processes and server restarts.
+
+Design:
+- Content-addressed: the key is a SHA-256 over the prompt, model, schema name,
+  normalized JSON schema and sampling parameters. Any change to any of these
+  produces a different key, so stale results are never served for new inputs.
+- SQLite storage: a single file with WAL journaling, safe for concurrent
+  readers/writers across processes.
+- Size-bounded LRU eviction: least recently accessed entries are removed once
+  the total payload size exceeds the configured limit.
+- TTL: entries older than the configured time-to-live are treated as misses
+  and purged.
+
+Configuration (environment variables):
+- CQC_AI_RESPONSE_CACHE: Enable the cache (default: False)
+- CQC_AI_RESPONSE_CACHE_DIR: Directory for the cache database
+  (default: ~/.cache/cqc_cpcc)
+- CQC_AI_RESPONSE_CACHE_MAX_MB: Maximum total payload size in MB (default: 256)
+- CQC_AI_RESPONSE_CACHE_TTL_SECONDS: Entry lifetime in seconds (default: 7 days)
+
+Usage:
+    from cqc_cpcc.utilities.AI.response_cache import build_cache_key, get_response_cache
+
+    cache = get_response_cache()
+    key = build_cache_key(prompt, model, "Feedback", normalized_schema, {"temperature": 0.2})
+    cached = cache.get(key)
+    if cached is None:
+        ...  # call the API
+        cache.set(key, payload_json, model=model, schema_name="Feedback")
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_RESPONSE_CACHE,
+    CQC_AI_RESPONSE_CACHE_DIR,
+    CQC_AI_RESPONSE_CACHE_MAX_MB,
+    CQC_AI_RESPONSE_CACHE_TTL_SECONDS,
+)
+from cqc_cpcc.utilities.logger import logger
+
+# Bump when the key derivation or stored payload format changes
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_FILENAME = "ai_response_cache.sqlite3"
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    schema_name TEXT,
+    payload TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_accessed ON responses (last_accessed);
+"""
+
+
+def is_cache_enabled() -> bool:
+    """Check if the persistent response cache is enabled.
+
+    Returns:
+        True if CQC_AI_RESPONSE_CACHE is enabled, False otherwise
+    """
+    return CQC_AI_RESPONSE_CACHE
+
+
+def build_cache_key(
+        prompt: str,
+        model: str,
+        schema_name: str,
+        normalized_schema: dict,
+        sampling_params: Optional[dict[str, Any]] = None,
+) -> str:
+    """Build a deterministic content-addressed cache key.
+
+    The key is derived from canonical JSON (sorted keys, no whitespace) so
+    that dict ordering never changes the hash.
+
+    Args:
+        prompt: Full prompt text sent to the model
+        model: Model identifier
+        schema_name: Name of the Pydantic schema model
+        normalized_schema: Normalized JSON schema sent in response_format
+        sampling_params: Sampling parameters (temperature, token limits, ...)
+
+    Returns:
+        SHA-256 hex digest (64 characters)
+    """
+    material = {
+        "v": CACHE_FORMAT_VERSION,
+        "prompt": prompt,
+        "model": model,
+        "schema_name": schema_name,
+        "schema": normalized_schema,
+        "sampling": sampling_params or {},
+    }
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache with LRU eviction and TTL.
+
+    Each operation opens a short-lived connection so the cache can be shared
+    safely between threads and processes.
+
+    Attributes:
+        db_path: Path to the SQLite database file
+        max_bytes: Maximum total payload size before LRU eviction
+        ttl_seconds: Entry lifetime in seconds (<= 0 disables expiry)
+    """
+
+    def __init__(self, db_path: str | Path, max_bytes: int, ttl_seconds: float):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=10.0)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA_SQL)
+            self._initialized = True
+        return conn
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and (now - created_at) > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached payload.
+
+        Args:
+            key: Cache key from build_cache_key()
+
+        Returns:
+            Cached payload string, or None on miss/expiry/error
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is None:
+                        return None
+
+                    payload, created_at = row
+                    now = time.time()
+                    if self._is_expired(created_at, now):
+                        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        conn.commit()
+                        return None
+
+                    conn.execute(
+                        "UPDATE responses SET last_accessed = ?, hits = hits + 1 WHERE key = ?",
+                        (now, key),
+                    )
+                    conn.commit()
+                    return payload
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            # Cache failures must never break grading
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def set(self, key: str, payload: str, model: str = "", schema_name: str = "") -> None:
+        """Store a payload and evict least recently used entries if over budget.
+
+        Args:
+            key: Cache key from build_cache_key()
+            payload: Serialized response (JSON string)
+            model: Model identifier (informational)
+            schema_name: Schema name (informational)
+        """
+        size_bytes = len(payload.encode("utf-8"))
+        if size_bytes > self.max_bytes:
+            logger.debug(f"Response too large to cache ({size_bytes} bytes > {self.max_bytes} limit)")
+            return
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    now = time.time()
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses "
+                        "(key, model, schema_name, payload, size_bytes, created_at, last_accessed, hits) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                        (key, model, schema_name, payload, size_bytes, now, now),
+                    )
+                    self._evict(conn, now)
+                    conn.commit()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Remove expired entries, then LRU entries until under max_bytes."""
+        if self.ttl_seconds > 0:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        (total_bytes,) = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM responses").fetchone()
+        if total_bytes <= self.max_bytes:
+            return
+
+        evicted = 0
+        rows = conn.execute("SELECT key, size_bytes FROM responses ORDER BY last_accessed ASC").fetchall()
+        for key, size_bytes in rows:
+            if total_bytes <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total_bytes -= size_bytes
+            evicted += 1
+
+        logger.debug(f"Response cache evicted {evicted} LRU entries (now {total_bytes} bytes)")
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute("DELETE FROM responses")
+                    conn.commit()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache clear failed: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        """Return entry count, total size and cumulative hits.
+
+        Returns:
+            Dict with keys: entries, total_bytes, max_bytes, hits, ttl_seconds
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    entries, total_bytes, hits = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), COALESCE(SUM(hits), 0) FROM responses"
+                    ).fetchone()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache stats failed: {e}")
+            entries, total_bytes, hits = 0, 0, 0
+
+        return {
+            "entries": entries,
+            "total_bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# Global cache instance (lazily created)
+_response_cache: ResponseCache | None = None
+_response_cache_lock = threading.Lock()
+
+
+def _default_cache_dir() -> Path:
+    if CQC_AI_RESPONSE_CACHE_DIR:
+        return Path(CQC_AI_RESPONSE_CACHE_DIR)
+    return Path.home() / ".cache" / "cqc_cpcc"
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the process-wide ResponseCache instance.
+
+    Returns:
+        ResponseCache configured from environment constants
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    db_path=_default_cache_dir() / DEFAULT_CACHE_FILENAME,
+                    max_bytes=int(CQC_AI_RESPONSE_CACHE_MAX_MB * 1024 * 1024),
+                    ttl_seconds=CQC_AI_RESPONSE_CACHE_TTL_SECONDS,
+                )
+                logger.info(f"Initialized AI response cache at {_response_cache.db_path}")
+    return _response_cache
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    """Replace the process-wide cache (None recreates it from env on next use; for tests)."""
+    global _response_cache
+    with _response_cache_lock:
+        _response_cache = cache
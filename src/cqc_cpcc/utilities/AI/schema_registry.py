@@ -0,0 +1,252 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Compiled schema registry for structured LLM outputs.
+
+Generating and normalizing a JSON schema for a large model such as
+RubricAssessmentResult means a full model_json_schema() pass plus a deep copy
+and recursive walk in normalize_json_schema_for_openai(). Doing that on every
+request (and rebuilding the fallback prompt description on every retry) is
+wasted work, because the schema of a Pydantic class never changes during the
+process lifetime.
+
+This module compiles each schema model once and caches the result:
+- normalized_schema: OpenAI strict-mode compatible JSON schema
+- json_schema: the {"name", "schema", "strict"} payload
+- response_format: the full response_format argument for chat completions
+- fallback_prompt_suffix: plain-JSON field requirements used by smart retry
+- schema_tokens: estimated prompt tokens the schema adds to a strict request
+- type_adapter: cached pydantic TypeAdapter for validation
+
+Usage:
+    from cqc_cpcc.utilities.AI.schema_registry import get_compiled_schema, warm_up_schemas
+
+    # At page startup (optional - compilation otherwise happens on first use)
+    warm_up_schemas(RubricAssessmentResult)
+
+    compiled = get_compiled_schema(RubricAssessmentResult)
+    response_format = compiled.response_format
+    result = compiled.type_adapter.validate_json(raw_output)
+
+Note:
+    Compiled payloads are shared between callers. Treat them as read-only.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+from cqc_cpcc.utilities.AI.schema_normalizer import normalize_json_schema_for_openai
+from cqc_cpcc.utilities.logger import logger
+from cqc_cpcc.utilities.token_estimator import count_raw_tokens
+
+
+@dataclass(frozen=True)
+class CompiledSchema:
+    """Precomputed artifacts for a Pydantic schema model.
+
+    Attributes:
+        name: Schema name (the model class name)
+        schema_model: The Pydantic model class
+        raw_schema: Output of schema_model.model_json_schema()
+        normalized_schema: Schema normalized for OpenAI strict mode
+        json_schema: {"name", "schema", "strict"} payload for response_format
+        response_format: Full response_format payload for chat completions
+        fallback_prompt_suffix: Text appended to prompts for plain-JSON fallback
+        type_adapter: Cached TypeAdapter for the model
+        schema_tokens: Estimated prompt tokens usage.prompt_tokens includes for json_schema
+    """
+    name: str
+    schema_model: Type[BaseModel]
+    raw_schema: dict[str, Any]
+    normalized_schema: dict[str, Any]
+    json_schema: dict[str, Any]
+    response_format: dict[str, Any]
+    fallback_prompt_suffix: str
+    type_adapter: TypeAdapter
+    schema_tokens: int
+
+
+def _describe_type(field_info: dict) -> str:
+    """Describe a JSON schema field type for the fallback prompt."""
+    field_type = field_info.get("type", "any")
+
+    if field_type == "array":
+        items = field_info.get("items", {})
+        if "$ref" in items:
+            # Reference to another model
+            ref_name = items["$ref"].split("/")[-1]
+            return f"array of {ref_name} objects"
+        elif items.get("type") == "object":
+            return "array of objects"
+        else:
+            return f"array of {items.get('type', 'any')}"
+    elif field_type == "object":
+        additional_props = field_info.get("additionalProperties")
+        if additional_props:
+            if isinstance(additional_props, dict):
+                value_type = additional_props.get("type", "any")
+                return f"object (dict with {value_type} values)"
+            return "object (dict)"
+        return "object"
+    else:
+        return field_type
+
+
+def build_fallback_prompt_suffix(schema_name: str, schema: dict[str, Any]) -> str:
+    """Build the plain-JSON format requirements appended by smart retry.
+
+    Args:
+        schema_name: Name of the schema model
+        schema: Raw JSON schema from model_json_schema()
+
+    Returns:
+        Suffix text (starts with a blank line) describing exact field names and types
+    """
+    # Build field requirements from top-level properties
+    properties = schema.get("properties", {})
+    required = schema.get("required", [])
+
+    field_descriptions = []
+    field_descriptions.append(f"Schema: {schema_name}")
+    field_descriptions.append("")
+    field_descriptions.append("CRITICAL - Use these EXACT field names and types:")
+
+    for field_name, field_info in properties.items():
+        field_type_desc = _describe_type(field_info)
+        description = field_info.get("description", "")
+        required_marker = " [REQUIRED]" if field_name in required else " [optional]"
+
+        # Add special notes for nested structures
+        if field_name == "criteria_results":
+            field_descriptions.append(
+                f"  • {field_name}: {field_type_desc}{required_marker}"
+            )
+            field_descriptions.append("    Each criterion result MUST have:")
+            field_descriptions.append("      - criterion_id (string) - NOT rubric_criterion_id")
+            field_descriptions.append("      - criterion_name (string) - NOT criterion_title")
+            field_descriptions.append("      - points_possible (integer)")
+            field_descriptions.append("      - points_earned (integer)")
+            field_descriptions.append("      - selected_level_label (string or null)")
+            field_descriptions.append("      - feedback (string)")
+            field_descriptions.append("      - evidence (array of strings or null)")
+        elif field_name == "detected_errors":
+            field_descriptions.append(
+                f"  • {field_name}: {field_type_desc}{required_marker} - MUST be JSON array, NOT string"
+            )
+        elif field_name in ["error_counts_by_severity", "error_counts_by_id"]:
+            field_descriptions.append(
+                f"  • {field_name}: {field_type_desc}{required_marker} - MUST be JSON object with integer values, NOT string"
+            )
+        else:
+            field_descriptions.append(
+                f"  • {field_name}: {field_type_desc}{required_marker} - {description}"
+            )
+
+    fields_text = "\n".join(field_descriptions)
+
+    return f"""
+
+IMPORTANT - Response Format Requirements:
+{fields_text}
+
+Return ONLY valid JSON (no markdown, no code blocks, no explanations).
+All arrays must be JSON arrays: [...], NOT strings containing JSON.
+All objects must be JSON objects: {{"key": "value"}}, NOT strings containing JSON.
+All integer fields must be integers: 42, NOT strings: "42".
+"""
+
+
+def compile_schema(schema_model: Type[BaseModel]) -> CompiledSchema:
+    """Compile a Pydantic model into a CompiledSchema (uncached).
+
+    Args:
+        schema_model: Pydantic BaseModel class
+
+    Returns:
+        CompiledSchema with all precomputed artifacts
+    """
+    name = schema_model.__name__
+    raw_schema = schema_model.model_json_schema()
+    normalized_schema = normalize_json_schema_for_openai(raw_schema)
+
+    json_schema = {
+        "name": name,
+        "schema": normalized_schema,
+        "strict": True,
+    }
+
+    return CompiledSchema(
+        name=name,
+        schema_model=schema_model,
+        raw_schema=raw_schema,
+        normalized_schema=normalized_schema,
+        json_schema=json_schema,
+        response_format={"type": "json_schema", "json_schema": json_schema},
+        fallback_prompt_suffix=build_fallback_prompt_suffix(name, raw_schema),
+        type_adapter=TypeAdapter(schema_model),
+        schema_tokens=count_raw_tokens(json.dumps(json_schema, separators=(",", ":"))),
+    )
+
+
+# Process-wide registry keyed by model class
+_registry: dict[Type[BaseModel], CompiledSchema] = {}
+_registry_lock = threading.Lock()
+
+
+def get_compiled_schema(schema_model: Type[BaseModel]) -> CompiledSchema:
+    """Get the compiled schema for a model, compiling it on first use.
+
+    Args:
+        schema_model: Pydantic BaseModel class
+
+    Returns:
+        Cached CompiledSchema for the model
+    """
+    compiled = _registry.get(schema_model)
+    if compiled is not None:
+        return compiled
+
+    with _registry_lock:
+        compiled = _registry.get(schema_model)
+        if compiled is None:
+            compiled = compile_schema(schema_model)
+            _registry[schema_model] = compiled
+            logger.debug(f"Compiled schema {compiled.name}")
+    return compiled
+
+
+def warm_up_schemas(*schema_models: Type[BaseModel]) -> list[str]:
+    """Compile schema models ahead of the first request.
+
+    Intended for Streamlit page startup so the first grading request does not
+    pay the compilation cost. Safe to call repeatedly.
+
+    Args:
+        *schema_models: Pydantic model classes. If none are given, the
+                        structured output models used by the grading
+                        pipeline are compiled.
+
+    Returns:
+        Names of the compiled schemas
+    """
+    if not schema_models:
+        schema_models = _default_schema_models()
+
+    return [get_compiled_schema(model).name for model in schema_models]
+
+
+def _default_schema_models() -> tuple[Type[BaseModel], ...]:
+    # Imported lazily to avoid import cycles with the grading modules
+    from cqc_cpcc.rubric_models import RubricAssessmentResult
+    from cqc_cpcc.utilities.AI.openai_client import PreprocessingDigest
+
+    return RubricAssessmentResult, PreprocessingDigest
+
+
+def clear_schema_registry() -> None:
+    """Remove all compiled schemas (mainly for tests)."""
+    with _registry_lock:
+        _registry.clear()
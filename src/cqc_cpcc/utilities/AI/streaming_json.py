@@ -0,0 +1,122 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Incremental JSON parsing for streamed structured outputs.
+
+A full RubricAssessmentResult takes 30-90 seconds to generate. When the
+response is streamed, each element of a top-level array such as
+criteria_results is complete long before the whole document is. This module
+scans the JSON text as it arrives and returns every finished element of a
+chosen top-level array so callers can render (and score) it immediately.
+
+The scanner is a small single-pass state machine (string/escape tracking and
+nesting depth). It never re-scans text it has already seen and does not need
+the document to be valid JSON until an element closes.
+
+Usage:
+    from cqc_cpcc.utilities.AI.streaming_json import IncrementalArrayItemParser
+
+    parser = IncrementalArrayItemParser("criteria_results")
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            print(item["criterion_id"])
+"""
+
+import json
+from typing import Any
+
+from cqc_cpcc.utilities.logger import logger
+
+
+class IncrementalArrayItemParser:
+    """Extract finished elements of a top-level JSON array from streamed text.
+
+    Only object elements of the array named `field_name` on the root object
+    are reported. Each element is reported exactly once.
+
+    Attributes:
+        field_name: Name of the top-level array field to watch
+        items_emitted: Number of elements returned so far
+    """
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.items_emitted = 0
+
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_root_string: str | None = None
+        self._in_target_array = False
+        self._element_start: int | None = None
+
+    @property
+    def text(self) -> str:
+        """All text fed so far."""
+        return self._text
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        """Consume the next chunk of JSON text.
+
+        Args:
+            chunk: Next piece of the streamed document
+
+        Returns:
+            Elements of the watched array that were completed by this chunk
+        """
+        if not chunk:
+            return []
+
+        self._text += chunk
+        text = self._text
+        finished = []
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_root_string = text[self._string_start + 1:i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._depth += 1
+                if (c == "[" and self._depth == 2
+                        and self._last_root_string == self.field_name and not self._in_target_array):
+                    self._in_target_array = True
+                elif self._in_target_array and self._depth == 3 and c == "{":
+                    self._element_start = i
+            elif c in "}]":
+                if self._in_target_array and self._depth == 3 and c == "}" and self._element_start is not None:
+                    item = self._parse_element(text[self._element_start:i + 1])
+                    if item is not None:
+                        finished.append(item)
+                    self._element_start = None
+                elif self._in_target_array and self._depth == 2 and c == "]":
+                    self._in_target_array = False
+                    # Prevent re-entering if the key string is seen again later
+                    self._last_root_string = None
+                self._depth -= 1
+
+        self._pos = len(text)
+        self.items_emitted += len(finished)
+        return finished
+
+    def _parse_element(self, raw: str) -> dict[str, Any] | None:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.debug(f"Skipping unparseable streamed {self.field_name} element: {e}")
+            return None
+        return item if isinstance(item, dict) else None
@@ -0,0 +1,89 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Run coroutines from synchronous code on one long-lived event loop.
+
+read_file is synchronous (and lru_cached) but audio and video files need the
+async transcription pipeline. It used to create a throwaway thread pool and a
+new event loop for every such file, so each file paid for loop setup, and
+async resources created inside it (such as HTTP connections) were torn down
+with the loop. Callers now submit the coroutine to a single daemon thread
+that runs one event loop for the life of the process, and block until it
+finishes.
+
+Usage:
+    from cqc_cpcc.utilities.async_bridge import run_coroutine_blocking
+
+    transcription = run_coroutine_blocking(transcribe_audio(file_path))
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def get_bridge_loop() -> asyncio.AbstractEventLoop:
+    """Get (starting it if needed) the background event loop."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _thread is None or not _thread.is_alive():
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            _thread = threading.Thread(target=run, name="cqc-async-bridge", daemon=True)
+            _thread.start()
+            ready.wait()
+            _loop = loop
+        return _loop
+
+
+def submit_coroutine(coro: Coroutine[Any, Any, T]) -> Future:
+    """Schedule a coroutine on the background loop and return its Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_bridge_loop())
+
+
+def run_coroutine_blocking(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """Run a coroutine on the background loop and wait for its result.
+
+    Safe to call whether or not the calling thread has a running event loop
+    (the caller's loop is blocked while waiting, as with any sync call).
+
+    Args:
+        coro: Coroutine to run
+        timeout: Seconds to wait (None waits indefinitely)
+
+    Returns:
+        The coroutine's result
+
+    Raises:
+        RuntimeError: If called from the background loop itself (would deadlock)
+        Exception: Whatever the coroutine raises
+    """
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("run_coroutine_blocking cannot be called from the async bridge loop")
+    return submit_coroutine(coro).result(timeout)
+
+
+def shutdown_bridge_loop() -> None:
+    """Stop the background loop (a new one starts on next use; for tests)."""
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop, _thread = None, None
+    if loop is not None:
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        loop.close()
@@ -61,5 +61,142 @@ CQC_OPENAI_DEBUG = CQC_AI_DEBUG
 CQC_OPENAI_DEBUG_REDACT = CQC_AI_DEBUG_REDACT
 CQC_OPENAI_DEBUG_SAVE_DIR = CQC_AI_DEBUG_SAVE_DIR
 
+# AI Response Cache Configuration (persistent, content-addressed cache for structured completions)
+CQC_AI_RESPONSE_CACHE = isTrue(get_constant_from_env('CQC_AI_RESPONSE_CACHE', default_value='False'))
+CQC_AI_RESPONSE_CACHE_DIR = get_constant_from_env('CQC_AI_RESPONSE_CACHE_DIR', default_value=None)
+CQC_AI_RESPONSE_CACHE_MAX_MB = float(get_constant_from_env('CQC_AI_RESPONSE_CACHE_MAX_MB', default_value='256'))
+CQC_AI_RESPONSE_CACHE_TTL_SECONDS = float(
+    get_constant_from_env('CQC_AI_RESPONSE_CACHE_TTL_SECONDS', default_value=str(7 * 24 * 60 * 60)))
+
+# AI Concurrency Limiter (process-wide AIMD limiter in front of OpenAI/OpenRouter calls)
+CQC_AI_CONCURRENCY_LIMITER = isTrue(get_constant_from_env('CQC_AI_CONCURRENCY_LIMITER', default_value='True'))
+CQC_AI_CONCURRENCY_INITIAL = int(get_constant_from_env('CQC_AI_CONCURRENCY_INITIAL', default_value='8'))
+CQC_AI_CONCURRENCY_MIN = int(get_constant_from_env('CQC_AI_CONCURRENCY_MIN', default_value='1'))
+CQC_AI_CONCURRENCY_MAX = int(get_constant_from_env('CQC_AI_CONCURRENCY_MAX', default_value='32'))
+CQC_AI_LATENCY_TARGET_SECONDS = float(get_constant_from_env('CQC_AI_LATENCY_TARGET_SECONDS', default_value='90'))
+
+# AI Rate Scheduler (per-model TPM/RPM token buckets, JSON: {"<model>": {"tpm": int, "rpm": int}})
+CQC_AI_MODEL_RATE_LIMITS = get_constant_from_env('CQC_AI_MODEL_RATE_LIMITS', default_value='')
+CQC_AI_EXPECTED_OUTPUT_TOKENS = int(get_constant_from_env('CQC_AI_EXPECTED_OUTPUT_TOKENS', default_value='2048'))
+
+# AI Request Hedging (duplicate slow requests after the observed p95 latency)
+CQC_AI_HEDGING = isTrue(get_constant_from_env('CQC_AI_HEDGING', default_value='False'))
+CQC_AI_HEDGE_MAX_RATE = float(get_constant_from_env('CQC_AI_HEDGE_MAX_RATE', default_value='0.1'))
+CQC_AI_HEDGE_MAX_IN_FLIGHT = int(get_constant_from_env('CQC_AI_HEDGE_MAX_IN_FLIGHT', default_value='4'))
+CQC_AI_HEDGE_MIN_DELAY_SECONDS = float(get_constant_from_env('CQC_AI_HEDGE_MIN_DELAY_SECONDS', default_value='5'))
+CQC_AI_HEDGE_FALLBACK_MODELS = get_constant_from_env('CQC_AI_HEDGE_FALLBACK_MODELS', default_value='')
+
+# AI Circuit Breaker (per provider and per model, with optional failover model for rubric grading)
+CQC_AI_CIRCUIT_BREAKER = isTrue(get_constant_from_env('CQC_AI_CIRCUIT_BREAKER', default_value='True'))
+CQC_AI_CIRCUIT_FAILURE_THRESHOLD = int(get_constant_from_env('CQC_AI_CIRCUIT_FAILURE_THRESHOLD', default_value='5'))
+CQC_AI_CIRCUIT_RESET_SECONDS = float(get_constant_from_env('CQC_AI_CIRCUIT_RESET_SECONDS', default_value='60'))
+CQC_AI_FAILOVER_MODEL = get_constant_from_env('CQC_AI_FAILOVER_MODEL', default_value='')
+
+# Token Estimator Calibration (learned from API-reported prompt token counts)
+CQC_TOKEN_CALIBRATION = isTrue(get_constant_from_env('CQC_TOKEN_CALIBRATION', default_value='True'))
+CQC_TOKEN_CALIBRATION_PATH = get_constant_from_env('CQC_TOKEN_CALIBRATION_PATH', default_value=None)
+
+# AI Metrics (always-on LLM call telemetry; optional Prometheus textfile export)
+CQC_AI_METRICS_EXPORT_PATH = get_constant_from_env('CQC_AI_METRICS_EXPORT_PATH', default_value=None)
+CQC_AI_METRICS_EXPORT_INTERVAL_SECONDS = float(
+    get_constant_from_env('CQC_AI_METRICS_EXPORT_INTERVAL_SECONDS', default_value='15'))
+CQC_AI_MODEL_PRICING = get_constant_from_env('CQC_AI_MODEL_PRICING', default_value='')
+
+# AI Debug Capture Writer (background batched writer, rolling gzip JSONL segments in CQC_AI_DEBUG_SAVE_DIR)
+CQC_AI_DEBUG_SEGMENT_MAX_MB = float(get_constant_from_env('CQC_AI_DEBUG_SEGMENT_MAX_MB', default_value='64'))
+CQC_AI_DEBUG_FLUSH_SECONDS = float(get_constant_from_env('CQC_AI_DEBUG_FLUSH_SECONDS', default_value='1'))
+CQC_AI_DEBUG_QUEUE_SIZE = int(get_constant_from_env('CQC_AI_DEBUG_QUEUE_SIZE', default_value='10000'))
+
+# OpenRouter Model Catalog (disk-persisted model list, refreshed in the background with conditional requests)
+CQC_OPENROUTER_CATALOG_PATH = get_constant_from_env('CQC_OPENROUTER_CATALOG_PATH', default_value=None)
+CQC_OPENROUTER_CATALOG_MAX_AGE_SECONDS = float(
+    get_constant_from_env('CQC_OPENROUTER_CATALOG_MAX_AGE_SECONDS', default_value='3600'))
+
+# AI HTTP Transport (shared httpx connection pool settings for the OpenAI and OpenRouter clients)
+CQC_AI_HTTP_MAX_CONNECTIONS = int(get_constant_from_env('CQC_AI_HTTP_MAX_CONNECTIONS', default_value='1000'))
+CQC_AI_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+    get_constant_from_env('CQC_AI_HTTP_MAX_KEEPALIVE_CONNECTIONS', default_value='200'))
+CQC_AI_HTTP_KEEPALIVE_EXPIRY_SECONDS = float(
+    get_constant_from_env('CQC_AI_HTTP_KEEPALIVE_EXPIRY_SECONDS', default_value='60'))
+CQC_AI_HTTP2 = isTrue(get_constant_from_env('CQC_AI_HTTP2', default_value='False'))
+CQC_AI_HTTP_CONNECT_TIMEOUT_SECONDS = float(
+    get_constant_from_env('CQC_AI_HTTP_CONNECT_TIMEOUT_SECONDS', default_value='10'))
+CQC_AI_HTTP_READ_TIMEOUT_SECONDS = float(get_constant_from_env('CQC_AI_HTTP_READ_TIMEOUT_SECONDS', default_value='600'))
+CQC_AI_HTTP_WRITE_TIMEOUT_SECONDS = float(get_constant_from_env('CQC_AI_HTTP_WRITE_TIMEOUT_SECONDS', default_value='60'))
+CQC_AI_HTTP_POOL_TIMEOUT_SECONDS = float(get_constant_from_env('CQC_AI_HTTP_POOL_TIMEOUT_SECONDS', default_value='60'))
+
+# AI Chunked Preprocessing (map-reduce digest of oversized submissions; chunk digests cached by content hash)
+CQC_AI_CHUNKED_PREPROCESSING = isTrue(get_constant_from_env('CQC_AI_CHUNKED_PREPROCESSING', default_value='True'))
+CQC_AI_PREPROCESSING_CHUNK_TOKENS = int(
+    get_constant_from_env('CQC_AI_PREPROCESSING_CHUNK_TOKENS', default_value='12000'))
+CQC_AI_CHUNK_DIGEST_CACHE = isTrue(get_constant_from_env('CQC_AI_CHUNK_DIGEST_CACHE', default_value='True'))
+
+# AI Audio Transcription (long recordings split into overlapping segments transcribed concurrently;
+# finished transcriptions cached by the audio's SHA-256)
+CQC_AI_TRANSCRIPTION_SEGMENT_SECONDS = float(
+    get_constant_from_env('CQC_AI_TRANSCRIPTION_SEGMENT_SECONDS', default_value='600'))
+CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS = float(
+    get_constant_from_env('CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS', default_value='5'))
+CQC_AI_TRANSCRIPTION_MAX_UPLOAD_MB = float(
+    get_constant_from_env('CQC_AI_TRANSCRIPTION_MAX_UPLOAD_MB', default_value='24'))
+CQC_AI_TRANSCRIPTION_CACHE = isTrue(get_constant_from_env('CQC_AI_TRANSCRIPTION_CACHE', default_value='True'))
+CQC_AI_TRANSCRIPTION_CACHE_MAX_MB = float(
+    get_constant_from_env('CQC_AI_TRANSCRIPTION_CACHE_MAX_MB', default_value='256'))
+
+# Media Processing (ffmpeg/ffprobe run as asyncio subprocesses in a bounded worker pool;
+# audio extracted from videos cached by the video's SHA-256)
+CQC_MEDIA_WORKERS = int(get_constant_from_env('CQC_MEDIA_WORKERS', default_value='0'))  # 0 = CPU count
+CQC_MEDIA_TIMEOUT_SECONDS = float(get_constant_from_env('CQC_MEDIA_TIMEOUT_SECONDS', default_value='300'))
+CQC_MEDIA_AUDIO_CACHE = isTrue(get_constant_from_env('CQC_MEDIA_AUDIO_CACHE', default_value='True'))
+CQC_MEDIA_AUDIO_CACHE_MAX_MB = float(get_constant_from_env('CQC_MEDIA_AUDIO_CACHE_MAX_MB', default_value='2048'))
+
+# AI Grading Cascade (grade with a cheap model first; escalate to the selected model only when a trigger fires)
+CQC_AI_GRADING_CASCADE = isTrue(get_constant_from_env('CQC_AI_GRADING_CASCADE', default_value='False'))
+CQC_AI_CASCADE_CHEAP_MODEL = get_constant_from_env('CQC_AI_CASCADE_CHEAP_MODEL', default_value='gpt-5-nano')
+CQC_AI_CASCADE_CONFIDENCE_THRESHOLD = float(
+    get_constant_from_env('CQC_AI_CASCADE_CONFIDENCE_THRESHOLD', default_value='0.75'))
+CQC_AI_CASCADE_BOUNDARY_MARGIN = float(
+    get_constant_from_env('CQC_AI_CASCADE_BOUNDARY_MARGIN', default_value='0.02'))  # Fraction of points
+CQC_AI_CASCADE_DISAGREEMENT_TOLERANCE = float(
+    get_constant_from_env('CQC_AI_CASCADE_DISAGREEMENT_TOLERANCE', default_value='0.1'))  # Fraction of points
+
+# AI Submission Packing (several small submissions graded in one request under a token budget;
+# students whose packed result fails validation are re-graded alone)
+CQC_AI_SUBMISSION_PACKING = isTrue(get_constant_from_env('CQC_AI_SUBMISSION_PACKING', default_value='False'))
+CQC_AI_PACK_TOKEN_BUDGET = int(get_constant_from_env('CQC_AI_PACK_TOKEN_BUDGET', default_value='8000'))
+CQC_AI_PACK_MAX_SUBMISSIONS = int(get_constant_from_env('CQC_AI_PACK_MAX_SUBMISSIONS', default_value='6'))
+CQC_AI_PACK_MAX_SUBMISSION_TOKENS = int(
+    get_constant_from_env('CQC_AI_PACK_MAX_SUBMISSION_TOKENS', default_value='1500'))
+
+# Submission Dedup (exact duplicates graded once and the result reused; near-duplicates found with MinHash/LSH
+# are flagged for review)
+CQC_SUBMISSION_DEDUP = isTrue(get_constant_from_env('CQC_SUBMISSION_DEDUP', default_value='True'))
+CQC_DEDUP_NEAR_THRESHOLD = float(get_constant_from_env('CQC_DEDUP_NEAR_THRESHOLD', default_value='0.8'))
+CQC_DEDUP_NUM_PERM = int(get_constant_from_env('CQC_DEDUP_NUM_PERM', default_value='64'))
+CQC_DEDUP_BANDS = int(get_constant_from_env('CQC_DEDUP_BANDS', default_value='16'))
+CQC_DEDUP_SHINGLE_SIZE = int(get_constant_from_env('CQC_DEDUP_SHINGLE_SIZE', default_value='5'))
+
+# Delta Regrading (resubmissions send only changed files plus the previous criterion results;
+# graded results are stored with per-file content hashes in CQC_AI_RESPONSE_CACHE_DIR)
+CQC_DELTA_REGRADING = isTrue(get_constant_from_env('CQC_DELTA_REGRADING', default_value='False'))
+CQC_DELTA_MAX_CHANGED_FRACTION = float(
+    get_constant_from_env('CQC_DELTA_MAX_CHANGED_FRACTION', default_value='0.5'))  # Of submission characters
+CQC_GRADING_HISTORY_MAX_MB = float(get_constant_from_env('CQC_GRADING_HISTORY_MAX_MB', default_value='256'))
+CQC_GRADING_HISTORY_TTL_DAYS = float(get_constant_from_env('CQC_GRADING_HISTORY_TTL_DAYS', default_value='180'))
+
+# AI Model Router (picks the grading model per submission from stored latency, schema failure, cost and
+# instructor-override agreement history, by course, assignment and submission size)
+CQC_AI_MODEL_ROUTER = isTrue(get_constant_from_env('CQC_AI_MODEL_ROUTER', default_value='False'))
+CQC_AI_ROUTER_CANDIDATES = get_constant_from_env(
+    'CQC_AI_ROUTER_CANDIDATES', default_value='openai/gpt-5-nano,openai/gpt-5-mini,openai/gpt-5')
+CQC_AI_ROUTER_OBJECTIVE = get_constant_from_env('CQC_AI_ROUTER_OBJECTIVE', default_value='cheapest')  # or fastest
+CQC_AI_ROUTER_MIN_AGREEMENT = float(get_constant_from_env('CQC_AI_ROUTER_MIN_AGREEMENT', default_value='0.9'))
+CQC_AI_ROUTER_MAX_SCHEMA_FAILURE_RATE = float(
+    get_constant_from_env('CQC_AI_ROUTER_MAX_SCHEMA_FAILURE_RATE', default_value='0.1'))
+CQC_AI_ROUTER_BUDGET_USD = float(get_constant_from_env('CQC_AI_ROUTER_BUDGET_USD', default_value='0.02'))  # Per call
+CQC_AI_ROUTER_MIN_SAMPLES = int(get_constant_from_env('CQC_AI_ROUTER_MIN_SAMPLES', default_value='5'))
+CQC_AI_ROUTER_EXPLORE_RATE = float(get_constant_from_env('CQC_AI_ROUTER_EXPLORE_RATE', default_value='0'))
+CQC_AI_ROUTER_WINDOW_DAYS = float(get_constant_from_env('CQC_AI_ROUTER_WINDOW_DAYS', default_value='90'))
+
 # Docker Configs
 DOCKER_SERVICE_NAME = "selenium-chrome"
\ No newline at end of file
@@ -0,0 +1,382 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Non-blocking ffmpeg/ffprobe stage for audio and video submissions.
+
+extract_audio_from_video was declared async but ran ffmpeg with
+subprocess.run, so every other student's grading call stalled while a video
+was converted (up to the 5 minute timeout). Media work now runs here:
+
+- asyncio subprocesses: ffmpeg and ffprobe are started with
+  asyncio.create_subprocess_exec, and stdout/stderr are read concurrently, so
+  the event loop keeps serving API calls while they run.
+- Bounded worker pool: every media command takes a slot from one process-wide
+  pool sized to the CPU count (a fixed-window AdaptiveConcurrencyLimiter, so
+  it works across event loops), so a ZIP full of videos cannot start dozens
+  of encoders at once.
+- Cancellation and timeouts: cancelling the awaiting task, or exceeding the
+  timeout, kills the ffmpeg process and removes its partial output.
+- Progress: ffmpeg is run with "-progress pipe:1"; each progress block is
+  reported to an optional callback as a MediaProgress.
+- Extracted audio cache: audio extracted from a video is stored under the
+  video's SHA-256, so re-grading the same video skips ffmpeg entirely. The
+  directory is size-bounded (least recently used files are removed first).
+
+Configuration (environment variables):
+- CQC_MEDIA_WORKERS: Concurrent ffmpeg/ffprobe processes (default: 0 = CPU count)
+- CQC_MEDIA_TIMEOUT_SECONDS: Timeout for one ffmpeg command (default: 300)
+- CQC_MEDIA_AUDIO_CACHE: Cache extracted audio by video hash (default: True)
+- CQC_MEDIA_AUDIO_CACHE_MAX_MB: Extracted audio cache size limit (default: 2048)
+
+Usage:
+    from cqc_cpcc.utilities.media_pipeline import extract_audio, release_extracted_audio
+
+    audio_path = await extract_audio("demo.mp4", progress_callback=lambda p: print(p.fraction))
+    try:
+        ...  # transcribe audio_path
+    finally:
+        release_extracted_audio(audio_path)  # keeps cached files, deletes temp files
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from cqc_cpcc.utilities.AI.concurrency_limiter import AdaptiveConcurrencyLimiter
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_RESPONSE_CACHE_DIR,
+    CQC_MEDIA_AUDIO_CACHE,
+    CQC_MEDIA_AUDIO_CACHE_MAX_MB,
+    CQC_MEDIA_TIMEOUT_SECONDS,
+    CQC_MEDIA_WORKERS,
+)
+from cqc_cpcc.utilities.logger import logger
+
+# Bump when the extracted audio format changes (part of the cached file name)
+AUDIO_CACHE_VERSION = 1
+
+MEDIA_CACHE_DIRNAME = "media_audio"
+
+# Mono 16 kHz MP3 (what Whisper resamples to anyway): about 5 MB per 10 minutes
+WHISPER_AUDIO_ARGS = ["-vn", "-ac", "1", "-ar", "16000", "-c:a", "libmp3lame", "-b:a", "64k"]
+
+FFMPEG_PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+
+PROBE_TIMEOUT_SECONDS = 60.0
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+_STDERR_TAIL_LINES = 20
+
+
+class MediaProcessingError(RuntimeError):
+    """An ffmpeg/ffprobe command failed or timed out."""
+
+
+class MediaToolNotFoundError(MediaProcessingError):
+    """ffmpeg or ffprobe is not installed."""
+
+
+@dataclass(frozen=True)
+class MediaProgress:
+    """Progress of one ffmpeg command.
+
+    Attributes:
+        label: What is being processed (usually the file name)
+        processed_seconds: Media time written so far
+        total_seconds: Media duration, if known
+        done: True for the final report
+    """
+    label: str
+    processed_seconds: float
+    total_seconds: Optional[float] = None
+    done: bool = False
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """Completed fraction (0-1), or None if the duration is unknown."""
+        if self.done:
+            return 1.0
+        if not self.total_seconds:
+            return None
+        return min(1.0, self.processed_seconds / self.total_seconds)
+
+
+ProgressCallback = Callable[[MediaProgress], None]
+
+
+def is_ffmpeg_available() -> bool:
+    """Check whether ffmpeg and ffprobe are on PATH."""
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def hash_media_file(file_path: str) -> str:
+    """SHA-256 of a file's bytes (streamed)."""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+_worker_pool: AdaptiveConcurrencyLimiter | None = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_media_worker_pool() -> AdaptiveConcurrencyLimiter:
+    """Get the process-wide media worker pool (CQC_MEDIA_WORKERS, default CPU count)."""
+    global _worker_pool
+    if _worker_pool is None:
+        with _worker_pool_lock:
+            if _worker_pool is None:
+                workers = CQC_MEDIA_WORKERS if CQC_MEDIA_WORKERS > 0 else (os.cpu_count() or 1)
+                _worker_pool = AdaptiveConcurrencyLimiter(
+                    name="media", initial_limit=workers, min_limit=workers, max_limit=workers,
+                )
+    return _worker_pool
+
+
+def set_media_worker_pool(pool: AdaptiveConcurrencyLimiter | None) -> None:
+    """Replace the media worker pool (None recreates it from env on next use; for tests)."""
+    global _worker_pool
+    with _worker_pool_lock:
+        _worker_pool = pool
+
+
+def parse_progress_time(key: str, value: str) -> Optional[float]:
+    """Seconds from an ffmpeg "-progress" out_time line, or None for other keys.
+
+    ffmpeg reports out_time_us and (despite the name) out_time_ms in microseconds.
+    """
+    if key not in ("out_time_us", "out_time_ms"):
+        return None
+    try:
+        return max(0.0, int(value) / 1_000_000)
+    except ValueError:
+        return None  # "N/A" before the first frame
+
+
+def _report(progress_callback: Optional[ProgressCallback], progress: MediaProgress) -> None:
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(progress)
+    except Exception as e:
+        logger.debug(f"Media progress callback failed for {progress.label}: {e}")
+
+
+async def _kill(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+
+async def run_media_command(
+        args: list[str],
+        timeout: Optional[float] = CQC_MEDIA_TIMEOUT_SECONDS,
+        total_seconds: Optional[float] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        label: str = "",
+) -> str:
+    """Run an ffmpeg/ffprobe command in a worker slot without blocking the event loop.
+
+    Lines of an ffmpeg "-progress pipe:1" block on stdout are reported to
+    progress_callback. Cancelling the caller kills the process.
+
+    Args:
+        args: Command and arguments
+        timeout: Seconds before the process is killed (None or 0 waits indefinitely)
+        total_seconds: Media duration, used for MediaProgress.fraction
+        progress_callback: Called with a MediaProgress for each progress block
+        label: Name used in progress reports and errors
+
+    Returns:
+        The command's stdout
+
+    Raises:
+        MediaToolNotFoundError: If the executable is not installed
+        MediaProcessingError: If the command exits non-zero or times out
+    """
+    tool = os.path.basename(args[0])
+    label = label or tool
+    async with get_media_worker_pool().slot():
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args, stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError as e:
+            raise MediaToolNotFoundError(f"{tool} is not installed") from e
+
+        stdout_lines: list[str] = []
+        stderr_tail: deque[str] = deque(maxlen=_STDERR_TAIL_LINES)
+
+        async def read_stdout() -> None:
+            processed = 0.0
+            async for raw in process.stdout:
+                line = raw.decode(errors="replace").rstrip("\r\n")
+                stdout_lines.append(line)
+                key, _, value = line.partition("=")
+                seconds = parse_progress_time(key, value)
+                if seconds is not None:
+                    processed = seconds
+                elif key == "progress":
+                    _report(progress_callback, MediaProgress(label, processed, total_seconds, done=value == "end"))
+
+        async def read_stderr() -> None:
+            async for raw in process.stderr:
+                stderr_tail.append(raw.decode(errors="replace").rstrip())
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(read_stdout(), read_stderr(), process.wait()), timeout or None,
+            )
+        except asyncio.TimeoutError:
+            await _kill(process)
+            raise MediaProcessingError(f"{tool} timed out after {timeout:g}s processing {label}") from None
+        except BaseException:
+            # Cancelled (or a reader failed): never leave ffmpeg running
+            await _kill(process)
+            raise
+
+    if process.returncode != 0:
+        details = "\n".join(stderr_tail)
+        raise MediaProcessingError(f"{tool} exited with code {process.returncode} processing {label}: {details}")
+    return "\n".join(stdout_lines)
+
+
+async def probe_media_duration(file_path: str) -> Optional[float]:
+    """Duration of a media file in seconds (via ffprobe), or None if unknown."""
+    try:
+        stdout = await run_media_command(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", file_path],
+            timeout=PROBE_TIMEOUT_SECONDS, label=os.path.basename(file_path),
+        )
+        duration = float(stdout.strip())
+    except (MediaProcessingError, ValueError) as e:
+        logger.debug(f"ffprobe could not read duration of {os.path.basename(file_path)}: {e}")
+        return None
+    return duration if 0 < duration < float("inf") else None
+
+
+_cache_dir_override: Path | None = None
+
+
+def get_media_cache_dir() -> Path:
+    """Directory holding extracted audio (next to the AI response cache)."""
+    if _cache_dir_override is not None:
+        return _cache_dir_override
+    base = Path(CQC_AI_RESPONSE_CACHE_DIR) if CQC_AI_RESPONSE_CACHE_DIR else Path.home() / ".cache" / "cqc_cpcc"
+    return base / MEDIA_CACHE_DIRNAME
+
+
+def set_media_cache_dir(path: Path | None) -> None:
+    """Override the extracted audio directory (None restores the default; for tests)."""
+    global _cache_dir_override
+    _cache_dir_override = Path(path) if path is not None else None
+
+
+def _is_in_cache(path: str) -> bool:
+    return Path(path).resolve().parent == get_media_cache_dir().resolve()
+
+
+def _evict_media_cache(max_bytes: int, keep: Path) -> None:
+    """Delete least recently used cached audio (never keep) until the directory fits max_bytes."""
+    files = []
+    for entry in get_media_cache_dir().glob("*.mp3"):
+        if entry == keep:
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry))
+    total = keep.stat().st_size + sum(size for _, size, _ in files)
+    for _, size, entry in sorted(files, key=lambda item: item[0]):
+        if total <= max_bytes:
+            break
+        entry.unlink(missing_ok=True)
+        total -= size
+
+
+def release_extracted_audio(audio_path: Optional[str]) -> None:
+    """Delete audio returned by extract_audio unless it lives in the cache."""
+    if audio_path and not _is_in_cache(audio_path):
+        try:
+            os.unlink(audio_path)
+        except OSError:
+            pass
+
+
+async def extract_audio(
+        video_path: str,
+        progress_callback: Optional[ProgressCallback] = None,
+        use_cache: Optional[bool] = None,
+        timeout: Optional[float] = CQC_MEDIA_TIMEOUT_SECONDS,
+) -> str:
+    """Extract a video's audio track as Whisper-ready MP3.
+
+    Args:
+        video_path: Path to the video file
+        progress_callback: Called with a MediaProgress while ffmpeg runs
+        use_cache: Reuse/store audio by the video's SHA-256 (default: CQC_MEDIA_AUDIO_CACHE)
+        timeout: Seconds before ffmpeg is killed
+
+    Returns:
+        Path to the audio file; pass it to release_extracted_audio() when done
+
+    Raises:
+        MediaToolNotFoundError: If ffmpeg is not installed
+        MediaProcessingError: If ffmpeg fails, times out or writes no audio
+    """
+    use_cache = CQC_MEDIA_AUDIO_CACHE if use_cache is None else use_cache
+    label = os.path.basename(video_path)
+
+    cached_path = None
+    if use_cache:
+        digest = await asyncio.to_thread(hash_media_file, video_path)
+        cache_dir = get_media_cache_dir()
+        cached_path = cache_dir / f"{digest}.v{AUDIO_CACHE_VERSION}.mp3"
+        if cached_path.is_file() and cached_path.stat().st_size > 0:
+            os.utime(cached_path)  # Mark as recently used
+            logger.info(f"Using cached audio for {label}")
+            _report(progress_callback, MediaProgress(label, 0.0, done=True))
+            return str(cached_path)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        output_path = str(cache_dir / f".{digest}.{uuid.uuid4().hex}.part")
+    else:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3", prefix=f"{Path(video_path).stem}_audio_") as f:
+            output_path = f.name
+
+    total_seconds = await probe_media_duration(video_path) if progress_callback else None
+    try:
+        await run_media_command(
+            ["ffmpeg", "-v", "error", "-y", "-i", video_path, *WHISPER_AUDIO_ARGS, *FFMPEG_PROGRESS_ARGS,
+             "-f", "mp3", output_path],
+            timeout=timeout, total_seconds=total_seconds, progress_callback=progress_callback, label=label,
+        )
+        if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            raise MediaProcessingError(f"ffmpeg wrote no audio for {label} (the video may have no audio track)")
+    except BaseException:
+        try:
+            os.unlink(output_path)
+        except OSError:
+            pass
+        raise
+
+    logger.info(f"Extracted audio from {label} ({os.path.getsize(output_path)} bytes)")
+    if cached_path is None:
+        return output_path
+    os.replace(output_path, cached_path)
+    await asyncio.to_thread(_evict_media_cache, int(CQC_MEDIA_AUDIO_CACHE_MAX_MB * 1024 * 1024), cached_path)
+    return str(cached_path)
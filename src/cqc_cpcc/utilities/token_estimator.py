@@ -0,0 +1,292 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Fast offline token estimator with per-language calibration.
+
+The old 4-characters-per-token rule is off by 30-50% for indented Java and
+for PDF-extracted text, so preprocessing triggered when it was not needed (or
+did not trigger when it was). This estimator works in two steps:
+
+1. Pre-tokenization: text is split the way BPE tokenizers pre-split it (word
+   pieces with camelCase boundaries, digit groups, punctuation runs, newline
+   plus indentation runs). Each piece is counted as one token, long pieces as
+   several. Indentation no longer inflates the count.
+2. Calibration: a multiplicative factor per language corrects the raw count.
+   Factors are learned online from the usage.prompt_tokens values returned by
+   the API and persisted to a small JSON file, so estimates improve as the app
+   is used.
+
+Languages come from the caller (e.g. the file extension of a submission file)
+or, for mixed prompts, from fenced code blocks: text inside ```java fences is
+counted as "java", everything else as "text". When a prompt is observed, the
+known "text" factor explains the prose part and the remainder calibrates the
+dominant code language.
+
+Configuration (environment variables):
+- CQC_TOKEN_CALIBRATION: Learn and persist calibration factors (default: True)
+- CQC_TOKEN_CALIBRATION_PATH: Calibration JSON file
+  (default: ~/.cache/cqc_cpcc/token_calibration.json)
+
+Usage:
+    from cqc_cpcc.utilities.token_estimator import get_token_estimator
+
+    estimator = get_token_estimator()
+    tokens = estimator.estimate(java_source, language="java")
+    estimator.observe(prompt_text, response.usage.prompt_tokens)
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from cqc_cpcc.utilities.env_constants import CQC_TOKEN_CALIBRATION, CQC_TOKEN_CALIBRATION_PATH
+from cqc_cpcc.utilities.logger import logger
+
+TEXT_LANGUAGE = "text"
+CODE_LANGUAGE = "code"  # Aggregate factor for code languages without their own samples
+
+MESSAGE_OVERHEAD_TOKENS = 7  # Chat formatting tokens around a single user message
+MIN_OBSERVATION_TOKENS = 256  # Ignore tiny prompts; overhead dominates them
+MIN_LANGUAGE_SAMPLES = 3  # Samples before a language factor is trusted
+EMA_ALPHA = 0.1  # Weight of each new observation
+FACTOR_BOUNDS = (0.25, 4.0)  # Clamp for observed factors
+SAVE_EVERY = 20  # Persist calibration every N observations
+
+# Pre-tokenization pieces, in priority order
+_PIECE_PATTERN = re.compile(
+    r"[A-Z]?[a-z]+"  # lowercase / Capitalized word pieces (camelCase boundaries)
+    r"|[A-Z]+(?![a-z])"  # ACRONYMS
+    r"|\d{1,3}"  # digit groups
+    r"|[^\x00-\x7f]"  # non-ASCII characters
+    r"|\n+[ \t]*"  # newlines plus indentation
+    r"|[ \t]{2,}"  # runs of spaces/tabs
+    r"|[!-/:-@\[-`{-~]+"  # ASCII punctuation runs (including underscore)
+)
+_FENCE_PATTERN = re.compile(r"```([\w+#.-]*)[^\n]*\n(.*?)(?:```|\Z)", re.DOTALL)
+
+
+def count_raw_tokens(text: str) -> int:
+    """Count pre-tokenizer pieces in text (uncalibrated estimate).
+
+    Args:
+        text: Input text
+
+    Returns:
+        Raw token count
+    """
+    count = 0
+    for match in _PIECE_PATTERN.finditer(text):
+        piece = match.group()
+        first = piece[0]
+        if first.isalpha() and first.isascii():
+            # Short words are single tokens; long/rare strings split every ~4 chars
+            count += 1 if len(piece) <= 7 else 1 + math.ceil((len(piece) - 7) / 4)
+        elif first in "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~":
+            count += math.ceil(len(piece) / 2)
+        else:
+            count += 1
+    return count
+
+
+def split_language_segments(text: str) -> dict[str, int]:
+    """Raw token counts per language, using fenced code blocks as language hints.
+
+    Args:
+        text: Prompt or document text
+
+    Returns:
+        Mapping of language to raw token count ("text" for everything outside fences)
+    """
+    segments: dict[str, int] = {}
+    position = 0
+    for match in _FENCE_PATTERN.finditer(text):
+        segments[TEXT_LANGUAGE] = segments.get(TEXT_LANGUAGE, 0) + count_raw_tokens(text[position:match.start(2)])
+        language = match.group(1).lower() or CODE_LANGUAGE
+        segments[language] = segments.get(language, 0) + count_raw_tokens(match.group(2))
+        position = match.end(2)
+    segments[TEXT_LANGUAGE] = segments.get(TEXT_LANGUAGE, 0) + count_raw_tokens(text[position:])
+    return {language: raw for language, raw in segments.items() if raw}
+
+
+@dataclass
+class LanguageCalibration:
+    """Learned correction for one language.
+
+    Attributes:
+        factor: Actual tokens per raw token
+        samples: Number of observations folded into the factor
+    """
+    factor: float = 1.0
+    samples: int = 0
+
+    def update(self, observed_factor: float, alpha: float = EMA_ALPHA) -> None:
+        observed_factor = min(max(observed_factor, FACTOR_BOUNDS[0]), FACTOR_BOUNDS[1])
+        if self.samples == 0:
+            self.factor = observed_factor
+        else:
+            self.factor += alpha * (observed_factor - self.factor)
+        self.samples += 1
+
+
+class TokenEstimator:
+    """Pre-tokenizer estimate corrected by per-language calibration factors."""
+
+    def __init__(self, path: Optional[Path] = None, learn: bool = True):
+        self.path = path
+        self.learn = learn
+        self._lock = threading.Lock()
+        self._calibration: dict[str, LanguageCalibration] = {}
+        self._unsaved = 0
+        if path is not None:
+            self._load()
+
+    def factor(self, language: str) -> float:
+        """Calibration factor for a language, falling back to code/text aggregates."""
+        fallbacks = [language] if language == TEXT_LANGUAGE else [language, CODE_LANGUAGE]
+        with self._lock:
+            for key in fallbacks:
+                calibration = self._calibration.get(key)
+                if calibration and calibration.samples >= MIN_LANGUAGE_SAMPLES:
+                    return calibration.factor
+        return 1.0
+
+    def estimate(self, text: str, language: Optional[str] = None) -> int:
+        """Estimate the token count of text.
+
+        Args:
+            text: Input text
+            language: Language of the whole text (e.g. "java"). None splits the
+                      text by fenced code blocks.
+
+        Returns:
+            Estimated token count
+        """
+        if not text:
+            return 0
+        if language:
+            return round(count_raw_tokens(text) * self.factor(language.lower()))
+        return round(sum(raw * self.factor(lang) for lang, raw in split_language_segments(text).items()))
+
+    def observe(
+            self,
+            text: str,
+            actual_tokens: Any,
+            language: Optional[str] = None,
+            extra_tokens: int = 0,
+    ) -> None:
+        """Fold an API-reported prompt token count into the calibration.
+
+        Args:
+            text: Prompt text that was sent (single user message)
+            actual_tokens: usage.prompt_tokens from the response (non-integers are ignored)
+            language: Language of the whole text, if known
+            extra_tokens: Prompt tokens the API counted outside the text, such as
+                          a json_schema response_format
+        """
+        if not self.learn or not isinstance(actual_tokens, int) or not text:
+            return
+
+        segments = {language.lower(): count_raw_tokens(text)} if language else split_language_segments(text)
+        total_raw = sum(segments.values())
+        target = actual_tokens - MESSAGE_OVERHEAD_TOKENS - extra_tokens
+        if total_raw < MIN_OBSERVATION_TOKENS or target <= 0:
+            return
+
+        prose_raw = segments.get(TEXT_LANGUAGE, 0)
+        code_segments = {lang: raw for lang, raw in segments.items() if lang != TEXT_LANGUAGE}
+        code_raw = sum(code_segments.values())
+
+        with self._lock:
+            if code_raw < 0.1 * total_raw:
+                self._calibration.setdefault(TEXT_LANGUAGE, LanguageCalibration()).update(target / total_raw)
+            elif code_raw >= 0.3 * total_raw:
+                text_calibration = self._calibration.get(TEXT_LANGUAGE)
+                text_factor = (text_calibration.factor
+                               if text_calibration and text_calibration.samples >= MIN_LANGUAGE_SAMPLES else 1.0)
+                observed = (target - text_factor * prose_raw) / code_raw
+                dominant = max(code_segments, key=code_segments.get)
+                self._calibration.setdefault(dominant, LanguageCalibration()).update(observed)
+                if dominant != CODE_LANGUAGE:
+                    self._calibration.setdefault(CODE_LANGUAGE, LanguageCalibration()).update(observed)
+            else:
+                return
+            self._unsaved += 1
+            should_save = self.path is not None and self._unsaved >= SAVE_EVERY
+
+        if should_save:
+            self.save()
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        """Current calibration factors and sample counts."""
+        with self._lock:
+            return {language: asdict(calibration) for language, calibration in self._calibration.items()}
+
+    def save(self) -> None:
+        """Persist calibration to the JSON file (atomic replace)."""
+        if self.path is None:
+            return
+        data = self.snapshot()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+            with self._lock:
+                self._unsaved = 0
+        except OSError as e:
+            logger.warning(f"Could not save token calibration to {self.path}: {e}")
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable token calibration {self.path}: {e}")
+            return
+
+        for language, entry in data.items():
+            try:
+                self._calibration[language] = LanguageCalibration(
+                    factor=float(entry["factor"]), samples=int(entry["samples"])
+                )
+            except (KeyError, TypeError, ValueError):
+                logger.debug(f"Skipping invalid token calibration entry for {language}")
+
+
+def _default_calibration_path() -> Path:
+    if CQC_TOKEN_CALIBRATION_PATH:
+        return Path(CQC_TOKEN_CALIBRATION_PATH)
+    return Path.home() / ".cache" / "cqc_cpcc" / "token_calibration.json"
+
+
+_token_estimator: TokenEstimator | None = None
+_token_estimator_lock = threading.Lock()
+
+
+def get_token_estimator() -> TokenEstimator:
+    """Get or create the process-wide TokenEstimator configured from env.
+
+    Returns:
+        Shared TokenEstimator instance
+    """
+    global _token_estimator
+    if _token_estimator is None:
+        with _token_estimator_lock:
+            if _token_estimator is None:
+                _token_estimator = TokenEstimator(
+                    path=_default_calibration_path() if CQC_TOKEN_CALIBRATION else None,
+                    learn=CQC_TOKEN_CALIBRATION,
+                )
+    return _token_estimator
+
+
+def set_token_estimator(estimator: TokenEstimator | None) -> None:
+    """Replace the shared estimator (None rebuilds it from env on next use; for tests)."""
+    global _token_estimator
+    with _token_estimator_lock:
+        _token_estimator = estimator
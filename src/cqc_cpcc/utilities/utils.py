@@ -383,33 +383,12 @@ def read_file(file_path: str, convert_to_markdown: bool = False) -> str:
     # If file is audio, transcribe it using OpenAI Whisper
     elif file_extension in ['.mp3', '.wav', '.m4a', '.ogg']:
         try:
-            # Import asyncio to run the async transcription
-            import asyncio
             from cqc_cpcc.utilities.AI.openai_client import transcribe_audio, format_transcription_for_grading
+            from cqc_cpcc.utilities.async_bridge import run_coroutine_blocking
 
-            # Run the async transcription - handle event loop properly
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = None
-
-            if loop is not None and loop.is_running():
-                # We're in an async context - create new loop in thread
-                import concurrent.futures
-                def run_in_thread():
-                    new_loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(new_loop)
-                    try:
-                        return new_loop.run_until_complete(transcribe_audio(file_path))
-                    finally:
-                        new_loop.close()
-
-                with concurrent.futures.ThreadPoolExecutor() as pool:
-                    future = pool.submit(run_in_thread)
-                    transcription = future.result()
-            else:
-                # No running loop - create and use one
-                transcription = asyncio.run(transcribe_audio(file_path))
+            # Run the async transcription on the shared background event loop (blocks this thread;
+            # async callers run read_file via asyncio.to_thread so their loop keeps running)
+            transcription = run_coroutine_blocking(transcribe_audio(file_path))
 
             contents = format_transcription_for_grading(transcription)
         except Exception as e:
@@ -424,32 +403,12 @@ Please manually review this audio file for grading."""
     # If file is video, return metadata and instructions
     elif file_extension in ['.mp4', '.avi', '.mov', '.webm']:
         try:
-            import asyncio
             from cqc_cpcc.utilities.AI.openai_client import process_video_file
+            from cqc_cpcc.utilities.async_bridge import run_coroutine_blocking
 
-            # Run the async video processing - handle event loop properly
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = None
-
-            if loop is not None and loop.is_running():
-                # We're in an async context - create new loop in thread
-                import concurrent.futures
-                def run_in_thread():
-                    new_loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(new_loop)
-                    try:
-                        return new_loop.run_until_complete(process_video_file(file_path))
-                    finally:
-                        new_loop.close()
-
-                with concurrent.futures.ThreadPoolExecutor() as pool:
-                    future = pool.submit(run_in_thread)
-                    contents = future.result()
-            else:
-                # No running loop - create and use one
-                contents = asyncio.run(process_video_file(file_path))
+            # Run the async video processing on the shared background event loop (blocks this thread;
+            # async callers run read_file via asyncio.to_thread so their loop keeps running)
+            contents = run_coroutine_blocking(process_video_file(file_path))
         except Exception as e:
             file_size = os.path.getsize(file_path) / (1024 * 1024)
             contents = f"""[VIDEO FILE: {os.path.basename(file_path)}]
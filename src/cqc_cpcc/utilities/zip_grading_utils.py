@@ -24,6 +24,7 @@ from typing import Optional
 
 from cqc_cpcc.utilities.language_utils import get_language_from_file_path
 from cqc_cpcc.utilities.logger import logger
+from cqc_cpcc.utilities.token_estimator import get_token_estimator
 from cqc_cpcc.utilities.utils import read_file, wrap_code_in_markdown_backticks
 
 # Token estimation constants
@@ -33,8 +34,8 @@ GPT5_CONTEXT_WINDOW = 128_000
 DEFAULT_INPUT_TOKEN_BUDGET_RATIO = 0.65
 DEFAULT_MAX_INPUT_TOKENS = int(GPT5_CONTEXT_WINDOW * DEFAULT_INPUT_TOKEN_BUDGET_RATIO)  # ~83K tokens
 
-# Rough token estimation: 1 token ≈ 4 characters for English text
-# This is conservative (OpenAI estimates ~1.3 tokens per word, ~4 chars per word)
+# Legacy rough token estimation: 1 token ≈ 4 characters for English text
+# (estimate_tokens now uses the calibrated estimator in token_estimator.py)
 CHARS_PER_TOKEN = 4
 
 # Noise directories and files to ignore
@@ -133,19 +134,22 @@ class StudentSubmission:
     omitted_files: list[str] = field(default_factory=list)
 
 
-def estimate_tokens(text: str) -> int:
+def estimate_tokens(text: str, language: Optional[str] = None) -> int:
     """Estimate token count for a text string.
     
-    Uses a conservative approximation of 1 token per 4 characters.
-    This is slightly pessimistic to provide safety margin.
+    Uses the shared calibrated token estimator (see token_estimator.py), which
+    is not thrown off by indentation and learns per-language corrections from
+    API-reported prompt token counts.
     
     Args:
         text: Input text to estimate
+        language: Optional language of the text (e.g. "java"); None detects
+                  fenced code blocks and treats the rest as prose
         
     Returns:
         Estimated token count
     """
-    return len(text) // CHARS_PER_TOKEN
+    return get_token_estimator().estimate(text, language=language)
 
 
 def should_ignore_file(filepath: str) -> bool:
@@ -389,7 +393,7 @@ def extract_student_submissions_from_zip(
                 # Read file content and estimate tokens
                 try:
                     file_content = read_file(temp_file_path, convert_to_markdown=False)
-                    file_tokens = estimate_tokens(file_content)
+                    file_tokens = estimate_tokens(file_content, get_language_from_file_path(file_name))
 
                     # NO TRUNCATION: Just warn if submission is large
                     if total_tokens + file_tokens > max_tokens_per_student:
@@ -489,7 +493,7 @@ def build_submission_text_with_token_limit(
     for filename, filepath in sorted_files:
         try:
             content = read_file(filepath, convert_to_markdown=False)
-            file_tokens = estimate_tokens(content)
+            file_tokens = estimate_tokens(content, get_language_from_file_path(filename))
 
             # Warn if large, but don't truncate
             if total_tokens + file_tokens > max_tokens:
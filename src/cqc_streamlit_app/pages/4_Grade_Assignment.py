@@ -3,6 +3,7 @@ import asyncio
 import os
 import re
 import tempfile
+from collections import Counter
 from datetime import datetime
 from typing import Optional
 
@@ -20,22 +21,43 @@ from cqc_cpcc.feedback_doc_generator import (
     generate_student_feedback_doc,
     sanitize_filename,
 )
+from cqc_cpcc.grading_cascade import CascadeDecision, CascadeStats
 # Import rubric system
 from cqc_cpcc.rubric_config import (
     get_distinct_course_ids,
     get_rubrics_for_course,
 )
+from cqc_cpcc.rubric_delta_grading import (
+    DeltaGradingOutcome,
+    GradedSubmission,
+    build_grading_context_hash,
+    file_content_hashes,
+    get_grading_history,
+    grade_with_rubric_delta,
+)
 from cqc_cpcc.rubric_grading import grade_with_rubric
-from cqc_cpcc.rubric_models import Rubric, RubricAssessmentResult
+from cqc_cpcc.rubric_models import CriterionResult, Rubric, RubricAssessmentResult
 from cqc_cpcc.rubric_overrides import (
     CriterionOverride,
     RubricOverrides,
     merge_rubric_overrides,
     validate_overrides_compatible,
 )
+from cqc_cpcc.scoring import rescore_class_results
+from cqc_cpcc.submission_dedup import fan_out_duplicate_results, find_duplicate_submissions
 from cqc_cpcc.utilities.AI.llm_deprecated.chains import (
     generate_assignment_feedback_grade,
 )
+from cqc_cpcc.utilities.AI.model_router import RouteDecision, get_model_router
+from cqc_cpcc.utilities.AI.openai_client import close_client
+from cqc_cpcc.utilities.AI.openrouter_client import close_openrouter_client
+from cqc_cpcc.utilities.env_constants import (
+    CQC_AI_CASCADE_CHEAP_MODEL,
+    CQC_AI_GRADING_CASCADE,
+    CQC_AI_SUBMISSION_PACKING,
+    CQC_DELTA_REGRADING,
+    CQC_SUBMISSION_DEDUP,
+)
 from cqc_cpcc.utilities.logger import logger
 from cqc_cpcc.utilities.utils import (
     dict_to_markdown_table,
@@ -59,13 +81,16 @@ from cqc_streamlit_app.utils import (
     define_chatGPTModel,
     define_openrouter_model,
     export_grading_summary_to_excel,
+    format_llm_concurrency_status,
     get_cpcc_css,
     get_custom_llm,
     get_file_extension_from_filepath,
     get_language_from_file_path,
     on_download_click,
     prefix_content_file_name,
+    render_grading_cascade_panel,
     sanitize_zip_filename,
+    warm_up_ai_schemas,
 )
 from streamlit.runtime.scriptrunner import add_script_run_ctx
 from streamlit.runtime.scriptrunner_utils.script_run_context import (
@@ -92,6 +117,15 @@ from cqc_cpcc.error_definitions_config import (
 )
 
 
+async def _close_ai_clients_after(coro):
+    """Await coro, then close the loop's AI clients so their pooled connections do not outlive the loop."""
+    try:
+        return await coro
+    finally:
+        await close_client()
+        await close_openrouter_client()
+
+
 def run_async_in_streamlit(coro):
     """Run an async coroutine safely within Streamlit.
     
@@ -108,6 +142,7 @@ def run_async_in_streamlit(coro):
     Raises:
         RuntimeError: If all execution strategies fail
     """
+    coro = _close_ai_clients_after(coro)
     try:
         # First, try to check if there's a running loop
         try:
@@ -963,6 +998,7 @@ async def get_grade_exam_content():
     use_openrouter = model_cfg.get("use_openrouter", True)
     use_auto_route = model_cfg.get("use_auto_route", True)
     selected_model = model_cfg.get("model", "openrouter/auto")
+    use_model_router = model_cfg.get("use_model_router", False)
 
     st.header("Student Submission File(s)")
     # Added support for HTML, audio, and video files
@@ -1006,6 +1042,8 @@ async def get_grade_exam_content():
             temperature=0.0,  # Temperature not used with OpenRouter
             use_openrouter=use_openrouter,
             openrouter_auto_route=use_auto_route,
+            use_model_router=use_model_router,
+            course_id=course_name,
         )
 
         tasks = []
@@ -1203,6 +1241,16 @@ async def grade_single_rubric_student(
         model_name: str,
         temperature: float,
         course_name: str,
+        use_cascade: bool = False,
+        cascade_model: Optional[str] = None,
+        cascade_stats: Optional[CascadeStats] = None,
+        packed_result: Optional[RubricAssessmentResult] = None,
+        previous_grading: Optional[GradedSubmission] = None,
+        delta_outcomes: Optional[dict[str, DeltaGradingOutcome]] = None,
+        use_model_router: bool = False,
+        course_id: Optional[str] = None,
+        assignment_id: Optional[str] = None,
+        route_decisions: Optional[dict[str, RouteDecision]] = None,
 ) -> tuple[str, RubricAssessmentResult | None]:
     """Grade a single student submission with rubric using async OpenAI call.
     
@@ -1220,6 +1268,17 @@ async def grade_single_rubric_student(
         model_name: OpenAI model name
         temperature: Sampling temperature
         course_name: Course identifier for output naming
+        use_cascade: Grade with cascade_model first and escalate to model_name when needed
+        cascade_model: Cheap first-pass model for cascade mode
+        cascade_stats: Run-level CascadeStats to record this student's cascade decision in
+        packed_result: Result already graded in a packed request (skips the grading call)
+        previous_grading: Stored grade of this student's previous submission; when
+            given, only changed files are regraded (see rubric_delta_grading.py)
+        delta_outcomes: Run-level dict to record this student's DeltaGradingOutcome in
+        use_model_router: Let the local model router pick the model for this submission
+        course_id: Course identifier for router history
+        assignment_id: Assignment identifier for router history
+        route_decisions: Run-level dict to record this student's RouteDecision in
         
     Returns:
         Tuple of (student_id, RubricAssessmentResult)
@@ -1239,7 +1298,9 @@ async def grade_single_rubric_student(
             # Build submission text from files
             status.update(label=f"{status_label} | Building submission text...")
 
-            submission_text = build_submission_text_with_token_limit(
+            # Off the grading loop: reading audio/video files blocks until transcription finishes
+            submission_text = await asyncio.to_thread(
+                build_submission_text_with_token_limit,
                 files=student_submission.files,
             )
 
@@ -1253,6 +1314,10 @@ async def grade_single_rubric_student(
             if student_submission.estimated_tokens > 70000:  # 70% of 128K context
                 st.info("🔄 Large submission detected - preprocessing will be used automatically")
 
+            if packed_result is not None:
+                st.caption("📦 Graded in a packed request together with other small submissions")
+                return _show_rubric_student_result(status, student_id, packed_result, grading_correlation_id)
+
             # Grade with rubric
             status.update(label=f"{status_label} | Calling OpenAI...")
 
@@ -1265,16 +1330,84 @@ async def grade_single_rubric_student(
                 grading_correlation_id = create_correlation_id()
                 logger.info(f"Starting grading for {student_id} with correlation_id={grading_correlation_id}")
 
-            result = await grade_with_rubric(
-                rubric=effective_rubric,
-                assignment_instructions=assignment_instructions,
-                student_submission=submission_text,
-                reference_solution=reference_solution,
-                error_definitions=error_definitions,
-                model_name=model_name,
-                temperature=temperature,
+            # Render criteria as they stream in (replaced by the full result below)
+            streamed_placeholder = st.empty()
+            streamed_lines: list[str] = []
+
+            def show_streamed_criterion(criterion_result: CriterionResult) -> None:
+                level = f" ({criterion_result.selected_level_label})" if criterion_result.selected_level_label else ""
+                streamed_lines.append(
+                    f"- ⏳ **{criterion_result.criterion_name}**: "
+                    f"{criterion_result.points_earned}/{criterion_result.points_possible}{level}"
+                )
+                streamed_placeholder.markdown("\n".join(streamed_lines))
+                status.update(label=f"{status_label} | {len(streamed_lines)} criteria received...")
+
+            cascade_decisions: list[CascadeDecision] = []
+
+            def record_cascade_decision(decision: CascadeDecision) -> None:
+                cascade_decisions.append(decision)
+                if cascade_stats is not None:
+                    cascade_stats.record(decision)
+
+            def record_route_decision(decision: RouteDecision) -> None:
+                if route_decisions is not None:
+                    route_decisions[student_id] = decision
+                st.caption(f"🧭 Routed to {decision.model}: {decision.reason}")
+
+            route_kwargs = dict(
+                route=use_model_router,
+                course_id=course_id,
+                assignment_id=assignment_id,
+                on_route_decision=record_route_decision,
             )
 
+            if previous_grading is not None:
+                outcome = await grade_with_rubric_delta(
+                    rubric=effective_rubric,
+                    assignment_instructions=assignment_instructions,
+                    student_submission=submission_text,
+                    previous=previous_grading,
+                    reference_solution=reference_solution,
+                    error_definitions=error_definitions,
+                    model_name=model_name,
+                    temperature=temperature,
+                    on_criterion_result=show_streamed_criterion,
+                    cascade=use_cascade,
+                    cascade_model=cascade_model,
+                    on_cascade_decision=record_cascade_decision,
+                    **route_kwargs,
+                )
+                result = outcome.result
+                if delta_outcomes is not None:
+                    delta_outcomes[student_id] = outcome
+                if outcome.mode == "unchanged":
+                    st.caption("♻️ No files changed since the previous grade (previous result reused)")
+                elif outcome.mode == "delta":
+                    changed = outcome.delta.changed + outcome.delta.added
+                    st.caption(
+                        f"♻️ Delta regrade: {', '.join(changed) or 'removed files only'} changed; "
+                        f"re-evaluated {', '.join(outcome.reevaluated_criteria) or 'no criteria'}"
+                    )
+                else:
+                    st.caption(f"♻️ Graded in full: {outcome.reason}")
+            else:
+                result = await grade_with_rubric(
+                    rubric=effective_rubric,
+                    assignment_instructions=assignment_instructions,
+                    student_submission=submission_text,
+                    reference_solution=reference_solution,
+                    error_definitions=error_definitions,
+                    model_name=model_name,
+                    temperature=temperature,
+                    on_criterion_result=show_streamed_criterion,
+                    cascade=use_cascade,
+                    cascade_model=cascade_model,
+                    on_cascade_decision=record_cascade_decision,
+                    **route_kwargs,
+                )
+
+            streamed_placeholder.empty()
             status.update(label=f"{status_label} | Processing results...")
 
             # Log grading summary for debugging
@@ -1284,15 +1417,17 @@ async def grade_single_rubric_student(
                 f"({result.overall_band_label or 'No band'})"
             )
 
-            # Display results with debug information
-            display_rubric_assessment_result(result, student_id, correlation_id=grading_correlation_id)
-
-            band_or_level = _get_band_or_level_label(result)
-            score_str = f"{result.total_points_earned}/{result.total_points_possible}"
-            level_str = f" [{band_or_level}]" if band_or_level else ""
-            status.update(label=f"✅ {student_id} — {score_str}{level_str}", state="complete")
+            for decision in cascade_decisions:
+                if decision.escalated:
+                    st.caption(
+                        f"🪜 Escalated from {decision.cheap_model} to {decision.strong_model} "
+                        f"({', '.join(decision.triggers)}): {'; '.join(decision.reasons)}"
+                    )
+                else:
+                    st.caption(f"🪜 Graded by {decision.cheap_model} in {decision.cheap_seconds:.1f}s "
+                               f"(no escalation needed)")
 
-            return (student_id, result)
+            return _show_rubric_student_result(status, student_id, result, grading_correlation_id)
 
         except Exception as e:
             logger.error(f"Error grading student {student_id}: {e}", exc_info=True)
@@ -1381,6 +1516,104 @@ async def grade_single_rubric_student(
             return (student_id, None)  # None signals failure
 
 
+def _show_rubric_student_result(
+        status,
+        student_id: str,
+        result: RubricAssessmentResult,
+        correlation_id: Optional[str],
+) -> tuple[str, RubricAssessmentResult]:
+    """Display a graded student's result and mark their status block complete."""
+    # Display results with debug information
+    display_rubric_assessment_result(result, student_id, correlation_id=correlation_id)
+
+    band_or_level = _get_band_or_level_label(result)
+    score_str = f"{result.total_points_earned}/{result.total_points_possible}"
+    level_str = f" [{band_or_level}]" if band_or_level else ""
+    status.update(label=f"✅ {student_id} — {score_str}{level_str}", state="complete")
+
+    return (student_id, result)
+
+
+async def grade_packed_rubric_students(
+        submission_texts: dict[str, str],
+        effective_rubric: Rubric,
+        assignment_instructions: str,
+        reference_solution: Optional[str],
+        error_definitions: Optional[list[ErrorDefinition]],
+        model_name: str,
+        temperature: float,
+) -> dict[str, RubricAssessmentResult]:
+    """Grade small submissions several to a request before the per-student pass.
+    
+    Students that are too large to pack, or whose packed result fails
+    validation, are left out of the returned dict and graded alone by
+    grade_single_rubric_student as usual.
+    
+    Args:
+        submission_texts: Student ID -> submission text built for grading
+        
+    Returns:
+        Student ID -> result for students graded in a packed request
+    """
+    from cqc_cpcc.rubric_packed_grading import grade_with_rubric_packed
+
+    with st.spinner("📦 Grading small submissions in packed requests..."):
+        try:
+            outcome = await grade_with_rubric_packed(
+                rubric=effective_rubric,
+                assignment_instructions=assignment_instructions,
+                student_submissions=submission_texts,
+                reference_solution=reference_solution,
+                error_definitions=error_definitions,
+                model_name=model_name,
+                temperature=temperature,
+                solo_fallback=False,
+            )
+        except Exception as e:
+            logger.error(f"Packed grading failed, grading every student alone: {e}", exc_info=True)
+            st.warning(f"⚠️ Packed grading failed, grading every student alone: {e}")
+            return {}
+
+    st.info(
+        f"📦 {len(outcome.packed)} submission(s) graded in {outcome.requests} packed request(s); "
+        f"{len(outcome.solo)} will be graded alone"
+    )
+    if outcome.fallback_reasons:
+        with st.expander(f"Re-graded alone after packing ({len(outcome.fallback_reasons)})"):
+            for student_id, reason in outcome.fallback_reasons.items():
+                st.markdown(f"- **{student_id}**: {reason}")
+
+    return outcome.results
+
+
+async def gather_with_llm_status(tasks: list, refresh_seconds: float = 1.0) -> list:
+    """Run grading tasks concurrently while showing the shared LLM limiter state.
+    
+    Every task is started at once; the process-wide concurrency limiter in the
+    AI client layer decides how many requests actually reach the provider.
+    
+    Args:
+        tasks: Coroutines to run
+        refresh_seconds: How often to refresh the limiter status line
+        
+    Returns:
+        Results in task order (exceptions returned, not raised)
+    """
+    status_placeholder = st.empty()
+
+    async def _refresh_status():
+        while True:
+            status_placeholder.caption(format_llm_concurrency_status())
+            await asyncio.sleep(refresh_seconds)
+
+    monitor = asyncio.create_task(_refresh_status())
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        monitor.cancel()
+        status_placeholder.caption(format_llm_concurrency_status())
+
+
 async def process_rubric_grading_batch(
         submission_file_paths: list[tuple[str, str]],
         effective_rubric: Rubric,
@@ -1392,6 +1625,15 @@ async def process_rubric_grading_batch(
         course_name: str,
         accepted_file_types: list[str],
         run_key: str,
+        use_cascade: bool = False,
+        cascade_model: Optional[str] = None,
+        use_packing: bool = False,
+        use_dedup: bool = False,
+        use_delta: bool = False,
+        assignment_key: Optional[str] = None,
+        use_model_router: bool = False,
+        course_id: Optional[str] = None,
+        assignment_id: Optional[str] = None,
 ) -> None:
     """Process a batch of student submissions with async grading.
     
@@ -1410,9 +1652,23 @@ async def process_rubric_grading_batch(
         course_name: Course name for output files
         accepted_file_types: List of acceptable file extensions
         run_key: Stable key for caching results in session state
+        use_cascade: Grade with cascade_model first and escalate to model_name when needed
+        cascade_model: Cheap first-pass model for cascade mode
+        use_packing: Grade small submissions several to a request first
+            (see rubric_packed_grading.py); the rest are graded one by one
+        use_dedup: Grade exact duplicates once and flag near-duplicates for
+            review (see submission_dedup.py)
+        use_delta: Regrade resubmissions from their changed files only and store
+            every result with per-file hashes (see rubric_delta_grading.py)
+        assignment_key: Identifies the assignment in the grading history (delta mode)
+        use_model_router: Let the local model router pick the model per submission
+            (see model_router.py); packed requests keep model_name
+        course_id: Course identifier for router history
+        assignment_id: Assignment identifier for router history
     """
     ctx = get_script_run_ctx()
     all_results: list[tuple[str, RubricAssessmentResult]] = []
+    cascade_stats = CascadeStats() if use_cascade else None
 
     # Collect all student submissions (from single files or ZIPs)
     student_submissions: dict[str, StudentSubmission] = {}
@@ -1461,11 +1717,58 @@ async def process_rubric_grading_batch(
             st.session_state.expand_all_students = True
             st.rerun()
 
+    dedup_report = None
+    submission_texts: dict[str, str] = {}
+    if use_delta or ((use_dedup or use_packing) and total_students > 1):
+        # Off the grading loop: reading audio/video files blocks until transcription finishes
+        texts = await asyncio.gather(*(
+            asyncio.to_thread(build_submission_text_with_token_limit, files=submission.files)
+            for submission in student_submissions.values()
+        ))
+        submission_texts = dict(zip(student_submissions, texts))
+
+    # Grade one student per distinct submission; exact duplicates reuse the result
+    grading_submissions = student_submissions
+    if use_dedup and total_students > 1:
+        dedup_report = find_duplicate_submissions(submission_texts)
+        grading_submissions = {sid: student_submissions[sid] for sid in dedup_report.representatives}
+        if dedup_report.llm_calls_saved or dedup_report.near_duplicate_groups:
+            st.info(
+                f"🧬 {dedup_report.llm_calls_saved} exact duplicate submission(s) will reuse another student's "
+                f"result; {len(dedup_report.near_duplicate_groups)} near-duplicate group(s) flagged for review"
+            )
+
+    # Students graded before are regraded from their changed files (never packed)
+    previous_gradings: dict[str, GradedSubmission] = {}
+    delta_outcomes: dict[str, DeltaGradingOutcome] = {}
+    route_decisions: dict[str, RouteDecision] = {}
+    if use_delta and assignment_key:
+        history = get_grading_history()
+        for student_id in grading_submissions:
+            previous = history.get(assignment_key, student_id)
+            if previous is not None:
+                previous_gradings[student_id] = previous
+        if previous_gradings:
+            st.info(f"♻️ {len(previous_gradings)} resubmission(s) will be regraded from their changed files only")
+
+    packable = [sid for sid in grading_submissions if sid not in previous_gradings]
+    packed_results: dict[str, RubricAssessmentResult] = {}
+    if use_packing and len(packable) > 1:
+        packed_results = await grade_packed_rubric_students(
+            submission_texts={sid: submission_texts[sid] for sid in packable},
+            effective_rubric=effective_rubric,
+            assignment_instructions=assignment_instructions,
+            reference_solution=reference_solution,
+            error_definitions=error_definitions,
+            model_name=model_name,
+            temperature=temperature,
+        )
+
     # Create async tasks for concurrent grading
     # Use gather with return_exceptions=True to ensure one failure doesn't stop others
     tasks = []
 
-    for student_id, submission in student_submissions.items():
+    for student_id, submission in grading_submissions.items():
         task = grade_single_rubric_student(
             ctx=ctx,
             student_id=student_id,
@@ -1477,11 +1780,22 @@ async def process_rubric_grading_batch(
             model_name=model_name,
             temperature=temperature,
             course_name=course_name,
+            use_cascade=use_cascade,
+            cascade_model=cascade_model,
+            cascade_stats=cascade_stats,
+            packed_result=packed_results.get(student_id),
+            previous_grading=previous_gradings.get(student_id),
+            delta_outcomes=delta_outcomes,
+            use_model_router=use_model_router,
+            course_id=course_id,
+            assignment_id=assignment_id,
+            route_decisions=route_decisions,
         )
         tasks.append(task)
 
     # Execute all tasks concurrently, collecting both successes and exceptions
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    # (the shared LLM limiter throttles how many reach the provider at once)
+    results = await gather_with_llm_status(tasks)
 
     # Separate successful results from failures
     failed_student_ids = []
@@ -1498,9 +1812,38 @@ async def process_rubric_grading_batch(
         else:
             all_results.append((student_id, assessment))
 
+    duplicate_notes: dict[str, str] = {}
+    if dedup_report is not None:
+        fanned_out = fan_out_duplicate_results(dict(all_results), dedup_report)
+        for representative, duplicates in dedup_report.exact_duplicates.items():
+            for duplicate_id in duplicates:
+                if duplicate_id in fanned_out:
+                    all_results.append((duplicate_id, fanned_out[duplicate_id]))
+                else:
+                    failed_student_ids.append(duplicate_id)
+        duplicate_notes = dedup_report.review_notes()
+        if dedup_report.llm_calls_saved:
+            st.metric("LLM calls saved by dedup", dedup_report.llm_calls_saved,
+                      help=f"{len(grading_submissions)} of {total_students} submissions graded")
+
+    if use_delta and assignment_key:
+        _store_graded_submissions(
+            all_results, submission_texts, delta_outcomes, assignment_key, effective_rubric,
+            assignment_instructions, reference_solution, error_definitions,
+        )
+        if delta_outcomes:
+            modes = Counter(outcome.mode for outcome in delta_outcomes.values())
+            st.info(
+                f"♻️ Resubmissions: {modes['delta']} delta regrade(s), {modes['unchanged']} unchanged, "
+                f"{modes['full']} graded in full"
+            )
+
     # Store results AND failures in session state for this run_key
     st.session_state.grading_results_by_key[run_key] = all_results
     st.session_state.grading_failures_by_key[run_key] = failed_student_ids
+    st.session_state[f"duplicate_review_notes_{run_key}"] = duplicate_notes
+    st.session_state[f"route_decisions_{run_key}"] = route_decisions
+    st.session_state[f"graded_rubric_{run_key}"] = effective_rubric
 
     # Display summary
     success_count = len(all_results)
@@ -1535,6 +1878,7 @@ async def process_rubric_grading_batch(
                 "Percentage": "Failed",
                 "Band": "❌ Failed",
             })
+        _add_duplicate_review_notes(summary_data, duplicate_notes)
 
         if summary_data:
             st.subheader("📊 Grading Summary")
@@ -1556,6 +1900,11 @@ async def process_rubric_grading_batch(
                     "Effective rubric has zero total_points_possible; skipping average percentage calculation.")
                 st.metric("Average Score", f"{avg_score:.1f}/0 (N/A%)")
 
+        if cascade_stats is not None:
+            render_grading_cascade_panel(cascade_stats.snapshot(), title="🪜 Grading Cascade (this run)")
+
+        _render_instructor_score_feedback(run_key, all_results)
+
         # Generate Word docs and ZIP download
         st.markdown("---")
         _generate_feedback_docs_and_zip(
@@ -1571,6 +1920,85 @@ async def process_rubric_grading_batch(
         st.error(f"❌ {failure_count} submission(s) failed to grade")
 
 
+def _store_graded_submissions(
+        results: list[tuple[str, RubricAssessmentResult]],
+        submission_texts: dict[str, str],
+        delta_outcomes: dict[str, DeltaGradingOutcome],
+        assignment_key: str,
+        effective_rubric: Rubric,
+        assignment_instructions: str,
+        reference_solution: Optional[str],
+        error_definitions: Optional[list[ErrorDefinition]],
+) -> None:
+    """Store every graded result with its per-file hashes for delta regrading of the next resubmission."""
+    history = get_grading_history()
+    context_hash = build_grading_context_hash(
+        effective_rubric, assignment_instructions, reference_solution, error_definitions
+    )
+    for student_id, result in results:
+        outcome = delta_outcomes.get(student_id)
+        if outcome is not None:
+            record = outcome.to_record(assignment_key, student_id)
+        else:
+            record = GradedSubmission(
+                assignment_key=assignment_key,
+                student_id=student_id,
+                context_hash=context_hash,
+                file_hashes=file_content_hashes(submission_texts[student_id]),
+                result=result,
+            )
+        history.put(record)
+
+
+def _add_duplicate_review_notes(summary_data: list[dict], duplicate_notes: dict[str, str]) -> None:
+    """Add a "Duplicate Review" column to summary rows when any duplicates were found."""
+    if not duplicate_notes:
+        return
+    for row in summary_data:
+        row["Duplicate Review"] = duplicate_notes.get(row["Student"], "")
+
+
+def _render_instructor_score_feedback(run_key: str, results: list[tuple[str, RubricAssessmentResult]]) -> None:
+    """Let the instructor enter their own scores for routed results so the model router learns agreement."""
+    route_decisions: dict[str, RouteDecision] = st.session_state.get(f"route_decisions_{run_key}", {})
+    routed = [(student_id, result) for student_id, result in results if student_id in route_decisions]
+    if not routed:
+        return
+
+    recorded: set[str] = st.session_state.setdefault(f"route_scores_recorded_{run_key}", set())
+    with st.expander("🧭 Instructor Scores for the Model Router"):
+        st.caption("Enter your score for any routed submission; the router prefers models that agree with you.")
+        edited = st.data_editor(
+            pd.DataFrame([
+                {
+                    "Student": student_id,
+                    "Model": route_decisions[student_id].model,
+                    "AI Score": result.total_points_earned,
+                    "Instructor Score": None,
+                }
+                for student_id, result in routed if student_id not in recorded
+            ], columns=["Student", "Model", "AI Score", "Instructor Score"]),
+            disabled=["Student", "Model", "AI Score"],
+            column_config={"Instructor Score": st.column_config.NumberColumn(min_value=0)},
+            hide_index=True,
+            key=f"route_scores_editor_{run_key}",
+        )
+        if st.button("Record instructor scores", key=f"record_route_scores_{run_key}"):
+            router = get_model_router()
+            points_possible = dict(routed)
+            for row in edited.to_dict("records"):
+                if pd.isna(row["Instructor Score"]):
+                    continue
+                router.record_instructor_score(
+                    route_decisions[row["Student"]],
+                    ai_score=row["AI Score"],
+                    instructor_score=float(row["Instructor Score"]),
+                    points_possible=points_possible[row["Student"]].total_points_possible,
+                )
+                recorded.add(row["Student"])
+            st.success(f"Recorded {len(recorded)} instructor score(s)")
+
+
 def _split_error_definitions_by_severity(
         error_definitions: Optional[list[ErrorDefinition]],
 ) -> tuple[list[str], list[str]]:
@@ -1602,6 +2030,9 @@ async def grade_single_error_only_student(
         temperature: float,
         use_openrouter: bool,
         openrouter_auto_route: bool,
+        use_model_router: bool = False,
+        course_id: Optional[str] = None,
+        assignment_id: Optional[str] = None,
 ) -> tuple[str, dict, tuple[str, str]]:
     add_script_run_ctx(ctx=ctx)
 
@@ -1611,7 +2042,9 @@ async def grade_single_error_only_student(
     with st.status(status_label, expanded=expanded_state) as status:
         try:
             status.update(label=f"{status_label} | Building submission text...")
-            submission_text = build_submission_text_with_token_limit(
+            # Off the grading loop: reading audio/video files blocks until transcription finishes
+            submission_text = await asyncio.to_thread(
+                build_submission_text_with_token_limit,
                 files=student_submission.files,
             )
 
@@ -1636,6 +2069,9 @@ async def grade_single_error_only_student(
                 temperature=temperature,
                 use_openrouter=use_openrouter,
                 openrouter_auto_route=openrouter_auto_route,
+                use_model_router=use_model_router,
+                course_id=course_id,
+                assignment_id=assignment_id,
             )
 
             status.update(label=f"{status_label} | Calling grading model...")
@@ -1708,6 +2144,9 @@ async def process_error_only_grading_batch(
         course_name: str,
         accepted_file_types: list[str],
         run_key: str,
+        use_model_router: bool = False,
+        course_id: Optional[str] = None,
+        assignment_id: Optional[str] = None,
 ) -> None:
     ctx = get_script_run_ctx()
     all_results: list[tuple[str, dict]] = []
@@ -1769,10 +2208,13 @@ async def process_error_only_grading_batch(
                 temperature=temperature,
                 use_openrouter=use_openrouter,
                 openrouter_auto_route=openrouter_auto_route,
+                use_model_router=use_model_router,
+                course_id=course_id,
+                assignment_id=assignment_id,
             )
         )
 
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    results = await gather_with_llm_status(tasks)
 
     for result in results:
         if isinstance(result, Exception):
@@ -2078,6 +2520,49 @@ async def get_rubric_based_exam_grading():
     use_openrouter = model_cfg.get("use_openrouter", True)
     use_auto_route = model_cfg.get("use_auto_route", True)
     selected_model = model_cfg.get("model", "openrouter/auto")
+    use_model_router = model_cfg.get("use_model_router", False)
+
+    use_cascade = False
+    cascade_model = None
+    use_packing = False
+    use_dedup = False
+    use_delta = False
+    if grading_mode != "errors_only":
+        use_cascade = st.checkbox(
+            "Cascade grading (cheap model first)",
+            value=CQC_AI_GRADING_CASCADE,
+            key="rubric_grade_exam_cascade",
+            help="Grade each submission with a cheap model and re-grade with the selected model only when "
+                 "the result fails validation, sits near a band boundary, reports low confidence or "
+                 "disagrees with the deterministic scorers.",
+        )
+        if use_cascade:
+            cascade_model = st.text_input(
+                "Cheap first-pass model",
+                value=CQC_AI_CASCADE_CHEAP_MODEL,
+                key="rubric_grade_exam_cascade_model",
+            ).strip() or CQC_AI_CASCADE_CHEAP_MODEL
+        use_dedup = st.checkbox(
+            "Grade duplicate submissions once",
+            value=CQC_SUBMISSION_DEDUP,
+            key="rubric_grade_exam_dedup",
+            help="Submissions that differ only in whitespace and formatting reuse one grading "
+                 "result. Near-duplicates are still graded separately but flagged in the summary.",
+        )
+        use_delta = st.checkbox(
+            "Regrade resubmissions from changed files only",
+            value=CQC_DELTA_REGRADING,
+            key="rubric_grade_exam_delta",
+            help="Results are stored with per-file content hashes. When a student resubmits, only the changed "
+                 "files are sent and only the affected criteria are re-evaluated.",
+        )
+        use_packing = st.checkbox(
+            "Pack small submissions into shared requests",
+            value=CQC_AI_SUBMISSION_PACKING,
+            key="rubric_grade_exam_packing",
+            help="Grade several short submissions (e.g. intro labs) in one request. Students whose packed "
+                 "result fails validation are re-graded alone.",
+        )
 
     # Step 8: Student Submissions
     st.header("Student Submission File(s)")
@@ -2108,7 +2593,7 @@ async def get_rubric_based_exam_grading():
                 if grading_mode == "errors_only":
                     display_cached_error_only_results(stored_run_key, course_name)
                 else:
-                    display_cached_grading_results(stored_run_key, course_name)
+                    display_cached_grading_results(stored_run_key, course_name, effective_rubric)
                 return
 
         st.info("📝 Please upload assignment instructions and student submissions to begin grading.")
@@ -2135,10 +2620,13 @@ async def get_rubric_based_exam_grading():
         rubric_version=rubric_version,
         error_definition_ids=error_definition_ids,
         file_metadata=file_metadata,
-        model_name=selected_model,
+        model_name=f"{cascade_model}>{selected_model}" if use_cascade else selected_model,
         temperature=0.0,  # Temperature not used with OpenRouter
         debug_mode=False,
-        grading_mode=grading_mode,
+        grading_mode="+".join(
+            [grading_mode] + [option for option, on in (("packed", use_packing), ("dedup", use_dedup),
+                                                         ("delta", use_delta), ("routed", use_model_router)) if on]
+        ),
     )
 
     results_cache = st.session_state.error_only_results_by_key if grading_mode == "errors_only" else st.session_state.grading_results_by_key
@@ -2222,6 +2710,9 @@ async def get_rubric_based_exam_grading():
                     course_name=course_name,
                     accepted_file_types=student_submission_accepted_file_types,
                     run_key=current_run_key,
+                    use_model_router=use_model_router,
+                    course_id=selected_course_id,
+                    assignment_id=selected_assignment_id,
                 )
             else:
                 await process_rubric_grading_batch(
@@ -2235,6 +2726,15 @@ async def get_rubric_based_exam_grading():
                     course_name=course_name,
                     accepted_file_types=student_submission_accepted_file_types,
                     run_key=current_run_key,
+                    use_cascade=use_cascade,
+                    cascade_model=cascade_model,
+                    use_packing=use_packing,
+                    use_dedup=use_dedup,
+                    use_delta=use_delta,
+                    assignment_key=f"{selected_course_id}/{selected_assignment_id}",
+                    use_model_router=use_model_router,
+                    course_id=selected_course_id,
+                    assignment_id=selected_assignment_id,
                 )
 
             st.session_state.grading_status_by_key[current_run_key] = "done"
@@ -2255,7 +2755,7 @@ async def get_rubric_based_exam_grading():
         if grading_mode == "errors_only":
             display_cached_error_only_results(current_run_key, course_name)
         else:
-            display_cached_grading_results(current_run_key, course_name)
+            display_cached_grading_results(current_run_key, course_name, effective_rubric)
 
 
 def _get_band_or_level_label(result) -> Optional[str]:
@@ -2416,7 +2916,64 @@ def display_rubric_assessment_result(result, student_name: str, correlation_id:
                         st.markdown(f"*Notes:* {error.notes}")
 
 
-def display_cached_grading_results(run_key: str, course_name: str) -> None:
+def _rescore_cached_results(run_key: str, effective_rubric: Rubric) -> None:
+    """Rescore cached results in one batch when the rubric overrides changed since grading.
+
+    Only the scoring rules are re-applied; the LLM's level selections and error
+    counts are reused. Adding or removing criteria still requires regrading.
+
+    Args:
+        run_key: The run key of the cached results
+        effective_rubric: Rubric with the instructor's current overrides applied
+    """
+    graded_rubric = st.session_state.get(f"graded_rubric_{run_key}")
+    if graded_rubric is None or graded_rubric == effective_rubric:
+        return
+    if graded_rubric.rubric_id != effective_rubric.rubric_id:
+        return
+
+    enabled_ids = {c.criterion_id for c in effective_rubric.criteria if c.enabled}
+    if enabled_ids != {c.criterion_id for c in graded_rubric.criteria if c.enabled}:
+        st.warning("⚠️ Enabled criteria changed since grading. Clear the results and re-grade to apply them.")
+        return
+
+    all_results = st.session_state.grading_results_by_key[run_key]
+    scored = [(student_id, result) for student_id, result in all_results if result is not None]
+    max_points = {c.criterion_id: c.max_points for c in effective_rubric.criteria}
+    realigned = []
+    for _, result in scored:
+        criteria_results = [
+            cr.model_copy(update={"points_possible": max_points.get(cr.criterion_id, cr.points_possible)})
+            for cr in result.criteria_results
+        ]
+        realigned.append(result.model_copy(update={
+            "criteria_results": criteria_results,
+            "total_points_possible": sum(cr.points_possible for cr in criteria_results),
+        }))
+
+    try:
+        rescored = rescore_class_results(effective_rubric, realigned)
+    except ValueError as e:
+        logger.warning(f"Could not rescore cached results for {run_key}: {e}")
+        st.error(f"❌ Could not rescore results with the edited rubric: {e}")
+        return
+
+    rescored_by_student = {student_id: result for (student_id, _), result in zip(scored, rescored.results)}
+    st.session_state.grading_results_by_key[run_key] = [
+        (student_id, rescored_by_student.get(student_id, result)) for student_id, result in all_results
+    ]
+    st.session_state[f"graded_rubric_{run_key}"] = effective_rubric
+    # Feedback documents and the summary sheet were generated from the old scores
+    st.session_state.feedback_zip_bytes_by_key.pop(run_key, None)
+    st.session_state.pop(f"grading_summary_df_{run_key}", None)
+    st.info(f"🔁 Rescored {len(rescored.results)} student(s) with the edited rubric")
+
+
+def display_cached_grading_results(
+        run_key: str,
+        course_name: str,
+        effective_rubric: Optional[Rubric] = None,
+) -> None:
     """Display cached grading results from session state.
     
     This function renders cached results without instantiating any RubricModel.
@@ -2425,11 +2982,16 @@ def display_cached_grading_results(run_key: str, course_name: str) -> None:
     Args:
         run_key: The run key to retrieve cached results
         course_name: Course name for display and file naming
+        effective_rubric: Current rubric; when its overrides differ from the graded
+            rubric, the cached results are rescored before display
     """
     if run_key not in st.session_state.grading_results_by_key:
         st.error("❌ No cached results found for this configuration")
         return
 
+    if effective_rubric is not None:
+        _rescore_cached_results(run_key, effective_rubric)
+
     all_results = st.session_state.grading_results_by_key[run_key]
     failed_student_ids = st.session_state.grading_failures_by_key.get(run_key, [])
 
@@ -2480,11 +3042,13 @@ def display_cached_grading_results(run_key: str, course_name: str) -> None:
             "Percentage": "Failed",
             "Band": "❌ Failed",
         })
+    _add_duplicate_review_notes(summary_data, st.session_state.get(f"duplicate_review_notes_{run_key}", {}))
 
     if summary_data:
         st.subheader("📊 Grading Summary")
         summary_df = pd.DataFrame(summary_data)
         st.dataframe(summary_df, hide_index=True)
+        _render_instructor_score_feedback(run_key, all_results)
 
         # Export options for grading summary
         col1, col2 = st.columns(2)
@@ -2780,6 +3344,9 @@ def main():
         unsafe_allow_html=True
     )
 
+    # Compile grading schemas once per process (no-op on reruns)
+    warm_up_ai_schemas()
+
     st.markdown("""Here we will give feedback and grade a students assignment submission""")
 
     # Create tabs - Added new "Exams (Rubric)" tab
@@ -3,7 +3,8 @@ import os
 
 import streamlit as st
 from cqc_streamlit_app.initi_pages import init_session_state
-from cqc_streamlit_app.utils import get_cpcc_css
+from cqc_streamlit_app.utils import get_cpcc_css, render_grading_cascade_panel, render_llm_metrics_panel, \
+    render_model_router_panel
 
 # Initialize session state variables
 init_session_state()
@@ -67,6 +68,15 @@ def main():
 
             st.success("Settings Saved")
 
+    st.markdown("---")
+    render_llm_metrics_panel()
+
+    st.markdown("---")
+    render_grading_cascade_panel()
+
+    st.markdown("---")
+    render_model_router_panel()
+
 
 if __name__ == '__main__':
     main()
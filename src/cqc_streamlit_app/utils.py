@@ -1153,32 +1153,286 @@ def define_chatGPTModel(unique_key: str | int,
     }
 
 
-@st.cache_data(ttl=3600)
 def _fetch_openrouter_models_cached() -> list:
     """
-    Fetch OpenRouter models with Streamlit caching.
-    Uses @st.cache_data to cache results for 1 hour.
+    Load OpenRouter models from the disk-persisted model catalog.
 
-    This helper runs outside of Streamlit's event loop context,
-    allowing asyncio.run() to work properly.
+    The catalog on disk is returned immediately; when it is stale a background
+    thread refreshes it with a conditional request. Only a cold start with no
+    catalog on disk waits for the network.
 
     Returns:
         List of model dictionaries from OpenRouter API
     """
     try:
-        import asyncio
+        from cqc_cpcc.utilities.AI.openrouter_catalog import get_openrouter_catalog
 
-        from cqc_cpcc.utilities.AI.openrouter_client import fetch_openrouter_models
+        catalog = get_openrouter_catalog()
+        if not catalog.models:
+            catalog.refresh_in_background(force=True)
+            catalog.wait_for_refresh(timeout=30)
+        else:
+            catalog.refresh_in_background()
+        return catalog.models
+    except Exception as e:
+        logger.error(f"Failed to load OpenRouter models: {e}", exc_info=True)
+        return []
+
+
+def _filter_openrouter_models(uk: str, models: list) -> list:
+    """
+    Render provider/context/price filters and apply them using the catalog indexes.
 
-        # st.cache_data runs in a context where asyncio.run() is safe
-        models = asyncio.run(fetch_openrouter_models())
-        logger.info(f"Fetched {len(models)} models from OpenRouter")
+    Args:
+        uk: Unique widget key suffix
+        models: Full model list (returned unchanged if no filter matches)
+
+    Returns:
+        Filtered list of model dictionaries
+    """
+    from cqc_cpcc.utilities.AI.openrouter_catalog import get_openrouter_catalog
+
+    catalog = get_openrouter_catalog()
+    with st.expander("Filter models", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        provider = col1.selectbox(
+            "Provider",
+            options=["All providers"] + catalog.providers(),
+            key=f"openrouter_provider_{uk}",
+        )
+        min_context = col2.selectbox(
+            "Minimum context",
+            options=[0, 32_000, 128_000, 200_000, 1_000_000],
+            format_func=lambda v: "Any" if v == 0 else f"{v:,} tokens",
+            key=f"openrouter_min_context_{uk}",
+        )
+        max_price = col3.number_input(
+            "Max prompt price ($ / 1M tokens)",
+            min_value=0.0,
+            value=0.0,
+            step=0.25,
+            help="0 means no price limit",
+            key=f"openrouter_max_price_{uk}",
+        )
+
+    filtered = catalog.filter(
+        provider=None if provider == "All providers" else provider,
+        min_context=min_context or None,
+        max_prompt_price=max_price or None,
+    )
+    if not filtered:
+        st.warning("No models match the selected filters; showing all models.")
         return models
+    return filtered
+
+
+@st.cache_resource
+def warm_up_ai_schemas() -> list[str]:
+    """
+    Compile the structured output schemas used for grading once per server process.
+    Uses @st.cache_resource so page reruns do not repeat the work.
+
+    Returns:
+        Names of the compiled schemas
+    """
+    try:
+        from cqc_cpcc.utilities.AI.schema_registry import warm_up_schemas
+
+        names = warm_up_schemas()
+        logger.info(f"Warmed up AI schemas: {', '.join(names)}")
+        return names
     except Exception as e:
-        logger.error(f"Failed to fetch OpenRouter models: {e}", exc_info=True)
+        logger.error(f"Failed to warm up AI schemas: {e}", exc_info=True)
         return []
 
 
+def format_llm_concurrency_status() -> str:
+    """
+    Describe the shared LLM concurrency limiter state for display.
+
+    Returns:
+        One-line summary of window, in-flight and queued requests per provider
+    """
+    from cqc_cpcc.utilities.AI.concurrency_limiter import get_limiter_snapshot
+
+    snapshot = get_limiter_snapshot()
+    if not snapshot:
+        return "🚦 LLM concurrency: idle"
+
+    parts = []
+    for provider, state in snapshot.items():
+        if state.get("window") is None:
+            parts.append(f"{provider}: unlimited")
+            continue
+        part = (
+            f"{provider}: {state['in_flight']}/{state['window']} in flight, "
+            f"{state['queue_depth']} queued"
+        )
+        if state.get("paused_seconds"):
+            part += f" (paused {state['paused_seconds']}s for Retry-After)"
+        parts.append(part)
+
+    return "🚦 LLM concurrency — " + "; ".join(parts)
+
+
+def render_llm_metrics_panel() -> None:
+    """
+    Render aggregate LLM call metrics (latency, tokens, retries, cost) with export buttons.
+    """
+    import json
+
+    from cqc_cpcc.utilities.AI.llm_metrics import get_metrics_registry
+
+    registry = get_metrics_registry()
+    snapshot = registry.snapshot()
+    totals = snapshot["totals"]
+
+    st.subheader("LLM Call Metrics")
+    st.caption("Aggregated since the app process started.")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Requests", f"{totals['requests']:g}", help=f"{totals['errors']:g} errors")
+    salvage_rate = totals.get("repair_salvage_rate")
+    col2.metric(
+        "Retries / Fallbacks",
+        f"{totals['retries']:g} / {totals['fallbacks']:g}",
+        help=f"{totals['repair_salvaged']:g} of {totals['repair_attempts']:g} malformed responses salvaged by "
+             f"JSON repair" + (f" ({salvage_rate:.0%})" if salvage_rate is not None else ""),
+    )
+    col3.metric(
+        "Tokens (prompt / completion)",
+        f"{totals['prompt_tokens']:,.0f} / {totals['completion_tokens']:,.0f}",
+        help=f"{totals['cached_tokens']:,.0f} cached prompt tokens",
+    )
+    col4.metric("Estimated cost", f"${totals['cost_usd']:.4f}")
+
+    if not snapshot["models"]:
+        st.info("No LLM calls recorded yet.")
+        return
+
+    st.dataframe(
+        [
+            {
+                "Operation": row["operation"],
+                "Model": row["model"],
+                "Requests": row["requests"],
+                "Errors": row["errors"],
+                "Retries": row["retries"],
+                "Fallbacks": row["fallbacks"],
+                "Cache hits": row["cache_hits"],
+                "Repaired": f"{row['repair_salvaged']:g}/{row['repair_attempts']:g}",
+                "p50 (s)": row["latency"].get("success", {}).get("p50"),
+                "p95 (s)": row["latency"].get("success", {}).get("p95"),
+                "Prompt tokens": row["prompt_tokens"],
+                "Cached tokens": row["cached_tokens"],
+                "Completion tokens": row["completion_tokens"],
+                "Cost ($)": row["cost_usd"],
+            }
+            for row in snapshot["models"]
+        ],
+        use_container_width=True,
+    )
+
+    col_prom, col_json = st.columns(2)
+    col_prom.download_button(
+        label="📥 Download Prometheus metrics",
+        data=registry.to_prometheus(),
+        file_name="cqc_llm_metrics.prom",
+        mime="text/plain",
+        key="download_llm_metrics_prometheus",
+    )
+    col_json.download_button(
+        label="📥 Download JSON snapshot",
+        data=json.dumps(snapshot, indent=2),
+        file_name="cqc_llm_metrics.json",
+        mime="application/json",
+        key="download_llm_metrics_json",
+    )
+
+
+def render_grading_cascade_panel(snapshot: Optional[Dict[str, Any]] = None, title: str = "Grading Cascade") -> None:
+    """
+    Render cascade escalation rate, estimated savings and latency.
+
+    Args:
+        snapshot: CascadeStats.snapshot() to show (default: process-wide stats)
+        title: Subheader text
+    """
+    from cqc_cpcc.grading_cascade import get_cascade_stats
+
+    if snapshot is None:
+        snapshot = get_cascade_stats().snapshot()
+
+    st.subheader(title)
+    if not snapshot["graded"]:
+        st.info("No submissions graded in cascade mode yet.")
+        return
+
+    latency = snapshot["latency"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric(
+        "Escalation rate",
+        f"{snapshot['escalation_rate']:.0%}",
+        help=f"{snapshot['escalated']} of {snapshot['graded']} submissions re-graded with the strong model",
+    )
+    if snapshot["savings_usd"] is not None:
+        col2.metric(
+            "Estimated savings",
+            f"${snapshot['savings_usd']:.4f}",
+            delta=f"{snapshot['savings_rate']:.0%}" if snapshot["savings_rate"] is not None else None,
+            help=f"Cascade ${snapshot['cost_usd']:.4f} vs strong model only "
+                 f"${snapshot['strong_only_cost_usd']:.4f}",
+        )
+    else:
+        col2.metric("Estimated cost", f"${snapshot['cost_usd']:.4f}",
+                    help="Savings unavailable: the strong model has no price in the metrics price table")
+    col3.metric(
+        "Latency p50 / p95 (s)",
+        f"{latency['cascade']['p50']} / {latency['cascade']['p95']}",
+        help=f"Kept cheap result: p50 {latency['cheap_only']['p50']}s; "
+             f"escalated: p50 {latency['escalated']['p50']}s",
+    )
+
+    fired = {name: count for name, count in snapshot["trigger_counts"].items() if count}
+    if fired:
+        st.caption("Escalation triggers: " + ", ".join(f"{name} ({count})" for name, count in fired.items()))
+
+
+def render_model_router_panel(title: str = "Model Router") -> None:
+    """
+    Render the local model router's per-model history across all segments.
+
+    Args:
+        title: Subheader text
+    """
+    from cqc_cpcc.utilities.AI.model_router import RoutingSegment, get_model_router
+
+    router = get_model_router()
+    stats = router.history.segment_stats(RoutingSegment())
+
+    st.subheader(title)
+    st.caption(f"Objective: {router.objective.kind} · candidates: {', '.join(router.candidates)}")
+    if not stats:
+        st.info("No routed grading calls recorded yet.")
+        return
+
+    st.dataframe(
+        [
+            {
+                "Model": s.model,
+                "Calls": s.samples,
+                "Schema failures": f"{s.schema_failure_rate:.0%}",
+                "Mean cost ($)": round(s.mean_cost_usd, 5) if s.mean_cost_usd is not None else None,
+                "p95 latency (s)": round(s.p95_latency_seconds, 2) if s.p95_latency_seconds is not None else None,
+                "Instructor agreement": f"{s.agreement:.0%}" if s.agreement is not None else "n/a",
+                "Scores compared": s.agreement_samples,
+            }
+            for s in sorted(stats.values(), key=lambda s: s.model)
+        ],
+        use_container_width=True,
+    )
+
+
 def define_openrouter_model(unique_key: str | int, default_use_auto_route: bool = True) -> Dict[str, Any]:
     """
     Presents OpenRouter model configuration with auto-routing option.
@@ -1187,6 +1441,7 @@ def define_openrouter_model(unique_key: str | int, default_use_auto_route: bool
         "use_auto_route": bool,
         "model": str,  # "openrouter/auto" or specific model ID
         "use_openrouter": True,
+        "use_model_router": bool,  # pick the model per submission from local history
       }
     
     Args:
@@ -1209,10 +1464,11 @@ def define_openrouter_model(unique_key: str | int, default_use_auto_route: bool
     selected_model = "openrouter/auto"
 
     if not use_auto_route:
-        # Fetch available models from OpenRouter
-        # Using cached helper to avoid asyncio.run() in running event loop
-        with st.spinner("Fetching available models from OpenRouter..."):
+        # Load available models from the disk-persisted OpenRouter catalog
+        with st.spinner("Loading available models from OpenRouter..."):
             models = _fetch_openrouter_models_cached()
+            if models:
+                models = _filter_openrouter_models(uk, models)
 
             if not models:
                 # Fall back to allowed models from environment or default list
@@ -1291,10 +1547,21 @@ def define_openrouter_model(unique_key: str | int, default_use_auto_route: bool
     else:
         st.info("**Auto Router:** OpenRouter will automatically select the best model for your request.")
 
+    from cqc_cpcc.utilities.env_constants import CQC_AI_MODEL_ROUTER, CQC_AI_ROUTER_OBJECTIVE
+
+    use_model_router = st.checkbox(
+        label="Use Local Model Router",
+        value=CQC_AI_MODEL_ROUTER,
+        key=f"openrouter_local_router_{uk}",
+        help=f"Pick the model per submission from our own grading history (objective: {CQC_AI_ROUTER_OBJECTIVE}). "
+             f"The model above is used until a candidate has enough history."
+    )
+
     return {
         "use_auto_route": use_auto_route,
         "model": selected_model,
         "use_openrouter": True,
+        "use_model_router": use_model_router,
     }
 
 
@@ -1794,8 +2061,10 @@ def render_openai_debug_panel(
     """
     import json
 
+    from cqc_cpcc.utilities.AI.circuit_breaker import get_circuit_snapshot
     from cqc_cpcc.utilities.AI.openai_debug import get_debug_context
     from cqc_cpcc.utilities.AI.openai_exceptions import (
+        CircuitOpenError,
         OpenAISchemaValidationError,
         OpenAITransportError,
     )
@@ -1815,6 +2084,15 @@ def render_openai_debug_panel(
         else:
             st.warning("No correlation ID available (debug mode may have been off during request)")
 
+        # Show circuit breaker states (provider and per-model)
+        circuit_snapshot = get_circuit_snapshot()
+        if circuit_snapshot:
+            st.markdown("**Circuit Breakers:**")
+            st.table([
+                {"circuit": name, **state}
+                for name, state in sorted(circuit_snapshot.items())
+            ])
+
         # Show error details if present
         if error:
             st.error("**Error Occurred:**")
@@ -1832,6 +2110,12 @@ def render_openai_debug_panel(
                     with st.expander("Show Raw Output"):
                         st.code(error.raw_output[:1000], language="json")  # Truncate to 1000 chars
 
+            elif isinstance(error, CircuitOpenError):
+                st.markdown("**Type:** Circuit Open (request not sent)")
+                st.markdown(f"**Circuit:** {error.circuit}")
+                if error.retry_after:
+                    st.markdown(f"**Probe In:** {error.retry_after}s")
+
             elif isinstance(error, OpenAITransportError):
                 st.markdown("**Type:** Transport Error")
                 if error.status_code:
@@ -1948,5 +2232,5 @@ def render_openai_debug_panel(
         **Debug Mode Configuration:**
         - `CQC_OPENAI_DEBUG=1` - Enable debug mode
         - `CQC_OPENAI_DEBUG_REDACT=1` - Redact sensitive data (default: enabled)
-        - `CQC_OPENAI_DEBUG_SAVE_DIR=/path/to/dir` - Save debug files to directory
+        - `CQC_OPENAI_DEBUG_SAVE_DIR=/path/to/dir` - Save debug captures (compressed JSONL segments) to directory
         """)
@@ -4,4 +4,57 @@ import pytest
 
 @pytest.fixture
 def sample_fixture():
-    return "sample data"
\ No newline at end of file
+    return "sample data"
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """Keep circuit breaker state from leaking between tests."""
+    from cqc_cpcc.utilities.AI.circuit_breaker import reset_circuit_breakers as _reset
+
+    _reset()
+    yield
+    _reset()
+
+
+@pytest.fixture(autouse=True)
+def isolated_token_estimator():
+    """Use an in-memory token estimator so calibration never leaks between tests."""
+    from cqc_cpcc.utilities.token_estimator import TokenEstimator, set_token_estimator
+
+    set_token_estimator(TokenEstimator(path=None))
+    yield
+    set_token_estimator(None)
+
+
+@pytest.fixture(autouse=True)
+def close_debug_writers():
+    """Stop background debug writers so no thread outlives a test's temp directory."""
+    yield
+    from cqc_cpcc.utilities.AI.debug_writer import close_debug_writers as _close
+
+    _close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_ai_caches(tmp_path):
+    """Point the persistent response, transcription, extracted audio, grading history and model router stores at a per-test directory."""
+    from cqc_cpcc.rubric_delta_grading import GradingHistory, set_grading_history
+    from cqc_cpcc.utilities.AI.audio_transcription import set_transcription_cache
+    from cqc_cpcc.utilities.AI.model_router import ModelRouter, RouterHistory, set_model_router
+    from cqc_cpcc.utilities.AI.response_cache import ResponseCache, set_response_cache
+    from cqc_cpcc.utilities.media_pipeline import set_media_cache_dir
+
+    set_response_cache(ResponseCache(tmp_path / "ai_response_cache.sqlite3", max_bytes=64 * 1024 * 1024,
+                                     ttl_seconds=0))
+    set_transcription_cache(ResponseCache(tmp_path / "ai_transcription_cache.sqlite3",
+                                          max_bytes=64 * 1024 * 1024, ttl_seconds=0))
+    set_media_cache_dir(tmp_path / "media_audio")
+    set_grading_history(GradingHistory(ResponseCache(tmp_path / "grading_history.sqlite3",
+                                                     max_bytes=64 * 1024 * 1024, ttl_seconds=0)))
+    set_model_router(ModelRouter(RouterHistory(tmp_path / "ai_model_router.sqlite3"), candidates=[]))
+    yield
+    set_response_cache(None)
+    set_transcription_cache(None)
+    set_media_cache_dir(None)
+    set_grading_history(None)
+    set_model_router(None)
@@ -0,0 +1,394 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""
+Local OpenAI-compatible stub server for benchmarks and load tests.
+
+A small asyncio HTTP/1.1 server (standard library only) that stands in for the
+OpenAI API so throughput can be measured without spending money. Unlike
+TEST_MODE, requests go through the real SDK, HTTP stack and retry layer.
+
+Routes:
+- POST /v1/chat/completions: returns a JSON object generated from the
+  request's json_schema response_format (or from content_factory). With
+  stream=True the content is sent as server-sent chat.completion.chunk
+  events, followed by a usage chunk when stream_options.include_usage is set.
+- POST /v1/audio/transcriptions: returns a verbose_json transcription whose
+  duration is derived from the uploaded file size.
+
+Behaviour knobs:
+- latency: seconds, or a distribution spec ("fixed:0.05", "uniform:0.02,0.2",
+  "normal:0.1,0.03", "lognormal:0.1,0.5" = median, sigma)
+- rate_limit_rate / server_error_rate: fraction of requests answered with a
+  429 (with Retry-After) or a 500/503, using OpenAI's error body
+- handshake_delay: per-connection delay simulating TCP/TLS setup
+- Token usage is estimated at chars_per_token and reported per response and
+  in stats
+
+Connections are kept alive between requests; stats counts connections,
+requests, injected errors and tokens.
+
+Usage:
+    from tests.openai_stub_server import OpenAIStubServer
+
+    async with OpenAIStubServer(latency="lognormal:0.8,0.4", rate_limit_rate=0.02) as stub:
+        client = AsyncOpenAI(api_key="stub", base_url=stub.base_url)
+        ...
+        print(stub.stats)
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Callable, Optional, Union
+
+LatencySpec = Union[float, int, str, None]
+
+_STREAM_CHUNK_CHARS = 48
+_AUDIO_BYTES_PER_SECOND = 16_000
+
+
+def parse_latency(spec: LatencySpec) -> Callable[[random.Random], float]:
+    """Build a latency sampler from a number or a distribution spec.
+
+    Args:
+        spec: Seconds (number), None, or "<kind>:<params>" with kind one of
+              fixed, uniform (low,high), normal (mean,stddev) or
+              lognormal (median,sigma)
+
+    Returns:
+        Function that draws a non-negative latency from a Random instance
+
+    Raises:
+        ValueError: If the spec is not recognized
+    """
+    if spec is None or isinstance(spec, (int, float)):
+        seconds = float(spec or 0.0)
+        return lambda rng: seconds
+
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(value) for value in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid latency parameters: {spec!r}")
+    kind = kind.strip().lower()
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: max(0.0, values[0])
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: max(0.0, rng.uniform(values[0], values[1]))
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2 and values[0] > 0:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if not params:
+        try:
+            seconds = float(kind)
+        except ValueError:
+            pass
+        else:
+            return lambda rng: max(0.0, seconds)
+    raise ValueError(f"Unknown latency spec: {spec!r}")
+
+
+def _error_body(message: str, error_type: str, code: Optional[str] = None) -> dict:
+    return {"error": {"message": message, "type": error_type, "param": None, "code": code}}
+
+
+def generate_from_schema(schema: dict, root: Optional[dict] = None) -> Any:
+    """Build a minimal instance that satisfies a (normalized) JSON schema.
+
+    Args:
+        schema: JSON schema node
+        root: Root schema used to resolve "#/$defs/..." references
+
+    Returns:
+        JSON-serializable value
+    """
+    root = root or schema
+    if "$ref" in schema:
+        node: Any = root
+        for part in schema["$ref"].lstrip("#/").split("/"):
+            node = node[part]
+        return generate_from_schema(node, root)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    for combinator in ("anyOf", "oneOf", "allOf"):
+        if combinator in schema:
+            options = [option for option in schema[combinator] if option.get("type") != "null"]
+            return generate_from_schema((options or schema[combinator])[0], root)
+
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+    if schema_type == "object" or "properties" in schema:
+        return {name: generate_from_schema(prop, root) for name, prop in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        return [generate_from_schema(schema.get("items", {}), root) for _ in range(schema.get("minItems", 0))]
+    if schema_type == "string":
+        return "stub"
+    if schema_type == "integer":
+        return int(schema.get("minimum", 0))
+    if schema_type == "number":
+        return float(schema.get("minimum", 0))
+    if schema_type == "boolean":
+        return False
+    return None
+
+
+class OpenAIStubServer:
+    """In-process OpenAI-compatible HTTP server."""
+
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 0,
+            latency: LatencySpec = 0.0,
+            handshake_delay: float = 0.0,
+            rate_limit_rate: float = 0.0,
+            server_error_rate: float = 0.0,
+            retry_after: float = 1.0,
+            chars_per_token: int = 4,
+            content_factory: Optional[Callable[[dict], Any]] = None,
+            seed: Optional[int] = None,
+    ):
+        """Configure the stub (the server starts with start() or async with).
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Response latency in seconds or a distribution spec (see parse_latency)
+            handshake_delay: Delay charged once per new connection
+            rate_limit_rate: Fraction of API requests answered with 429
+            server_error_rate: Fraction of API requests answered with 500/503
+            retry_after: Retry-After seconds sent with 429 responses
+            chars_per_token: Characters per token for usage estimates
+            content_factory: Optional callable receiving the chat request body and
+                             returning the response content (str, or a value that
+                             is JSON-encoded); defaults to schema-generated JSON
+            seed: Seed for latency sampling and error injection
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.handshake_delay = handshake_delay
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after = retry_after
+        self.chars_per_token = max(1, chars_per_token)
+        self.content_factory = content_factory
+        self._sample_latency = parse_latency(latency)
+        self._rng = random.Random(seed)
+        self.stats = {
+            "connections": 0,
+            "requests": 0,
+            "streamed": 0,
+            "transcriptions": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass to AsyncOpenAI."""
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> "OpenAIStubServer":
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Drop idle keep-alive connections so wait_closed() does not wait on clients
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "OpenAIStubServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        self._writers.add(writer)
+        if self.handshake_delay:
+            await asyncio.sleep(self.handshake_delay)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                self.stats["requests"] += 1
+                status, payload, extra_headers = await self._route(method, path, headers, body)
+                head = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nConnection: keep-alive\r\n"
+                head += "".join(f"{name}: {value}\r\n" for name, value in extra_headers.items())
+                if isinstance(payload, dict):
+                    data = json.dumps(payload).encode("utf-8")
+                    writer.write(
+                        f"{head}Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                    )
+                else:
+                    # Server-sent events with chunked transfer encoding
+                    writer.write(
+                        f"{head}Content-Type: text/event-stream\r\n"
+                        f"Transfer-Encoding: chunked\r\n\r\n".encode("latin-1")
+                    )
+                    async for event in payload:
+                        writer.write(f"{len(event):X}\r\n".encode("latin-1") + event + b"\r\n")
+                        await writer.drain()
+                    writer.write(b"0\r\n\r\n")
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _route(
+            self, method: str, path: str, headers: dict[str, str], body: bytes
+    ) -> tuple[int, Union[dict, AsyncIterator[bytes]], dict[str, str]]:
+        route = path.split("?", 1)[0].rstrip("/")
+        if method != "POST" or not route.endswith(("/chat/completions", "/audio/transcriptions")):
+            return 404, _error_body(f"No stub route for {method} {path}", "not_found"), {}
+
+        # Injected failures: 429s are answered immediately, 5xx after the normal latency
+        roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return 429, _error_body(
+                "Rate limit reached (stub)", "requests", "rate_limit_exceeded"
+            ), {"Retry-After": f"{self.retry_after:g}"}
+
+        latency = self._sample_latency(self._rng)
+        if latency:
+            await asyncio.sleep(latency)
+
+        if roll < self.rate_limit_rate + self.server_error_rate:
+            self.stats["server_errors"] += 1
+            status = self._rng.choice((500, 503))
+            return status, _error_body("The server had an error (stub)", "server_error"), {}
+
+        if route.endswith("/audio/transcriptions"):
+            return 200, self._transcription(headers, body), {}
+
+        request = json.loads(body or b"{}")
+        content = self._chat_content(request)
+        usage = self._usage(request, content)
+        if request.get("stream"):
+            self.stats["streamed"] += 1
+            include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+            return 200, self._stream_chunks(request, content, usage if include_usage else None), {}
+        return 200, self._chat_completion(request, content, usage), {}
+
+    def _chat_content(self, request: dict) -> str:
+        if self.content_factory is not None:
+            content = self.content_factory(request)
+            return content if isinstance(content, str) else json.dumps(content)
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            return json.dumps(generate_from_schema(response_format["json_schema"]["schema"]))
+        return "{}"
+
+    def _usage(self, request: dict, content: str) -> dict:
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        prompt_tokens = max(1, len(prompt) // self.chars_per_token)
+        completion_tokens = max(1, len(content) // self.chars_per_token)
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["completion_tokens"] += completion_tokens
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+            "completion_tokens_details": {"reasoning_tokens": 0},
+        }
+
+    @staticmethod
+    def _chat_completion(request: dict, content: str, usage: dict) -> dict:
+        return {
+            "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    @staticmethod
+    async def _stream_chunks(request: dict, content: str, usage: Optional[dict]) -> AsyncIterator[bytes]:
+        base = {
+            "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+        }
+
+        def event(choices: list, **extra: Any) -> bytes:
+            return f"data: {json.dumps({**base, 'choices': choices, **extra})}\n\n".encode("utf-8")
+
+        yield event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for start in range(0, len(content), _STREAM_CHUNK_CHARS):
+            piece = content[start:start + _STREAM_CHUNK_CHARS]
+            yield event([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+            await asyncio.sleep(0)
+        yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if usage is not None:
+            yield event([], usage=usage)
+        yield b"data: [DONE]\n\n"
+
+    def _transcription(self, headers: dict[str, str], body: bytes) -> dict:
+        self.stats["transcriptions"] += 1
+        file_name, file_size = "audio", len(body)
+        boundary = re.search(r'boundary="?([^";]+)"?', headers.get("content-type", ""))
+        if boundary:
+            for part in body.split(b"--" + boundary.group(1).encode("latin-1")):
+                head, _, data = part.partition(b"\r\n\r\n")
+                match = re.search(rb'name="file"; filename="([^"]*)"', head)
+                if match:
+                    file_name = match.group(1).decode("utf-8", "replace")
+                    file_size = len(data.removesuffix(b"\r\n"))
+                    break
+        duration = round(file_size / _AUDIO_BYTES_PER_SECOND, 2)
+        text = f"Stub transcript of {file_name} ({duration} seconds)."
+        return {
+            "task": "transcribe",
+            "language": "english",
+            "duration": duration,
+            "text": text,
+            "segments": [{
+                "id": 0, "seek": 0, "start": 0.0, "end": duration, "text": text, "tokens": [],
+                "temperature": 0.0, "avg_logprob": 0.0, "compression_ratio": 1.0, "no_speech_prob": 0.0,
+            }],
+        }
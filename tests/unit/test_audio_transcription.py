@@ -0,0 +1,212 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for segmented audio transcription and the transcription cache.
+
+Tests cover:
+- Segment planning with overlap
+- Stitching segment transcripts (timestamp windows and text overlap)
+- transcribe_audio: cache by audio SHA-256, segmented transcription,
+  oversized files without ffmpeg
+- Running coroutines from sync code on the shared background loop
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from cqc_cpcc.utilities.AI import openai_client
+from cqc_cpcc.utilities.AI.audio_transcription import (
+    AudioSegment,
+    merge_overlapping_text,
+    normalize_transcription_segments,
+    plan_segments,
+    stitch_transcriptions,
+)
+from cqc_cpcc.utilities.AI.openai_client import transcribe_audio
+from cqc_cpcc.utilities.AI.openai_exceptions import OpenAITransportError
+from cqc_cpcc.utilities.async_bridge import get_bridge_loop, run_coroutine_blocking
+
+
+def _mock_client(mocker, responses):
+    """Client whose transcription call returns the next response for each upload."""
+    client = mocker.MagicMock()
+    client.audio.transcriptions.create = mocker.AsyncMock(side_effect=responses)
+    mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_client", return_value=client)
+    return client
+
+
+def _verbose(mocker, text, segments=None, duration=None, language="english"):
+    response = mocker.MagicMock()
+    response.text = text
+    response.duration = duration
+    response.language = language
+    response.segments = segments
+    return response
+
+
+@pytest.mark.unit
+class TestSegmentPlanning:
+    """Test overlapping segment plans."""
+
+    def test_short_recording_is_one_segment(self):
+        assert plan_segments(300.0, segment_seconds=600, overlap_seconds=5) == [(0.0, 300.0)]
+
+    def test_long_recording_overlaps(self):
+        plan = plan_segments(1500.0, segment_seconds=600, overlap_seconds=5)
+
+        assert plan == [(0.0, 600.0), (595.0, 600.0), (1190.0, 310.0)]
+
+
+@pytest.mark.unit
+class TestStitching:
+    """Test stitching segment transcripts."""
+
+    def test_merge_overlapping_text_drops_repeated_words(self):
+        merged = merge_overlapping_text("so the loop runs ten times.", "Runs ten times. Then it prints")
+
+        assert merged == "so the loop runs ten times. Then it prints"
+
+    def test_merge_without_overlap_concatenates(self):
+        assert merge_overlapping_text("first part", "second part") == "first part second part"
+        # One shared word is not treated as overlap
+        assert merge_overlapping_text("I like the", "the cat") == "I like the the cat"
+
+    def test_timestamp_windows_keep_each_segment_once(self):
+        parts = [
+            (0.0, {"text": "", "segments": [
+                {"start": 0.0, "end": 50.0, "text": "Intro."},
+                {"start": 50.0, "end": 58.0, "text": "Shared sentence."},
+            ]}),
+            (55.0, {"text": "", "segments": [
+                {"start": 0.0, "end": 3.0, "text": "Shared sentence."},
+                {"start": 3.0, "end": 40.0, "text": "Conclusion."},
+            ]}),
+        ]
+
+        text, segments = stitch_transcriptions(parts, overlap_seconds=5)
+
+        assert text == "Intro. Shared sentence. Conclusion."
+        assert [(s["start"], s["end"]) for s in segments] == [(0.0, 50.0), (50.0, 58.0), (58.0, 95.0)]
+
+    def test_normalize_segments_accepts_objects_and_dicts(self, mocker):
+        class Segment:
+            def __init__(self, start, end, text):
+                self.start, self.end, self.text = start, end, text
+
+        assert normalize_transcription_segments([Segment(0, 1.5, " hi "), {"start": 2, "end": 3, "text": "x"}]) == [
+            {"start": 0.0, "end": 1.5, "text": "hi"},
+            {"start": 2.0, "end": 3.0, "text": "x"},
+        ]
+        assert normalize_transcription_segments(mocker.MagicMock()) == []
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestTranscribeAudioPipeline:
+    """Test transcribe_audio caching and segmentation."""
+
+    async def test_same_audio_is_transcribed_once(self, mocker, tmp_path):
+        client = _mock_client(mocker, [_verbose(mocker, "First run.", duration=12.0)])
+        first = tmp_path / "presentation.m4a"
+        first.write_bytes(b"identical audio bytes")
+        regraded = tmp_path / "renamed_copy.m4a"
+        regraded.write_bytes(b"identical audio bytes")
+
+        result1 = await transcribe_audio(str(first))
+        result2 = await transcribe_audio(str(regraded))
+
+        assert client.audio.transcriptions.create.await_count == 1
+        assert result2["text"] == result1["text"] == "First run."
+        assert result2["file_info"]["name"] == "renamed_copy.m4a"
+
+    async def test_different_audio_is_not_served_from_cache(self, mocker, tmp_path):
+        client = _mock_client(mocker, [_verbose(mocker, "one"), _verbose(mocker, "two")])
+        (tmp_path / "a.mp3").write_bytes(b"audio a")
+        (tmp_path / "b.mp3").write_bytes(b"audio b")
+
+        assert (await transcribe_audio(str(tmp_path / "a.mp3")))["text"] == "one"
+        assert (await transcribe_audio(str(tmp_path / "b.mp3")))["text"] == "two"
+        assert client.audio.transcriptions.create.await_count == 2
+
+    async def test_long_recording_is_split_and_stitched(self, mocker, tmp_path):
+        audio = tmp_path / "long.mp3"
+        audio.write_bytes(b"long audio")
+        mocker.patch.object(openai_client, "probe_media_duration", return_value=1500.0)
+        mocker.patch.object(openai_client, "CQC_AI_TRANSCRIPTION_SEGMENT_SECONDS", 600.0)
+        mocker.patch.object(openai_client, "CQC_AI_TRANSCRIPTION_OVERLAP_SECONDS", 5.0)
+        mocker.patch.object(openai_client, "plan_segments",
+                            return_value=[(0.0, 600.0), (595.0, 600.0), (1190.0, 310.0)])
+
+        async def fake_split(file_path, plan, output_dir):
+            segments = []
+            for index, (start, length) in enumerate(plan):
+                path = tmp_path / f"seg{index}.mp3"
+                path.write_bytes(f"segment {index}".encode())
+                segments.append(AudioSegment(index, start, length, str(path)))
+            return segments
+
+        mocker.patch.object(openai_client, "split_audio", side_effect=fake_split)
+        _mock_client(mocker, [
+            _verbose(mocker, "", segments=[{"start": 0, "end": 597, "text": "Part one."}]),
+            _verbose(mocker, "", segments=[{"start": 0, "end": 4, "text": "Part one."},
+                                           {"start": 4, "end": 597, "text": "Part two."}]),
+            _verbose(mocker, "", segments=[{"start": 0, "end": 4, "text": "Part two."},
+                                           {"start": 4, "end": 310, "text": "Part three."}]),
+        ])
+
+        result = await transcribe_audio(str(audio))
+
+        assert result["text"] == "Part one. Part two. Part three."
+        assert result["segment_count"] == 3
+        assert result["duration"] == 1500.0
+        assert result["segments"][-1]["end"] == 1500.0
+
+    async def test_oversized_file_without_ffmpeg_fails(self, mocker, tmp_path):
+        audio = tmp_path / "huge.wav"
+        audio.write_bytes(b"x" * 2048)
+        mocker.patch.object(openai_client, "CQC_AI_TRANSCRIPTION_MAX_UPLOAD_MB", 0.001)
+        mocker.patch.object(openai_client, "probe_media_duration", return_value=None)
+        mocker.patch.object(openai_client, "is_ffmpeg_available", return_value=False)
+        client = _mock_client(mocker, [])
+
+        with pytest.raises(OpenAITransportError, match="ffmpeg is not installed"):
+            await transcribe_audio(str(audio))
+        client.audio.transcriptions.create.assert_not_called()
+
+
+@pytest.mark.unit
+class TestAsyncBridge:
+    """Test running coroutines from synchronous code."""
+
+    def test_runs_on_one_persistent_loop(self):
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        assert run_coroutine_blocking(current_loop()) is run_coroutine_blocking(current_loop()) is get_bridge_loop()
+
+    def test_works_inside_a_running_loop(self):
+        async def caller():
+            # Synchronous code (like read_file) called from a grading task
+            return run_coroutine_blocking(asyncio.sleep(0, result="done"))
+
+        assert asyncio.run(caller()) == "done"
+
+    def test_exceptions_propagate(self):
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            run_coroutine_blocking(fail())
+
+    def test_rejects_calls_from_the_bridge_loop(self):
+        async def nested():
+            coro = asyncio.sleep(0)
+            try:
+                run_coroutine_blocking(coro)
+            except RuntimeError as e:
+                return str(e), threading.current_thread().name
+
+        message, thread_name = run_coroutine_blocking(nested())
+        assert "cannot be called" in message
+        assert thread_name == "cqc-async-bridge"
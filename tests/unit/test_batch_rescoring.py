@@ -0,0 +1,190 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for vectorized class-wide rescoring.
+
+Tests cover:
+1. Identical output to per-student apply_backend_scoring for every configured rubric
+2. Error-count rules (conversion, max_deduction, floor_score) and overall bands
+3. Array loading and vectorized error normalization
+4. Inputs left unmodified and per-student errors preserved
+"""
+
+import json
+import random
+
+import numpy as np
+import pytest
+
+from cqc_cpcc.error_scoring import normalize_errors
+from cqc_cpcc.rubric_config import load_rubrics_from_config
+from cqc_cpcc.rubric_grading import apply_backend_scoring
+from cqc_cpcc.rubric_models import (
+    Criterion,
+    CriterionResult,
+    DetectedError,
+    ErrorConversionRules,
+    ErrorCountScoringRules,
+    OverallBand,
+    PerformanceLevel,
+    Rubric,
+    RubricAssessmentResult,
+)
+from cqc_cpcc.scoring import load_class_scoring_arrays, rescore_class_results
+from cqc_cpcc.scoring.batch_rescoring import normalize_error_arrays
+
+
+@pytest.fixture
+def mixed_rubric():
+    """Rubric with level_band, capped/floored error_count and manual criteria plus overall bands."""
+    return Rubric(
+        rubric_id="mixed_rubric",
+        rubric_version="1.0",
+        title="Mixed Rubric",
+        criteria=[
+            Criterion(
+                criterion_id="design",
+                name="Design",
+                max_points=30,
+                scoring_mode="level_band",
+                points_strategy="mid",
+                levels=[
+                    PerformanceLevel(label="Exemplary", score_min=27, score_max=30, description="..."),
+                    PerformanceLevel(label="Proficient", score_min=21, score_max=26, description="..."),
+                    PerformanceLevel(label="Beginning", score_min=0, score_max=20, description="..."),
+                ],
+            ),
+            Criterion(
+                criterion_id="correctness",
+                name="Correctness",
+                max_points=50,
+                scoring_mode="error_count",
+                error_rules=ErrorCountScoringRules(
+                    major_weight=7.5,
+                    minor_weight=2.5,
+                    max_deduction=40,
+                    floor_score=5,
+                    error_conversion=ErrorConversionRules(minor_to_major_ratio=3),
+                ),
+            ),
+            Criterion(criterion_id="reflection", name="Reflection", max_points=20, scoring_mode="manual"),
+        ],
+        overall_bands=[
+            OverallBand(label="A", score_min=90, score_max=100),
+            OverallBand(label="B", score_min=80, score_max=89.5),
+            OverallBand(label="C", score_min=0, score_max=79),
+        ],
+    )
+
+
+def _random_results(rubric: Rubric, rng: random.Random, count: int) -> list[RubricAssessmentResult]:
+    results = []
+    for _ in range(count):
+        criteria_results = []
+        for criterion in rubric.criteria:
+            if not criterion.enabled and rng.random() < 0.7:
+                continue
+            label = None
+            if criterion.levels and rng.random() < 0.9:
+                label = rng.choice(criterion.levels).label if rng.random() < 0.9 else "Unknown level"
+            points = None
+            if criterion.scoring_mode == "manual" or rng.random() < 0.3:
+                points = rng.randint(0, criterion.max_points)
+            criteria_results.append(CriterionResult(
+                criterion_id=criterion.criterion_id, criterion_name=criterion.name,
+                points_possible=criterion.max_points, points_earned=points,
+                selected_level_label=label, feedback="Feedback",
+            ))
+        detected_errors, counts = None, None
+        source = rng.random()
+        if source < 0.4:
+            counts = {"major": rng.randint(0, 7), "minor": rng.randint(0, 12)}
+        elif source < 0.8:
+            detected_errors = [
+                DetectedError(code=rng.choice("ABCD"), name="Error", severity=rng.choice(["major", "minor"]),
+                              description="...", occurrences=rng.randint(1, 3))
+                for _ in range(rng.randint(0, 6))
+            ]
+        results.append(RubricAssessmentResult(
+            rubric_id=rubric.rubric_id, rubric_version=rubric.rubric_version,
+            total_points_possible=sum(cr.points_possible for cr in criteria_results), total_points_earned=0,
+            criteria_results=criteria_results, overall_feedback="Overall",
+            detected_errors=detected_errors, error_counts_by_severity=counts,
+        ))
+    return [r for r in results if r.criteria_results]
+
+
+def _assert_identical(rubric: Rubric, results: list[RubricAssessmentResult]) -> None:
+    expected = [apply_backend_scoring(rubric, r.model_copy(deep=True)) for r in results]
+    rescored = rescore_class_results(rubric, results)
+
+    # JSON comparison also catches int/float differences
+    assert [json.dumps(r.model_dump(), sort_keys=True) for r in rescored.results] == \
+           [json.dumps(r.model_dump(), sort_keys=True) for r in expected]
+    assert rescored.total_points_earned.tolist() == [r.total_points_earned for r in expected]
+
+
+@pytest.mark.unit
+class TestIdenticalToPerStudentPath:
+    """Test that class-wide rescoring matches apply_backend_scoring."""
+
+    @pytest.mark.parametrize("rubric_id", sorted(load_rubrics_from_config()))
+    def test_configured_rubrics(self, rubric_id):
+        rubric = load_rubrics_from_config()[rubric_id]
+
+        _assert_identical(rubric, _random_results(rubric, random.Random(rubric_id), 60))
+
+    def test_error_count_rules_and_overall_bands(self, mixed_rubric):
+        _assert_identical(mixed_rubric, _random_results(mixed_rubric, random.Random(7), 200))
+
+    def test_percentages_and_bands(self, mixed_rubric):
+        results = _random_results(mixed_rubric, random.Random(3), 50)
+        rescored = rescore_class_results(mixed_rubric, results)
+
+        for result, percentage in zip(rescored.results, rescored.percentages):
+            assert percentage == round(result.total_points_earned / result.total_points_possible * 100.0, 2)
+        assert rescored.overall_band_labels == [r.overall_band_label for r in rescored.results]
+
+
+@pytest.mark.unit
+class TestBatchInputs:
+    """Test array loading and input handling."""
+
+    def test_normalize_error_arrays_matches_scalar(self):
+        major = np.array([0, 1, 2, 0, 3])
+        minor = np.array([4, 7, 8, 3, 13])
+
+        effective_major, effective_minor = normalize_error_arrays(major, minor)
+
+        assert list(zip(effective_major.tolist(), effective_minor.tolist())) == [
+            normalize_errors(int(a), int(b)) for a, b in zip(major, minor)
+        ]
+
+    def test_arrays_keep_unknown_criteria(self, mixed_rubric):
+        results = _random_results(mixed_rubric, random.Random(1), 3)
+        results[0].criteria_results.append(CriterionResult(
+            criterion_id="extra", criterion_name="Extra", points_possible=0, points_earned=None, feedback="..."
+        ))
+
+        arrays = load_class_scoring_arrays(mixed_rubric, results)
+
+        assert len(arrays.student_index) == sum(len(r.criteria_results) for r in results)
+        assert arrays.criterion_index[len(results[0].criteria_results) - 1] == -1
+
+    def test_inputs_are_not_modified(self, mixed_rubric):
+        results = _random_results(mixed_rubric, random.Random(5), 10)
+        before = [r.model_dump() for r in results]
+
+        rescore_class_results(mixed_rubric, results)
+
+        assert [r.model_dump() for r in results] == before
+
+    def test_zero_points_possible_raises_like_per_student_path(self, mixed_rubric):
+        result = _random_results(mixed_rubric, random.Random(2), 1)[0]
+        empty = result.model_copy(update={"criteria_results": [
+            cr.model_copy(update={"points_possible": 0}) for cr in result.criteria_results
+        ]})
+
+        with pytest.raises(ValueError, match="points_possible must be positive"):
+            apply_backend_scoring(mixed_rubric, empty.model_copy(deep=True))
+        with pytest.raises(ValueError, match="points_possible must be positive"):
+            rescore_class_results(mixed_rubric, [result, empty])
@@ -0,0 +1,226 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for map-reduce chunked preprocessing.
+
+Tests cover:
+- Splitting submissions by file and by definition boundary
+- Merging chunk digests of one file
+- Concurrent chunk digests merged into one PreprocessingDigest
+- Chunk digest cache: only changed files are re-digested
+- generate_preprocessing_digest delegating to chunked mode
+"""
+
+import pytest
+
+from cqc_cpcc.utilities.AI import chunked_preprocessing
+from cqc_cpcc.utilities.AI.chunked_preprocessing import (
+    DigestSummary,
+    generate_chunked_preprocessing_digest,
+    merge_file_digests,
+    split_file_into_chunks,
+    split_submission_files,
+    split_submission_into_chunks,
+)
+from cqc_cpcc.utilities.AI.openai_client import (
+    CompletenessCheck,
+    ComponentInfo,
+    DetectedIssue,
+    FileDigest,
+    PreprocessingDigest,
+    generate_preprocessing_digest,
+)
+from cqc_cpcc.utilities.AI.response_cache import ResponseCache
+
+
+def _java_class(name: str, methods: int, body_lines: int = 30) -> str:
+    body = "".join(
+        f"    @Override\n    public int method{i}(int x) {{\n" + "        x += 1;\n" * body_lines + "        return x;\n    }\n\n"
+        for i in range(methods)
+    )
+    return f"import java.util.*;\n\npublic class {name} {{\n{body}}}"
+
+
+def _submission(files: dict[str, str]) -> str:
+    return "\n".join(
+        f"### Submission File Name: {name}\n### Submission Content: ```java\n{content}\n```"
+        for name, content in files.items()
+    )
+
+
+def _file_digest(filename: str = "x", **overrides) -> FileDigest:
+    values = {
+        "filename": filename, "purpose": "p", "structure": "s", "key_components": [],
+        "notable_logic": "l", "io_behavior": "io", "detected_issues": [],
+    }
+    values.update(overrides)
+    return FileDigest(**values)
+
+
+def _fake_completion(calls: list):
+    async def fake(prompt, model_name, schema_model, **kwargs):
+        calls.append(schema_model.__name__)
+        if schema_model is DigestSummary:
+            return DigestSummary(
+                overall_assessment="overall",
+                completeness_check=CompletenessCheck(required_components_present=["a"], missing_components=[]),
+            )
+        return _file_digest("model-chosen-name", purpose=prompt.split("STUDENT FILE: ")[1].split("\n")[0])
+    return fake
+
+
+@pytest.mark.unit
+class TestSplitting:
+    """Test submission splitting."""
+
+    def test_split_submission_files_strips_headers_and_fences(self):
+        text = _submission({"A.java": "class A {}", "B.java": "class B {}"})
+
+        assert split_submission_files(text) == [("A.java", "java", "class A {}"), ("B.java", "java", "class B {}")]
+
+    def test_raw_code_is_one_file(self):
+        assert split_submission_files("print('hi')") == [("submission", "", "print('hi')")]
+
+    def test_small_file_is_single_chunk(self):
+        chunks = split_file_into_chunks("A.java", "class A {}", "java", max_tokens=1000)
+
+        assert len(chunks) == 1
+        assert (chunks[0].part, chunks[0].total_parts, chunks[0].start_line) == (1, 1, 1)
+
+    def test_large_file_splits_at_definitions(self):
+        content = _java_class("Big", methods=20)
+        chunks = split_file_into_chunks("Big.java", content, "java", max_tokens=800)
+
+        assert len(chunks) > 1
+        assert "\n".join(chunk.text for chunk in chunks) == content
+        # Every chunk after the first starts with the annotation of a method
+        assert all(chunk.text.startswith("    @Override") for chunk in chunks[1:])
+        assert all(chunk.total_parts == len(chunks) for chunk in chunks)
+        assert chunks[1].start_line == chunks[0].end_line + 1
+
+    def test_oversized_definition_splits_by_lines(self):
+        content = _java_class("Huge", methods=1, body_lines=600)
+        chunks = split_file_into_chunks("Huge.java", content, "java", max_tokens=500)
+
+        assert len(chunks) > 2
+        assert "\n".join(chunk.text for chunk in chunks) == content
+
+    def test_submission_chunks_keep_file_order(self):
+        text = _submission({"Big.java": _java_class("Big", methods=20), "Small.java": "class S {}"})
+        chunks = split_submission_into_chunks(text, max_tokens=800)
+
+        assert chunks[-1].filename == "Small.java"
+        assert {chunk.filename for chunk in chunks[:-1]} == {"Big.java"}
+
+
+@pytest.mark.unit
+class TestMergeFileDigests:
+    """Test merging chunk digests."""
+
+    def test_merge_dedupes_components_and_issues(self):
+        component = ComponentInfo(name="m", type="method", signature="int m()", behavior="b")
+        issue = DetectedIssue(issue="bug", location="A.java:3")
+        parts = [
+            _file_digest(purpose="Parses input", key_components=[component], detected_issues=[issue]),
+            _file_digest(purpose="Parses input", notable_logic="loops", key_components=[component],
+                         detected_issues=[issue, DetectedIssue(issue="bug2", location="A.java:90")]),
+        ]
+
+        merged = merge_file_digests("A.java", parts)
+
+        assert merged.filename == "A.java"
+        assert merged.purpose == "Parses input"
+        assert merged.notable_logic == "l\nloops"
+        assert len(merged.key_components) == 1
+        assert [i.issue for i in merged.detected_issues] == ["bug", "bug2"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGenerateChunkedDigest:
+    """Test the map-reduce digest and its cache."""
+
+    async def test_digest_merges_chunks_per_file(self, mocker):
+        calls: list[str] = []
+        mocker.patch.object(chunked_preprocessing, "get_structured_completion", side_effect=_fake_completion(calls))
+        text = _submission({"Big.java": _java_class("Big", methods=20), "Small.java": "class S {}"})
+        chunk_count = len(split_submission_into_chunks(text, max_tokens=800))
+
+        digest = await generate_chunked_preprocessing_digest(
+            text, "instructions", model_name="gpt-5-mini", max_chunk_tokens=800, use_cache=False,
+        )
+
+        assert isinstance(digest, PreprocessingDigest)
+        assert [f.filename for f in digest.files] == ["Big.java", "Small.java"]
+        assert "part 1 of" in digest.files[0].purpose
+        assert digest.overall_assessment == "overall"
+        assert calls.count("FileDigest") == chunk_count
+        assert calls.count("DigestSummary") == 1
+
+    async def test_changed_file_is_the_only_one_redigested(self, mocker, tmp_path):
+        cache = ResponseCache(tmp_path / "cache.sqlite3", max_bytes=10 * 1024 * 1024, ttl_seconds=0)
+        mocker.patch.object(chunked_preprocessing, "get_response_cache", return_value=cache)
+        calls: list[str] = []
+        mocker.patch.object(chunked_preprocessing, "get_structured_completion", side_effect=_fake_completion(calls))
+        files = {"A.java": "class A {}", "B.java": "class B {}", "C.java": "class C {}"}
+
+        await generate_chunked_preprocessing_digest(_submission(files), "instructions", use_cache=True)
+        assert calls.count("FileDigest") == 3
+
+        calls.clear()
+        files["B.java"] = "class B { int changed; }"
+        digest = await generate_chunked_preprocessing_digest(_submission(files), "instructions", use_cache=True)
+
+        assert calls.count("FileDigest") == 1
+        assert calls.count("DigestSummary") == 1
+        assert [f.filename for f in digest.files] == ["A.java", "B.java", "C.java"]
+
+    async def test_instructions_change_invalidates_cache(self, mocker, tmp_path):
+        cache = ResponseCache(tmp_path / "cache.sqlite3", max_bytes=10 * 1024 * 1024, ttl_seconds=0)
+        mocker.patch.object(chunked_preprocessing, "get_response_cache", return_value=cache)
+        calls: list[str] = []
+        mocker.patch.object(chunked_preprocessing, "get_structured_completion", side_effect=_fake_completion(calls))
+        text = _submission({"A.java": "class A {}"})
+
+        await generate_chunked_preprocessing_digest(text, "instructions v1", use_cache=True)
+        await generate_chunked_preprocessing_digest(text, "instructions v2", use_cache=True)
+
+        assert calls.count("FileDigest") == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestPreprocessingModeSelection:
+    """Test generate_preprocessing_digest choosing chunked mode."""
+
+    async def test_multi_chunk_submission_uses_chunked_mode(self, mocker):
+        chunked = mocker.patch.object(
+            chunked_preprocessing, "generate_chunked_preprocessing_digest",
+            return_value=mocker.sentinel.digest,
+        )
+        single = mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_structured_completion")
+
+        result = await generate_preprocessing_digest(
+            _submission({"A.java": "class A {}", "B.java": "class B {}"}), "instructions", chunked=True,
+        )
+
+        assert result is mocker.sentinel.digest
+        chunked.assert_awaited_once()
+        single.assert_not_called()
+
+    async def test_single_chunk_or_disabled_uses_single_prompt(self, mocker):
+        chunked = mocker.patch.object(chunked_preprocessing, "generate_chunked_preprocessing_digest")
+        single = mocker.patch(
+            "cqc_cpcc.utilities.AI.openai_client.get_structured_completion",
+            return_value=PreprocessingDigest(
+                files=[], overall_assessment="o",
+                completeness_check=CompletenessCheck(required_components_present=[], missing_components=[]),
+            ),
+        )
+
+        await generate_preprocessing_digest("print('hi')", "instructions", chunked=True)
+        await generate_preprocessing_digest(
+            _submission({"A.java": "class A {}", "B.java": "class B {}"}), "instructions", chunked=False,
+        )
+
+        assert single.await_count == 2
+        chunked.assert_not_called()
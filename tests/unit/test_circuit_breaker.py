@@ -0,0 +1,192 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for provider/model circuit breakers.
+
+Tests cover:
+- closed -> open -> half_open -> closed/open transitions
+- Error classification in circuit_guard (5xx/timeouts count, 429/4xx do not)
+- get_structured_completion fails fast while a circuit is open
+- grade_with_rubric fails over to the configured alternate model
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from openai import APITimeoutError, BadRequestError, RateLimitError
+from pydantic import BaseModel
+
+from cqc_cpcc.rubric_config import get_rubric_by_id
+from cqc_cpcc.rubric_grading import grade_with_rubric
+from cqc_cpcc.rubric_models import RubricAssessmentResult
+from cqc_cpcc.utilities.AI.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    circuit_guard,
+    get_circuit_breaker,
+    get_circuit_snapshot,
+    is_circuit_open,
+)
+from cqc_cpcc.utilities.AI.openai_client import get_structured_completion
+from cqc_cpcc.utilities.AI.openai_exceptions import CircuitOpenError
+from tests.unit.test_rubric_grading import create_valid_rubric_assessment
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _open_circuit(name: str) -> CircuitBreaker:
+    breaker = get_circuit_breaker(name)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    return breaker
+
+
+@pytest.mark.unit
+class TestCircuitBreakerStates:
+    """Test state transitions."""
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker("c", failure_threshold=3, reset_timeout=10, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow_request()
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker("c", failure_threshold=2, reset_timeout=10, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_allows_single_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("c", failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+
+        clock.now = 10.0
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("c", failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10.0
+        assert breaker.allow_request()
+
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.snapshot()["seconds_until_probe"] == 10.0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestCircuitGuard:
+    """Test error classification in the guard."""
+
+    async def _fail_with(self, error):
+        with pytest.raises(type(error)):
+            async with circuit_guard("openai", "gpt-5-mini"):
+                raise error
+
+    async def test_timeouts_count_for_provider_and_model(self):
+        await self._fail_with(APITimeoutError(request=REQUEST))
+        snapshot = get_circuit_snapshot()
+        assert snapshot["openai"]["consecutive_failures"] == 1
+        assert snapshot["openai:gpt-5-mini"]["consecutive_failures"] == 1
+
+    async def test_rate_limits_and_client_errors_do_not_count(self):
+        response_429 = httpx.Response(429, request=REQUEST)
+        response_400 = httpx.Response(400, request=REQUEST)
+        await self._fail_with(RateLimitError("slow down", response=response_429, body=None))
+        await self._fail_with(BadRequestError("bad", response=response_400, body=None))
+        assert get_circuit_snapshot()["openai"]["consecutive_failures"] == 0
+
+    async def test_open_model_circuit_rejects(self):
+        _open_circuit("openai:gpt-5-mini")
+        assert is_circuit_open("openai", "gpt-5-mini")
+        assert not is_circuit_open("openai", "gpt-5")
+
+        with pytest.raises(CircuitOpenError) as exc_info:
+            async with circuit_guard("openai", "gpt-5-mini"):
+                pass
+        assert exc_info.value.circuit == "openai:gpt-5-mini"
+
+
+class Simple(BaseModel):
+    """Minimal schema for fail-fast test."""
+    value: str
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestFailFastAndFailover:
+    """Test client fail-fast and grade_with_rubric failover."""
+
+    async def test_structured_completion_fails_fast(self, mocker):
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
+        mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_client", return_value=mock_client)
+        _open_circuit("openai")
+
+        with pytest.raises(CircuitOpenError):
+            await get_structured_completion(prompt="p", model_name="gpt-5-mini", schema_model=Simple)
+        mock_client.chat.completions.create.assert_not_called()
+
+    async def test_grade_with_rubric_routes_to_failover_when_open(self, mocker):
+        rubric = get_rubric_by_id("default_100pt_rubric")
+        _open_circuit("openai:gpt-5-mini")
+        openai_call = mocker.patch("cqc_cpcc.rubric_grading.get_structured_completion", new=AsyncMock())
+        openrouter_call = mocker.patch(
+            "cqc_cpcc.utilities.AI.openrouter_client.get_openrouter_completion",
+            new=AsyncMock(return_value=RubricAssessmentResult.model_validate(create_valid_rubric_assessment())),
+        )
+
+        result = await grade_with_rubric(
+            rubric=rubric,
+            assignment_instructions="Write Hello World",
+            student_submission="print('hi')",
+            model_name="gpt-5-mini",
+            failover_model="openrouter/auto",
+        )
+
+        assert result.rubric_id == rubric.rubric_id
+        openai_call.assert_not_called()
+        assert openrouter_call.call_args.kwargs["use_auto_route"] is True
+
+    async def test_grade_with_rubric_fails_over_on_circuit_open_error(self, mocker):
+        rubric = get_rubric_by_id("default_100pt_rubric")
+        valid = RubricAssessmentResult.model_validate(create_valid_rubric_assessment())
+        openai_call = mocker.patch(
+            "cqc_cpcc.rubric_grading.get_structured_completion",
+            new=AsyncMock(side_effect=[CircuitOpenError("openai"), valid]),
+        )
+
+        await grade_with_rubric(
+            rubric=rubric,
+            assignment_instructions="Write Hello World",
+            student_submission="print('hi')",
+            model_name="gpt-5",
+            failover_model="gpt-5-mini",
+        )
+
+        assert [c.kwargs["model_name"] for c in openai_call.call_args_list] == ["gpt-5", "gpt-5-mini"]
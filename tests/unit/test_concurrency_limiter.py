@@ -0,0 +1,180 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the adaptive AIMD concurrency limiter.
+
+Tests cover:
+- Window caps concurrent requests and queues the rest
+- Additive increase on success, multiplicative decrease on 429/5xx
+- Retry-After extraction and pause
+- Cancellation while queued does not leak slots
+- Snapshot/registry used by the UI
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from openai import APIError, RateLimitError
+
+import cqc_cpcc.utilities.AI.concurrency_limiter as limiter_module
+from cqc_cpcc.utilities.AI.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    get_concurrency_limiter,
+    get_limiter_snapshot,
+    reset_concurrency_limiters,
+    retry_after_from_exception,
+)
+
+
+def _rate_limit_error(retry_after=None):
+    response = MagicMock()
+    response.headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestWindowEnforcement:
+    """Test that the window bounds concurrency."""
+
+    async def test_never_exceeds_window(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=3, max_limit=3)
+        active = 0
+        peak = 0
+
+        async def worker():
+            nonlocal active, peak
+            async with limiter.slot():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(worker() for _ in range(20)))
+
+        assert peak == 3
+        assert limiter.in_flight == 0
+        assert limiter.queue_depth == 0
+
+    async def test_queue_depth_reported(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1, max_limit=1)
+        await limiter.acquire()
+
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+        assert limiter.snapshot()["in_flight"] == 1
+
+        limiter.release()
+        await asyncio.wait_for(waiter, timeout=1)
+        assert limiter.queue_depth == 0
+        assert limiter.in_flight == 1
+        limiter.release()
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1, max_limit=1)
+        await limiter.acquire()
+
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        limiter.release()
+        assert limiter.in_flight == 0
+        assert limiter.queue_depth == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestAIMD:
+    """Test window adjustments."""
+
+    async def test_success_increases_window(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2, max_limit=10)
+        for _ in range(4):
+            async with limiter.slot():
+                pass
+        assert limiter.window >= 3
+
+    async def test_window_capped_at_max(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2, max_limit=2)
+        for _ in range(10):
+            limiter.on_success(0.1)
+        assert limiter.window == 2
+
+    async def test_slow_response_shrinks_window(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=10, latency_target=1.0)
+        limiter.on_success(5.0)
+        assert limiter.window == 9
+
+    async def test_rate_limit_halves_window_and_pauses(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=8)
+
+        with pytest.raises(RateLimitError):
+            async with limiter.slot():
+                raise _rate_limit_error(retry_after=5)
+
+        snapshot = limiter.snapshot()
+        assert snapshot["window"] == 4
+        assert snapshot["rate_limited"] == 1
+        assert snapshot["paused_seconds"] > 0
+        assert snapshot["in_flight"] == 0
+
+    async def test_server_error_decreases_window(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=8)
+        error = APIError("boom", request=MagicMock(), body=None)
+        error.status_code = 503
+
+        with pytest.raises(APIError):
+            async with limiter.slot():
+                raise error
+
+        assert limiter.window == 4
+        assert limiter.snapshot()["server_errors"] == 1
+
+    async def test_decrease_respects_cooldown_and_minimum(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=8, min_limit=2)
+        limiter.on_server_error()
+        limiter.on_server_error()  # within cooldown - ignored
+        assert limiter.window == 4
+
+        for _ in range(5):
+            limiter._last_decrease = 0.0
+            limiter.on_server_error()
+        assert limiter.window == 2
+
+    async def test_acquire_waits_for_retry_after(self, mocker):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2)
+        limiter.on_rate_limited(retry_after=3)
+        mock_sleep = mocker.patch.object(limiter_module.asyncio, "sleep", new=mocker.AsyncMock())
+
+        await limiter.acquire()
+
+        mock_sleep.assert_awaited_once()
+        assert mock_sleep.await_args[0][0] == pytest.approx(3, abs=0.5)
+        limiter.release()
+
+
+@pytest.mark.unit
+class TestHelpers:
+    """Test Retry-After parsing and the provider registry."""
+
+    def test_retry_after_from_attribute(self):
+        error = Exception("x")
+        error.retry_after = 7
+        assert retry_after_from_exception(error) == 7.0
+
+    def test_retry_after_from_header(self):
+        assert retry_after_from_exception(_rate_limit_error(retry_after=12)) == 12.0
+
+    def test_retry_after_missing(self):
+        assert retry_after_from_exception(Exception("x")) is None
+
+    def test_registry_shares_limiter_per_provider(self):
+        reset_concurrency_limiters()
+        assert get_concurrency_limiter("openai") is get_concurrency_limiter("openai")
+        assert get_concurrency_limiter("openai") is not get_concurrency_limiter("openrouter")
+        assert set(get_limiter_snapshot()) == {"openai", "openrouter"}
+        reset_concurrency_limiters()
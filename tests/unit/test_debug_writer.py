@@ -0,0 +1,106 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the background AI debug writer.
+
+Tests cover:
+- Batched gzip JSONL segments and the correlation ID index
+- Size-based segment rotation
+- Dropping records instead of blocking when the queue is full
+- get_debug_context reading records written through record_request/record_response
+"""
+
+import gzip
+import json
+
+import pytest
+
+from cqc_cpcc.utilities.AI.debug_writer import (
+    INDEX_FILENAME,
+    SEGMENT_GLOB,
+    DebugSegmentWriter,
+    read_debug_records,
+)
+from cqc_cpcc.utilities.AI.openai_debug import get_debug_context, record_request, record_response
+
+
+@pytest.mark.unit
+class TestDebugSegmentWriter:
+    """Test segment writing, indexing and rotation."""
+
+    def test_writes_indexed_gzip_segments(self, tmp_path):
+        writer = DebugSegmentWriter(tmp_path)
+        writer.submit("aaaa1111", "request", {"model": "gpt-5-mini"})
+        writer.submit("bbbb2222", "request", {"model": "gpt-5"})
+        writer.submit("aaaa1111", "response", {"decision_notes": "ok"})
+        writer.close()
+
+        segments = list(tmp_path.glob(SEGMENT_GLOB))
+        assert len(segments) == 1
+        lines = gzip.decompress(segments[0].read_bytes()).decode().splitlines()
+        assert len(lines) == 3
+
+        index = [json.loads(line) for line in (tmp_path / INDEX_FILENAME).read_text().splitlines()]
+        assert [entry["correlation_id"] for entry in index] == ["aaaa1111", "bbbb2222", "aaaa1111"]
+
+        records = read_debug_records(tmp_path, "aaaa1111")
+        assert [r["data_type"] for r in records] == ["request", "response"]
+        assert records[0]["data"] == {"model": "gpt-5-mini"}
+
+    def test_rotates_segments_by_size(self, tmp_path):
+        writer = DebugSegmentWriter(tmp_path, max_segment_bytes=1)
+        for i in range(3):
+            writer.submit(f"cid{i}", "request", {"i": i})
+            writer.flush()
+        writer.close()
+
+        assert len(list(tmp_path.glob(SEGMENT_GLOB))) == 3
+        assert writer.snapshot()["segments"] == 3
+        assert read_debug_records(tmp_path, "cid2")[0]["data"] == {"i": 2}
+
+    def test_full_queue_drops_instead_of_blocking(self, tmp_path):
+        writer = DebugSegmentWriter(tmp_path, queue_size=1, flush_interval=60)
+        writer.close()
+        writer._closed = False  # Thread stopped: nothing drains the queue
+
+        assert writer.submit("cid", "request", {}) is True
+        assert writer.submit("cid", "notes", {}) is False
+        assert writer.snapshot()["dropped"] == 1
+
+    def test_unserializable_values_are_stringified(self, tmp_path):
+        writer = DebugSegmentWriter(tmp_path)
+        writer.submit("cid", "notes", {"value": object})
+        writer.close()
+        assert "object" in read_debug_records(tmp_path, "cid")[0]["data"]["value"]
+
+    def test_missing_index_returns_no_records(self, tmp_path):
+        assert read_debug_records(tmp_path, "nope") == []
+
+
+@pytest.mark.unit
+class TestDebugContextRoundTrip:
+    """Test reading captures back for the UI."""
+
+    def test_get_debug_context_sees_queued_records(self, mocker, tmp_path):
+        mocker.patch('cqc_cpcc.utilities.AI.openai_debug.CQC_OPENAI_DEBUG', True)
+        mocker.patch('cqc_cpcc.utilities.AI.openai_debug.CQC_OPENAI_DEBUG_SAVE_DIR', str(tmp_path))
+
+        record_request(
+            correlation_id="round123",
+            model="gpt-5-mini",
+            messages=[{"role": "user", "content": "test"}],
+            response_format={"type": "json_schema", "json_schema": {"name": "Test"}},
+            schema_name="Test",
+        )
+        record_response(
+            correlation_id="round123",
+            response=None,
+            schema_name="Test",
+            decision_notes="exception thrown",
+            error=ValueError("boom"),
+        )
+
+        context = get_debug_context("round123")
+        assert context["request"]["model"] == "gpt-5-mini"
+        assert context["response"]["decision_notes"] == "exception thrown"
+        assert "notes" in context
+        assert not list(tmp_path.glob("*.json"))
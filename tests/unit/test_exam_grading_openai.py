@@ -293,6 +293,49 @@ class TestExamGradingOpenAI:
         mock_openrouter.assert_called_once()
         mock_openai.assert_not_called()
 
+    async def test_grade_exam_submission_uses_model_router_choice(self, mocker, tmp_path):
+        """A routed OpenAI model replaces the OpenRouter auto-router."""
+        from cqc_cpcc.utilities.AI.model_router import (
+            ModelRouter,
+            RouterHistory,
+            RoutingObjective,
+            RoutingSegment,
+            set_model_router,
+        )
+
+        history = RouterHistory(tmp_path / "router.sqlite3")
+        segment = RoutingSegment("CSC151", "Exam1", "small")
+        for _ in range(5):
+            history.record_outcome("gpt-5-nano", segment, 1.0, 0.0005, schema_failure=False)
+            history.record_agreement("gpt-5-nano", segment, 0.95)
+        set_model_router(ModelRouter(history, ["gpt-5-nano"], RoutingObjective(kind="cheapest"), explore_rate=0))
+
+        mock_openrouter = mocker.patch(
+            "cqc_cpcc.utilities.AI.openrouter_client.get_openrouter_completion",
+            new_callable=AsyncMock,
+        )
+        mock_openai = mocker.patch(
+            "cqc_cpcc.utilities.AI.exam_grading_openai.get_structured_completion",
+            new_callable=AsyncMock,
+        )
+        mock_openai.return_value = ErrorDefinitions.model_validate(create_valid_error_definitions_response())
+
+        await grade_exam_submission(
+            exam_instructions=EXAM_INSTRUCTIONS,
+            exam_solution=EXAM_SOLUTION,
+            student_submission=STUDENT_SUBMISSION,
+            major_error_type_list=MAJOR_ERROR_TYPES,
+            minor_error_type_list=MINOR_ERROR_TYPES,
+            use_openrouter=True,
+            openrouter_auto_route=True,
+            route=True,
+            course_id="CSC151",
+            assignment_id="Exam1",
+        )
+
+        mock_openrouter.assert_not_called()
+        assert mock_openai.call_args.kwargs["model_name"] == "gpt-5-nano"
+
 
 @pytest.mark.unit
 @pytest.mark.asyncio
@@ -0,0 +1,292 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the confidence-based grading cascade.
+
+Tests cover:
+- Escalation triggers (low confidence, band boundary, scorer disagreement)
+- CascadeStats escalation rate, savings and latency
+- grade_with_rubric in cascade mode (cheap result kept, escalation, schema and transport failures)
+"""
+
+import pytest
+
+from cqc_cpcc.grading_cascade import (
+    CascadeConfig,
+    CascadeDecision,
+    CascadeRubricAssessmentResult,
+    CascadeStats,
+    evaluate_cascade_triggers,
+    find_boundary_reasons,
+    find_disagreement_reasons,
+    get_cascade_stats,
+    reset_cascade_stats,
+)
+from cqc_cpcc.rubric_config import get_rubric_by_id
+from cqc_cpcc.rubric_grading import finalize_rubric_result, grade_with_rubric
+from cqc_cpcc.rubric_models import CriterionResult, DetectedError, RubricAssessmentResult
+from cqc_cpcc.utilities.AI.openai_exceptions import (
+    CircuitOpenError,
+    OpenAISchemaValidationError,
+    OpenAITransportError,
+)
+
+CONFIG = CascadeConfig(cheap_model="gpt-5-nano", confidence_threshold=0.75, boundary_margin=0.02,
+                       disagreement_tolerance=0.1)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cascade_stats():
+    reset_cascade_stats()
+    yield
+    reset_cascade_stats()
+
+
+def _manual_result(points: list[float], confidence=None, result_type=RubricAssessmentResult):
+    """Result for default_100pt_rubric (four manually scored criteria)."""
+    rubric = get_rubric_by_id("default_100pt_rubric")
+    criteria = [
+        CriterionResult(
+            criterion_id=criterion.criterion_id,
+            criterion_name=criterion.name,
+            points_possible=criterion.max_points,
+            points_earned=earned,
+            feedback="ok",
+        )
+        for criterion, earned in zip(rubric.criteria, points)
+    ]
+    extra = {"grading_confidence": confidence} if result_type is CascadeRubricAssessmentResult else {}
+    return result_type(
+        rubric_id=rubric.rubric_id,
+        rubric_version=rubric.rubric_version,
+        total_points_possible=rubric.total_points_possible,
+        total_points_earned=sum(points),
+        criteria_results=criteria,
+        overall_feedback="Solid work.",
+        **extra,
+    )
+
+
+def _csc134_raw(minor_errors: int, label: str) -> RubricAssessmentResult:
+    rubric = get_rubric_by_id("csc134_cpp_exam_rubric")
+    return RubricAssessmentResult(
+        rubric_id=rubric.rubric_id,
+        rubric_version=rubric.rubric_version,
+        total_points_possible=rubric.total_points_possible,
+        total_points_earned=0,
+        criteria_results=[CriterionResult(
+            criterion_id="program_performance",
+            criterion_name="Program Performance",
+            points_possible=rubric.total_points_possible,
+            points_earned=0,
+            selected_level_label=label,
+            feedback="ok",
+        )],
+        overall_feedback="ok",
+        detected_errors=[
+            DetectedError(code=f"MINOR_{i}", name="Minor", severity="minor", description="minor issue")
+            for i in range(minor_errors)
+        ],
+    )
+
+
+@pytest.mark.unit
+class TestCascadeTriggers:
+    """Test escalation triggers."""
+
+    def test_confident_clear_result_has_no_triggers(self):
+        rubric = get_rubric_by_id("default_100pt_rubric")
+        raw = _manual_result([20, 24, 20, 15])
+        final = finalize_rubric_result(rubric, raw.model_copy(deep=True))
+
+        assert evaluate_cascade_triggers(rubric, raw, final, 0.9, CONFIG) == ([], [])
+
+    def test_low_or_missing_confidence(self):
+        rubric = get_rubric_by_id("default_100pt_rubric")
+        raw = _manual_result([20, 24, 20, 15])
+        final = finalize_rubric_result(rubric, raw.model_copy(deep=True))
+
+        assert evaluate_cascade_triggers(rubric, raw, final, 0.5, CONFIG)[0] == ["low_confidence"]
+        assert evaluate_cascade_triggers(rubric, raw, final, None, CONFIG)[0] == ["low_confidence"]
+
+    def test_manual_criterion_on_level_edge(self):
+        rubric = get_rubric_by_id("default_100pt_rubric")
+        # 22.5 is the Proficient/Exemplary edge for "understanding"
+        final = finalize_rubric_result(rubric, _manual_result([22.5, 24, 20, 15]))
+
+        reasons = find_boundary_reasons(rubric, final, margin=0.02)
+
+        assert any(reason.startswith("understanding") for reason in reasons)
+
+    def test_total_near_overall_band_edge(self):
+        rubric = get_rubric_by_id("default_100pt_rubric")
+        # 89 is within 2 points of the 89.5 Proficient/Exemplary edge
+        final = finalize_rubric_result(rubric, _manual_result([20, 29, 20, 20]))
+
+        assert any(reason.startswith("total") for reason in find_boundary_reasons(rubric, final, margin=0.02))
+
+    def test_one_more_minor_error_changes_program_performance_level(self):
+        rubric = get_rubric_by_id("csc134_cpp_exam_rubric")
+        final = finalize_rubric_result(rubric, _csc134_raw(2, "Superior"))
+        assert final.criteria_results[0].selected_level_label == "Superior"
+
+        reasons = find_boundary_reasons(rubric, final, margin=0.02)
+
+        assert any("Above Average" in reason for reason in reasons)
+
+    def test_model_level_disagrees_with_error_counts(self):
+        rubric = get_rubric_by_id("csc134_cpp_exam_rubric")
+        raw = _csc134_raw(2, "Outstanding")
+        final = finalize_rubric_result(rubric, raw.model_copy(deep=True))
+
+        reasons = find_disagreement_reasons(rubric, raw, final, tolerance=0.1)
+
+        assert any("model chose 'Outstanding'" in reason for reason in reasons)
+        assert find_disagreement_reasons(rubric, final, final, tolerance=0.1) == []
+
+    def test_zero_total_left_for_backend_does_not_escalate(self):
+        rubric = get_rubric_by_id("csc113_final_reflection_rubric")
+        # The prompt asks for total_points_earned=0 and no points on level_band criteria
+        raw = RubricAssessmentResult(
+            rubric_id=rubric.rubric_id,
+            rubric_version=rubric.rubric_version,
+            total_points_possible=rubric.total_points_possible,
+            total_points_earned=0,
+            criteria_results=[
+                CriterionResult(
+                    criterion_id=criterion.criterion_id,
+                    criterion_name=criterion.name,
+                    points_possible=criterion.max_points,
+                    selected_level_label="Proficient",
+                    feedback="ok",
+                )
+                for criterion in rubric.criteria
+            ],
+            overall_feedback="ok",
+        )
+        final = finalize_rubric_result(rubric, raw.model_copy(deep=True))
+        assert final.total_points_earned > 0
+
+        assert evaluate_cascade_triggers(rubric, raw, final, 0.9, CONFIG) == ([], [])
+
+    def test_unset_backend_scored_points_are_not_disagreement(self):
+        rubric = get_rubric_by_id("csc134_cpp_exam_rubric")
+        raw = _csc134_raw(2, "Superior")
+        final = finalize_rubric_result(rubric, raw.model_copy(deep=True))
+        assert final.total_points_earned > 0
+
+        assert find_disagreement_reasons(rubric, raw, final, tolerance=0.1) == []
+
+
+@pytest.mark.unit
+class TestCascadeStats:
+    """Test cascade statistics."""
+
+    def test_snapshot_reports_rate_savings_and_latency(self):
+        stats = CascadeStats()
+        stats.record(CascadeDecision("nano", "big", cheap_seconds=1.0, cost_usd=0.001, strong_only_cost_usd=0.01))
+        stats.record(CascadeDecision("nano", "big", triggers=["low_confidence"], cheap_seconds=1.0,
+                                     strong_seconds=4.0, cost_usd=0.011, strong_only_cost_usd=0.01))
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["graded"] == 2
+        assert snapshot["escalation_rate"] == 0.5
+        assert snapshot["trigger_counts"]["low_confidence"] == 1
+        assert snapshot["savings_usd"] == pytest.approx(0.008)
+        assert snapshot["savings_rate"] == pytest.approx(0.4)
+        assert snapshot["latency"]["cheap_only"]["count"] == 1
+        assert snapshot["latency"]["escalated"]["mean"] == 5.0
+
+    def test_unpriced_strong_model_has_no_savings(self):
+        stats = CascadeStats()
+        stats.record(CascadeDecision("nano", "unknown-model", cost_usd=0.001))
+
+        assert stats.snapshot()["savings_usd"] is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGradeWithRubricCascade:
+    """Test grade_with_rubric in cascade mode."""
+
+    async def _grade(self, mocker, responses):
+        completion = mocker.patch("cqc_cpcc.rubric_grading.get_structured_completion", side_effect=responses)
+        decisions = []
+        result = await grade_with_rubric(
+            rubric=get_rubric_by_id("default_100pt_rubric"),
+            assignment_instructions="Write a program",
+            student_submission="print('hi')",
+            model_name="gpt-5",
+            cascade=True,
+            cascade_model="gpt-5-nano",
+            on_cascade_decision=decisions.append,
+        )
+        return result, completion, decisions
+
+    async def test_confident_cheap_result_is_kept(self, mocker):
+        cheap = _manual_result([20, 24, 20, 15], 0.95, CascadeRubricAssessmentResult)
+
+        result, completion, decisions = await self._grade(mocker, [cheap])
+
+        assert completion.await_count == 1
+        assert completion.call_args.kwargs["model_name"] == "gpt-5-nano"
+        assert completion.call_args.kwargs["schema_model"] is CascadeRubricAssessmentResult
+        assert type(result) is RubricAssessmentResult
+        assert result.total_points_earned == 79
+        assert not decisions[0].escalated
+        assert get_cascade_stats().snapshot()["graded"] == 1
+
+    async def test_low_confidence_escalates_to_strong_model(self, mocker):
+        cheap = _manual_result([20, 24, 20, 15], 0.3, CascadeRubricAssessmentResult)
+        strong = _manual_result([21, 25, 21, 16])
+
+        result, completion, decisions = await self._grade(mocker, [cheap, strong])
+
+        assert [call.kwargs["model_name"] for call in completion.call_args_list] == ["gpt-5-nano", "gpt-5"]
+        assert completion.call_args.kwargs["schema_model"] is RubricAssessmentResult
+        assert result.total_points_earned == 83
+        assert decisions[0].triggers == ["low_confidence"]
+        assert decisions[0].final_model == "gpt-5"
+        assert get_cascade_stats().snapshot()["escalation_rate"] == 1.0
+
+    async def test_schema_failure_escalates(self, mocker):
+        strong = _manual_result([21, 25, 21, 16])
+
+        result, completion, decisions = await self._grade(
+            mocker, [OpenAISchemaValidationError("bad output", schema_name="RubricAssessmentResult"), strong]
+        )
+
+        assert completion.await_count == 2
+        assert result.total_points_earned == 83
+        assert decisions[0].triggers == ["schema_validation"]
+
+    @pytest.mark.parametrize("error", [
+        OpenAITransportError("connection reset"),
+        CircuitOpenError("openai:gpt-5-nano"),
+    ])
+    async def test_cheap_model_error_escalates(self, mocker, error):
+        strong = _manual_result([21, 25, 21, 16])
+
+        result, completion, decisions = await self._grade(mocker, [error, strong])
+
+        assert [call.kwargs["model_name"] for call in completion.call_args_list] == ["gpt-5-nano", "gpt-5"]
+        assert result.total_points_earned == 83
+        assert decisions[0].triggers == ["cheap_model_error"]
+        assert get_cascade_stats().snapshot()["trigger_counts"]["cheap_model_error"] == 1
+
+    async def test_same_cheap_and_strong_model_grades_once(self, mocker):
+        completion = mocker.patch("cqc_cpcc.rubric_grading.get_structured_completion",
+                                  return_value=_manual_result([20, 24, 20, 15]))
+
+        await grade_with_rubric(
+            rubric=get_rubric_by_id("default_100pt_rubric"),
+            assignment_instructions="Write a program",
+            student_submission="print('hi')",
+            model_name="gpt-5-nano",
+            cascade=True,
+            cascade_model="gpt-5-nano",
+        )
+
+        assert completion.await_count == 1
+        assert completion.call_args.kwargs["schema_model"] is RubricAssessmentResult
+        assert get_cascade_stats().snapshot()["graded"] == 0
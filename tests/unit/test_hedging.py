@@ -0,0 +1,224 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for request hedging.
+
+Tests cover:
+- Fallback model configuration parsing
+- p95 latency tracking and the minimum sample requirement
+- Hedge fires only after the p95 delay; first valid result wins, loser cancelled
+- Only in-flight API time is sampled and counted toward the hedge delay
+- Hedge rate and in-flight budgets
+- get_structured_completion routes through the hedger when enabled
+"""
+
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from cqc_cpcc.utilities.AI.hedging import (
+    LatencyTracker,
+    RequestHedger,
+    parse_hedge_fallback_models,
+    track_in_flight,
+)
+from cqc_cpcc.utilities.AI.openai_client import get_structured_completion
+
+
+def _warm_tracker(model: str = "m", seconds: float = 0.01, count: int = 20) -> LatencyTracker:
+    tracker = LatencyTracker(min_samples=count)
+    for _ in range(count):
+        tracker.observe(model, seconds)
+    return tracker
+
+
+class CallRecorder:
+    """Fake LLM call with per-(model, is_hedge) delays and outcomes."""
+
+    def __init__(self, delays: dict, errors: dict | None = None):
+        self.delays = delays
+        self.errors = errors or {}
+        self.calls: list[tuple[str, bool]] = []
+        self.cancelled: list[tuple[str, bool]] = []
+
+    def __call__(self, model: str, is_hedge: bool):
+        return self._run(model, is_hedge)
+
+    async def _run(self, model: str, is_hedge: bool):
+        key = (model, is_hedge)
+        self.calls.append(key)
+        try:
+            await asyncio.sleep(self.delays[key])
+        except asyncio.CancelledError:
+            self.cancelled.append(key)
+            raise
+        if key in self.errors:
+            raise self.errors[key]
+        return f"{model}:{'hedge' if is_hedge else 'primary'}"
+
+
+@pytest.mark.unit
+class TestLatencyTracker:
+    """Test percentile estimation."""
+
+    def test_requires_min_samples(self):
+        tracker = LatencyTracker(min_samples=5)
+        for _ in range(4):
+            tracker.observe("m", 1.0)
+        assert tracker.percentile("m") is None
+        tracker.observe("m", 1.0)
+        assert tracker.percentile("m") == 1.0
+
+    def test_p95_nearest_rank(self):
+        tracker = LatencyTracker(min_samples=1)
+        for i in range(1, 101):
+            tracker.observe("m", float(i))
+        assert tracker.percentile("m", 0.95) == 95.0
+
+    def test_parse_fallback_models(self):
+        assert parse_hedge_fallback_models('{"gpt-5": "gpt-5-mini", "bad": 3}') == {"gpt-5": "gpt-5-mini"}
+        assert parse_hedge_fallback_models("not json") == {}
+        assert parse_hedge_fallback_models("") == {}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRequestHedger:
+    """Test hedged execution."""
+
+    async def test_no_hedge_without_latency_history(self):
+        hedger = RequestHedger(max_rate=1.0, min_delay=0)
+        recorder = CallRecorder({("m", False): 0.01})
+        assert await hedger.run("m", recorder) == "m:primary"
+        assert recorder.calls == [("m", False)]
+
+    async def test_hedge_wins_and_primary_cancelled(self):
+        hedger = RequestHedger(max_rate=1.0, min_delay=0, latency_tracker=_warm_tracker(),
+                               fallback_models={"m": "fast"})
+        recorder = CallRecorder({("m", False): 5.0, ("fast", True): 0.01})
+
+        assert await hedger.run("m", recorder) == "fast:hedge"
+        assert recorder.cancelled == [("m", False)]
+        assert hedger.snapshot()["hedge_wins"] == 1
+        assert hedger.snapshot()["hedges_in_flight"] == 0
+
+    async def test_fast_primary_never_hedged(self):
+        hedger = RequestHedger(max_rate=1.0, min_delay=0, latency_tracker=_warm_tracker(seconds=1.0))
+        recorder = CallRecorder({("m", False): 0.01})
+        assert await hedger.run("m", recorder) == "m:primary"
+        assert hedger.snapshot()["hedges_started"] == 0
+
+    async def test_failed_request_waits_for_the_other(self):
+        hedger = RequestHedger(max_rate=1.0, min_delay=0, latency_tracker=_warm_tracker())
+        recorder = CallRecorder(
+            {("m", False): 0.05, ("m", True): 0.1},
+            errors={("m", False): RuntimeError("bad json")},
+        )
+        assert await hedger.run("m", recorder) == "m:hedge"
+
+    async def test_both_fail_raises_primary_error(self):
+        hedger = RequestHedger(max_rate=1.0, min_delay=0, latency_tracker=_warm_tracker())
+        recorder = CallRecorder(
+            {("m", False): 0.05, ("m", True): 0.01},
+            errors={("m", False): RuntimeError("primary"), ("m", True): RuntimeError("hedge")},
+        )
+        with pytest.raises(RuntimeError, match="primary"):
+            await hedger.run("m", recorder)
+
+    async def test_rate_budget_limits_hedges(self):
+        hedger = RequestHedger(max_rate=0.5, min_delay=0, latency_tracker=_warm_tracker())
+        recorder = CallRecorder({("m", False): 0.05, ("m", True): 0.01})
+
+        # First request: 1 hedge > 0.5 * 1 request, so no hedge
+        assert await hedger.run("m", recorder) == "m:primary"
+        # Second request: 1 hedge <= 0.5 * 2 requests
+        assert await hedger.run("m", recorder) == "m:hedge"
+
+    async def test_in_flight_budget_limits_hedges(self):
+        hedger = RequestHedger(max_rate=1.0, max_in_flight=0, min_delay=0, latency_tracker=_warm_tracker())
+        recorder = CallRecorder({("m", False): 0.05, ("m", True): 0.01})
+        assert await hedger.run("m", recorder) == "m:primary"
+
+
+    async def test_cancelled_primary_raises_hedge_error(self):
+        hedger = RequestHedger(max_rate=1.0, min_delay=0, latency_tracker=_warm_tracker())
+        recorder = CallRecorder(
+            {("m", False): 0.05, ("m", True): 0.01},
+            errors={("m", False): asyncio.CancelledError(), ("m", True): RuntimeError("hedge")},
+        )
+        with pytest.raises(RuntimeError, match="hedge"):
+            await hedger.run("m", recorder)
+
+
+class QueuedCall:
+    """Fake LLM call that waits in a queue before its in-flight API request."""
+
+    def __init__(self, queue_seconds: float, api_seconds: float):
+        self.queue_seconds = queue_seconds
+        self.api_seconds = api_seconds
+        self.calls: list[tuple[str, bool]] = []
+
+    def __call__(self, model: str, is_hedge: bool):
+        return self._run(model, is_hedge)
+
+    async def _run(self, model: str, is_hedge: bool):
+        self.calls.append((model, is_hedge))
+        await asyncio.sleep(self.queue_seconds)
+        with track_in_flight():
+            await asyncio.sleep(self.api_seconds)
+        return model
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestInFlightTiming:
+    """Test that queue time neither triggers hedges nor inflates p95."""
+
+    async def test_queued_request_is_not_hedged(self):
+        hedger = RequestHedger(max_rate=1.0, min_delay=0, latency_tracker=_warm_tracker(seconds=0.05))
+        recorder = QueuedCall(queue_seconds=0.2, api_seconds=0.01)
+
+        assert await hedger.run("m", recorder, reports_in_flight=True) == "m"
+        assert recorder.calls == [("m", False)]
+        assert hedger.snapshot()["hedges_started"] == 0
+
+    async def test_only_in_flight_time_is_sampled(self):
+        tracker = LatencyTracker(min_samples=1)
+        hedger = RequestHedger(latency_tracker=tracker)
+
+        await hedger.run("m", QueuedCall(queue_seconds=0.2, api_seconds=0.01), reports_in_flight=True)
+
+        assert tracker.percentile("m") < 0.1
+
+    async def test_slow_in_flight_request_is_hedged(self):
+        hedger = RequestHedger(max_rate=1.0, min_delay=0, latency_tracker=_warm_tracker(seconds=0.05))
+        recorder = QueuedCall(queue_seconds=0.01, api_seconds=0.5)
+
+        await hedger.run("m", recorder, reports_in_flight=True)
+
+        assert recorder.calls == [("m", False), ("m", True)]
+
+
+class HedgeSchema(BaseModel):
+    """Minimal schema for hedging integration test."""
+    value: str
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStructuredCompletionHedging:
+    """Test get_structured_completion integration."""
+
+    async def test_routes_through_hedger(self, mocker):
+        expected = HedgeSchema(value="ok")
+        hedger = mocker.MagicMock()
+        hedger.run = mocker.AsyncMock(return_value=expected)
+        mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_request_hedger", return_value=hedger)
+
+        result = await get_structured_completion(
+            prompt="p", model_name="gpt-5-mini", schema_model=HedgeSchema, hedge=True
+        )
+
+        assert result is expected
+        assert hedger.run.call_args.args[0] == "gpt-5-mini"
+        assert hedger.run.call_args.kwargs["reports_in_flight"] is True
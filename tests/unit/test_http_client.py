@@ -0,0 +1,157 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the shared AI HTTP transport configuration.
+
+Tests cover:
+- Pool limits, keep-alive and per-phase timeouts from env configuration
+- HTTP/2 falling back to HTTP/1.1 when "h2" is not installed
+- get_client and the OpenRouter client using the shared transport, one client per event loop
+- Connection reuse against the local OpenAI-compatible stub server
+"""
+
+import asyncio
+
+import pytest
+from openai import AsyncOpenAI
+
+from cqc_cpcc.utilities.AI import http_client
+from cqc_cpcc.utilities.AI.http_client import create_async_http_client, get_http_limits, get_http_timeout
+from tests.openai_stub_server import OpenAIStubServer, generate_from_schema
+
+
+@pytest.mark.unit
+class TestHttpConfig:
+    """Test configuration values."""
+
+    def test_limits_and_timeouts_from_env(self, mocker):
+        mocker.patch.object(http_client, "CQC_AI_HTTP_MAX_KEEPALIVE_CONNECTIONS", 150)
+        mocker.patch.object(http_client, "CQC_AI_HTTP_KEEPALIVE_EXPIRY_SECONDS", 90.0)
+        mocker.patch.object(http_client, "CQC_AI_HTTP_CONNECT_TIMEOUT_SECONDS", 3.0)
+
+        limits = get_http_limits()
+        timeout = get_http_timeout()
+        assert limits.max_keepalive_connections == 150
+        assert limits.keepalive_expiry == 90.0
+        assert timeout.connect == 3.0
+        assert timeout.read == http_client.CQC_AI_HTTP_READ_TIMEOUT_SECONDS
+
+    def test_http2_falls_back_without_h2(self, mocker):
+        mocker.patch.object(http_client, "is_http2_available", return_value=False)
+        constructor = mocker.patch.object(http_client, "DefaultAsyncHttpxClient")
+
+        create_async_http_client(http2=True)
+        assert constructor.call_args.kwargs["http2"] is False
+
+    def test_overrides_replace_configured_values(self, mocker):
+        constructor = mocker.patch.object(http_client, "DefaultAsyncHttpxClient")
+        create_async_http_client(timeout=5.0)
+        assert constructor.call_args.kwargs["timeout"] == 5.0
+        assert constructor.call_args.kwargs["limits"].max_connections == http_client.CQC_AI_HTTP_MAX_CONNECTIONS
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestClientsUseSharedTransport:
+    """Test that both AI clients are built with the shared transport."""
+
+    async def test_get_client_passes_http_client(self, mocker):
+        import cqc_cpcc.utilities.AI.openai_client as client_module
+
+        client_module._clients.clear()
+        mocker.patch.object(client_module, "OPENAI_API_KEY", "test-key")
+        constructor = mocker.patch.object(client_module, "AsyncOpenAI")
+
+        await client_module.get_client()
+        client_module._clients.clear()
+
+        kwargs = constructor.call_args.kwargs
+        assert kwargs["max_retries"] == 0
+        assert kwargs["http_client"] is not None
+        assert kwargs["timeout"].connect == http_client.CQC_AI_HTTP_CONNECT_TIMEOUT_SECONDS
+
+    async def test_get_client_closes_client_replaced_by_key_change(self, mocker):
+        import cqc_cpcc.utilities.AI.openai_client as client_module
+
+        client_module._clients.clear()
+        first, second = mocker.AsyncMock(), mocker.AsyncMock()
+        mocker.patch.object(client_module, "AsyncOpenAI", side_effect=[first, second])
+        mocker.patch.object(client_module, "OPENAI_API_KEY", "key-1")
+        assert await client_module.get_client() is first
+
+        mocker.patch.object(client_module, "OPENAI_API_KEY", "key-2")
+        assert await client_module.get_client() is second
+        first.close.assert_awaited_once()
+        client_module._clients.clear()
+
+    async def test_openrouter_client_reused_within_event_loop(self, mocker):
+        from cqc_cpcc.utilities.AI import openrouter_client
+
+        mocker.patch.object(openrouter_client, "_get_openrouter_api_key", return_value="key-1")
+        first = openrouter_client._get_openrouter_client()
+        assert openrouter_client._get_openrouter_client() is first
+
+        mocker.patch.object(openrouter_client, "_get_openrouter_api_key", return_value="key-2")
+        assert openrouter_client._get_openrouter_client() is not first
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStubServerConnectionReuse:
+    """Test keep-alive reuse against the local stub."""
+
+    async def test_shared_client_reuses_connections(self):
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": "S", "schema": {
+                "type": "object", "properties": {"score": {"type": "integer"}}, "required": ["score"],
+            }},
+        }
+        async with OpenAIStubServer() as stub:
+            client = AsyncOpenAI(api_key="stub", base_url=stub.base_url, max_retries=0,
+                                 http_client=create_async_http_client())
+            for _ in range(3):
+                await asyncio.gather(*(
+                    client.chat.completions.create(
+                        model="gpt-5-mini",
+                        messages=[{"role": "user", "content": "hi"}],
+                        response_format=response_format,
+                    )
+                    for _ in range(5)
+                ))
+            await client.close()
+
+        assert stub.stats["requests"] == 15
+        assert stub.stats["connections"] == 5
+
+
+@pytest.mark.unit
+class TestStubSchemaGeneration:
+    """Test stub response generation."""
+
+    def test_generate_from_schema_resolves_refs(self):
+        schema = {
+            "type": "object",
+            "properties": {"items": {"type": "array", "minItems": 1, "items": {"$ref": "#/$defs/Item"}}},
+            "$defs": {"Item": {"type": "object", "properties": {"name": {"type": "string"}}}},
+        }
+        assert generate_from_schema(schema) == {"items": [{"name": "stub"}]}
+
+
+@pytest.mark.unit
+class TestClientPerEventLoop:
+    """Test that pooled clients are never shared across event loops."""
+
+    def test_openai_client_is_created_per_loop(self, mocker):
+        import cqc_cpcc.utilities.AI.openai_client as client_module
+
+        mocker.patch.object(client_module, "OPENAI_API_KEY", "test-key")
+        mocker.patch.object(client_module, "AsyncOpenAI", side_effect=lambda **kwargs: mocker.AsyncMock())
+
+        async def get_twice():
+            client = await client_module.get_client()
+            assert await client_module.get_client() is client
+            await client_module.close_client()
+            client.close.assert_awaited_once()
+            return client
+
+        assert asyncio.run(get_twice()) is not asyncio.run(get_twice())
@@ -0,0 +1,143 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for tolerant JSON repair.
+
+Tests cover:
+- Closing truncated strings, arrays and objects
+- Dropping trailing commas, dangling keys and partial values
+- Salvaging malformed responses in get_structured_completion without a retry
+- Retrying truncated responses instead of completing them
+- Salvage telemetry in the metrics registry
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import BaseModel
+
+from cqc_cpcc.utilities.AI.json_repair import repair_json
+from cqc_cpcc.utilities.AI.llm_metrics import MetricsRegistry
+from cqc_cpcc.rubric_models import RubricAssessmentResult
+from cqc_cpcc.utilities.AI.openai_client import get_structured_completion
+from tests.unit.test_rubric_grading import create_valid_rubric_assessment
+
+
+@pytest.mark.unit
+class TestRepairJson:
+    """Test the repair stage on its own."""
+
+    @pytest.mark.parametrize("text,expected", [
+        ('{"a": 1}', {"a": 1}),
+        ('{"a": [1, 2,], }', {"a": [1, 2]}),
+        ('```json\n{"a": 1}\n```', {"a": 1}),
+        ('Here is the result: {"a": {"b": "tex', {"a": {"b": "tex"}}),
+        ('[1, 2, 3', [1, 2, 3]),
+        ('{"a": [{"x": 1}, {"x": 2, "y": tr', {"a": [{"x": 1}, {"x": 2}]}),
+        ('{"a": 1, "b":', {"a": 1}),
+        ('{"a": 1, "b"', {"a": 1}),
+        ('{"a": "x", "n": 12.', {"a": "x"}),
+        ('{"s": "ends with escape \\', {"s": "ends with escape "}),
+        ('{"s": "a, [b", "t": [', {"s": "a, [b", "t": []}),
+        ('{"items": [{"name": "a"}, {"na', {"items": [{"name": "a"}]}),
+    ])
+    def test_repairs(self, text, expected):
+        assert repair_json(text) == expected
+
+    @pytest.mark.parametrize("text", [None, "", "   ", "no json here"])
+    def test_unrepairable_returns_none(self, text):
+        assert repair_json(text) is None
+
+    def test_truncated_output_is_not_completed_when_disabled(self):
+        assert repair_json('```json\n{"a": [1, 2,],}\n```', complete_truncated=False) == {"a": [1, 2]}
+        assert repair_json('{"items": [{"name": "a"}, {"na', complete_truncated=False) is None
+
+
+class Item(BaseModel):
+    """Array item for salvage test."""
+    name: str
+
+
+class Report(BaseModel):
+    """Schema for salvage test."""
+    summary: str
+    items: list[Item]
+
+
+def _response(content: str, finish_reason: str):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.choices[0].message.refusal = None
+    response.choices[0].finish_reason = finish_reason
+    return response
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStructuredCompletionSalvage:
+    """Test repair before retry in get_structured_completion."""
+
+    async def _complete(self, mocker, *responses, schema_model=Report):
+        registry = MetricsRegistry()
+        mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_metrics_registry", return_value=registry)
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=list(responses))
+        mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_client", return_value=mock_client)
+        result = await get_structured_completion(
+            prompt="p", model_name="gpt-5-mini", schema_model=schema_model, retry_delay=0
+        )
+        return result, mock_client.chat.completions.create, registry.snapshot()["totals"]
+
+    async def test_malformed_response_is_salvaged_without_retry(self, mocker):
+        malformed = 'Here you go:\n```json\n{"summary": "ok", "items": [{"name": "a"}, {"name": "b"},],}\n```'
+        result, create, totals = await self._complete(mocker, _response(malformed, "stop"))
+
+        assert [item.name for item in result.items] == ["a", "b"]
+        assert create.call_count == 1
+        assert totals["repair_salvaged"] == 1
+        assert totals["repair_salvage_rate"] == 1.0
+
+    async def test_length_truncated_response_is_retried(self, mocker):
+        # Closing this would validate with an invented item "b" and drop the rest of the list
+        truncated = '{"summary": "ok", "items": [{"name": "a"}, {"name": "b'
+        valid = '{"summary": "ok", "items": [{"name": "a"}, {"name": "bc"}]}'
+        result, create, totals = await self._complete(
+            mocker, _response(truncated, "length"), _response(valid, "stop")
+        )
+
+        assert [item.name for item in result.items] == ["a", "bc"]
+        assert create.call_count == 2
+        assert totals.get("repair_salvaged", 0) == 0
+
+    async def test_rubric_result_truncated_inside_detected_errors_is_retried(self, mocker):
+        complete = create_valid_rubric_assessment()
+        complete["detected_errors"] = [
+            {"code": "A", "name": "Missing loop", "severity": "major", "description": "No loop", "occurrences": 1},
+        ]
+        complete["error_counts_by_severity"] = {"major": 1, "minor": 0}
+        text = json.dumps(complete)
+        # Cut inside the error's "severity" value, before error_counts_by_severity
+        truncated = text[:text.index('"major"') + 3]
+
+        result, create, totals = await self._complete(
+            mocker, _response(truncated, "length"), _response(text, "stop"), schema_model=RubricAssessmentResult
+        )
+
+        assert result.detected_errors[0].severity == "major"
+        assert result.error_counts_by_severity == {"major": 1, "minor": 0}
+        assert create.call_count == 2
+        assert totals.get("repair_salvaged", 0) == 0
+
+    async def test_unusable_salvage_falls_back_to_retry(self, mocker):
+        truncated = '{"summary": "ok", "items": [{"name": "a"}'  # Would need closing
+        valid = '{"summary": "ok", "items": []}'
+        result, create, totals = await self._complete(
+            mocker, _response(truncated, "stop"), _response(valid, "stop")
+        )
+
+        assert result.summary == "ok"
+        assert create.call_count == 2
+        assert totals["repair_attempts"] == 1
+        assert totals["repair_salvaged"] == 0
+        assert totals["repair_salvage_rate"] == 0.0
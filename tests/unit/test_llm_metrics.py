@@ -0,0 +1,151 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the LLM metrics registry.
+
+Tests cover:
+- Latency histograms and outcome counting
+- Token counters and cost estimation (price table and provider-reported cost)
+- Prometheus text and JSON export
+- get_structured_completion instrumentation
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import BaseModel
+
+from cqc_cpcc.utilities.AI.llm_metrics import MetricsRegistry, parse_model_pricing
+from cqc_cpcc.utilities.AI.openai_client import get_structured_completion
+
+
+def _usage(prompt=1000, completion=500, cached=0, **extra):
+    return SimpleNamespace(
+        prompt_tokens=prompt,
+        completion_tokens=completion,
+        total_tokens=prompt + completion,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached),
+        **extra,
+    )
+
+
+@pytest.mark.unit
+class TestMetricsRegistry:
+    """Test recording and aggregation."""
+
+    def test_track_request_records_latency_and_errors(self):
+        registry = MetricsRegistry()
+        with registry.track_request("structured_completion", "gpt-5-mini"):
+            pass
+        with pytest.raises(RuntimeError):
+            with registry.track_request("structured_completion", "gpt-5-mini"):
+                raise RuntimeError("boom")
+
+        row = registry.snapshot()["models"][0]
+        assert row["requests"] == 2
+        assert row["errors"] == 1
+        assert row["latency"]["success"]["count"] == 1
+        assert row["latency"]["error"]["count"] == 1
+        assert row["latency"]["success"]["p95"] == 0.5
+
+    def test_cost_uses_cached_price_and_prefix_match(self):
+        registry = MetricsRegistry(pricing=parse_model_pricing(None))
+        registry.record_usage("structured_completion", "gpt-5-mini-2025-08-07", _usage(1_000_000, 1_000_000, 400_000))
+
+        row = registry.snapshot()["models"][0]
+        assert row["cached_tokens"] == 400_000
+        # 600K uncached * 0.25 + 400K cached * 0.025 + 1M output * 2.00
+        assert row["cost_usd"] == pytest.approx(0.15 + 0.01 + 2.0)
+
+    def test_provider_reported_cost_wins(self):
+        registry = MetricsRegistry()
+        registry.record_usage("openrouter_completion", "openrouter/auto", _usage(cost=0.0123))
+        assert registry.snapshot()["totals"]["cost_usd"] == pytest.approx(0.0123)
+
+    def test_audio_cost_per_minute(self):
+        registry = MetricsRegistry()
+        registry.record_audio("transcription", "whisper-1", 120.0)
+        registry.record_audio("transcription", "whisper-1", MagicMock())
+        row = registry.snapshot()["models"][0]
+        assert row["audio_seconds"] == 120.0
+        assert row["cost_usd"] == pytest.approx(0.012)
+
+    def test_mock_usage_is_ignored(self):
+        registry = MetricsRegistry()
+        registry.record_usage("structured_completion", "m", MagicMock())
+        assert registry.snapshot()["totals"]["prompt_tokens"] == 0
+
+    def test_pricing_overrides(self):
+        pricing = parse_model_pricing('{"custom": {"input": 1, "output": 2}}')
+        assert pricing["custom"] == {"input": 1.0, "output": 2.0}
+        assert "gpt-5" in pricing
+        assert parse_model_pricing("not json") == parse_model_pricing(None)
+
+
+@pytest.mark.unit
+class TestMetricsExport:
+    """Test export formats."""
+
+    def test_prometheus_text(self):
+        registry = MetricsRegistry()
+        registry.observe_latency("structured_completion", "gpt-5", 3.0)
+        registry.record_usage("structured_completion", "gpt-5", _usage())
+        text = registry.to_prometheus()
+
+        assert 'cqc_llm_requests_total{operation="structured_completion",model="gpt-5"} 1' in text
+        assert 'cqc_llm_prompt_tokens_total{operation="structured_completion",model="gpt-5"} 1000' in text
+        assert ('cqc_llm_request_duration_seconds_bucket{operation="structured_completion",model="gpt-5",'
+                'outcome="success",le="2"} 0') in text
+        assert ('cqc_llm_request_duration_seconds_bucket{operation="structured_completion",model="gpt-5",'
+                'outcome="success",le="5"} 1') in text
+        assert "# TYPE cqc_llm_request_duration_seconds histogram" in text
+
+    def test_export_files(self, tmp_path):
+        registry = MetricsRegistry()
+        registry.increment("retries", "structured_completion", "gpt-5")
+        registry.export(tmp_path / "metrics.prom")
+        registry.export(tmp_path / "metrics.json", fmt="json")
+
+        assert "cqc_llm_retries_total" in (tmp_path / "metrics.prom").read_text()
+        assert json.loads((tmp_path / "metrics.json").read_text())["totals"]["retries"] == 1
+
+    def test_auto_export_when_path_configured(self, tmp_path):
+        path = tmp_path / "auto.prom"
+        registry = MetricsRegistry(export_path=str(path), export_interval=0)
+        registry.increment("cache_hits", "structured_completion", "gpt-5")
+        assert "cqc_llm_cache_hits_total" in path.read_text()
+
+
+class MetricsSchema(BaseModel):
+    """Minimal schema for instrumentation test."""
+    value: str
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStructuredCompletionInstrumentation:
+    """Test that get_structured_completion feeds the registry."""
+
+    async def test_records_request_and_usage(self, mocker):
+        registry = MetricsRegistry()
+        mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_metrics_registry", return_value=registry)
+
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = '{"value": "ok"}'
+        response.choices[0].message.refusal = None
+        response.choices[0].finish_reason = "stop"
+        response.usage = _usage(200, 20, 100)
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=response)
+        mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_client", return_value=mock_client)
+
+        await get_structured_completion(prompt="p", model_name="gpt-5-mini", schema_model=MetricsSchema)
+
+        row = registry.snapshot()["models"][0]
+        assert (row["operation"], row["model"]) == ("structured_completion", "gpt-5-mini")
+        assert row["requests"] == 1
+        assert row["prompt_tokens"] == 200
+        assert row["cached_tokens"] == 100
+        assert row["cost_usd"] > 0
@@ -0,0 +1,213 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the non-blocking media stage.
+
+Tests cover:
+- ffmpeg "-progress" parsing and MediaProgress reporting
+- Subprocess failures, timeouts, missing tools and cancellation
+- Bounded worker pool
+- Extracted audio cache by video hash
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+from cqc_cpcc.utilities import media_pipeline
+from cqc_cpcc.utilities.AI.concurrency_limiter import AdaptiveConcurrencyLimiter
+from cqc_cpcc.utilities.media_pipeline import (
+    MediaProcessingError,
+    MediaProgress,
+    MediaToolNotFoundError,
+    extract_audio,
+    get_media_cache_dir,
+    parse_progress_time,
+    release_extracted_audio,
+    run_media_command,
+    set_media_worker_pool,
+)
+
+
+def _python(code: str) -> list[str]:
+    """A command standing in for ffmpeg."""
+    return [sys.executable, "-c", code]
+
+
+@pytest.fixture
+def fake_ffmpeg(mocker):
+    """Replace ffmpeg with a function that writes audio to the output path (last argument)."""
+    calls = []
+
+    async def fake_run(args, **kwargs):
+        calls.append(args)
+        with open(args[-1], "wb") as f:
+            f.write(b"mp3 audio")
+        return ""
+
+    mocker.patch.object(media_pipeline, "run_media_command", side_effect=fake_run)
+    return calls
+
+
+@pytest.mark.unit
+class TestProgressParsing:
+    """Test ffmpeg progress values."""
+
+    def test_parse_progress_time(self):
+        assert parse_progress_time("out_time_us", "1500000") == 1.5
+        assert parse_progress_time("out_time_ms", "250000") == 0.25
+        assert parse_progress_time("out_time_us", "N/A") is None
+        assert parse_progress_time("frame", "10") is None
+
+    def test_progress_fraction(self):
+        assert MediaProgress("a", 30.0, 120.0).fraction == 0.25
+        assert MediaProgress("a", 30.0).fraction is None
+        assert MediaProgress("a", 30.0, done=True).fraction == 1.0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRunMediaCommand:
+    """Test running media commands as asyncio subprocesses."""
+
+    async def test_reports_progress_blocks(self):
+        script = (
+            "print('out_time_us=N/A'); print('progress=continue'); "
+            "print('out_time_us=1000000'); print('progress=continue'); "
+            "print('out_time_us=2000000'); print('progress=end')"
+        )
+        updates: list[MediaProgress] = []
+
+        await run_media_command(_python(script), total_seconds=2.0, progress_callback=updates.append, label="v.mp4")
+
+        assert [u.fraction for u in updates] == [0.0, 0.5, 1.0]
+        assert updates[-1].done and updates[-1].label == "v.mp4"
+
+    async def test_returns_stdout(self):
+        assert await run_media_command(_python("print('12.5')")) == "12.5"
+
+    async def test_failure_includes_stderr(self):
+        with pytest.raises(MediaProcessingError, match="exited with code 3.*Invalid data"):
+            await run_media_command(_python("import sys; sys.stderr.write('Invalid data found'); sys.exit(3)"))
+
+    async def test_missing_tool(self):
+        with pytest.raises(MediaToolNotFoundError, match="not installed"):
+            await run_media_command(["cqc-no-such-ffmpeg", "-version"])
+
+    async def test_timeout_kills_process(self):
+        start = time.monotonic()
+        with pytest.raises(MediaProcessingError, match="timed out"):
+            await run_media_command(_python("import time; time.sleep(30)"), timeout=0.5)
+        assert time.monotonic() - start < 10
+
+    async def test_cancellation_kills_process(self, tmp_path):
+        pid_file = tmp_path / "pid"
+        task = asyncio.create_task(run_media_command(
+            _python(f"import os, time; open({str(pid_file)!r}, 'w').write(str(os.getpid())); time.sleep(30)"),
+        ))
+        while not pid_file.exists() or not pid_file.read_text():
+            await asyncio.sleep(0.05)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        with pytest.raises(ProcessLookupError):
+            os.kill(int(pid_file.read_text()), 0)
+
+    async def test_worker_pool_bounds_concurrency(self):
+        set_media_worker_pool(AdaptiveConcurrencyLimiter("media", initial_limit=1, min_limit=1, max_limit=1))
+        try:
+            start = time.monotonic()
+            await asyncio.gather(*(run_media_command(_python("import time; time.sleep(0.3)")) for _ in range(3)))
+            assert time.monotonic() - start >= 0.9
+        finally:
+            set_media_worker_pool(None)
+
+    async def test_event_loop_is_not_blocked(self):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        await run_media_command(_python("import time; time.sleep(0.5)"))
+        ticking.cancel()
+
+        assert ticks >= 5
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestExtractAudio:
+    """Test audio extraction and its cache."""
+
+    async def test_same_video_is_extracted_once(self, tmp_path, fake_ffmpeg):
+        video = tmp_path / "demo.mp4"
+        video.write_bytes(b"video bytes")
+        copy = tmp_path / "resubmitted.mp4"
+        copy.write_bytes(b"video bytes")
+
+        first = await extract_audio(str(video))
+        release_extracted_audio(first)
+        second = await extract_audio(str(copy))
+
+        assert first == second
+        assert os.path.dirname(first) == str(get_media_cache_dir())
+        assert open(second, "rb").read() == b"mp3 audio"
+        assert len(fake_ffmpeg) == 1
+
+    async def test_uncached_audio_is_released(self, tmp_path, fake_ffmpeg):
+        video = tmp_path / "demo.mp4"
+        video.write_bytes(b"video bytes")
+
+        audio = await extract_audio(str(video), use_cache=False)
+        assert os.path.exists(audio)
+
+        release_extracted_audio(audio)
+        assert not os.path.exists(audio)
+
+    async def test_empty_output_is_an_error(self, tmp_path, mocker):
+        video = tmp_path / "silent.mp4"
+        video.write_bytes(b"video without audio")
+        mocker.patch.object(media_pipeline, "run_media_command", return_value="")
+
+        with pytest.raises(MediaProcessingError, match="no audio"):
+            await extract_audio(str(video))
+        assert list(get_media_cache_dir().iterdir()) == []
+
+    async def test_cancelled_extraction_leaves_no_partial_file(self, tmp_path, mocker):
+        video = tmp_path / "long.mp4"
+        video.write_bytes(b"long video")
+        started = asyncio.Event()
+
+        async def slow_run(args, **kwargs):
+            with open(args[-1], "wb") as f:
+                f.write(b"partial")
+            started.set()
+            await asyncio.sleep(30)
+
+        mocker.patch.object(media_pipeline, "run_media_command", side_effect=slow_run)
+        task = asyncio.create_task(extract_audio(str(video)))
+        await started.wait()
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert list(get_media_cache_dir().iterdir()) == []
+
+    async def test_cache_evicts_least_recently_used(self, tmp_path, fake_ffmpeg, mocker):
+        mocker.patch.object(media_pipeline, "CQC_MEDIA_AUDIO_CACHE_MAX_MB", 10 / (1024 * 1024))
+        (tmp_path / "a.mp4").write_bytes(b"video a")
+        (tmp_path / "b.mp4").write_bytes(b"video b")
+
+        first = await extract_audio(str(tmp_path / "a.mp4"))
+        second = await extract_audio(str(tmp_path / "b.mp4"))
+
+        assert not os.path.exists(first)
+        assert os.path.exists(second)
@@ -0,0 +1,220 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the telemetry-driven model router.
+
+Tests cover:
+1. Size buckets and segment fallback
+2. "cheapest" and "fastest" objectives with agreement, failure and budget bounds
+3. Exploration of under-sampled candidates
+4. Outcome tracking and instructor agreement
+5. Routing inside grade_with_rubric
+"""
+
+import pytest
+
+from cqc_cpcc.rubric_config import get_rubric_by_id
+from cqc_cpcc.rubric_grading import grade_with_rubric
+from cqc_cpcc.rubric_models import RubricAssessmentResult
+from cqc_cpcc.utilities.AI.model_router import (
+    ModelRouter,
+    RouterHistory,
+    RoutingObjective,
+    RoutingSegment,
+    set_model_router,
+    size_bucket,
+)
+from cqc_cpcc.utilities.AI.openai_exceptions import OpenAISchemaValidationError
+from tests.unit.test_rubric_grading import create_valid_rubric_assessment
+
+SMALL_SEGMENT = RoutingSegment("CSC151", "Exam1", "small")
+
+
+class _NeverExplore:
+    def random(self):
+        return 1.0
+
+
+class _AlwaysExplore:
+    def random(self):
+        return 0.0
+
+    def choice(self, options):
+        return options[0]
+
+
+@pytest.fixture
+def history(tmp_path):
+    return RouterHistory(tmp_path / "router.sqlite3")
+
+
+def _router(history, kind="cheapest", candidates=("gpt-5-nano", "gpt-5-mini", "gpt-5"), rng=None, **bounds):
+    objective = RoutingObjective(kind=kind, min_agreement=0.9, max_schema_failure_rate=0.1, budget_usd=0.01,
+                                 min_samples=3, **bounds)
+    return ModelRouter(history, list(candidates), objective, explore_rate=0.05, rng=rng or _NeverExplore())
+
+
+def _seed(history, model, segment=SMALL_SEGMENT, calls=4, latency=1.0, cost=0.001, failures=0, agreement=None):
+    for i in range(calls):
+        history.record_outcome(model, segment, latency, cost, schema_failure=i < failures)
+    if agreement is not None:
+        for _ in range(3):
+            history.record_agreement(model, segment, agreement)
+
+
+@pytest.mark.unit
+class TestSegments:
+    """Test size buckets and segment fallback."""
+
+    def test_size_buckets(self):
+        assert [size_bucket(t) for t in (100, 5000, 20000, 50000)] == ["small", "medium", "large", "xlarge"]
+
+    def test_creates_missing_history_directory(self, tmp_path):
+        history = RouterHistory(tmp_path / "new" / "router.sqlite3")
+
+        history.record_outcome("gpt-5", SMALL_SEGMENT, 1.0, 0.001, schema_failure=False)
+
+        assert history.segment_stats(SMALL_SEGMENT)["gpt-5"].samples == 1
+
+    def test_new_assignment_uses_course_history(self, history):
+        _seed(history, "gpt-5-nano", cost=0.0005, agreement=0.95)
+        router = _router(history)
+
+        decision = router.choose("gpt-5", "CSC151", "Exam2", submission_tokens=200)
+
+        assert decision.model == "gpt-5-nano"
+        assert decision.stats["gpt-5-nano"].segment == "CSC151/small"
+
+
+@pytest.mark.unit
+class TestObjectives:
+    """Test model selection under each objective."""
+
+    def test_cheapest_model_meeting_agreement_bound(self, history):
+        _seed(history, "gpt-5-nano", cost=0.0005, agreement=0.8)
+        _seed(history, "gpt-5-mini", cost=0.002, agreement=0.95)
+        _seed(history, "gpt-5", cost=0.01, agreement=0.97)
+
+        decision = _router(history).choose("gpt-5", "CSC151", "Exam1", submission_tokens=200)
+
+        assert decision.model == "gpt-5-mini"
+        assert not decision.explored
+
+    def test_unverified_models_keep_the_default(self, history):
+        _seed(history, "gpt-5-nano", cost=0.0005)
+
+        decision = _router(history).choose("gpt-5", "CSC151", "Exam1", submission_tokens=200)
+
+        assert decision.model == "gpt-5"
+        assert "using default" in decision.reason
+
+    def test_schema_failure_rate_excludes_model(self, history):
+        _seed(history, "gpt-5-nano", cost=0.0005, failures=2, agreement=0.95)
+
+        decision = _router(history).choose("gpt-5", "CSC151", "Exam1", submission_tokens=200)
+
+        assert decision.model == "gpt-5"
+
+    def test_fastest_within_budget(self, history):
+        _seed(history, "gpt-5-nano", latency=3.0, cost=0.0005)
+        _seed(history, "gpt-5-mini", latency=1.5, cost=0.002)
+        _seed(history, "gpt-5", latency=0.8, cost=0.05)
+
+        decision = _router(history, kind="fastest").choose("gpt-5", "CSC151", "Exam1", submission_tokens=200)
+
+        assert decision.model == "gpt-5-mini"
+
+    def test_unknown_objective_is_rejected(self):
+        with pytest.raises(ValueError, match="Unknown routing objective"):
+            RoutingObjective(kind="best")
+
+    def test_candidates_must_match_selected_provider(self, history):
+        _seed(history, "openai/gpt-5-nano", cost=0.0005, agreement=0.95)
+        router = _router(history, candidates=("openai/gpt-5-nano",), rng=_AlwaysExplore())
+
+        decision = router.choose("gpt-5", "CSC151", "Exam1", submission_tokens=200)
+
+        assert decision.model == "gpt-5"
+        assert not decision.explored
+
+    def test_exploration_is_off_by_default(self, history):
+        router = ModelRouter(history, ["gpt-5-nano"], rng=_AlwaysExplore())
+
+        decision = router.choose("gpt-5", "CSC151", "Exam1", submission_tokens=200)
+
+        assert decision.model == "gpt-5"
+        assert not decision.explored
+
+    def test_explores_under_sampled_candidates(self, history):
+        router = _router(history, rng=_AlwaysExplore())
+
+        decision = router.choose("gpt-5", "CSC151", "Exam1", submission_tokens=200)
+
+        assert decision.explored
+        assert decision.model == "gpt-5-nano"
+
+
+@pytest.mark.unit
+class TestFeedback:
+    """Test outcome tracking and instructor agreement."""
+
+    def test_track_records_cost_for_openrouter_ids(self, history):
+        router = _router(history, candidates=("openai/gpt-5-mini",))
+        decision = router.choose("openai/gpt-5-mini", "CSC151", "Exam1")
+
+        with router.track(decision, "prompt " * 100) as call:
+            call.completion = "{}"
+
+        stats = history.segment_stats(RoutingSegment())["openai/gpt-5-mini"]
+        assert stats.samples == 1
+        assert stats.mean_cost_usd > 0
+
+    def test_track_records_schema_failures(self, history):
+        router = _router(history)
+        decision = router.choose("gpt-5", "CSC151", "Exam1")
+
+        with pytest.raises(OpenAISchemaValidationError):
+            with router.track(decision, "prompt"):
+                raise OpenAISchemaValidationError("bad", schema_name="RubricAssessmentResult")
+
+        assert history.segment_stats(RoutingSegment())["gpt-5"].schema_failure_rate == 1.0
+
+    def test_instructor_score_agreement(self, history):
+        router = _router(history)
+        decision = router.choose("gpt-5", "CSC151", "Exam1")
+
+        assert router.record_instructor_score(decision, ai_score=85, instructor_score=90, points_possible=100) == 0.95
+        assert history.segment_stats(SMALL_SEGMENT)["gpt-5"].agreement == 0.95
+        with pytest.raises(ValueError):
+            router.record_instructor_score(decision, ai_score=1, instructor_score=1, points_possible=0)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRoutedGrading:
+    """Test routing inside rubric grading."""
+
+    async def test_grade_with_rubric_uses_routed_model(self, history, mocker):
+        _seed(history, "gpt-5-nano", cost=0.0005, agreement=0.95)
+        set_model_router(_router(history))
+        completion = mocker.patch(
+            "cqc_cpcc.rubric_grading.get_structured_completion",
+            return_value=RubricAssessmentResult.model_validate(create_valid_rubric_assessment()),
+        )
+        decisions = []
+
+        result = await grade_with_rubric(
+            rubric=get_rubric_by_id("default_100pt_rubric"),
+            assignment_instructions="Write Hello World",
+            student_submission="print('Hello World')",
+            model_name="gpt-5",
+            cascade=False,
+            route=True,
+            course_id="CSC151",
+            assignment_id="Exam1",
+            on_route_decision=decisions.append,
+        )
+
+        assert result.total_points_earned == 85
+        assert completion.call_args.kwargs["model_name"] == "gpt-5-nano"
+        assert decisions[0].model == "gpt-5-nano"
+        assert history.segment_stats(SMALL_SEGMENT)["gpt-5-nano"].samples == 5
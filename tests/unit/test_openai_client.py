@@ -27,6 +27,7 @@ from cqc_cpcc.utilities.AI.openai_exceptions import (
     OpenAISchemaValidationError,
     OpenAITransportError,
 )
+from cqc_cpcc.utilities.AI.schema_registry import get_compiled_schema
 
 
 # Test Pydantic models
@@ -53,7 +54,7 @@ class TestGetClient:
         """Client should be initialized only once (singleton pattern)."""
         # Reset global client
         import cqc_cpcc.utilities.AI.openai_client as client_module
-        client_module._client = None
+        client_module._clients.clear()
         
         # Mock API key
         mocker.patch('cqc_cpcc.utilities.AI.openai_client.OPENAI_API_KEY', 'test-key')
@@ -79,7 +80,7 @@ class TestGetClient:
         """Should raise ValueError if OPENAI_API_KEY is not set."""
         # Reset global client
         import cqc_cpcc.utilities.AI.openai_client as client_module
-        client_module._client = None
+        client_module._clients.clear()
         
         # Mock empty API key
         mocker.patch('cqc_cpcc.utilities.AI.openai_client.OPENAI_API_KEY', None)
@@ -91,7 +92,7 @@ class TestGetClient:
         """close_client should allow re-initialization."""
         # Reset global client
         import cqc_cpcc.utilities.AI.openai_client as client_module
-        client_module._client = None
+        client_module._clients.clear()
         
         # Mock API key
         mocker.patch('cqc_cpcc.utilities.AI.openai_client.OPENAI_API_KEY', 'test-key')
@@ -160,6 +161,28 @@ class TestGetStructuredCompletionSuccess:
         assert call_kwargs["response_format"]["json_schema"]["name"] == "SimpleFeedback"
         assert call_kwargs["response_format"]["json_schema"]["strict"] is True
     
+    async def test_strict_schema_tokens_passed_to_calibration(self, mocker):
+        """Should keep the json_schema size out of the token calibration."""
+        mock_client = AsyncMock()
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = '{"summary": "Great work!", "score": 95}'
+        mock_response.usage.prompt_tokens = 400
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mocker.patch('cqc_cpcc.utilities.AI.openai_client.get_client', return_value=mock_client)
+        estimator = MagicMock()
+        mocker.patch('cqc_cpcc.utilities.AI.openai_client.get_token_estimator', return_value=estimator)
+
+        await get_structured_completion(
+            prompt="Review this code",
+            model_name="gpt-4o",
+            schema_model=SimpleFeedback,
+        )
+
+        estimator.observe.assert_called_once_with(
+            "Review this code", 400, extra_tokens=get_compiled_schema(SimpleFeedback).schema_tokens
+        )
+
     async def test_success_with_complex_model(self, mocker):
         """Should handle complex nested models."""
         mock_client = AsyncMock()
@@ -860,16 +883,13 @@ class TestVideoProcessing:
         video_file = tmp_path / "test.mp4"
         video_file.write_bytes(b"video content")
         
-        # Mock subprocess.run to simulate successful ffmpeg extraction
-        mock_result = mocker.MagicMock()
-        mock_result.returncode = 0
-        mock_result.stderr = ""
-        
-        mock_run = mocker.patch("subprocess.run", return_value=mock_result)
+        # Mock the ffmpeg subprocess to write the audio file
+        async def fake_run(args, **kwargs):
+            with open(args[-1], "wb") as f:
+                f.write(b"mp3 audio")
+            return ""
         
-        # Mock os.path.exists and os.path.getsize
-        mocker.patch("os.path.exists", return_value=True)
-        mocker.patch("os.path.getsize", return_value=1000000)  # 1MB
+        mock_run = mocker.patch("cqc_cpcc.utilities.media_pipeline.run_media_command", side_effect=fake_run)
         
         result = await extract_audio_from_video(str(video_file))
         
@@ -891,8 +911,8 @@ class TestVideoProcessing:
         video_file = tmp_path / "test.mp4"
         video_file.write_bytes(b"video content")
         
-        # Mock subprocess.run to raise FileNotFoundError (ffmpeg not found)
-        mocker.patch("subprocess.run", side_effect=FileNotFoundError("ffmpeg not found"))
+        # Mock the subprocess to raise FileNotFoundError (ffmpeg not found)
+        mocker.patch("asyncio.create_subprocess_exec", side_effect=FileNotFoundError("ffmpeg not found"))
         
         result = await extract_audio_from_video(str(video_file))
         
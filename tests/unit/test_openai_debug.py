@@ -26,6 +26,13 @@ from cqc_cpcc.utilities.AI.openai_debug import (
     get_debug_context,
     _redact_sensitive_data,
 )
+from cqc_cpcc.utilities.AI.debug_writer import flush_debug_writer, read_debug_records
+
+
+def _saved_types(save_dir, correlation_id):
+    """Data types written to the debug segments for a correlation ID."""
+    flush_debug_writer(save_dir)
+    return [record["data_type"] for record in read_debug_records(save_dir, correlation_id)]
 
 
 @pytest.mark.unit
@@ -215,10 +222,8 @@ class TestRecordRequest:
                 schema_name="TestSchema"
             )
             
-            # Check if file was created
-            save_dir = Path(tmpdir)
-            files = list(save_dir.glob("*_test123_request.json"))
-            assert len(files) == 1
+            # Check the request was written to a segment
+            assert _saved_types(tmpdir, "test123") == ["request"]
 
 
 @pytest.mark.unit
@@ -287,14 +292,10 @@ class TestRecordResponse:
                 output_parsed=None
             )
             
-            # Check if response file was created
-            save_dir = Path(tmpdir)
-            files = list(save_dir.glob("*_test123_response.json"))
-            assert len(files) == 1
-            
-            # Check notes file was created
-            notes_files = list(save_dir.glob("*_test123_notes.json"))
-            assert len(notes_files) == 1
+            # Check response and notes were written to a segment
+            saved_types = _saved_types(tmpdir, "test123")
+            assert saved_types.count("response") == 1
+            assert saved_types.count("notes") == 1
     
     def test_record_response_with_error(self, mocker):
         """Should record error information."""
@@ -317,14 +318,10 @@ class TestRecordResponse:
                 error=test_error
             )
             
-            # Check if response file was created
-            save_dir = Path(tmpdir)
-            files = list(save_dir.glob("*_test123_response.json"))
-            assert len(files) == 1
-            
-            # Check notes file was created
-            notes_files = list(save_dir.glob("*_test123_notes.json"))
-            assert len(notes_files) == 1
+            # Check response and notes were written to a segment
+            saved_types = _saved_types(tmpdir, "test123")
+            assert saved_types.count("response") == 1
+            assert saved_types.count("notes") == 1
 
 
 @pytest.mark.unit
@@ -437,6 +434,5 @@ class TestFileSaving:
             # Directory should be created
             assert save_dir.exists()
             
-            # File should exist
-            files = list(save_dir.glob("*_test123_request.json"))
-            assert len(files) == 1
+            # Record should be in a segment
+            assert _saved_types(save_dir, "test123") == ["request"]
@@ -0,0 +1,140 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the local OpenAI-compatible stub server used by load tests.
+
+Tests cover:
+- Latency distribution specs
+- Streamed chat completions (chunks, finish_reason, usage chunk) via the SDK
+- content_factory overriding schema-generated content
+- 429 (with Retry-After) and 5xx injection
+- The audio transcription endpoint
+"""
+
+import io
+import json
+import random
+
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+from tests.openai_stub_server import OpenAIStubServer, parse_latency
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "S", "schema": {
+        "type": "object",
+        "properties": {"items": {"type": "array", "minItems": 2, "items": {"type": "string"}}},
+        "required": ["items"],
+    }},
+}
+
+
+@pytest.mark.unit
+class TestParseLatency:
+    """Test latency specs."""
+
+    def test_numbers_and_fixed(self):
+        rng = random.Random(0)
+        assert parse_latency(None)(rng) == 0.0
+        assert parse_latency(0.25)(rng) == 0.25
+        assert parse_latency("0.5")(rng) == 0.5
+        assert parse_latency("fixed:0.1")(rng) == 0.1
+
+    def test_distributions_stay_in_range(self):
+        rng = random.Random(0)
+        uniform = parse_latency("uniform:0.1,0.2")
+        normal = parse_latency("normal:0.05,1.0")
+        lognormal = parse_latency("lognormal:1.0,0.5")
+        samples = [uniform(rng) for _ in range(200)]
+        assert all(0.1 <= sample <= 0.2 for sample in samples)
+        assert all(normal(rng) >= 0.0 for _ in range(200))
+        assert all(lognormal(rng) > 0.0 for _ in range(200))
+
+    @pytest.mark.parametrize("spec", ["gamma:1,2", "uniform:1", "lognormal:0,1", "normal:a,b"])
+    def test_invalid_specs(self, spec):
+        with pytest.raises(ValueError):
+            parse_latency(spec)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStubChatCompletions:
+    """Test chat completion routes through the SDK."""
+
+    async def test_streamed_completion_with_usage(self):
+        async with OpenAIStubServer() as stub:
+            client = AsyncOpenAI(api_key="stub", base_url=stub.base_url, max_retries=0)
+            stream = await client.chat.completions.create(
+                model="gpt-5-mini",
+                messages=[{"role": "user", "content": "x" * 400}],
+                response_format=RESPONSE_FORMAT,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            parts, finish_reasons, usage = [], [], None
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices:
+                    parts.append(chunk.choices[0].delta.content or "")
+                    finish_reasons.append(chunk.choices[0].finish_reason)
+            await client.close()
+
+        assert json.loads("".join(parts)) == {"items": ["stub", "stub"]}
+        assert finish_reasons[-1] == "stop"
+        assert usage.prompt_tokens == 100
+        assert usage.prompt_tokens_details.cached_tokens == 0
+        assert stub.stats["streamed"] == 1
+
+    async def test_content_factory_and_token_stats(self):
+        async with OpenAIStubServer(content_factory=lambda request: {"model": request["model"]}) as stub:
+            client = AsyncOpenAI(api_key="stub", base_url=stub.base_url, max_retries=0)
+            response = await client.chat.completions.create(
+                model="gpt-5-mini", messages=[{"role": "user", "content": "hi"}], response_format=RESPONSE_FORMAT,
+            )
+            await client.close()
+
+        assert json.loads(response.choices[0].message.content) == {"model": "gpt-5-mini"}
+        assert stub.stats["completion_tokens"] == response.usage.completion_tokens
+
+    async def test_rate_limit_injection(self):
+        async with OpenAIStubServer(rate_limit_rate=1.0, retry_after=2) as stub:
+            client = AsyncOpenAI(api_key="stub", base_url=stub.base_url, max_retries=0)
+            with pytest.raises(openai.RateLimitError) as exc_info:
+                await client.chat.completions.create(model="gpt-5-mini", messages=[{"role": "user", "content": "hi"}])
+            await client.close()
+
+        assert exc_info.value.response.headers["retry-after"] == "2"
+        assert stub.stats["rate_limited"] == 1
+
+    async def test_server_error_injection(self):
+        async with OpenAIStubServer(server_error_rate=1.0, seed=1) as stub:
+            client = AsyncOpenAI(api_key="stub", base_url=stub.base_url, max_retries=0)
+            with pytest.raises(openai.InternalServerError) as exc_info:
+                await client.chat.completions.create(model="gpt-5-mini", messages=[{"role": "user", "content": "hi"}])
+            await client.close()
+
+        assert exc_info.value.status_code in (500, 503)
+        assert stub.stats["server_errors"] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStubTranscriptions:
+    """Test the audio transcription route."""
+
+    async def test_verbose_json_transcription(self):
+        async with OpenAIStubServer() as stub:
+            client = AsyncOpenAI(api_key="stub", base_url=stub.base_url, max_retries=0)
+            transcription = await client.audio.transcriptions.create(
+                model="whisper-1",
+                file=("lecture.mp3", io.BytesIO(b"\0" * 48_000)),
+                response_format="verbose_json",
+            )
+            await client.close()
+
+        assert transcription.duration == 3.0
+        assert transcription.language == "english"
+        assert "lecture.mp3" in transcription.text
+        assert stub.stats["transcriptions"] == 1
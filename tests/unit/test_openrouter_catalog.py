@@ -0,0 +1,177 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the disk-persisted OpenRouter model catalog.
+
+Tests cover:
+- Provider, context length and price indexes
+- Conditional refresh (ETag / If-Modified-Since, 304 handling)
+- Persistence and reload from disk
+- Background refresh only when stale
+"""
+
+import json
+
+import httpx
+import pytest
+
+from cqc_cpcc.utilities.AI.openai_exceptions import OpenAITransportError
+from cqc_cpcc.utilities.AI.openrouter_catalog import OpenRouterModelCatalog, get_prompt_price_per_million
+
+MODELS = [
+    {"id": "openai/gpt-5-mini", "context_length": 400_000, "pricing": {"prompt": "0.00000025"}},
+    {"id": "openai/gpt-4o", "context_length": 128_000, "pricing": {"prompt": "0.0000025"}},
+    {"id": "anthropic/claude-sonnet", "context_length": 200_000, "pricing": {"prompt": "0.000003"}},
+    {"id": "openrouter/auto", "context_length": 2_000_000, "pricing": {"prompt": "-1"}},
+]
+
+
+class FakeClock:
+    """Manually advanced wall clock."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ModelsServer:
+    """httpx handler that serves MODELS with an ETag and honors If-None-Match."""
+
+    def __init__(self, etag='"v1"', status_code=200):
+        self.etag = etag
+        self.status_code = status_code
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.status_code != 200:
+            return httpx.Response(self.status_code)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        return httpx.Response(200, json={"data": MODELS}, headers={"ETag": self.etag})
+
+
+@pytest.fixture(autouse=True)
+def openrouter_key(mocker):
+    mocker.patch("cqc_cpcc.utilities.AI.openrouter_catalog._get_openrouter_api_key", return_value="test-key")
+
+
+def _catalog(tmp_path, server, clock=None, max_age=3600):
+    return OpenRouterModelCatalog(
+        path=tmp_path / "models.json",
+        max_age_seconds=max_age,
+        transport=httpx.MockTransport(server),
+        clock=clock or FakeClock(),
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestCatalogRefresh:
+    """Test conditional refresh and persistence."""
+
+    async def test_first_refresh_fetches_and_persists(self, tmp_path):
+        server = ModelsServer()
+        catalog = _catalog(tmp_path, server)
+        assert catalog.is_stale()
+
+        assert await catalog.refresh() is True
+        assert len(catalog.models) == 4
+        assert "If-None-Match" not in server.requests[0].headers
+
+        saved = json.loads((tmp_path / "models.json").read_text())
+        assert saved["etag"] == '"v1"'
+        assert len(saved["models"]) == 4
+
+    async def test_reload_from_disk_then_conditional_304(self, tmp_path):
+        clock = FakeClock()
+        await _catalog(tmp_path, ModelsServer(), clock).refresh()
+
+        server = ModelsServer()
+        reloaded = _catalog(tmp_path, server, clock)
+        assert len(reloaded.models) == 4
+        assert not reloaded.is_stale()
+
+        clock.now += 7200
+        assert reloaded.is_stale()
+        assert await reloaded.refresh() is False
+        assert server.requests[0].headers["If-None-Match"] == '"v1"'
+        assert not reloaded.is_stale()
+        assert len(reloaded.models) == 4
+
+    async def test_http_error_raises_transport_error_and_keeps_models(self, tmp_path):
+        catalog = _catalog(tmp_path, ModelsServer())
+        await catalog.refresh()
+        catalog._transport = httpx.MockTransport(ModelsServer(status_code=503))
+
+        with pytest.raises(OpenAITransportError):
+            await catalog.refresh()
+        assert len(catalog.models) == 4
+
+    async def test_corrupt_file_is_ignored(self, tmp_path):
+        (tmp_path / "models.json").write_text("{oops")
+        assert _catalog(tmp_path, ModelsServer()).models == []
+
+
+@pytest.mark.unit
+class TestCatalogIndexes:
+    """Test filtering through the indexes."""
+
+    @pytest.fixture
+    def catalog(self, tmp_path):
+        catalog = _catalog(tmp_path, ModelsServer())
+        catalog._set_models(MODELS)
+        return catalog
+
+    def _ids(self, models):
+        return [m["id"] for m in models]
+
+    def test_providers(self, catalog):
+        assert catalog.providers() == ["anthropic", "openai", "openrouter"]
+
+    def test_filter_by_provider(self, catalog):
+        assert self._ids(catalog.filter(provider="openai")) == ["openai/gpt-5-mini", "openai/gpt-4o"]
+
+    def test_filter_by_context(self, catalog):
+        assert self._ids(catalog.filter(min_context=200_000)) == [
+            "openai/gpt-5-mini", "anthropic/claude-sonnet", "openrouter/auto"
+        ]
+
+    def test_filter_by_price_excludes_variable_pricing(self, catalog):
+        assert self._ids(catalog.filter(max_prompt_price=2.5)) == ["openai/gpt-5-mini", "openai/gpt-4o"]
+
+    def test_combined_filters(self, catalog):
+        assert self._ids(catalog.filter(provider="openai", min_context=200_000, max_prompt_price=1.0)) == [
+            "openai/gpt-5-mini"
+        ]
+
+    def test_no_filters_returns_all(self, catalog):
+        assert len(catalog.filter()) == 4
+
+    def test_price_parsing(self):
+        assert get_prompt_price_per_million({"pricing": {"prompt": "0.000001"}}) == pytest.approx(1.0)
+        assert get_prompt_price_per_million({"pricing": {"prompt": "-1"}}) is None
+        assert get_prompt_price_per_million({}) is None
+
+
+@pytest.mark.unit
+class TestBackgroundRefresh:
+    """Test the background refresh trigger."""
+
+    def test_refreshes_only_when_stale(self, tmp_path):
+        server = ModelsServer()
+        catalog = _catalog(tmp_path, server)
+
+        assert catalog.refresh_in_background() is True
+        catalog.wait_for_refresh(timeout=5)
+        assert len(catalog.models) == 4
+
+        assert catalog.refresh_in_background() is False
+        assert len(server.requests) == 1
+
+    def test_background_failure_is_swallowed(self, tmp_path):
+        catalog = _catalog(tmp_path, ModelsServer(status_code=500))
+        assert catalog.refresh_in_background() is True
+        catalog.wait_for_refresh(timeout=5)
+        assert catalog.models == []
@@ -0,0 +1,100 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the prefix-stable rubric prompt layout and cached token accounting.
+
+Tests cover:
+- Assignment-wide content forms a byte-identical prefix across students
+- The student submission is the last section of the prompt
+- Cached input tokens are read from usage and accumulated per model
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from cqc_cpcc.rubric_config import get_rubric_by_id
+from cqc_cpcc.rubric_grading import build_rubric_grading_prompt, build_rubric_grading_prompt_prefix
+from cqc_cpcc.utilities.AI.openai_client import (
+    get_cached_prompt_tokens,
+    get_prompt_cache_stats,
+    record_prompt_cache_usage,
+    reset_prompt_cache_stats,
+)
+
+ASSIGNMENT_INSTRUCTIONS = "Write a Java program that prints Hello World."
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    reset_prompt_cache_stats()
+    yield
+    reset_prompt_cache_stats()
+
+
+@pytest.mark.unit
+class TestPrefixStablePrompt:
+    """Test that every student shares the same prompt prefix."""
+
+    def test_prompts_share_identical_prefix(self):
+        rubric = get_rubric_by_id("default_100pt_rubric")
+        prefix = build_rubric_grading_prompt_prefix(
+            rubric=rubric,
+            assignment_instructions=ASSIGNMENT_INSTRUCTIONS,
+            reference_solution="class Ref {}",
+        )
+
+        prompts = [
+            build_rubric_grading_prompt(
+                rubric=rubric,
+                assignment_instructions=ASSIGNMENT_INSTRUCTIONS,
+                student_submission=submission,
+                reference_solution="class Ref {}",
+            )
+            for submission in ("class A {}", "class B { int x; }")
+        ]
+
+        for prompt in prompts:
+            assert prompt.startswith(prefix)
+
+    def test_submission_is_last_section(self):
+        rubric = get_rubric_by_id("default_100pt_rubric")
+        prompt = build_rubric_grading_prompt(
+            rubric=rubric,
+            assignment_instructions=ASSIGNMENT_INSTRUCTIONS,
+            student_submission="STUDENT_CODE_MARKER",
+        )
+
+        assert prompt.endswith("## Student Submission to Grade\nSTUDENT_CODE_MARKER")
+        assert prompt.index("### Output Format") < prompt.index("## Student Submission to Grade")
+
+
+@pytest.mark.unit
+class TestCachedTokenAccounting:
+    """Test reading and accumulating cached prompt tokens."""
+
+    def test_reads_cached_tokens(self):
+        usage = SimpleNamespace(prompt_tokens=1000, prompt_tokens_details=SimpleNamespace(cached_tokens=768))
+        assert get_cached_prompt_tokens(usage) == 768
+        assert get_cached_prompt_tokens(
+            SimpleNamespace(prompt_tokens_details={"cached_tokens": 5})
+        ) == 5
+
+    def test_missing_or_non_integer_details(self, mocker):
+        assert get_cached_prompt_tokens(None) is None
+        assert get_cached_prompt_tokens(SimpleNamespace(prompt_tokens=10)) is None
+        assert get_cached_prompt_tokens(mocker.MagicMock()) is None
+
+    def test_accumulates_per_model(self, mocker):
+        record_prompt_cache_usage(
+            "gpt-5-mini", SimpleNamespace(prompt_tokens=1000, prompt_tokens_details=SimpleNamespace(cached_tokens=0))
+        )
+        record_prompt_cache_usage(
+            "gpt-5-mini", SimpleNamespace(prompt_tokens=1000, prompt_tokens_details=SimpleNamespace(cached_tokens=900))
+        )
+        record_prompt_cache_usage("gpt-5-mini", mocker.MagicMock())
+
+        stats = get_prompt_cache_stats()["gpt-5-mini"]
+        assert stats["requests"] == 2
+        assert stats["prompt_tokens"] == 2000
+        assert stats["cached_tokens"] == 900
+        assert stats["hit_rate"] == pytest.approx(0.45)
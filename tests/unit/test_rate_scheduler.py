@@ -0,0 +1,184 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the per-model TPM/RPM rate scheduler.
+
+Tests cover:
+- Limits parsing from JSON configuration
+- Token bucket refill
+- Reservation waits for TPM and RPM capacity
+- Settling with actual usage and refunding failed calls
+- Unconfigured models pass through
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from openai import APIConnectionError
+from pydantic import BaseModel
+
+import cqc_cpcc.utilities.AI.rate_scheduler as scheduler_module
+from cqc_cpcc.utilities.AI.openai_client import get_structured_completion
+from cqc_cpcc.utilities.AI.openai_exceptions import OpenAITransportError
+from cqc_cpcc.utilities.AI.rate_scheduler import (
+    ModelRateLimits,
+    RateScheduler,
+    TokenBucket,
+    parse_model_rate_limits,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.mark.unit
+class TestParseModelRateLimits:
+    """Test configuration parsing."""
+
+    def test_parses_json(self):
+        limits = parse_model_rate_limits('{"gpt-5-mini": {"tpm": 1000, "rpm": 10}, "default": {"rpm": 5}}')
+        assert limits["gpt-5-mini"] == ModelRateLimits(tpm=1000, rpm=10)
+        assert limits["default"] == ModelRateLimits(tpm=None, rpm=5)
+
+    @pytest.mark.parametrize("raw", ["", None, "not json", "[1, 2]"])
+    def test_empty_or_invalid_returns_empty(self, raw):
+        assert parse_model_rate_limits(raw) == {}
+
+    def test_skips_invalid_entries(self):
+        assert parse_model_rate_limits({"a": 5, "b": {"tpm": 10}}) == {"b": ModelRateLimits(tpm=10)}
+
+
+@pytest.mark.unit
+class TestTokenBucket:
+    """Test refill arithmetic."""
+
+    def test_refills_over_a_minute(self, clock):
+        bucket = TokenBucket(600, clock)
+        bucket.take(600)
+        assert bucket.seconds_until(100) == pytest.approx(10.0)
+
+        clock.now = 30.0
+        assert bucket.available == pytest.approx(300)
+
+        clock.now = 600.0
+        assert bucket.available == 600
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRateScheduler:
+    """Test reservations against TPM/RPM limits."""
+
+    async def test_unconfigured_model_never_waits(self, clock):
+        scheduler = RateScheduler({}, clock)
+        reservation = await scheduler.reserve("gpt-5", prompt_tokens=10**9, output_tokens=10**9)
+        assert reservation.tokens == 0
+
+    async def test_tpm_exhaustion_requires_wait(self, clock):
+        scheduler = RateScheduler({"m": ModelRateLimits(tpm=6000)}, clock)
+
+        reservation, wait = scheduler.try_reserve("m", 5000)
+        assert reservation is not None and wait == 0
+
+        reservation, wait = scheduler.try_reserve("m", 2000)
+        assert reservation is None
+        assert wait == pytest.approx(10.0)  # 1000 token deficit at 100 tokens/s
+
+    async def test_rpm_exhaustion_requires_wait(self, clock):
+        scheduler = RateScheduler({"m": ModelRateLimits(rpm=2)}, clock)
+        assert scheduler.try_reserve("m", 1)[0] is not None
+        assert scheduler.try_reserve("m", 1)[0] is not None
+
+        reservation, wait = scheduler.try_reserve("m", 1)
+        assert reservation is None
+        assert wait == pytest.approx(30.0)
+
+    async def test_default_entry_applies_to_other_models(self, clock):
+        scheduler = RateScheduler({"default": ModelRateLimits(rpm=1)}, clock)
+        assert scheduler.try_reserve("any-model", 1)[0] is not None
+        assert scheduler.try_reserve("any-model", 1)[0] is None
+
+    async def test_oversized_request_is_clamped(self, clock):
+        scheduler = RateScheduler({"m": ModelRateLimits(tpm=100)}, clock)
+        reservation, wait = scheduler.try_reserve("m", 5000)
+        assert wait == 0
+        assert reservation.tokens == 100
+
+    async def test_reserve_sleeps_until_capacity(self, clock, mocker):
+        scheduler = RateScheduler({"m": ModelRateLimits(tpm=600)}, clock)
+        await scheduler.reserve("m", prompt_tokens=500, output_tokens=100)
+
+        async def advance(seconds):
+            clock.now += seconds
+
+        mock_sleep = mocker.patch.object(scheduler_module.asyncio, "sleep", side_effect=advance)
+
+        reservation = await scheduler.reserve("m", prompt_tokens=50, output_tokens=50)
+
+        assert reservation.tokens == 100
+        assert mock_sleep.call_args[0][0] == pytest.approx(10.0)
+
+    async def test_settle_refunds_and_charges(self, clock):
+        scheduler = RateScheduler({"m": ModelRateLimits(tpm=1000)}, clock)
+        reservation = await scheduler.reserve("m", prompt_tokens=400, output_tokens=400)
+        assert scheduler.snapshot()["m"]["tokens_available"] == 200
+
+        scheduler.settle(reservation, actual_tokens=300)
+        assert scheduler.snapshot()["m"]["tokens_available"] == 700
+
+        reservation = await scheduler.reserve("m", prompt_tokens=100, output_tokens=0)
+        scheduler.settle(reservation, actual_tokens=400)
+        assert scheduler.snapshot()["m"]["tokens_available"] == 300
+
+    async def test_settle_ignores_non_integer_usage(self, clock, mocker):
+        scheduler = RateScheduler({"m": ModelRateLimits(tpm=1000)}, clock)
+        reservation = await scheduler.reserve("m", prompt_tokens=400, output_tokens=400)
+        scheduler.settle(reservation, actual_tokens=mocker.MagicMock())
+        scheduler.settle(reservation, actual_tokens=None)
+        assert scheduler.snapshot()["m"]["tokens_available"] == 200
+
+    async def test_refund_returns_reserved_tokens(self, clock):
+        scheduler = RateScheduler({"m": ModelRateLimits(tpm=1000, rpm=10)}, clock)
+        reservation = await scheduler.reserve("m", prompt_tokens=400, output_tokens=400)
+
+        scheduler.refund(reservation)
+
+        assert scheduler.snapshot()["m"]["tokens_available"] == 1000
+        assert scheduler.snapshot()["m"]["requests_available"] == 9
+
+
+class Answer(BaseModel):
+    """Schema for the failed-call test."""
+    value: str
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStructuredCompletionReservations:
+    """Test that get_structured_completion releases budget for failed calls."""
+
+    async def test_failed_calls_are_refunded(self, clock, mocker):
+        scheduler = RateScheduler({"gpt-5-mini": ModelRateLimits(tpm=100000)}, clock)
+        mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_rate_scheduler", return_value=scheduler)
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=APIConnectionError(request=MagicMock()))
+        mocker.patch("cqc_cpcc.utilities.AI.openai_client.get_client", return_value=mock_client)
+
+        with pytest.raises(OpenAITransportError):
+            await get_structured_completion(
+                prompt="p", model_name="gpt-5-mini", schema_model=Answer, max_retries=2, retry_delay=0
+            )
+
+        assert mock_client.chat.completions.create.await_count == 3
+        assert scheduler.snapshot()["gpt-5-mini"]["tokens_available"] == 100000
@@ -0,0 +1,171 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the persistent AI response cache.
+
+Tests cover:
+- Deterministic, content-addressed cache keys
+- Get/set round trip and persistence across instances
+- TTL expiry
+- Size-bounded LRU eviction
+- get_structured_completion integration (hit, bypass)
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import BaseModel, Field
+
+import cqc_cpcc.utilities.AI.response_cache as cache_module
+from cqc_cpcc.utilities.AI.openai_client import get_structured_completion
+from cqc_cpcc.utilities.AI.response_cache import ResponseCache, build_cache_key
+
+
+class SimpleFeedback(BaseModel):
+    """Simple test model."""
+    summary: str = Field(description="Brief summary")
+    score: int = Field(description="Score 0-100")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(tmp_path / "cache.sqlite3", max_bytes=1024 * 1024, ttl_seconds=3600)
+
+
+@pytest.mark.unit
+class TestBuildCacheKey:
+    """Test cache key derivation."""
+
+    def test_key_is_deterministic(self):
+        key1 = build_cache_key("prompt", "gpt-5-mini", "S", {"a": 1, "b": 2}, {"temperature": 0.2})
+        key2 = build_cache_key("prompt", "gpt-5-mini", "S", {"b": 2, "a": 1}, {"temperature": 0.2})
+        assert key1 == key2
+        assert len(key1) == 64
+
+    @pytest.mark.parametrize("changed", [
+        ("other prompt", "gpt-5-mini", "S", {"a": 1}, {"temperature": 0.2}),
+        ("prompt", "gpt-5", "S", {"a": 1}, {"temperature": 0.2}),
+        ("prompt", "gpt-5-mini", "T", {"a": 1}, {"temperature": 0.2}),
+        ("prompt", "gpt-5-mini", "S", {"a": 2}, {"temperature": 0.2}),
+        ("prompt", "gpt-5-mini", "S", {"a": 1}, {"temperature": 0.7}),
+    ])
+    def test_any_input_change_changes_key(self, changed):
+        base = build_cache_key("prompt", "gpt-5-mini", "S", {"a": 1}, {"temperature": 0.2})
+        assert build_cache_key(*changed) != base
+
+
+@pytest.mark.unit
+class TestResponseCache:
+    """Test SQLite storage, TTL and LRU eviction."""
+
+    def test_miss_returns_none(self, cache):
+        assert cache.get("missing") is None
+
+    def test_set_then_get(self, cache):
+        cache.set("k1", '{"x": 1}', model="m", schema_name="S")
+        assert cache.get("k1") == '{"x": 1}'
+
+    def test_persists_across_instances(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        ResponseCache(path, max_bytes=1024, ttl_seconds=60).set("k1", "payload")
+        assert ResponseCache(path, max_bytes=1024, ttl_seconds=60).get("k1") == "payload"
+
+    def test_creates_missing_parent_directory(self, tmp_path):
+        cache = ResponseCache(tmp_path / "new" / "dir" / "cache.sqlite3", max_bytes=1024, ttl_seconds=60)
+
+        cache.set("k1", "payload")
+
+        assert cache.get("k1") == "payload"
+
+    def test_expired_entry_is_miss(self, cache, mocker):
+        mock_time = mocker.patch.object(cache_module.time, "time", return_value=1000.0)
+        cache.set("k1", "payload")
+        mock_time.return_value = 1000.0 + 3601
+        assert cache.get("k1") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction_removes_least_recently_used(self, tmp_path, mocker):
+        cache = ResponseCache(tmp_path / "cache.sqlite3", max_bytes=25, ttl_seconds=0)
+        mock_time = mocker.patch.object(cache_module.time, "time", return_value=1.0)
+        cache.set("a", "x" * 10)
+        mock_time.return_value = 2.0
+        cache.set("b", "y" * 10)
+        mock_time.return_value = 3.0
+        cache.get("a")  # "a" becomes most recently used
+        mock_time.return_value = 4.0
+        cache.set("c", "z" * 10)
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        assert cache.stats()["total_bytes"] <= 25
+
+    def test_oversized_payload_not_stored(self, tmp_path):
+        cache = ResponseCache(tmp_path / "cache.sqlite3", max_bytes=5, ttl_seconds=0)
+        cache.set("k1", "too large")
+        assert cache.get("k1") is None
+
+    def test_clear_and_stats(self, cache):
+        cache.set("k1", "abc")
+        cache.get("k1")
+        stats = cache.stats()
+        assert stats["entries"] == 1
+        assert stats["total_bytes"] == 3
+        assert stats["hits"] == 1
+
+        cache.clear()
+        assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStructuredCompletionCache:
+    """Test cache integration in get_structured_completion."""
+
+    @pytest.fixture
+    def mock_client(self, mocker):
+        mock_client = AsyncMock()
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = '{"summary": "Good", "score": 90}'
+        mock_response.choices[0].message.refusal = None
+        mock_response.usage.total_tokens = 100
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mocker.patch('cqc_cpcc.utilities.AI.openai_client.get_client', return_value=mock_client)
+        return mock_client
+
+    @pytest.fixture(autouse=True)
+    def isolated_cache(self, tmp_path, mocker):
+        cache = ResponseCache(tmp_path / "cache.sqlite3", max_bytes=1024 * 1024, ttl_seconds=3600)
+        mocker.patch('cqc_cpcc.utilities.AI.openai_client.get_response_cache', return_value=cache)
+        return cache
+
+    async def test_second_identical_call_served_from_cache(self, mock_client):
+        result1 = await get_structured_completion(
+            prompt="Review this code", model_name="gpt-4o", schema_model=SimpleFeedback, use_cache=True
+        )
+        result2 = await get_structured_completion(
+            prompt="Review this code", model_name="gpt-4o", schema_model=SimpleFeedback, use_cache=True
+        )
+
+        assert result1 == result2
+        assert isinstance(result2, SimpleFeedback)
+        assert mock_client.chat.completions.create.call_count == 1
+
+    async def test_bypass_flag_skips_cache(self, mock_client, isolated_cache):
+        for _ in range(2):
+            await get_structured_completion(
+                prompt="Review this code", model_name="gpt-4o", schema_model=SimpleFeedback, use_cache=False
+            )
+
+        assert mock_client.chat.completions.create.call_count == 2
+        assert isolated_cache.stats()["entries"] == 0
+
+    async def test_different_prompt_misses_cache(self, mock_client):
+        await get_structured_completion(
+            prompt="Review this code", model_name="gpt-4o", schema_model=SimpleFeedback, use_cache=True
+        )
+        await get_structured_completion(
+            prompt="Review other code", model_name="gpt-4o", schema_model=SimpleFeedback, use_cache=True
+        )
+
+        assert mock_client.chat.completions.create.call_count == 2
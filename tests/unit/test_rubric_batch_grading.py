@@ -0,0 +1,191 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for offline batch rubric grading.
+
+Tests cover:
+1. JSONL serialization of grading requests
+2. Polling with backoff until a terminal status
+3. Result parsing through backend scoring (success and failure lines)
+4. End-to-end run against an in-memory stand-in endpoint
+"""
+
+import json
+
+import pytest
+
+from cqc_cpcc.rubric_batch_grading import (
+    build_rubric_batch_jsonl,
+    grade_with_rubric_batch,
+    parse_batch_result_line,
+    poll_batch_until_done,
+)
+from cqc_cpcc.rubric_config import get_rubric_by_id
+from cqc_cpcc.rubric_grading import apply_backend_scoring
+from cqc_cpcc.rubric_models import RubricAssessmentResult
+from tests.unit.test_rubric_grading import create_valid_rubric_assessment
+
+ASSIGNMENT_INSTRUCTIONS = "Write a Java program that prints Hello World."
+
+
+@pytest.fixture
+def base_rubric():
+    return get_rubric_by_id("default_100pt_rubric")
+
+
+def _success_line(student_id: str, rubric_id: str = "default_100pt_rubric") -> dict:
+    return {
+        "custom_id": student_id,
+        "response": {
+            "status_code": 200,
+            "body": {"choices": [{"message": {"content": json.dumps(create_valid_rubric_assessment(rubric_id))}}]},
+        },
+        "error": None,
+    }
+
+
+class InMemoryBatchEndpoint:
+    """Local stand-in for a batch endpoint."""
+
+    def __init__(self, statuses: list[str], result_lines: list[dict]):
+        self.statuses = list(statuses)
+        self.result_lines = result_lines
+        self.submitted: list[dict] = []
+
+    async def submit(self, jsonl_content: str) -> str:
+        self.submitted = [json.loads(line) for line in jsonl_content.splitlines() if line]
+        return "batch_test"
+
+    async def get_status(self, batch_id: str) -> dict:
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return {"status": status}
+
+    async def iter_results(self, batch_id: str):
+        for line in self.result_lines:
+            yield line
+
+
+@pytest.mark.unit
+class TestBuildRubricBatchJsonl:
+    """Test stage 1 serialization."""
+
+    def test_one_line_per_student_with_schema(self, base_rubric):
+        content = build_rubric_batch_jsonl(
+            rubric=base_rubric,
+            assignment_instructions=ASSIGNMENT_INSTRUCTIONS,
+            student_submissions={"s1": "code one", "s2": "code two"},
+            model_name="gpt-4o",
+        )
+        lines = [json.loads(line) for line in content.splitlines()]
+
+        assert [line["custom_id"] for line in lines] == ["s1", "s2"]
+        assert all(line["url"] == "/v1/chat/completions" for line in lines)
+        body = lines[0]["body"]
+        assert body["response_format"]["json_schema"]["name"] == "RubricAssessmentResult"
+        assert body["response_format"]["json_schema"]["strict"] is True
+        assert "code one" in body["messages"][0]["content"]
+        assert body["max_tokens"] == 16384
+
+    def test_gpt5_uses_completion_token_param_without_temperature(self, base_rubric):
+        content = build_rubric_batch_jsonl(
+            rubric=base_rubric,
+            assignment_instructions=ASSIGNMENT_INSTRUCTIONS,
+            student_submissions={"s1": "code"},
+            model_name="gpt-5-mini",
+        )
+        body = json.loads(content.splitlines()[0])["body"]
+        assert "max_completion_tokens" in body
+        assert "temperature" not in body
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestPollBatch:
+    """Test stage 3 polling."""
+
+    async def test_polls_with_backoff_until_completed(self, mocker):
+        endpoint = InMemoryBatchEndpoint(["validating", "in_progress", "in_progress", "completed"], [])
+        mock_sleep = mocker.patch("cqc_cpcc.rubric_batch_grading.asyncio.sleep", new=mocker.AsyncMock())
+
+        status = await poll_batch_until_done(endpoint, "b", initial_delay=1, max_delay=3)
+
+        assert status["status"] == "completed"
+        assert [c.args[0] for c in mock_sleep.await_args_list] == [1, 2, 3]
+
+    async def test_times_out(self, mocker):
+        endpoint = InMemoryBatchEndpoint(["in_progress"], [])
+        mocker.patch("cqc_cpcc.rubric_batch_grading.asyncio.sleep", new=mocker.AsyncMock())
+
+        with pytest.raises(TimeoutError):
+            await poll_batch_until_done(endpoint, "b", initial_delay=10, timeout=5)
+
+
+@pytest.mark.unit
+class TestParseBatchResultLine:
+    """Test stage 4 parsing."""
+
+    def test_success_matches_interactive_scoring(self, base_rubric):
+        student_id, result, failure = parse_batch_result_line(base_rubric, _success_line("s1"))
+
+        expected = apply_backend_scoring(
+            base_rubric, RubricAssessmentResult.model_validate(create_valid_rubric_assessment())
+        )
+        assert student_id == "s1"
+        assert failure is None
+        assert result == expected
+
+    def test_corrects_rubric_id(self, base_rubric):
+        _, result, failure = parse_batch_result_line(base_rubric, _success_line("s1", rubric_id="generic"))
+        assert failure is None
+        assert result.rubric_id == base_rubric.rubric_id
+
+    @pytest.mark.parametrize("line,reason", [
+        ({"custom_id": "s1", "error": {"message": "boom"}}, "Batch request error"),
+        ({"custom_id": "s1", "response": {"status_code": 500, "body": {}}}, "status 500"),
+        ({"custom_id": "s1", "response": {"status_code": 200, "body": {"choices": []}}}, "missing choices"),
+        ({"custom_id": "s1", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "{}"}}]}}},
+         "Schema validation failed"),
+    ])
+    def test_failure_lines(self, base_rubric, line, reason):
+        student_id, result, failure = parse_batch_result_line(base_rubric, line)
+        assert student_id == "s1"
+        assert result is None
+        assert reason in failure
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGradeWithRubricBatch:
+    """Test the full pipeline against the in-memory endpoint."""
+
+    async def test_end_to_end(self, base_rubric, mocker):
+        mocker.patch("cqc_cpcc.rubric_batch_grading.asyncio.sleep", new=mocker.AsyncMock())
+        endpoint = InMemoryBatchEndpoint(
+            ["in_progress", "completed"],
+            [_success_line("s1"), {"custom_id": "s2", "error": {"message": "boom"}}],
+        )
+
+        outcome = await grade_with_rubric_batch(
+            rubric=base_rubric,
+            assignment_instructions=ASSIGNMENT_INSTRUCTIONS,
+            student_submissions={"s1": "a", "s2": "b", "s3": "c"},
+            model_name="gpt-4o",
+            endpoint=endpoint,
+        )
+
+        assert outcome.batch_id == "batch_test"
+        assert len(endpoint.submitted) == 3
+        assert set(outcome.results) == {"s1"}
+        assert set(outcome.failures) == {"s2", "s3"}
+        assert outcome.failures["s3"] == "No result returned by batch"
+
+    async def test_failed_batch_raises(self, base_rubric, mocker):
+        mocker.patch("cqc_cpcc.rubric_batch_grading.asyncio.sleep", new=mocker.AsyncMock())
+        endpoint = InMemoryBatchEndpoint(["failed"], [])
+
+        with pytest.raises(ValueError, match="failed"):
+            await grade_with_rubric_batch(
+                rubric=base_rubric,
+                assignment_instructions=ASSIGNMENT_INSTRUCTIONS,
+                student_submissions={"s1": "a"},
+                endpoint=endpoint,
+            )
@@ -0,0 +1,195 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for delta regrading of resubmissions.
+
+Tests cover:
+1. Per-file content hashes and file deltas
+2. Delta prompt layout (changed files in full, digest of unchanged ones)
+3. Merging re-evaluated criteria and rescoring
+4. Mode selection (unchanged, delta, full) and the grading history store
+"""
+
+import pytest
+
+from cqc_cpcc.rubric_config import get_rubric_by_id
+from cqc_cpcc.rubric_delta_grading import (
+    DeltaRubricAssessment,
+    GradedSubmission,
+    build_delta_regrade_prompt,
+    build_grading_context_hash,
+    compute_file_delta,
+    file_content_hashes,
+    get_grading_history,
+    grade_with_rubric_delta,
+    merge_delta_assessment,
+)
+from cqc_cpcc.rubric_models import CriterionResult, RubricAssessmentResult
+from cqc_cpcc.utilities.AI.chunked_preprocessing import split_submission_files
+from tests.unit.test_rubric_grading import create_valid_rubric_assessment
+
+ASSIGNMENT_INSTRUCTIONS = "Write a Java program that reads and averages grades."
+MAIN = "public class Main {\n    public static void main(String[] args) {\n        Grades.run();\n    }\n}"
+GRADES = "public class Grades {\n    static void run() {\n        System.out.println(\"avg\");\n    }\n}"
+GRADES_FIXED = GRADES.replace('"avg"', '"average: " + compute()')
+
+
+def _submission(**files: str) -> str:
+    return "\n".join(
+        f"### Submission File Name: {name}\n### Submission Content: ```java\n{content}\n```"
+        for name, content in files.items()
+    )
+
+
+@pytest.fixture
+def base_rubric():
+    return get_rubric_by_id("default_100pt_rubric")
+
+
+@pytest.fixture
+def previous(base_rubric):
+    submission = _submission(**{"Main.java": MAIN, "Grades.java": GRADES})
+    return GradedSubmission(
+        assignment_key="CSC151/Exam1",
+        student_id="alice",
+        context_hash=build_grading_context_hash(base_rubric, ASSIGNMENT_INSTRUCTIONS),
+        file_hashes=file_content_hashes(submission),
+        result=RubricAssessmentResult.model_validate(create_valid_rubric_assessment()),
+    )
+
+
+def _delta_response(points: float = 29) -> DeltaRubricAssessment:
+    return DeltaRubricAssessment(
+        reevaluated_criteria=[CriterionResult(
+            criterion_id="completeness", criterion_name="Completeness", points_possible=30,
+            points_earned=points, feedback="Average is now computed.",
+        )],
+        overall_feedback="Resubmission fixes the average.",
+    )
+
+
+@pytest.mark.unit
+class TestFileDelta:
+    """Test per-file hashes and deltas."""
+
+    def test_hashes_ignore_line_endings_and_trailing_whitespace(self):
+        original = file_content_hashes(_submission(**{"Main.java": MAIN}))
+        reformatted = file_content_hashes(_submission(**{"Main.java": MAIN.replace("\n", "   \r\n")}))
+
+        assert original == reformatted
+        assert list(original) == ["Main.java"]
+
+    def test_changed_added_removed_and_unchanged(self):
+        previous = file_content_hashes(_submission(**{"Main.java": MAIN, "Grades.java": GRADES, "Old.java": MAIN}))
+        files = split_submission_files(_submission(**{"Main.java": MAIN, "Grades.java": GRADES_FIXED,
+                                                      "Util.java": GRADES}))
+
+        delta = compute_file_delta(previous, files)
+
+        assert delta.changed == ["Grades.java"]
+        assert delta.added == ["Util.java"]
+        assert delta.removed == ["Old.java"]
+        assert delta.unchanged == ["Main.java"]
+        assert 0 < delta.changed_fraction < 1
+
+
+@pytest.mark.unit
+class TestDeltaPrompt:
+    """Test the delta regrade prompt layout."""
+
+    def test_only_changed_files_are_sent_in_full(self, base_rubric, previous):
+        files = split_submission_files(_submission(**{"Main.java": MAIN, "Grades.java": GRADES_FIXED}))
+        delta = compute_file_delta(previous.file_hashes, files)
+
+        prompt = build_delta_regrade_prompt(base_rubric, ASSIGNMENT_INSTRUCTIONS, previous.result, files, delta)
+
+        assert "compute()" in prompt
+        assert "Grades.run();" not in prompt
+        assert "`Main.java` (java, 5 lines): `public class Main`" in prompt
+        assert "`completeness`: 27" in prompt
+        assert prompt.index("### Previous Criterion Results") < prompt.index("## Changed Files")
+
+
+@pytest.mark.unit
+class TestMergeDeltaAssessment:
+    """Test merging a delta response into the previous result."""
+
+    def test_reevaluated_criteria_replace_previous_ones(self, base_rubric, previous):
+        result, reevaluated = merge_delta_assessment(base_rubric, previous.result, _delta_response())
+
+        assert reevaluated == ["completeness"]
+        assert result.total_points_earned == 87
+        assert result.overall_feedback == "Resubmission fixes the average."
+        assert [c.criterion_id for c in result.criteria_results] == \
+            [c.criterion_id for c in previous.result.criteria_results]
+
+    def test_unknown_criteria_are_ignored(self, base_rubric, previous):
+        response = _delta_response()
+        response.reevaluated_criteria[0].criterion_id = "made_up"
+
+        result, reevaluated = merge_delta_assessment(base_rubric, previous.result, response)
+
+        assert reevaluated == []
+        assert result.total_points_earned == 85
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGradeWithRubricDelta:
+    """Test mode selection."""
+
+    async def test_unchanged_submission_reuses_previous_result(self, base_rubric, previous, mocker):
+        completion = mocker.patch("cqc_cpcc.rubric_grading.get_structured_completion")
+
+        outcome = await grade_with_rubric_delta(
+            base_rubric, ASSIGNMENT_INSTRUCTIONS, _submission(**{"Main.java": MAIN, "Grades.java": GRADES}),
+            previous=previous,
+        )
+
+        assert outcome.mode == "unchanged"
+        assert outcome.result == previous.result
+        completion.assert_not_awaited()
+
+    async def test_changed_file_is_regraded_with_delta_schema(self, base_rubric, previous, mocker):
+        completion = mocker.patch("cqc_cpcc.rubric_grading.get_structured_completion",
+                                  return_value=_delta_response())
+
+        outcome = await grade_with_rubric_delta(
+            base_rubric, ASSIGNMENT_INSTRUCTIONS, _submission(**{"Main.java": MAIN, "Grades.java": GRADES_FIXED}),
+            previous=previous, max_changed_fraction=1.0,
+        )
+
+        assert outcome.mode == "delta"
+        assert completion.call_args.kwargs["schema_model"] is DeltaRubricAssessment
+        assert outcome.result.total_points_earned == 87
+        assert outcome.file_hashes["Grades.java"] != previous.file_hashes["Grades.java"]
+
+    async def test_changed_grading_context_regrades_in_full(self, base_rubric, previous, mocker):
+        completion = mocker.patch(
+            "cqc_cpcc.rubric_grading.get_structured_completion",
+            return_value=RubricAssessmentResult.model_validate(create_valid_rubric_assessment()),
+        )
+
+        outcome = await grade_with_rubric_delta(
+            base_rubric, "Different instructions", _submission(**{"Main.java": MAIN, "Grades.java": GRADES_FIXED}),
+            previous=previous, max_changed_fraction=1.0,
+        )
+
+        assert outcome.mode == "full"
+        assert "changed" in outcome.reason
+        assert completion.call_args.kwargs["schema_model"] is RubricAssessmentResult
+
+
+@pytest.mark.unit
+class TestGradingHistory:
+    """Test storing graded submissions."""
+
+    def test_put_replaces_previous_record(self, previous):
+        history = get_grading_history()
+        history.put(previous)
+        history.put(previous.model_copy(update={"mode": "delta"}))
+
+        stored = history.get("CSC151/Exam1", "alice")
+
+        assert stored.mode == "delta"
+        assert stored.result == previous.result
+        assert history.get("CSC151/Exam2", "alice") is None
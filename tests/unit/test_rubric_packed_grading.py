@@ -0,0 +1,171 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for micro-batched (packed) rubric grading.
+
+Tests cover:
+1. Pack planning under the token budget and pack size
+2. Packed prompt layout (shared prefix, one section per student)
+3. Splitting packed responses into per-student results
+4. Solo fallback for missing, invalid or failed packs
+"""
+
+import json
+
+import pytest
+
+from cqc_cpcc.rubric_config import get_rubric_by_id
+from cqc_cpcc.rubric_grading import build_rubric_grading_prompt_prefix
+from cqc_cpcc.rubric_models import RubricAssessmentResult
+from cqc_cpcc.rubric_packed_grading import (
+    PackedRubricAssessmentResults,
+    build_packed_rubric_grading_prompt,
+    grade_with_rubric_packed,
+    plan_submission_packs,
+    split_packed_results,
+)
+from cqc_cpcc.utilities.AI.openai_exceptions import OpenAISchemaValidationError
+from tests.unit.test_rubric_grading import create_valid_rubric_assessment
+
+ASSIGNMENT_INSTRUCTIONS = "Write a Java program that prints Hello World."
+SMALL = 'public class Hello { public static void main(String[] a) { System.out.println("Hi"); } }'
+
+
+@pytest.fixture
+def base_rubric():
+    return get_rubric_by_id("default_100pt_rubric")
+
+
+def _packed(*student_ids: str) -> PackedRubricAssessmentResults:
+    return PackedRubricAssessmentResults.model_validate({
+        "results": [{"student_id": s, "assessment": create_valid_rubric_assessment()} for s in student_ids]
+    })
+
+
+@pytest.mark.unit
+class TestPackPlanning:
+    """Test grouping submissions into packs."""
+
+    def test_small_submissions_are_packed_up_to_max_size(self):
+        submissions = {f"s{i}": SMALL for i in range(5)}
+
+        packs, solo = plan_submission_packs(submissions, token_budget=8000, max_submissions=2)
+
+        assert packs == [["s0", "s1"], ["s2", "s3"]]
+        assert solo == ["s4"]
+
+    def test_large_submissions_are_graded_alone(self):
+        submissions = {"big": "x " * 5000, "a": SMALL, "b": SMALL}
+
+        packs, solo = plan_submission_packs(submissions, token_budget=8000, max_submissions=6,
+                                            max_submission_tokens=1500)
+
+        assert packs == [["a", "b"]]
+        assert solo == ["big"]
+
+    def test_token_budget_limits_pack(self):
+        submissions = {"a": "word " * 300, "b": "word " * 300, "c": "word " * 300}
+
+        packs, solo = plan_submission_packs(submissions, token_budget=700, max_submissions=6,
+                                            max_submission_tokens=700)
+
+        assert all(len(pack) <= 2 for pack in packs)
+        assert sorted(sum(packs, []) + solo) == ["a", "b", "c"]
+
+
+@pytest.mark.unit
+class TestPackedPrompt:
+    """Test the packed prompt layout."""
+
+    def test_shares_solo_prefix_and_labels_each_student(self, base_rubric):
+        prompt = build_packed_rubric_grading_prompt(
+            base_rubric, ASSIGNMENT_INSTRUCTIONS, {"alice": "code A", "bob": "code B"}
+        )
+
+        assert prompt.startswith(build_rubric_grading_prompt_prefix(base_rubric, ASSIGNMENT_INSTRUCTIONS))
+        assert "2 independent student submissions" in prompt
+        assert prompt.index("student_id: `alice`") < prompt.index("code A") < prompt.index("student_id: `bob`")
+
+
+@pytest.mark.unit
+class TestSplitPackedResults:
+    """Test splitting packed responses."""
+
+    def test_each_student_gets_a_finalized_result(self, base_rubric):
+        results, fallbacks = split_packed_results(base_rubric, ["alice", "bob"], _packed("bob", "alice"))
+
+        assert fallbacks == {}
+        assert set(results) == {"alice", "bob"}
+        assert all(isinstance(r, RubricAssessmentResult) for r in results.values())
+        assert results["alice"].total_points_earned == 85
+
+    def test_missing_and_duplicate_entries_fall_back(self, base_rubric):
+        results, fallbacks = split_packed_results(base_rubric, ["alice", "bob"], _packed("alice", "alice", "stranger"))
+
+        assert results == {}
+        assert "2 times" in fallbacks["alice"]
+        assert fallbacks["bob"] == "missing from packed response"
+
+    def test_invalid_entry_does_not_fail_the_pack(self, base_rubric):
+        entries = [{"student_id": "alice", "assessment": create_valid_rubric_assessment()}]
+        broken = create_valid_rubric_assessment()
+        broken["criteria_results"] = broken["criteria_results"][:3]  # points no longer add up
+        entries.append({"student_id": "carol", "assessment": broken})
+
+        packed = PackedRubricAssessmentResults.model_validate_json(json.dumps({"results": entries}))
+        results, fallbacks = split_packed_results(base_rubric, ["alice", "carol"], packed)
+
+        assert set(results) == {"alice"}
+        assert fallbacks["carol"].startswith("failed validation")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGradeWithRubricPacked:
+    """Test packed grading with solo fallback."""
+
+    async def test_one_request_for_a_pack(self, base_rubric, mocker):
+        completion = mocker.patch("cqc_cpcc.rubric_grading.get_structured_completion",
+                                  return_value=_packed("a", "b", "c"))
+
+        outcome = await grade_with_rubric_packed(base_rubric, ASSIGNMENT_INSTRUCTIONS,
+                                                 {"a": SMALL, "b": SMALL, "c": SMALL})
+
+        assert completion.await_count == 1
+        assert completion.call_args.kwargs["schema_model"] is PackedRubricAssessmentResults
+        assert sorted(outcome.packed) == ["a", "b", "c"]
+        assert outcome.solo == [] and outcome.requests == 1
+
+    async def test_student_missing_from_pack_is_graded_alone(self, base_rubric, mocker):
+        solo = RubricAssessmentResult.model_validate(create_valid_rubric_assessment())
+        completion = mocker.patch("cqc_cpcc.rubric_grading.get_structured_completion",
+                                  side_effect=[_packed("a", "b"), solo])
+
+        outcome = await grade_with_rubric_packed(base_rubric, ASSIGNMENT_INSTRUCTIONS,
+                                                 {"a": SMALL, "b": SMALL, "c": SMALL})
+
+        assert completion.await_count == 2
+        assert completion.call_args.kwargs["schema_model"] is RubricAssessmentResult
+        assert set(outcome.results) == {"a", "b", "c"}
+        assert outcome.solo == ["c"] and outcome.requests == 2
+
+    async def test_invalid_pack_falls_back_for_everyone(self, base_rubric, mocker):
+        solo = RubricAssessmentResult.model_validate(create_valid_rubric_assessment())
+        mocker.patch("cqc_cpcc.rubric_grading.get_structured_completion",
+                     side_effect=[OpenAISchemaValidationError("bad", schema_name="PackedRubricAssessmentResults"),
+                                  solo, solo])
+
+        outcome = await grade_with_rubric_packed(base_rubric, ASSIGNMENT_INSTRUCTIONS, {"a": SMALL, "b": SMALL})
+
+        assert set(outcome.results) == {"a", "b"}
+        assert outcome.packed == []
+        assert all("failed validation" in reason for reason in outcome.fallback_reasons.values())
+
+    async def test_without_solo_fallback_students_are_only_listed(self, base_rubric, mocker):
+        mocker.patch("cqc_cpcc.rubric_grading.get_structured_completion", return_value=_packed("a"))
+
+        outcome = await grade_with_rubric_packed(base_rubric, ASSIGNMENT_INSTRUCTIONS,
+                                                 {"a": SMALL, "b": SMALL}, solo_fallback=False)
+
+        assert set(outcome.results) == {"a"}
+        assert outcome.solo == ["b"]
+        assert outcome.failures == {}
@@ -19,6 +19,7 @@ from cqc_cpcc.rubric_config import get_rubric_by_id, load_rubrics_from_config
 from cqc_cpcc.rubric_models import RubricAssessmentResult, CriterionResult, DetectedError
 from cqc_cpcc.rubric_grading import apply_backend_scoring
 from cqc_cpcc.error_scoring import normalize_errors
+from cqc_cpcc.utilities.AI.debug_writer import flush_debug_writer, read_debug_records
 from cqc_cpcc.utilities.AI.openai_debug import record_response, should_debug
 
 
@@ -216,19 +217,15 @@ def test_debug_logger_saves_complete_parsed_output():
                 output_parsed=mock_parsed,
             )
             
-            # Check that files were created
-            temp_path = Path(temp_dir)
-            files = list(temp_path.glob(f"*{correlation_id}*.json"))
+            # Check that records were written to the debug segments
+            flush_debug_writer(temp_dir)
+            records = {r["data_type"]: r["data"] for r in read_debug_records(temp_dir, correlation_id)}
             
-            assert len(files) > 0, "No debug files were created"
+            assert len(records) > 0, "No debug records were written"
             
-            # Find the response_raw file
-            response_raw_files = [f for f in files if "response_raw" in f.name]
-            assert len(response_raw_files) > 0, "response_raw.json not created"
-            
-            # Read and verify response_raw contains full text
-            with open(response_raw_files[0], 'r') as f:
-                response_raw_data = json.load(f)
+            # Verify response_raw contains full text
+            assert "response_raw" in records, "response_raw record not written"
+            response_raw_data = records["response_raw"]
             
             assert "output" in response_raw_data
             assert "text" in response_raw_data["output"]
@@ -236,13 +233,9 @@ def test_debug_logger_saves_complete_parsed_output():
             assert len(response_raw_data["output"]["text"]) > 500, \
                 f"response_raw should contain full text, got {len(response_raw_data['output']['text'])} chars"
             
-            # Find the response_parsed file
-            response_parsed_files = [f for f in files if "response_parsed" in f.name]
-            assert len(response_parsed_files) > 0, "response_parsed.json not created"
-            
-            # Read and verify response_parsed contains structural fields
-            with open(response_parsed_files[0], 'r') as f:
-                response_parsed_data = json.load(f)
+            # Verify response_parsed contains structural fields
+            assert "response_parsed" in records, "response_parsed record not written"
+            response_parsed_data = records["response_parsed"]
             
             assert "parsed_model" in response_parsed_data
             parsed_model = response_parsed_data["parsed_model"]
@@ -0,0 +1,91 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the compiled schema registry.
+
+Tests cover:
+- Compiled artifacts match the per-request computation they replace
+- Each schema model is compiled only once
+- Warm-up API
+- Fallback prompt built from the cached suffix
+"""
+
+import pytest
+from pydantic import BaseModel, Field
+
+import cqc_cpcc.utilities.AI.schema_registry as registry_module
+from cqc_cpcc.rubric_models import RubricAssessmentResult
+from cqc_cpcc.utilities.AI.openai_client import PreprocessingDigest, _build_fallback_prompt
+from cqc_cpcc.utilities.AI.schema_normalizer import normalize_json_schema_for_openai
+from cqc_cpcc.utilities.AI.schema_registry import (
+    clear_schema_registry,
+    get_compiled_schema,
+    warm_up_schemas,
+)
+
+
+class SimpleFeedback(BaseModel):
+    """Simple test model."""
+    summary: str = Field(description="Brief summary")
+    score: int = Field(description="Score 0-100")
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    clear_schema_registry()
+    yield
+    clear_schema_registry()
+
+
+@pytest.mark.unit
+class TestCompiledSchema:
+    """Test compiled schema contents."""
+
+    def test_normalized_schema_matches_normalizer(self):
+        compiled = get_compiled_schema(RubricAssessmentResult)
+        expected = normalize_json_schema_for_openai(RubricAssessmentResult.model_json_schema())
+        assert compiled.normalized_schema == expected
+
+    def test_response_format_payload(self):
+        compiled = get_compiled_schema(SimpleFeedback)
+        assert compiled.response_format == {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "SimpleFeedback",
+                "schema": compiled.normalized_schema,
+                "strict": True,
+            },
+        }
+
+    def test_type_adapter_validates(self):
+        compiled = get_compiled_schema(SimpleFeedback)
+        result = compiled.type_adapter.validate_json('{"summary": "ok", "score": 5}')
+        assert result == SimpleFeedback(summary="ok", score=5)
+
+    def test_fallback_prompt_uses_suffix(self):
+        compiled = get_compiled_schema(RubricAssessmentResult)
+        prompt = _build_fallback_prompt("Grade this code", RubricAssessmentResult)
+        assert prompt == "Grade this code" + compiled.fallback_prompt_suffix
+        assert "Schema: RubricAssessmentResult" in prompt
+        assert "criterion_id (string)" in prompt
+
+
+@pytest.mark.unit
+class TestRegistryCaching:
+    """Test compile-once behavior and warm-up."""
+
+    def test_compiles_once(self, mocker):
+        spy = mocker.spy(registry_module, "compile_schema")
+        first = get_compiled_schema(SimpleFeedback)
+        second = get_compiled_schema(SimpleFeedback)
+        assert first is second
+        assert spy.call_count == 1
+
+    def test_warm_up_explicit_models(self):
+        names = warm_up_schemas(SimpleFeedback)
+        assert names == ["SimpleFeedback"]
+        assert SimpleFeedback in registry_module._registry
+
+    def test_warm_up_defaults(self):
+        names = warm_up_schemas()
+        assert "RubricAssessmentResult" in names
+        assert PreprocessingDigest in registry_module._registry
@@ -0,0 +1,169 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for streamed structured outputs.
+
+Tests cover:
+- Incremental extraction of finished array elements from arbitrary chunks
+- Strings containing braces/quotes and nested objects
+- get_structured_completion streaming path (callback + final validation)
+- grade_with_rubric criterion callback with preview scoring
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from pydantic import BaseModel
+
+from cqc_cpcc.rubric_config import get_rubric_by_id
+from cqc_cpcc.rubric_grading import grade_with_rubric, preview_criterion_score
+from cqc_cpcc.rubric_models import CriterionResult
+from cqc_cpcc.utilities.AI.openai_client import get_structured_completion
+from cqc_cpcc.utilities.AI.streaming_json import IncrementalArrayItemParser
+from tests.unit.test_rubric_grading import create_valid_rubric_assessment
+
+DOCUMENT = {
+    "rubric_id": "r",
+    "criteria_results": [
+        {"criterion_id": "a", "feedback": "uses {braces} and \"quotes\" and [brackets]", "evidence": ["x"]},
+        {"criterion_id": "b", "feedback": "nested", "detail": {"k": [1, 2, {"z": 3}]}},
+    ],
+    "overall_feedback": "criteria_results",
+    "other": [{"criterion_id": "not-me"}],
+}
+
+
+def _chunks(text: str, size: int) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class Item(BaseModel):
+    """Streamed array element."""
+    id: int
+
+
+class Report(BaseModel):
+    """Test model with a streamed array."""
+    title: str
+    criteria_results: list[Item]
+
+
+@pytest.mark.unit
+class TestIncrementalArrayItemParser:
+    """Test the incremental scanner."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+    def test_extracts_each_element_once(self, chunk_size):
+        parser = IncrementalArrayItemParser("criteria_results")
+        items = []
+        for chunk in _chunks(json.dumps(DOCUMENT), chunk_size):
+            items.extend(parser.feed(chunk))
+
+        assert items == DOCUMENT["criteria_results"]
+        assert parser.items_emitted == 2
+        assert json.loads(parser.text) == DOCUMENT
+
+    def test_element_published_before_document_ends(self):
+        parser = IncrementalArrayItemParser("criteria_results")
+        text = json.dumps(DOCUMENT)
+        cutoff = text.index('{"criterion_id": "b"')
+        assert [item["criterion_id"] for item in parser.feed(text[:cutoff])] == ["a"]
+
+    def test_ignores_other_arrays(self):
+        parser = IncrementalArrayItemParser("missing")
+        assert parser.feed(json.dumps(DOCUMENT)) == []
+
+
+def _stream_chunk(content=None, finish_reason=None, usage=None):
+    choices = [] if content is None and finish_reason is None else [
+        SimpleNamespace(delta=SimpleNamespace(content=content, refusal=None), finish_reason=finish_reason)
+    ]
+    return SimpleNamespace(id="chatcmpl-1", model="gpt-4o", created=1, choices=choices, usage=usage)
+
+
+class _AsyncStream:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        return self._chunks.pop(0)
+
+
+def _mock_streaming_client(mocker, document: dict, chunk_size: int = 5):
+    chunks = [_stream_chunk(content=c) for c in _chunks(json.dumps(document), chunk_size)]
+    chunks.append(_stream_chunk(finish_reason="stop"))
+    chunks.append(_stream_chunk(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30)))
+
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create = AsyncMock(return_value=_AsyncStream(chunks))
+    mocker.patch('cqc_cpcc.utilities.AI.openai_client.get_client', return_value=mock_client)
+    return mock_client
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStreamedStructuredCompletion:
+    """Test the streaming path in get_structured_completion."""
+
+    async def test_items_published_and_result_validated(self, mocker):
+        document = {"title": "t", "criteria_results": [{"id": 1}, {"id": 2}]}
+        mock_client = _mock_streaming_client(mocker, document)
+        received = []
+
+        result = await get_structured_completion(
+            prompt="Grade",
+            model_name="gpt-4o",
+            schema_model=Report,
+            on_stream_item=received.append,
+        )
+
+        assert result == Report(**document)
+        assert received == document["criteria_results"]
+        call_kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert call_kwargs["stream"] is True
+        assert call_kwargs["stream_options"] == {"include_usage": True}
+
+    async def test_async_callback_errors_do_not_fail_request(self, mocker):
+        document = {"title": "t", "criteria_results": [{"id": 1}]}
+        _mock_streaming_client(mocker, document)
+
+        async def failing_callback(item):
+            raise RuntimeError("UI went away")
+
+        result = await get_structured_completion(
+            prompt="Grade", model_name="gpt-4o", schema_model=Report, on_stream_item=failing_callback
+        )
+        assert result.title == "t"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGradeWithRubricStreaming:
+    """Test criterion callback in grade_with_rubric."""
+
+    async def test_criteria_published_with_preview_scores(self, mocker):
+        rubric = get_rubric_by_id("default_100pt_rubric")
+        document = create_valid_rubric_assessment()
+        _mock_streaming_client(mocker, document, chunk_size=40)
+        received: list[CriterionResult] = []
+
+        result = await grade_with_rubric(
+            rubric=rubric,
+            assignment_instructions="Write Hello World",
+            student_submission="print('hi')",
+            model_name="gpt-4o",
+            on_criterion_result=received.append,
+        )
+
+        assert [c.criterion_id for c in received] == [c.criterion_id for c in result.criteria_results]
+        for streamed, final in zip(received, result.criteria_results):
+            assert streamed == preview_criterion_score(rubric, CriterionResult.model_validate(
+                next(c for c in document["criteria_results"] if c["criterion_id"] == streamed.criterion_id)
+            ))
+            assert streamed.criterion_id == final.criterion_id
@@ -0,0 +1,185 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for exact and near-duplicate submission detection.
+
+Tests cover:
+1. Normalization (whitespace and submission headers; comments only for near-duplicates)
+2. Exact duplicate grouping and LLM calls saved
+3. MinHash/LSH near-duplicate detection
+4. Review notes and result fan-out
+"""
+
+import pytest
+
+from cqc_cpcc.rubric_models import RubricAssessmentResult
+from cqc_cpcc.submission_dedup import (
+    MinHasher,
+    fan_out_duplicate_results,
+    find_duplicate_submissions,
+    find_lsh_candidate_pairs,
+    normalize_code_tokens,
+    normalize_submission_text,
+)
+from tests.unit.test_rubric_grading import create_valid_rubric_assessment
+
+PROGRAM = """
+import java.util.Scanner;
+
+public class Grades {
+    public static void main(String[] args) {
+        Scanner input = new Scanner(System.in);
+        int total = 0;
+        for (int i = 0; i < 5; i++) {
+            System.out.print("Enter score: ");
+            total += input.nextInt();
+        }
+        double average = total / 5.0;
+        if (average >= 90) {
+            System.out.println("A");
+        } else if (average >= 80) {
+            System.out.println("B");
+        } else {
+            System.out.println("C");
+        }
+    }
+}
+"""
+
+UNRELATED = """
+def fibonacci(n):
+    a, b = 0, 1
+    result = []
+    while len(result) < n:
+        result.append(a)
+        a, b = b, a + b
+    return result
+
+if __name__ == "__main__":
+    values = fibonacci(int(input("How many? ")))
+    print(", ".join(str(v) for v in values))
+"""
+
+
+def _as_submission(code: str, file_name: str = "Grades.java") -> str:
+    return f"### Submission File Name: {file_name}\n\n### Submission Content:\n```java\n{code}\n```\n"
+
+
+@pytest.mark.unit
+class TestNormalizeSubmissionText:
+    """Test normalization before hashing."""
+
+    def test_whitespace_and_headers_are_ignored(self):
+        reformatted = PROGRAM.replace("    ", "\t").replace("int total = 0;", "int total = 0;   \r\n\n") \
+            .replace("public class", "public   class")
+
+        assert normalize_submission_text(_as_submission(PROGRAM, "alice/Grades.java")) == \
+            normalize_submission_text(_as_submission(reformatted, "bob/Grades.java"))
+
+    def test_comment_only_differences_are_not_exact_duplicates(self):
+        commented = PROGRAM.replace("int total = 0;", "int total = 0; // running total") \
+            .replace("public class", "/** Computes a letter grade. */\npublic class")
+
+        report = find_duplicate_submissions({
+            "alice": _as_submission(PROGRAM),
+            "bob": _as_submission(commented),
+        })
+
+        assert report.llm_calls_saved == 0
+        assert [group.student_ids for group in report.near_duplicate_groups] == [["alice", "bob"]]
+
+    def test_hash_inside_string_literals_is_kept(self):
+        items = normalize_code_tokens('print("Total # of items")  # note')
+        widgets = normalize_code_tokens('print("Total # of widgets")')
+
+        assert "items" in items and "note" not in items
+        assert items != widgets
+
+    def test_urls_and_preprocessor_directives_are_kept(self):
+        normalized = normalize_code_tokens('#include <iostream>\nurl = "http://example.com" # note')
+
+        assert "include" in normalized
+        assert "example" in normalized
+        assert "note" not in normalized
+
+
+@pytest.mark.unit
+class TestFindDuplicateSubmissions:
+    """Test exact and near-duplicate grouping."""
+
+    def test_exact_duplicates_share_a_representative(self):
+        report = find_duplicate_submissions({
+            "alice": _as_submission(PROGRAM),
+            "bob": _as_submission(PROGRAM.replace("    ", "\t") + "\n\n"),
+            "carol": _as_submission(UNRELATED, "fib.py"),
+            "dave": _as_submission(PROGRAM),
+        })
+
+        assert report.representatives == ["alice", "carol"]
+        assert report.exact_duplicates == {"alice": ["bob", "dave"]}
+        assert report.llm_calls_saved == 2
+        assert report.representative_of("dave") == "alice"
+        assert report.representative_of("carol") == "carol"
+
+    def test_renamed_variable_is_a_near_duplicate(self):
+        renamed = PROGRAM.replace("average", "avg")
+
+        report = find_duplicate_submissions({
+            "alice": _as_submission(PROGRAM),
+            "bob": _as_submission(renamed),
+            "carol": _as_submission(UNRELATED, "fib.py"),
+        }, near_threshold=0.5)
+
+        assert report.llm_calls_saved == 0
+        assert [group.student_ids for group in report.near_duplicate_groups] == [["alice", "bob"]]
+        assert 0.5 <= report.near_duplicate_groups[0].similarity < 1.0
+
+    def test_unrelated_and_tiny_submissions_are_not_flagged(self):
+        report = find_duplicate_submissions({
+            "alice": _as_submission(PROGRAM),
+            "carol": _as_submission(UNRELATED, "fib.py"),
+            "empty1": _as_submission("x = 1"),
+            "empty2": _as_submission("y = 2"),
+        })
+
+        assert report.near_duplicate_groups == []
+        assert len(report.representatives) == 4
+
+    def test_bands_must_divide_signature_length(self):
+        signature = MinHasher(num_perm=10).signature({1, 2, 3})
+
+        with pytest.raises(ValueError, match="must divide"):
+            find_lsh_candidate_pairs({"a": signature, "b": signature}, bands=3)
+
+    def test_review_notes(self):
+        report = find_duplicate_submissions({
+            "alice": _as_submission(PROGRAM),
+            "bob": _as_submission(PROGRAM),
+            "carol": _as_submission(PROGRAM.replace("average", "avg")),
+        }, near_threshold=0.5)
+
+        notes = report.review_notes()
+
+        assert notes["bob"].startswith("Exact duplicate of alice")
+        assert "Result reused by exact duplicate(s): bob" in notes["alice"]
+        assert "Near-duplicate group 1" in notes["carol"]
+        assert "alice, bob" in notes["carol"]
+
+
+@pytest.mark.unit
+class TestFanOutDuplicateResults:
+    """Test reusing representatives' results."""
+
+    def test_duplicates_get_independent_copies(self):
+        report = find_duplicate_submissions({
+            "alice": _as_submission(PROGRAM),
+            "bob": _as_submission(PROGRAM),
+            "carol": _as_submission(UNRELATED, "fib.py"),
+            "dave": _as_submission(UNRELATED, "fib.py"),
+        })
+        result = RubricAssessmentResult.model_validate(create_valid_rubric_assessment())
+
+        expanded = fan_out_duplicate_results({"alice": result}, report)
+
+        assert set(expanded) == {"alice", "bob"}
+        assert expanded["bob"] == result
+        assert expanded["bob"] is not result
@@ -0,0 +1,129 @@
+#  Copyright (c) 2024. Christopher Queen Consulting LLC (http://www.ChristopherQueenConsulting.com/)
+
+"""Unit tests for the calibrated token estimator.
+
+Tests cover:
+- Pre-tokenizer piece counting (camelCase, digits, punctuation, indentation)
+- Language segmentation by fenced code blocks
+- Online calibration of prose and code factors from reported usage
+- Excluding json_schema tokens from calibration
+- Persistence of calibration data
+"""
+
+import json
+
+import pytest
+
+from cqc_cpcc.rubric_models import RubricAssessmentResult
+from cqc_cpcc.utilities.AI.schema_registry import get_compiled_schema
+from cqc_cpcc.utilities.token_estimator import (
+    MIN_LANGUAGE_SAMPLES,
+    MIN_OBSERVATION_TOKENS,
+    TokenEstimator,
+    count_raw_tokens,
+    split_language_segments,
+)
+
+PROSE = "The student should write a program that prints a greeting. " * 60
+JAVA = "public class Main {\n    public static void main(String[] args) {\n        System.out.println(x);\n    }\n}\n" * 20
+
+
+@pytest.mark.unit
+class TestCountRawTokens:
+    """Test pre-tokenization counting."""
+
+    @pytest.mark.parametrize("text,expected", [
+        ("", 0),
+        ("hello world", 2),
+        ("getStudentName", 3),
+        ("HTTPServer", 2),
+        ("12345", 2),
+        ("();", 2),
+        ("x" * 15, 3),
+    ])
+    def test_piece_counts(self, text, expected):
+        assert count_raw_tokens(text) == expected
+
+    def test_indentation_is_one_piece(self):
+        assert count_raw_tokens("a\n" + " " * 16 + "b") == count_raw_tokens("a\n  b") == 3
+
+
+@pytest.mark.unit
+class TestSplitLanguageSegments:
+    """Test fence-based language detection."""
+
+    def test_splits_prose_and_code(self):
+        text = "Grade this:\n```java\nint x = 1;\n```\nThanks"
+        segments = split_language_segments(text)
+        assert set(segments) == {"text", "java"}
+        assert segments["java"] == count_raw_tokens("int x = 1;\n")
+
+    def test_unterminated_fence_counts_as_code(self):
+        assert "python" in split_language_segments("```python\nprint(1)")
+
+
+@pytest.mark.unit
+class TestCalibration:
+    """Test learning factors from reported usage."""
+
+    def test_uncalibrated_factor_is_one(self):
+        estimator = TokenEstimator()
+        assert estimator.estimate(PROSE) == count_raw_tokens(PROSE)
+
+    def test_learns_prose_factor(self):
+        estimator = TokenEstimator()
+        raw = count_raw_tokens(PROSE)
+        assert raw >= MIN_OBSERVATION_TOKENS
+        for _ in range(MIN_LANGUAGE_SAMPLES):
+            estimator.observe(PROSE, int(raw * 1.2) + 7)
+
+        assert estimator.factor("text") == pytest.approx(1.2, rel=0.01)
+        assert estimator.estimate(PROSE) == pytest.approx(raw * 1.2, rel=0.01)
+
+    def test_learns_code_factor_net_of_prose(self):
+        estimator = TokenEstimator()
+        prompt = f"Instructions\n```java\n{JAVA}```\n"
+        segments = split_language_segments(prompt)
+        actual = round(segments["text"] + segments["java"] * 1.5) + 7
+
+        for _ in range(MIN_LANGUAGE_SAMPLES):
+            estimator.observe(prompt, actual)
+
+        assert estimator.factor("java") == pytest.approx(1.5, rel=0.02)
+        # Other code languages fall back to the aggregate code factor
+        assert estimator.factor("python") == pytest.approx(1.5, rel=0.02)
+        assert estimator.factor("text") == 1.0
+
+    def test_schema_tokens_are_excluded_from_calibration(self):
+        estimator = TokenEstimator()
+        schema_tokens = get_compiled_schema(RubricAssessmentResult).schema_tokens
+        raw = count_raw_tokens(PROSE)
+        assert schema_tokens > raw / 2  # Large enough to skew the factor if counted as prompt text
+
+        for _ in range(MIN_LANGUAGE_SAMPLES):
+            estimator.observe(PROSE, raw + 7 + schema_tokens, extra_tokens=schema_tokens)
+
+        assert estimator.factor("text") == pytest.approx(1.0, rel=0.01)
+
+    def test_ignores_small_or_non_integer_observations(self, mocker):
+        estimator = TokenEstimator()
+        estimator.observe("short prompt", 500)
+        estimator.observe(PROSE, mocker.MagicMock())
+        estimator.observe(PROSE, None)
+        assert estimator.snapshot() == {}
+
+    def test_persists_and_reloads(self, tmp_path):
+        path = tmp_path / "calibration.json"
+        estimator = TokenEstimator(path=path)
+        raw = count_raw_tokens(PROSE)
+        for _ in range(MIN_LANGUAGE_SAMPLES):
+            estimator.observe(PROSE, raw * 2 + 7)
+        estimator.save()
+
+        assert json.loads(path.read_text())["text"]["samples"] == MIN_LANGUAGE_SAMPLES
+        assert TokenEstimator(path=path).factor("text") == pytest.approx(2.0)
+
+    def test_corrupt_calibration_file_is_ignored(self, tmp_path):
+        path = tmp_path / "calibration.json"
+        path.write_text("{not json")
+        assert TokenEstimator(path=path).snapshot() == {}
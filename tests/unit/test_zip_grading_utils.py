@@ -28,15 +28,20 @@ class TestTokenEstimation:
         """Test token estimation for short text."""
         text = "Hello world"
         tokens = estimate_tokens(text)
-        expected = len(text) // CHARS_PER_TOKEN
-        assert tokens == expected
+        assert tokens == 2
     
     def test_estimate_tokens_long_text(self):
         """Test token estimation for longer text."""
         text = "This is a longer piece of text " * 100
         tokens = estimate_tokens(text)
-        assert tokens > 0
-        assert tokens == len(text) // CHARS_PER_TOKEN
+        assert tokens == 700
+        assert tokens > len(text) // CHARS_PER_TOKEN * 0.5
+    
+    def test_estimate_tokens_ignores_indentation_width(self):
+        """Deep indentation should not inflate the estimate like chars/4 did."""
+        shallow = "if (x) {\n  return y;\n}"
+        deep = "if (x) {\n                return y;\n}"
+        assert estimate_tokens(deep, "java") == estimate_tokens(shallow, "java")
 
 
 @pytest.mark.unit